@@ -0,0 +1,399 @@
+"""価格アラートエンジンモジュール"""
+import bisect
+import logging
+import queue
+import threading
+import pandas as pd
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from database import db
+from price_watcher import PriceCacheWatcher
+from stock_analyzer import StockAnalyzer
+from exceptions import StockTrackingError
+from symbol_utils import normalize_symbol
+from config import RSI_PERIOD, ALERT_WEBHOOK_URL, ALERT_QUEUE_SIZE, ALERT_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# ルール種別
+PRICE_ABOVE = 'price_above'
+PRICE_BELOW = 'price_below'
+CHANGE_ABOVE = 'change_above'
+CHANGE_BELOW = 'change_below'
+RSI_ABOVE = 'rsi_above'
+RSI_BELOW = 'rsi_below'
+NEW_52W_HIGH = 'new_52w_high'
+NEW_52W_LOW = 'new_52w_low'
+
+# 価格キャッシュ更新時に評価するルール（指標, 方向）
+QUOTE_RULES = {
+    PRICE_ABOVE: ('current_price', 'up'),
+    PRICE_BELOW: ('current_price', 'down'),
+    CHANGE_ABOVE: ('change_percent', 'up'),
+    CHANGE_BELOW: ('change_percent', 'down'),
+}
+THRESHOLD_RULES = set(QUOTE_RULES) | {RSI_ABOVE, RSI_BELOW}
+RULE_TYPES = THRESHOLD_RULES | {NEW_52W_HIGH, NEW_52W_LOW}
+
+# 52週高値・安値の判定に使う営業日数
+WEEKS_52_BARS = 252
+
+
+class ThresholdIndex:
+    """閾値でソートされたルールIDの索引（閾値を跨いだルールだけを二分探索で取り出す）"""
+
+    def __init__(self):
+        self._thresholds: List[float] = []
+        self._ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, threshold: float, rule_id: int):
+        i = bisect.bisect_right(self._thresholds, threshold)
+        self._thresholds.insert(i, threshold)
+        self._ids.insert(i, rule_id)
+
+    def remove(self, threshold: float, rule_id: int):
+        i = bisect.bisect_left(self._thresholds, threshold)
+        while i < len(self._ids) and self._thresholds[i] == threshold:
+            if self._ids[i] == rule_id:
+                del self._thresholds[i]
+                del self._ids[i]
+                return
+            i += 1
+
+    def crossed_up(self, previous: float, current: float) -> List[int]:
+        """previous < 閾値 <= current となるルール"""
+        lo = bisect.bisect_right(self._thresholds, previous)
+        hi = bisect.bisect_right(self._thresholds, current)
+        return self._ids[lo:hi]
+
+    def crossed_down(self, previous: float, current: float) -> List[int]:
+        """current <= 閾値 < previous となるルール"""
+        lo = bisect.bisect_left(self._thresholds, current)
+        hi = bisect.bisect_left(self._thresholds, previous)
+        return self._ids[lo:hi]
+
+
+class AlertEngine:
+    """
+    アラートルールの増分評価エンジン
+
+    ルールは銘柄・種別ごとの閾値索引で保持し、保存通知を受けて
+    該当銘柄の跨いだ閾値のルールだけを評価する。
+    価格・変動率ルールは価格キャッシュ更新時、RSI・52週高安ルールは履歴保存時に評価する。
+
+    複数プロセスで起動した場合は、バックグラウンド処理を担当する1つのプロセスが start で
+    価格キャッシュの変更を監視して評価する（どのプロセスが保存しても1回だけ評価される）。
+    ルールの索引はプロセスごとに持つため、評価のたびにルールの版を確認し、変わっていれば読み込み直す。
+    """
+
+    def __init__(self, webhook_url: str = ALERT_WEBHOOK_URL, queue_size: int = ALERT_QUEUE_SIZE,
+                 poll_seconds: float = ALERT_POLL_SECONDS):
+        self.webhook_url = webhook_url
+        self.poll_seconds = poll_seconds
+        self.events: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.watcher = PriceCacheWatcher()
+        self.watcher.add_listener(self.on_data_saved)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version: Optional[Tuple[int, int]] = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self._rules: Dict[int, Dict] = {}
+        self._index: Dict[str, Dict[str, ThresholdIndex]] = defaultdict(lambda: defaultdict(ThresholdIndex))
+        self._extreme_rules: Dict[str, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._last_quotes: Dict[str, Dict[str, float]] = {}
+        self._webhook_queue: Optional[queue.Queue] = None
+
+    # ---- ルール管理 ----
+
+    def load(self):
+        """
+        有効なルールをデータベースから読み込み、索引を構築
+
+        読み込み直す場合も、既に前回値がある銘柄はその値を跨ぎ判定の起点として引き継ぐ
+        （価格キャッシュには今回の値が保存済みのため、読み込み直すと跨ぎを検知できない）。
+        """
+        with self._lock:
+            # 読み込み中に変更された場合は次の評価で再度読み込むよう、版を先に取得する
+            self._version = db.get_alert_rules_version()
+            last_quotes = dict(self._last_quotes)
+            self._rules.clear()
+            self._index.clear()
+            self._extreme_rules.clear()
+            self._last_quotes.clear()
+            for rule in db.get_alert_rules(enabled_only=True):
+                self._index_rule(rule)
+            self._last_quotes.update(last_quotes)
+            self._seed_quotes([symbol for symbol in self._index if symbol not in self._last_quotes])
+            self._loaded = True
+        logger.info(f"Loaded {len(self._rules)} alert rules")
+
+    def _ensure_loaded(self):
+        """未読み込み、または他のプロセスでルールが追加・削除された場合に読み込む"""
+        if not self._loaded or db.get_alert_rules_version() != self._version:
+            self.load()
+
+    def _index_rule(self, rule: Dict):
+        self._rules[rule['id']] = rule
+        if rule['rule_type'] in THRESHOLD_RULES:
+            self._index[rule['symbol']][rule['rule_type']].add(rule['threshold'], rule['id'])
+        else:
+            self._extreme_rules[rule['symbol']][rule['rule_type']].add(rule['id'])
+
+    def _unindex_rule(self, rule_id: int):
+        rule = self._rules.pop(rule_id, None)
+        if not rule:
+            return
+        symbol = rule['symbol']
+        if rule['rule_type'] in THRESHOLD_RULES:
+            index = self._index[symbol][rule['rule_type']]
+            index.remove(rule['threshold'], rule_id)
+            if not index:
+                del self._index[symbol][rule['rule_type']]
+            if not self._index[symbol]:
+                del self._index[symbol]
+        else:
+            self._extreme_rules[symbol][rule['rule_type']].discard(rule_id)
+            if not self._extreme_rules[symbol][rule['rule_type']]:
+                del self._extreme_rules[symbol][rule['rule_type']]
+            if not self._extreme_rules[symbol]:
+                del self._extreme_rules[symbol]
+
+    def _seed_quotes(self, symbols: List[str]):
+        """前回値として価格キャッシュを読み込む（跨ぎ判定の起点）"""
+        for symbol, cache in db.get_price_cache_entries(symbols).items():
+            self._last_quotes[symbol] = {
+                'current_price': cache.get('current_price'),
+                'change_percent': cache.get('change_percent'),
+            }
+
+    def add_rule(self, symbol: str, rule_type: str, threshold: Optional[float] = None, repeat: bool = True) -> Dict:
+        """アラートルールを追加"""
+        if rule_type not in RULE_TYPES:
+            raise StockTrackingError(f"未対応のルール種別です: {rule_type}", 400)
+        if rule_type in THRESHOLD_RULES:
+            try:
+                threshold = float(threshold)
+            except (TypeError, ValueError):
+                raise StockTrackingError('threshold に数値を指定してください', 400)
+        else:
+            threshold = None
+
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            # 読み込み前に追加すると新しいルールが二重に索引されるため先に読み込む
+            self._ensure_loaded()
+
+        rule = db.add_alert_rule(symbol, rule_type, threshold, repeat)
+        if rule is None:
+            raise StockTrackingError('アラートルールの追加に失敗しました', 500)
+
+        with self._lock:
+            if rule['rule_type'] in QUOTE_RULES and symbol not in self._last_quotes:
+                self._seed_quotes([symbol])
+            self._index_rule(rule)
+        return rule
+
+    def remove_rule(self, rule_id: int) -> bool:
+        """アラートルールを削除"""
+        if not db.remove_alert_rule(rule_id):
+            return False
+        with self._lock:
+            self._unindex_rule(rule_id)
+        return True
+
+    # ---- 評価 ----
+
+    def on_data_saved(self, kind: str, symbol: str, data):
+        """PriceCacheWatcher の変更通知ハンドラ"""
+        with self._lock:
+            self._ensure_loaded()
+            if kind == 'price':
+                fired = self._evaluate_quote(symbol, data)
+            elif kind == 'history':
+                fired = self._evaluate_history(symbol)
+            else:
+                fired = []
+        for rule, value, event_key in fired:
+            self._trigger(rule, value, event_key)
+
+    def _evaluate_quote(self, symbol: str, quote: Dict) -> List[Tuple[Dict, float, Optional[str]]]:
+        # ルールがない銘柄も前回値を記録し、他のプロセスで追加されたルールの跨ぎ判定の起点にする
+        previous = self._last_quotes.get(symbol, {})
+        current = {field: quote.get(field) for field in ('current_price', 'change_percent')}
+        self._last_quotes[symbol] = current
+
+        indexes = self._index.get(symbol)
+        if not indexes:
+            return []
+
+        fired = []
+        for rule_type, index in indexes.items():
+            if rule_type not in QUOTE_RULES:
+                continue
+            field, direction = QUOTE_RULES[rule_type]
+            before, after = previous.get(field), current.get(field)
+            if before is None or after is None:
+                continue
+            ids = index.crossed_up(before, after) if direction == 'up' else index.crossed_down(before, after)
+            fired.extend((self._rules[rule_id], after, None) for rule_id in ids)
+        return fired
+
+    def _evaluate_history(self, symbol: str) -> List[Tuple[Dict, float, Optional[str]]]:
+        indexes = self._index.get(symbol, {})
+        extremes = self._extreme_rules.get(symbol, {})
+        has_rsi = RSI_ABOVE in indexes or RSI_BELOW in indexes
+        if not has_rsi and not extremes:
+            return []
+
+        rows = db.get_closes([symbol], days=400)
+        if len(rows) < 2:
+            return []
+        bar_date = rows[-1][1]
+        closes = pd.Series([row[2] for row in rows], dtype='float64')
+        fired = []
+
+        if has_rsi and len(closes) > RSI_PERIOD:
+            before = StockAnalyzer.calculate_rsi(closes.iloc[:-1])
+            after = StockAnalyzer.calculate_rsi(closes)
+            if pd.notna(before) and pd.notna(after):
+                if RSI_ABOVE in indexes:
+                    fired.extend((self._rules[i], after, bar_date) for i in indexes[RSI_ABOVE].crossed_up(before, after))
+                if RSI_BELOW in indexes:
+                    fired.extend((self._rules[i], after, bar_date) for i in indexes[RSI_BELOW].crossed_down(before, after))
+
+        if extremes:
+            window = closes.iloc[-WEEKS_52_BARS - 1:-1]
+            last = float(closes.iloc[-1])
+            if last > window.max():
+                fired.extend((self._rules[i], last, bar_date) for i in extremes.get(NEW_52W_HIGH, ()))
+            if last < window.min():
+                fired.extend((self._rules[i], last, bar_date) for i in extremes.get(NEW_52W_LOW, ()))
+
+        # 同じバーで既に通知済みのルールは除外
+        return [f for f in fired if f[0].get('last_event_key') != bar_date]
+
+    @staticmethod
+    def _format_message(rule: Dict, value: float) -> str:
+        symbol, threshold = rule['symbol'], rule['threshold']
+        messages = {
+            PRICE_ABOVE: f"{symbol} の株価が {threshold} を上回りました（現在値 {value:.2f}）",
+            PRICE_BELOW: f"{symbol} の株価が {threshold} を下回りました（現在値 {value:.2f}）",
+            CHANGE_ABOVE: f"{symbol} の変動率が {threshold}% を上回りました（{value:.2f}%）",
+            CHANGE_BELOW: f"{symbol} の変動率が {threshold}% を下回りました（{value:.2f}%）",
+            RSI_ABOVE: f"{symbol} のRSIが {threshold} を上抜けました（RSI {value:.1f}）",
+            RSI_BELOW: f"{symbol} のRSIが {threshold} を下抜けました（RSI {value:.1f}）",
+            NEW_52W_HIGH: f"{symbol} が52週高値を更新しました（{value:.2f}）",
+            NEW_52W_LOW: f"{symbol} が52週安値を更新しました（{value:.2f}）",
+        }
+        return messages[rule['rule_type']]
+
+    def _trigger(self, rule: Dict, value: float, event_key: Optional[str]):
+        """発火を記録し、キュー・Webhookに送る"""
+        event = db.record_alert_event(rule, value, self._format_message(rule, value), event_key)
+        if event is None:
+            return
+
+        with self._lock:
+            if not rule['repeat']:
+                self._unindex_rule(rule['id'])
+            else:
+                rule['last_event_key'] = event_key if event_key is not None else rule.get('last_event_key')
+                rule['last_triggered_at'] = event['triggered_at']
+
+        self._publish(event)
+
+    def start(self):
+        """価格キャッシュの変更を poll_seconds ごとに確認して評価するスレッドを開始（バックグラウンド処理を担当するプロセスで呼ぶ）"""
+        with self._lock:
+            if self._watch_thread is not None and self._watch_thread.is_alive():
+                return
+            self._watch_stop = threading.Event()
+            self._watch_thread = threading.Thread(
+                target=self._watch_loop, args=(self._watch_stop,), name='alert-watcher', daemon=True
+            )
+            self._watch_thread.start()
+
+    def stop(self):
+        """
+        評価するスレッドを停止
+
+        停止中の変更は他のプロセスが評価するため、再開時は監視の基準と前回値を取り直し、
+        停止前の値を起点に同じ跨ぎを重複して通知しないようにする。
+        """
+        with self._lock:
+            thread, self._watch_thread = self._watch_thread, None
+            self._watch_stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self._lock:
+            self.watcher.reset()
+            self._last_quotes.clear()
+            self._loaded = False
+
+    def _watch_loop(self, stop: threading.Event):
+        from models.database import db_session
+
+        while not stop.is_set():
+            try:
+                self.watcher.poll()
+            except Exception as e:
+                logger.error(f"Alert watcher failed: {e}")
+            finally:
+                db_session.remove()
+            stop.wait(self.poll_seconds)
+
+    # ---- 通知先 ----
+
+    def _publish(self, event: Dict):
+        # キューが満杯の場合は最も古いイベントを捨てる
+        while True:
+            try:
+                self.events.put_nowait(event)
+                break
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+        if self.webhook_url:
+            self._ensure_webhook_worker()
+            try:
+                self._webhook_queue.put_nowait(event)
+            except queue.Full:
+                logger.warning(f"Alert webhook queue full, dropping event {event['id']}")
+
+    def _ensure_webhook_worker(self):
+        with self._lock:
+            if self._webhook_queue is not None:
+                return
+            self._webhook_queue = queue.Queue(maxsize=self.events.maxsize or 1000)
+            threading.Thread(target=self._webhook_worker, name='alert-webhook', daemon=True).start()
+
+    def _webhook_worker(self):
+        """Webhookへの送信（保存処理をブロックしないよう専用スレッドで行う）"""
+        import requests
+
+        while True:
+            event = self._webhook_queue.get()
+            try:
+                requests.post(self.webhook_url, json=event, timeout=5)
+            except Exception as e:
+                logger.warning(f"Failed to post alert webhook: {e}")
+
+    # ---- 参照 ----
+
+    def get_rules(self, symbol: Optional[str] = None) -> List[Dict]:
+        return db.get_alert_rules(normalize_symbol(symbol) if symbol else None)
+
+    def get_events(self, symbol: Optional[str] = None, since: Optional[datetime] = None, limit: int = 100) -> List[Dict]:
+        return db.get_alert_events(normalize_symbol(symbol) if symbol else None, since, limit)
+
+
+# グローバルインスタンス
+alert_engine = AlertEngine()
@@ -1,19 +1,42 @@
 """株価トラッキング & 分析アプリ - メインアプリケーションファイル"""
-from flask import Flask, jsonify, request, send_from_directory, render_template
+from flask import Flask, Response, g, jsonify, request, send_from_directory, render_template
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import time
 from typing import Dict, Optional
 
-from config import CACHE_MINUTES, IS_PRODUCTION, ALLOWED_ORIGINS
+from config import (
+    CACHE_MINUTES, IS_PRODUCTION, ALLOWED_ORIGINS,
+    RISK_HISTORY_DAYS, RISK_SIMULATIONS, RISK_HORIZON_DAYS,
+    FX_BASE_CURRENCY, FX_HISTORY_DAYS,
+    PREDICTION_HISTORY_PERIOD, PREDICTION_ENGINE, PREDICTION_WAIT_SECONDS, PREDICTION_MAX_PERIODS,
+    PREDICTION_BATCH_TIME, PREDICTION_BATCH_MAX_AGE_DAYS, METRICS_ENABLED, PROFILING_SAMPLE_INTERVAL_MS
+)
 from database import db
-from stock_api import StockAPI, get_stock_price_with_fallback
-from stock_analyzer import StockAnalyzer
-from symbol_utils import normalize_symbol, get_currency, SymbolUtils
+from models.database import db_session
+from stock_api import StockAPI, HISTORY_FORMATS, get_stock_price_with_fallback
+from symbol_utils import normalize_symbol, SymbolUtils
 from exceptions import StockTrackingError
+from http_cache import ConditionalGet, compressed_cache
+from history_query import HistoryQuery
 from services.stock_service import StockService
+from services.portfolio_service import PortfolioService
+from services.detail_service import DetailService, DETAIL_FIELDS, DEFAULT_DETAIL_FIELDS
+from alert_engine import alert_engine
+from price_stream import price_stream
+from prediction_jobs import prediction_jobs
+from stock_import import StockImporter, stock_imports
+from enrichment_queue import enrichment_worker
+from forecast_batch import forecast_batch_scheduler
+from metrics import metrics, HTTP_REQUEST_SECONDS
+from tracing import tracer, TracedJSONProvider
+from profiling import profiler, allocation_tracker, PROFILE_MODES
+from leases import RoleLease, owner_id
+from shard_refresh import shard_status
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
+app.json = TracedJSONProvider(app)
 
 # SECRET_KEY設定
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', os.urandom(24))
@@ -29,12 +52,103 @@ from logging_config import setup_logging
 setup_logging(app)
 
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    tracer.start(f'{request.method} {request.path}')
+
+
+@app.after_request
+def record_request_time(response):
+    """ルートごとのレスポンス時間を記録（ラベルはURLではなくルールにして種類数を抑える）し、処理時間の内訳を付与"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start, method=request.method, route=route, status=response.status_code
+        )
+    trace = tracer.finish()
+    if trace is not None:
+        response.headers['Server-Timing'] = tracer.server_timing(trace)
+    return response
+
+
+@app.teardown_request
+def end_request_trace(exc):
+    # after_request を通らなかった場合もトレースを残さない
+    tracer.finish()
+
+
+@app.teardown_appcontext
+def remove_db_session(exc):
+    # リクエストごとのスレッドが接続を持ち続けると同時リクエストで接続プールが枯渇する
+    db_session.remove()
+
+
+@app.before_request
+def start_request_profile():
+    """X-Profile-Token が一致するリクエストをプロファイル"""
+    token = request.headers.get('X-Profile-Token')
+    if token and profiler.is_authorized(token):
+        mode = request.headers.get('X-Profile-Mode', 'cprofile')
+        g.profile = profiler.begin(mode if mode in PROFILE_MODES else 'cprofile')
+
+
+@app.after_request
+def finish_request_profile(response):
+    handle = g.pop('profile', None)
+    if handle is not None:
+        response.headers['X-Profile-Id'] = profiler.end(handle, f'{request.method} {request.path}')
+    return response
+
+
+
+def _data_etag(kind: str, symbols, version: Dict, *params) -> str:
+    """価格データの更新状況からETagを生成（履歴の取得範囲が日付で変わるため当日の日付も含める）"""
+    cached_at = version['cached_at'].isoformat() if version['cached_at'] else None
+    return ConditionalGet.make_etag(
+        kind, tuple(symbols), cached_at, version['history_date'], datetime.now().strftime('%Y-%m-%d'), *params
+    )
+
+
+def _conditional_data_response(kind: str, symbols, build, *params):
+    """
+    価格データに基づくレスポンスを条件付きGETで返す
+    
+    全銘柄の price_cache が有効期限内の場合のみ 304 や圧縮済みレスポンスを返す（期限切れの場合は再取得が必要なため）。
+    """
+    version = db.get_data_version(symbols)
+    if version['fresh']:
+        etag = _data_etag(kind, symbols, version, *params)
+        not_modified = ConditionalGet.not_modified(etag, version['cached_at'])
+        if not_modified is not None:
+            return not_modified
+        # 同じ版の圧縮済みレスポンスがあればそのまま返す
+        cached = compressed_cache.respond(etag)
+        if cached is not None:
+            return ConditionalGet.apply(cached, etag, version['cached_at'])
+    
+    response = build()
+    if isinstance(response, tuple):
+        return response
+    version = db.get_data_version(symbols)
+    etag = _data_etag(kind, symbols, version, *params)
+    if version['fresh']:
+        response = compressed_cache.store(etag, response)
+    else:
+        response = compressed_cache.compress_response(response)
+    return ConditionalGet.apply(response, etag, version['cached_at'])
+
 
 @app.route('/api/stocks', methods=['GET'])
 def get_tracked_stocks():
     """追跡中の銘柄一覧を取得"""
     stocks = db.get_tracked_stocks()
-    return jsonify(stocks)
+    etag = ConditionalGet.make_etag('stocks', [tuple(sorted(stock.items())) for stock in stocks])
+    not_modified = ConditionalGet.not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    return ConditionalGet.apply(jsonify(stocks), etag)
 
 
 @app.route('/api/stocks', methods=['POST'])
@@ -42,13 +156,44 @@ def add_stock():
     """新しい銘柄を追加"""
     data = request.json
     raw_symbol = data.get('symbol', '').upper() if data else ''
-    force_add = data.get('force', False) if data else False
     
     # サービス層に処理を委譲
-    response_data, status_code = StockService.add_stock(raw_symbol, force_add)
+    response_data, status_code = StockService.add_stock(raw_symbol)
     return jsonify(response_data), status_code
 
 
+@app.route('/api/stocks/import', methods=['POST'])
+def import_stocks():
+    """銘柄を一括登録（CSV / JSON）し、銘柄情報はバックグラウンドで取得"""
+    upload = request.files.get('file')
+    if upload is not None:
+        content = upload.read().decode('utf-8-sig')
+        content_format = 'json' if (upload.filename or '').lower().endswith('.json') else 'csv'
+    else:
+        content = request.get_data(as_text=True)
+        content_format = 'json' if request.is_json else 'csv'
+    content_format = request.args.get('format', content_format)
+    enrich = request.args.get('enrich', 'true').lower() == 'true'
+    
+    job = stock_imports.start(StockImporter.parse(content, content_format), enrich=enrich)
+    return jsonify(job), 202 if job['status'] != 'done' else 201
+
+
+@app.route('/api/stocks/import/<job_id>', methods=['GET'])
+def get_import_status(job_id: str):
+    """銘柄インポートの進捗を取得"""
+    job = stock_imports.get(job_id)
+    if job is None:
+        return jsonify({'error': 'インポートが見つかりません'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/stocks/enrichment', methods=['GET'])
+def get_enrichment_status():
+    """銘柄情報取得キューの状態を取得"""
+    return jsonify(db.get_enrichment_summary())
+
+
 @app.route('/api/stocks/<path:symbol>', methods=['DELETE'])
 def remove_stock(symbol: str):
     """銘柄を削除"""
@@ -87,9 +232,20 @@ def get_stock_price(symbol: str):
     symbol = symbol.upper()
     period = request.args.get('period', '1mo')
     use_cache = request.args.get('use_cache', 'true').lower() == 'true'
+    history_format = request.args.get('history_format', 'rows')
+    if history_format not in HISTORY_FORMATS:
+        return jsonify({'error': f'不明な履歴形式です: {history_format}'}), 400
     
+    return _conditional_data_response(
+        'price', [symbol], lambda: _build_price_response(symbol, period, use_cache, history_format),
+        period, use_cache, history_format
+    )
+
+
+def _build_price_response(symbol: str, period: str, use_cache: bool, history_format: str):
+    """株価データのレスポンスを構築"""
     try:
-        response = get_stock_price_with_fallback(symbol, period, use_cache)
+        response = get_stock_price_with_fallback(symbol, period, use_cache, history_format)
         if response:
             return jsonify(response)
         else:
@@ -102,7 +258,7 @@ def get_stock_price(symbol: str):
             if cached_history:
                 response = StockAPI.build_history_response(
                     symbol, cached_history,
-                    'APIレート制限のため、保存された履歴データを使用しています'
+                    'APIレート制限のため、保存された履歴データを使用しています', history_format
                 )
                 if response:
                     return jsonify(response)
@@ -115,25 +271,82 @@ def analyze_stock(symbol: str):
     symbol = normalize_symbol(symbol)
     period = request.args.get('period', '1y')
     
+    return _conditional_data_response('analysis', [symbol], lambda: _build_analysis_response(symbol, period), period)
+
+
+def _build_analysis_response(symbol: str, period: str):
+    """分析評価のレスポンスを構築"""
     try:
         hist = StockAPI.get_history(symbol, period)
         if hist is None or hist.empty:
             return jsonify({'error': 'データが見つかりません'}), 404
         
-        analysis = StockAnalyzer.analyze(hist)
-        currency = get_currency(symbol)
-        
-        return jsonify({
-            'symbol': symbol,
-            'currency': currency,
-            'currency_symbol': SymbolUtils.get_currency_symbol(currency),
-            'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            **analysis
-        })
+        return jsonify(DetailService.analysis_response(symbol, hist))
     except Exception as e:
         return jsonify({'error': f'分析の実行に失敗しました: {str(e)}'}), 500
 
 
+@app.route('/api/stocks/<path:symbol>/detail', methods=['GET'])
+def get_stock_detail(symbol: str):
+    """銘柄詳細（価格・分析・財務・配当・予測）を1回のリクエストで取得"""
+    symbol = normalize_symbol(symbol)
+    period = request.args.get('period', '3mo')
+    history_format = request.args.get('history_format', 'rows')
+    engine = request.args.get('engine', PREDICTION_ENGINE)
+    fields = tuple(f.strip() for f in request.args.get('fields', ','.join(DEFAULT_DETAIL_FIELDS)).split(',') if f.strip())
+    unknown = [f for f in fields if f not in DETAIL_FIELDS]
+    if unknown:
+        return jsonify({'error': f"不明な項目です: {', '.join(unknown)}"}), 400
+    if history_format not in HISTORY_FORMATS:
+        return jsonify({'error': f'不明な履歴形式です: {history_format}'}), 400
+    periods = _parse_periods(request.args.get('periods', 30))
+    
+    def build():
+        response_data, status_code = DetailService.get_detail(symbol, period, fields, history_format, periods, engine)
+        prediction = response_data.get('prediction') or {}
+        if status_code != 200 or 'job_id' in prediction:
+            # 予測ジョブが未完了の場合は版としてキャッシュしない
+            return jsonify(response_data), status_code
+        return jsonify(response_data)
+    
+    return _conditional_data_response(
+        'detail', [symbol], build, period, tuple(sorted(set(fields))), history_format, periods, engine
+    )
+
+
+@app.route('/api/stocks/<path:symbol>/history', methods=['GET'])
+def query_stock_history(symbol: str):
+    """保存済みの履歴を期間・列・足の種類を指定して取得（行は順次書き出す）"""
+    symbol = normalize_symbol(symbol)
+    fields = request.args.get('fields')
+    order = request.args.get('order', 'asc')
+    try:
+        if order not in ('asc', 'desc'):
+            raise ValueError(f'不明な並び順です: {order}')
+        limit = request.args.get('limit')
+        query = HistoryQuery(
+            symbol,
+            fields=[f.strip() for f in fields.split(',') if f.strip()] if fields else None,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            interval=request.args.get('interval', '1d'),
+            limit=int(limit) if limit else None,
+            descending=order == 'desc'
+        )
+    except ValueError as e:
+        return jsonify({'error': f'パラメータの形式が無効です: {e}'}), 400
+    
+    # 履歴は価格の保存時に更新されるため、価格データの更新状況で判定する
+    version = db.get_data_version([symbol])
+    etag = _data_etag(
+        'history', [symbol], version, query.fields, query.start, query.end, query.interval, query.limit, order
+    )
+    not_modified = ConditionalGet.not_modified(etag, version['cached_at'])
+    if not_modified is not None:
+        return not_modified
+    return ConditionalGet.apply(Response(query.stream(), mimetype='application/json'), etag, version['cached_at'])
+
+
 @app.route('/api/stocks/<path:symbol>/dividends', methods=['GET'])
 def get_dividends(symbol: str):
     """配当履歴を取得"""
@@ -163,29 +376,119 @@ def get_financials(symbol: str):
         return jsonify({'error': f'財務データの取得に失敗しました: {str(e)}'}), 500
 
 
+def _parse_periods(value) -> int:
+    """予測日数を検証して返す（1 から prediction.max_periods の整数でなければ 400）"""
+    try:
+        periods = int(value)
+    except (TypeError, ValueError):
+        raise StockTrackingError('periods には整数を指定してください', 400)
+    if not 1 <= periods <= PREDICTION_MAX_PERIODS:
+        raise StockTrackingError(f'periods は 1 から {PREDICTION_MAX_PERIODS} の範囲で指定してください', 400)
+    return periods
+
+
+def _prediction_job_response(job: Dict):
+    """予測ジョブの状態をレスポンスに変換（完了時は予測結果、未完了時は202）"""
+    if job['status'] == 'done':
+        return jsonify(job['result'])
+    if job['status'] == 'error':
+        return jsonify({'error': job['error'], 'job_id': job['id']}), job['status_code'] or 500
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'symbol': job['symbol'],
+        'periods': job['periods'],
+        'submitted_at': job['submitted_at']
+    }), 202
+
+
 @app.route('/api/stocks/<path:symbol>/prediction', methods=['GET'])
 def predict_stock(symbol: str):
-    """株価予測を実行"""
+    """株価予測を実行（一定時間内に完了しない場合はジョブIDを返す）"""
     symbol = normalize_symbol(symbol)
-    periods = int(request.args.get('periods', 30))
+    periods = _parse_periods(request.args.get('periods', 30))
+    engine = request.args.get('engine', PREDICTION_ENGINE)
     
-    try:
-        # 学習用に長期間のデータを取得（3年分）
-        hist = StockAPI.get_history(symbol, '2y')
-        if hist is None or hist.empty:
-            return jsonify({'error': '予測に必要なデータが見つかりません'}), 404
-        
-        # データ数が少なすぎる場合はエラー
-        if len(hist) < 30:
-            return jsonify({'error': 'データ不足のため予測できません'}), 400
-            
-        from stock_predictor import StockPredictor
-        predictor = StockPredictor()
-        prediction = predictor.predict(hist, periods=periods)
-        
-        return jsonify(prediction)
-    except Exception as e:
-        return jsonify({'error': f'予測の実行に失敗しました: {str(e)}'}), 500
+    from stock_predictor import StockPredictor
+    if engine not in StockPredictor.ENGINES:
+        return jsonify({'error': f'不明な予測エンジンです: {engine}'}), 400
+    
+    # 予測バッチで計算済みの結果があればそのまま返す
+    since = (datetime.now() - timedelta(days=PREDICTION_BATCH_MAX_AGE_DAYS)).strftime('%Y-%m-%d')
+    precomputed = db.get_latest_forecast_result(symbol, engine, periods, since)
+    if precomputed:
+        return jsonify({**precomputed['result'], 'precomputed': True, 'as_of': precomputed['as_of']})
+    
+    if engine != 'prophet':
+        # 軽量エンジンはリクエストスレッドで直接計算する
+        try:
+            hist = StockAPI.get_history(symbol, PREDICTION_HISTORY_PERIOD)
+            if hist is None or hist.empty:
+                return jsonify({'error': '予測に必要なデータが見つかりません'}), 404
+            if len(hist) < 30:
+                return jsonify({'error': 'データ不足のため予測できません'}), 400
+            return jsonify(StockPredictor(engine=engine).predict(hist, periods=periods, symbol=symbol))
+        except StockTrackingError:
+            raise
+        except Exception as e:
+            return jsonify({'error': f'予測の実行に失敗しました: {str(e)}'}), 500
+    
+    job = prediction_jobs.submit(symbol, periods)
+    if job['status'] not in ('done', 'error'):
+        job = prediction_jobs.wait(job['id'], PREDICTION_WAIT_SECONDS)
+    return _prediction_job_response(job)
+
+
+@app.route('/api/stocks/<path:symbol>/prediction/jobs', methods=['POST'])
+def submit_prediction_job(symbol: str):
+    """株価予測ジョブを登録"""
+    symbol = normalize_symbol(symbol)
+    data = request.get_json(silent=True) or {}
+    periods = _parse_periods(data.get('periods', request.args.get('periods', 30)))
+    
+    job = prediction_jobs.submit(symbol, periods)
+    return jsonify({k: v for k, v in job.items() if k != 'result'}), 202
+
+
+@app.route('/api/prediction/batch', methods=['GET'])
+def get_prediction_batch_status():
+    """予測バッチの実行状況を取得"""
+    run_date = request.args.get('run_date', datetime.now().strftime('%Y-%m-%d'))
+    engine = request.args.get('engine', PREDICTION_ENGINE)
+    periods = _parse_periods(request.args.get('periods', 30))
+    
+    results = db.get_forecast_run_status(run_date, engine, periods)
+    return jsonify({
+        'schedule': PREDICTION_BATCH_TIME or None,
+        'last_run': forecast_batch_scheduler.last_state,
+        'run_date': run_date,
+        'done': sum(1 for r in results.values() if r['status'] == 'done'),
+        'failed': {symbol: r['error'] for symbol, r in results.items() if r['status'] == 'error'}
+    })
+
+
+@app.route('/api/prediction/evaluations', methods=['GET'])
+def get_prediction_evaluations():
+    """予測精度評価の結果を取得（run_id 省略時は最新の実行）"""
+    from forecast_evaluation import ForecastEvaluator
+    
+    records = db.get_forecast_evaluations(request.args.get('run_id'))
+    if not records:
+        return jsonify({'error': '評価結果が見つかりません'}), 404
+    return jsonify({
+        'run_id': records[0]['run_id'],
+        'summary': ForecastEvaluator.summarize(records),
+        'results': records
+    })
+
+
+@app.route('/api/prediction/jobs/<job_id>', methods=['GET'])
+def get_prediction_job(job_id: str):
+    """株価予測ジョブの状態と結果を取得"""
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'ジョブが見つかりません'}), 404
+    return jsonify(job)
 
 
 
@@ -232,9 +535,177 @@ def normalize_stock_symbol():
 @app.route('/api/dashboard', methods=['GET'])
 def get_dashboard():
     """ダッシュボード用の全銘柄データを取得 - キャッシュ優先"""
+    history_format = request.args.get('history_format', 'rows')
+    if history_format not in HISTORY_FORMATS:
+        return jsonify({'error': f'不明な履歴形式です: {history_format}'}), 400
+    
+    stocks = db.get_tracked_stocks()
+    symbols = [stock['symbol'] for stock in stocks]
+    names = tuple(stock['name'] for stock in stocks)
+    
     # サービス層に処理を委譲
-    dashboard_data = StockService.get_dashboard_data()
-    return jsonify(dashboard_data)
+    return _conditional_data_response(
+        'dashboard', symbols, lambda: jsonify(StockService.get_dashboard_data(history_format)), names, history_format
+    )
+
+
+@app.route('/api/portfolio', methods=['GET'])
+def get_portfolio():
+    """保有銘柄を基準通貨建てで評価（評価額推移を含む）"""
+    try:
+        history_days = int(request.args.get('history_days', FX_HISTORY_DAYS))
+    except ValueError:
+        return jsonify({'error': '数値形式が無効です'}), 400
+    
+    response_data, status_code = PortfolioService.get_portfolio(
+        base_currency=request.args.get('base', FX_BASE_CURRENCY),
+        history_days=history_days
+    )
+    return jsonify(response_data), status_code
+
+
+@app.route('/api/portfolio/risk', methods=['GET'])
+def get_portfolio_risk():
+    """ポートフォリオのリスク分析（共分散・相関・モンテカルロVaR）"""
+    try:
+        days = int(request.args.get('days', RISK_HISTORY_DAYS))
+        simulations = int(request.args.get('simulations', RISK_SIMULATIONS))
+        horizon_days = int(request.args.get('horizon', RISK_HORIZON_DAYS))
+        seed = request.args.get('seed')
+        seed = int(seed) if seed is not None else None
+        confidence = request.args.get('confidence')
+        confidence_levels = [float(c) for c in confidence.split(',')] if confidence else None
+    except ValueError:
+        return jsonify({'error': '数値形式が無効です'}), 400
+    
+    response_data, status_code = PortfolioService.get_risk(
+        days=days,
+        simulations=simulations,
+        horizon_days=horizon_days,
+        method=request.args.get('method', 'normal'),
+        confidence_levels=confidence_levels,
+        seed=seed,
+        backfill=request.args.get('backfill', 'false').lower() == 'true',
+        include_matrix=request.args.get('matrix', 'true').lower() == 'true',
+        base_currency=request.args.get('base', FX_BASE_CURRENCY)
+    )
+    return jsonify(response_data), status_code
+
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alert_rules():
+    """アラートルール一覧を取得"""
+    return jsonify(alert_engine.get_rules(request.args.get('symbol')))
+
+
+@app.route('/api/alerts', methods=['POST'])
+def add_alert_rule():
+    """アラートルールを追加"""
+    data = request.json or {}
+    if not data.get('symbol') or not data.get('type'):
+        return jsonify({'error': '銘柄コードとルール種別が必要です'}), 400
+    
+    rule = alert_engine.add_rule(
+        data['symbol'], data['type'], data.get('threshold'), bool(data.get('repeat', True))
+    )
+    return jsonify(rule), 201
+
+
+@app.route('/api/alerts/<int:rule_id>', methods=['DELETE'])
+def remove_alert_rule(rule_id: int):
+    """アラートルールを削除"""
+    if alert_engine.remove_rule(rule_id):
+        return jsonify({'message': 'アラートルールを削除しました'})
+    return jsonify({'error': 'アラートルールが見つかりません'}), 404
+
+
+@app.route('/api/alerts/events', methods=['GET'])
+def get_alert_events():
+    """アラート発火履歴を取得"""
+    try:
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'パラメータの形式が無効です'}), 400
+    
+    return jsonify(alert_engine.get_events(request.args.get('symbol'), since, limit))
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_prices():
+    """価格の変化分を Server-Sent Events で配信"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = Response(price_stream.subscribe(last_event_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """メトリクスを Prometheus のテキスト形式で返す"""
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'メトリクスは無効です'}), 404
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/admin/profile', methods=['POST'])
+def profile_window():
+    """指定秒数の間、全スレッドをサンプリングして collapsed 形式で返す"""
+    profiler.authorize(request.headers.get('X-Profile-Token'))
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval_ms = float(request.args.get('interval_ms', PROFILING_SAMPLE_INTERVAL_MS))
+    except ValueError:
+        return jsonify({'error': 'パラメータの形式が無効です'}), 400
+    profile_id, sampler = profiler.sample_window(seconds, interval_ms)
+    return Response(sampler.collapsed(), mimetype='text/plain', headers={'X-Profile-Id': profile_id})
+
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """保存済みのプロファイル一覧"""
+    profiler.authorize(request.headers.get('X-Profile-Token'))
+    return jsonify(profiler.list_profiles())
+
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id: str):
+    """保存済みのプロファイルを取得（format=text / raw）"""
+    profiler.authorize(request.headers.get('X-Profile-Token'))
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'パラメータの形式が無効です'}), 400
+    body, mimetype = profiler.load(profile_id, request.args.get('format', 'text'), limit)
+    return Response(body, mimetype=mimetype)
+
+
+@app.route('/api/admin/tracemalloc/<action>', methods=['POST'])
+def control_tracemalloc(action: str):
+    """tracemalloc を開始（frames で保持するスタックの深さを指定）・停止"""
+    profiler.authorize(request.headers.get('X-Profile-Token'))
+    if action == 'start':
+        try:
+            frames = int(request.args.get('frames', 10))
+        except ValueError:
+            return jsonify({'error': 'パラメータの形式が無効です'}), 400
+        return jsonify(allocation_tracker.start(frames))
+    if action == 'stop':
+        return jsonify(allocation_tracker.stop())
+    return jsonify({'error': '不明な操作です'}), 404
+
+
+@app.route('/api/admin/tracemalloc', methods=['GET'])
+def get_tracemalloc():
+    """開始時からのメモリ割り当ての増加を割り当て箇所ごとに返す"""
+    profiler.authorize(request.headers.get('X-Profile-Token'))
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'パラメータの形式が無効です'}), 400
+    return jsonify(allocation_tracker.report(request.args.get('group_by', 'lineno'), limit))
 
 
 @app.errorhandler(StockTrackingError)
@@ -243,18 +714,70 @@ def handle_stock_error(error):
     return jsonify({'error': str(error)}), error.status_code
 
 
+@app.route('/api/workers', methods=['GET'])
+def get_workers():
+    """応答したワーカープロセス・有効なリース・更新シャードの状態の一覧"""
+    return jsonify({
+        'worker': owner_id(),
+        'background': background_lease.holding,
+        'leases': db.get_leases(),
+        'refresh_shards': shard_status()
+    })
+
+
 @app.route('/')
 def index():
     """メインページを返す"""
     return render_template('index.html')
 
 
+def _start_background_services():
+    if PREDICTION_BATCH_TIME:
+        forecast_batch_scheduler.start(PREDICTION_BATCH_TIME)
+    enrichment_worker.start()
+    prediction_jobs.start()
+    alert_engine.start()
+
+
+def _stop_background_services():
+    forecast_batch_scheduler.stop()
+    enrichment_worker.stop()
+    prediction_jobs.shutdown()
+    alert_engine.stop()
+
+
+# 予測バッチ・銘柄情報の取得・予測ジョブの実行・アラートの評価は、リースを取得した1つのプロセスだけで動かす
+# （リースを失ったプロセスは、取得したプロセスと重複しないよう止める）
+background_lease = RoleLease('background', _start_background_services, _stop_background_services)
+
+
+def start_background_services():
+    """バックグラウンド処理の担当プロセスの選出を開始（fork 後の各ワーカープロセスで呼ぶ）"""
+    enrichment_worker.autostart = False
+    background_lease.start()
+
+
+def create_app(start_background: bool = True) -> Flask:
+    """
+    データベースを初期化してアプリを返す（python app.py と WSGI サーバーの共通の入口）
+
+    gunicorn の preload_app では親プロセスで start_background=False として読み込み、
+    各ワーカーの post_fork で start_background_services を呼ぶ（gunicorn.conf.py）。
+    """
+    db.init_app()
+    if start_background:
+        start_background_services()
+    return app
+
+
 if __name__ == '__main__':
     from config import USE_YAHOO_AUTH, SERVER_HOST, SERVER_PORT, SERVER_DEBUG
     from yahoo_auth import yahoo_auth
+    from upstream_capture import upstream_capture
     
+    # 予測バッチの定時実行と銘柄情報の取得（デバッグ時はリローダーの子プロセスでのみ開始）
+    create_app(start_background=not SERVER_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
     print('データベースを初期化しました')
-    db.init_app()
     
     # Yahoo認証状態を表示
     if USE_YAHOO_AUTH:
@@ -265,5 +788,8 @@ if __name__ == '__main__':
     else:
         print('Yahoo認証: 無効（匿名アクセス）')
     
+    if upstream_capture.mode:
+        print(f'上流データ: {upstream_capture.mode}（{upstream_capture.path}）')
+    
     print(f'サーバーを起動しています... http://{SERVER_HOST}:{SERVER_PORT}')
     app.run(debug=SERVER_DEBUG, host=SERVER_HOST, port=SERVER_PORT)
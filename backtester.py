@@ -0,0 +1,219 @@
+"""スコアリングルールのバックテストモジュール"""
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from stock_analyzer import StockAnalyzer
+from config import (
+    RSI_PERIOD, MA_SHORT, MA_LONG, TRADING_DAYS_PER_YEAR,
+    BACKTEST_ENTRY_SCORE, BACKTEST_EXIT_SCORE, BACKTEST_COST_BPS, BACKTEST_MAX_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# パラメータスイープ用ワーカーが参照する終値（プロセスごとに一度だけ受け渡す）
+_worker_closes: Optional[pd.DataFrame] = None
+
+
+class Backtester:
+    """閾値ベースの売買シミュレーションクラス"""
+
+    @staticmethod
+    def load_closes(symbols: List[str], period: str = '5y') -> pd.DataFrame:
+        """複数銘柄の終値を 日付×銘柄 の DataFrame として取得"""
+        from stock_api import StockAPI
+
+        histories = StockAPI.get_multiple_stocks_history(symbols, period=period)
+        closes = {
+            symbol: hist['Close']
+            for symbol, hist in histories.items()
+            if hist is not None and not hist.empty and 'Close' in hist
+        }
+        if not closes:
+            return pd.DataFrame()
+        return pd.DataFrame(closes).sort_index().dropna(how='all')
+
+    @staticmethod
+    def simulate(
+        closes: pd.DataFrame,
+        scores: pd.DataFrame,
+        entry_score: float = BACKTEST_ENTRY_SCORE,
+        exit_score: float = BACKTEST_EXIT_SCORE,
+        cost_bps: float = BACKTEST_COST_BPS
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        スコアに基づくロングオンリー売買を全銘柄一括でシミュレート
+
+        スコアが entry_score 以上で買い、exit_score 未満で手仕舞う。
+        シグナルはバーの終値で確定し、翌バーから保有する。
+
+        Returns:
+            Dict: position（保有）, returns（コスト控除後リターン）, turnover（売買量）
+        """
+        if exit_score > entry_score:
+            raise ValueError('exit_score は entry_score 以下である必要があります')
+
+        target = pd.DataFrame(np.nan, index=scores.index, columns=scores.columns)
+        target = target.mask(scores >= entry_score, 1.0).mask(scores < exit_score, 0.0)
+        position = target.ffill().fillna(0.0).shift(1).fillna(0.0)
+
+        asset_returns = (closes / closes.shift(1) - 1).fillna(0.0)
+        turnover = position.diff().abs().fillna(position.abs())
+        returns = position * asset_returns - turnover * (cost_bps / 10000)
+
+        return {'position': position, 'returns': returns, 'turnover': turnover}
+
+    @staticmethod
+    def calculate_metrics(returns: pd.Series, position: Optional[pd.Series] = None) -> Dict:
+        """リターン系列から成績指標を計算"""
+        if returns.empty:
+            return {}
+
+        equity = (1 + returns).cumprod()
+        total_return = float(equity.iloc[-1] - 1)
+        years = len(returns) / TRADING_DAYS_PER_YEAR
+        annual_return = float((1 + total_return) ** (1 / years) - 1) if years > 0 and total_return > -1 else -1.0
+        std = float(returns.std())
+        sharpe = float(returns.mean() / std * (TRADING_DAYS_PER_YEAR ** 0.5)) if std > 0 else 0.0
+        max_drawdown = float((equity / equity.cummax() - 1).min())
+
+        metrics = {
+            'total_return': total_return * 100,
+            'annual_return': annual_return * 100,
+            'volatility': std * (TRADING_DAYS_PER_YEAR ** 0.5) * 100,
+            'sharpe': sharpe,
+            'max_drawdown': max_drawdown * 100,
+        }
+
+        if position is not None:
+            # 取引単位の損益（手仕舞いバーのコストも含める）
+            entries = position.diff().fillna(position) > 0
+            in_trade = (position > 0) | (position.shift(1).fillna(0) > 0)
+            trade_ids = entries.cumsum()[in_trade]
+            trade_returns = np.expm1(np.log1p(returns[in_trade]).groupby(trade_ids).sum())
+
+            metrics.update({
+                'trades': int(len(trade_returns)),
+                'hit_rate': float((trade_returns > 0).mean() * 100) if len(trade_returns) else 0.0,
+                'avg_trade_return': float(trade_returns.mean() * 100) if len(trade_returns) else 0.0,
+                'exposure': float(position.mean() * 100),
+            })
+
+        return metrics
+
+    @staticmethod
+    def run(
+        closes: pd.DataFrame,
+        rsi_period: int = RSI_PERIOD,
+        ma_short: int = MA_SHORT,
+        ma_long: int = MA_LONG,
+        entry_score: float = BACKTEST_ENTRY_SCORE,
+        exit_score: float = BACKTEST_EXIT_SCORE,
+        cost_bps: float = BACKTEST_COST_BPS,
+        lookback: Optional[int] = None
+    ) -> Dict:
+        """
+        バックテストを実行
+
+        Args:
+            closes: 日付×銘柄 の終値 DataFrame
+            rsi_period, ma_short, ma_long: スコア計算パラメータ
+            entry_score, exit_score: 売買閾値
+            cost_bps: 片道の取引コスト（bps）
+            lookback: 価格範囲・ボラティリティの参照バー数（None の場合は全期間）
+
+        Returns:
+            Dict: パラメータ、銘柄別成績、等金額ポートフォリオ成績
+        """
+        params = {
+            'rsi_period': rsi_period,
+            'ma_short': ma_short,
+            'ma_long': ma_long,
+            'entry_score': entry_score,
+            'exit_score': exit_score,
+            'cost_bps': cost_bps,
+            'lookback': lookback,
+        }
+
+        scores = StockAnalyzer.calculate_score_series(
+            closes, rsi_period=rsi_period, ma_short=ma_short, ma_long=ma_long, lookback=lookback
+        )
+        sim = Backtester.simulate(closes, scores, entry_score, exit_score, cost_bps)
+        asset_returns = (closes / closes.shift(1) - 1).fillna(0.0)
+
+        symbols = {}
+        for symbol in closes.columns:
+            valid = closes[symbol].notna()
+            metrics = Backtester.calculate_metrics(
+                sim['returns'][symbol][valid], sim['position'][symbol][valid]
+            )
+            metrics['buy_and_hold_return'] = float((1 + asset_returns[symbol][valid]).prod() - 1) * 100
+            symbols[symbol] = metrics
+
+        # 上場期間外の銘柄を除いた等金額ポートフォリオ
+        portfolio_returns = sim['returns'].where(closes.notna()).mean(axis=1).fillna(0.0)
+
+        return {
+            'params': params,
+            'start': closes.index[0].strftime('%Y-%m-%d') if len(closes) else None,
+            'end': closes.index[-1].strftime('%Y-%m-%d') if len(closes) else None,
+            'bars': len(closes),
+            'symbols': symbols,
+            'portfolio': Backtester.calculate_metrics(portfolio_returns),
+        }
+
+    @staticmethod
+    def sweep(
+        closes: pd.DataFrame,
+        grid: Dict[str, List],
+        max_workers: int = BACKTEST_MAX_WORKERS,
+        **fixed
+    ) -> List[Dict]:
+        """
+        パラメータグリッドを並列に評価（プロセスプール）
+
+        Args:
+            closes: 日付×銘柄 の終値 DataFrame
+            grid: パラメータ名 → 候補値リスト（rsi_period, ma_short, ma_long, entry_score, exit_score など）
+            max_workers: ワーカープロセス数（0 の場合はCPU数）
+            **fixed: 全組み合わせに共通のパラメータ
+
+        Returns:
+            List[Dict]: 組み合わせごとのパラメータとポートフォリオ成績（シャープレシオ降順）
+        """
+        keys = list(grid.keys())
+        combinations = []
+        for values in itertools.product(*(grid[k] for k in keys)):
+            params = {**fixed, **dict(zip(keys, values))}
+            if params.get('exit_score', BACKTEST_EXIT_SCORE) > params.get('entry_score', BACKTEST_ENTRY_SCORE):
+                continue
+            if params.get('ma_short', MA_SHORT) >= params.get('ma_long', MA_LONG):
+                continue
+            combinations.append(params)
+
+        if not combinations:
+            return []
+
+        logger.info(f"Running backtest sweep: {len(combinations)} combinations")
+        with ProcessPoolExecutor(
+            max_workers=max_workers or None,
+            initializer=_init_sweep_worker,
+            initargs=(closes,)
+        ) as executor:
+            results = list(executor.map(_run_sweep_task, combinations, chunksize=max(1, len(combinations) // 64)))
+
+        return sorted(results, key=lambda r: r['portfolio'].get('sharpe', 0.0), reverse=True)
+
+
+def _init_sweep_worker(closes: pd.DataFrame):
+    """スイープ用ワーカーの初期化"""
+    global _worker_closes
+    _worker_closes = closes
+
+
+def _run_sweep_task(params: Dict) -> Dict:
+    """スイープの1組み合わせを評価"""
+    result = Backtester.run(_worker_closes, **params)
+    return {'params': result['params'], 'portfolio': result['portfolio']}
@@ -0,0 +1,257 @@
+"""ベンチマークモジュール - 分析・シリアライズ・データベースの処理時間を合成データで計測"""
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 計測する規模（quick はCIやコミットごとの確認用）
+BENCHMARK_SIZES = {
+    'quick': {
+        'analyze_bars': [100, 1000, 10000],
+        'format_bars': [100, 1000, 10000],
+        'db_symbols': [1, 100],
+        'dashboard_symbols': [10, 50],
+    },
+    'full': {
+        'analyze_bars': [100, 1000, 10000, 100000, 1000000],
+        'format_bars': [100, 1000, 10000, 100000],
+        'db_symbols': [1, 100, 1000, 10000],
+        'dashboard_symbols': [10, 100, 500],
+    },
+}
+BENCHMARK_NAMES = ('analyze', 'format_history', 'encode_history', 'db_history', 'dashboard')
+REPORT_VERSION = 1
+
+
+def synthetic_history(bars: int, seed: int = 0, end: Optional[datetime] = None, freq: str = 'B') -> pd.DataFrame:
+    """
+    幾何ブラウン運動による合成のOHLCVデータ
+
+    営業日で表せない本数（約25万本以上）の場合は分足にする。
+    """
+    rng = np.random.default_rng(seed)
+    if freq == 'B' and bars > 250000:
+        freq = 'min'
+    end = pd.Timestamp(end or datetime.now()).normalize()
+    index = pd.date_range(end=end, periods=bars, freq=freq)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, bars)))
+    opens = closes * (1 + rng.normal(0, 0.005, bars))
+    spread = np.abs(rng.normal(0, 0.01, bars))
+    return pd.DataFrame({
+        'Open': opens,
+        'High': np.maximum(opens, closes) * (1 + spread),
+        'Low': np.minimum(opens, closes) * (1 - spread),
+        'Close': closes,
+        'Volume': rng.integers(1000, 1000000, bars),
+    }, index=index)
+
+
+def measure(func: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """func を repeat 回実行した所要時間の統計（ミリ秒）"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+class _TemporaryDatabase:
+    """ファイル上の一時SQLiteデータベース（ワーカースレッドからも同じデータを参照できるようにファイルにする）"""
+
+    def __enter__(self):
+        from sqlalchemy import create_engine
+        from models.database import db_session, Base
+        import models.stock  # noqa: F401  テーブル定義を登録
+
+        self._dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._dir.name, 'benchmark.db')}")
+        db_session.remove()
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        return self
+
+    def __exit__(self, *exc):
+        from models.database import db_session, engine
+
+        db_session.remove()
+        db_session.configure(bind=engine)
+        self.engine.dispose()
+        self._dir.cleanup()
+        return False
+
+
+class BenchmarkSuite:
+    """
+    ベンチマークスイート
+
+    結果はJSONのレポートにまとめ、compare() で過去のレポートと中央値を比較する。
+    Yahoo Finance への問い合わせはすべてモックに置き換え、リクエスト間の待機も行わない。
+    """
+
+    def __init__(self, profile: str = 'quick', repeat: int = 5, names: Optional[Sequence[str]] = None,
+                 sizes: Optional[Dict[str, List[int]]] = None):
+        if profile not in BENCHMARK_SIZES:
+            raise ValueError(f"Unknown benchmark profile: {profile}")
+        self.profile = profile
+        self.repeat = repeat
+        self.names = list(names or BENCHMARK_NAMES)
+        self.sizes = {**BENCHMARK_SIZES[profile], **(sizes or {})}
+        self.results: List[Dict] = []
+
+    def run(self) -> Dict:
+        """選択したベンチマークを実行してレポートを返す"""
+        self.results = []
+        for name in self.names:
+            getattr(self, f'bench_{name}')()
+        return {
+            'version': REPORT_VERSION,
+            'created_at': datetime.now().isoformat(),
+            'commit': self._git_commit(),
+            'profile': self.profile,
+            'repeat': self.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'results': self.results,
+        }
+
+    def _record(self, name: str, params: Dict, stats: Dict):
+        self.results.append({'name': name, 'params': params, **stats})
+        logger.info(f"{name} {params}: median {stats['median_ms']:.2f}ms (min {stats['min_ms']:.2f}ms)")
+
+    def _repeat_for(self, size: int, large: int) -> int:
+        """大きな規模では繰り返し回数を減らす"""
+        return 1 if size >= large else self.repeat
+
+    def bench_analyze(self):
+        from stock_analyzer import StockAnalyzer
+
+        for bars in self.sizes['analyze_bars']:
+            hist = synthetic_history(bars)
+            stats = measure(lambda: StockAnalyzer.analyze(hist), self._repeat_for(bars, 1000000))
+            self._record('analyze', {'bars': bars}, stats)
+
+    def bench_format_history(self):
+        from stock_api import StockAPI
+
+        for bars in self.sizes['format_bars']:
+            hist = synthetic_history(bars)
+            stats = measure(lambda: StockAPI.format_history_data(hist), self._repeat_for(bars, 100000))
+            self._record('format_history', {'bars': bars}, stats)
+
+    def bench_encode_history(self):
+        """履歴の各レスポンス形式への変換とJSONのシリアライズ"""
+        from stock_api import StockAPI, HISTORY_FORMATS
+
+        for bars in self.sizes['format_bars']:
+            hist = synthetic_history(bars)
+            for history_format in HISTORY_FORMATS:
+                stats = measure(
+                    lambda: json.dumps(StockAPI.encode_history(hist, history_format)),
+                    self._repeat_for(bars, 100000)
+                )
+                self._record('encode_history', {'bars': bars, 'format': history_format}, stats)
+
+    def bench_db_history(self):
+        """銘柄数ごとの save_price_history / get_cached_history（1銘柄あたり直近30日分）"""
+        from database import db
+        from stock_api import StockAPI
+
+        rows = StockAPI.format_history_data(synthetic_history(30, end=datetime.now(), freq='D'))
+        for count in self.sizes['db_symbols']:
+            symbols = [f'SYM{i:05d}' for i in range(count)]
+            repeat = self._repeat_for(count, 1000)
+            with _TemporaryDatabase():
+                save = measure(lambda: [db.save_price_history(s, rows) for s in symbols], repeat)
+                load = measure(lambda: [db.get_cached_history(s) for s in symbols], repeat)
+            self._record('save_price_history', {'symbols': count}, save)
+            self._record('get_cached_history', {'symbols': count}, load)
+
+    def bench_dashboard(self):
+        """
+        StockService.get_dashboard_data（Yahoo Finance はモック）
+
+        cold は全銘柄を取得して保存する場合、warm は価格キャッシュがすべて有効な場合。
+        """
+        from database import db
+        from models.database import db_session
+        from models.stock import PriceCache
+        from services.stock_service import StockService
+        from stock_api import StockAPI
+
+        def clear_price_cache():
+            db_session.query(PriceCache).delete()
+            db_session.commit()
+
+        hist = synthetic_history(30, end=datetime.now(), freq='D')
+        info = {'name': 'Benchmark Corp', 'market_cap': 1e12, 'pe_ratio': 20.0, 'dividend_yield': 0.01,
+                '52_week_high': 150.0, '52_week_low': 80.0}
+        for count in self.sizes['dashboard_symbols']:
+            repeat = self._repeat_for(count, 500)
+            with _TemporaryDatabase(), \
+                    patch.object(StockAPI, 'get_history', return_value=hist), \
+                    patch.object(StockAPI, 'get_ticker_info', return_value=info), \
+                    patch('services.stock_service.DASHBOARD_REQUEST_DELAY', 0):
+                db.add_stocks([{'symbol': f'SYM{i:05d}', 'name': f'SYM{i:05d}'} for i in range(count)])
+                cold = measure(StockService.get_dashboard_data, repeat, setup=clear_price_cache)
+                warm = measure(StockService.get_dashboard_data, repeat)
+            self._record('dashboard', {'symbols': count, 'cache': 'cold'}, cold)
+            self._record('dashboard', {'symbols': count, 'cache': 'warm'}, warm)
+
+    @staticmethod
+    def compare(baseline: Dict, current: Dict, threshold: float = 0.2) -> List[Dict]:
+        """
+        中央値が baseline より threshold（割合）以上遅くなった項目を返す
+
+        名前とパラメータが一致する項目同士を比較する。
+        """
+        def key(result: Dict) -> str:
+            return result['name'] + json.dumps(result['params'], sort_keys=True)
+
+        previous = {key(result): result for result in baseline.get('results', [])}
+        regressions = []
+        for result in current.get('results', []):
+            base = previous.get(key(result))
+            if base is None or base['median_ms'] <= 0:
+                continue
+            ratio = result['median_ms'] / base['median_ms']
+            if ratio > 1 + threshold:
+                regressions.append({
+                    'name': result['name'],
+                    'params': result['params'],
+                    'baseline_ms': base['median_ms'],
+                    'current_ms': result['median_ms'],
+                    'ratio': round(ratio, 3),
+                })
+        return regressions
+
+    @staticmethod
+    def _git_commit() -> Optional[str]:
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
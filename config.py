@@ -67,12 +67,25 @@ class Config:
         if os.getenv('YAHOO_PASSWORD'):
             config.setdefault('yahoo_auth', {})['password'] = os.getenv('YAHOO_PASSWORD')
 
+        # Profiling
+        if os.getenv('PROFILING_SECRET'):
+            config.setdefault('profiling', {})['secret'] = os.getenv('PROFILING_SECRET')
+
+        # Upstream capture
+        if os.getenv('UPSTREAM_CAPTURE_MODE') is not None:
+            config.setdefault('capture', {})['mode'] = os.getenv('UPSTREAM_CAPTURE_MODE')
+        if os.getenv('UPSTREAM_CAPTURE_PATH'):
+            config.setdefault('capture', {})['path'] = os.getenv('UPSTREAM_CAPTURE_PATH')
+
     def _get_default_config(self) -> dict:
         """デフォルト設定を返す"""
         return {
-            "database": {"name": "stock_tracking.db"},
+            "database": {"name": "stock_tracking.db", "journal_mode": "wal", "busy_timeout_ms": 5000},
             "cache": {"minutes": 5, "history_days": 30},
+            "history_query": {"max_rows": 5000, "batch_size": 1000},
             "api": {"max_retries": 2, "retry_delay": 1, "dashboard_request_delay": 0.5},
+            "upstream": {"base_url": ""},
+            "capture": {"mode": "", "path": "captures/upstream.jsonl.gz", "replay_speed": 0},
             "analysis": {
                 "rsi_period": 14,
                 "ma_short": 20,
@@ -92,6 +105,101 @@ class Config:
                 "macd_slow": 26,
                 "macd_signal": 9
             },
+            "backtest": {
+                "entry_score": 60,
+                "exit_score": 40,
+                "cost_bps": 10.0,
+                "max_workers": 0
+            },
+            "risk": {
+                "history_days": 1825,
+                "simulations": 10000,
+                "max_simulations": 200000,
+                "horizon_days": 1,
+                "confidence_levels": [0.95, 0.99],
+                "chunk_elements": 2000000
+            },
+            "fx": {
+                "base_currency": "JPY",
+                "cache_minutes": 60,
+                "history_days": 365
+            },
+            "prediction": {
+                "history_period": "2y",
+                "engine": "prophet",
+                "cache_dir": "cache/forecasts",
+                "cache_max_entries": 256,
+                "cache_max_age_days": 7,
+                "max_workers": 2,
+                "max_pending_jobs": 32,
+                "job_ttl_minutes": 30,
+                "job_poll_seconds": 1.0,
+                "wait_seconds": 2.0,
+                "max_periods": 365,
+                "batch_time": "",
+                "batch_periods": 30,
+                "batch_workers": 0,
+                "batch_chunk_size": 50,
+                "batch_max_age_days": 1,
+                "eval_horizons": [1, 5, 20],
+                "eval_cutoffs": 8,
+                "eval_min_train": 250,
+                "eval_history_days": 1095
+            },
+            "alerts": {
+                "webhook_url": "",
+                "queue_size": 1000,
+                "poll_seconds": 5
+            },
+            "compression": {
+                "enabled": True,
+                "min_size": 1024,
+                "gzip_level": 6,
+                "brotli_quality": 5,
+                "cache_max_mb": 64
+            },
+            "import": {
+                "max_symbols": 2000,
+                "job_ttl_minutes": 60
+            },
+            "enrichment": {
+                "batch_size": 50,
+                "requests_per_second": 2.0,
+                "max_workers": 4,
+                "max_attempts": 8,
+                "backoff_seconds": 60,
+                "max_backoff_seconds": 3600,
+                "poll_seconds": 30
+            },
+            "stream": {
+                "buffer_size": 1000,
+                "heartbeat_seconds": 15,
+                "refresh_seconds": 60,
+                "poll_seconds": 1.0
+            },
+            "metrics": {"enabled": True},
+            "tracing": {"enabled": True, "slow_request_ms": 2000, "server_timing_max_entries": 20},
+            "profiling": {
+                "secret": "",
+                "output_dir": "logs/profiles",
+                "max_files": 50,
+                "max_window_seconds": 60,
+                "sample_interval_ms": 10
+            },
+            "workers": {
+                "processes": 4,
+                "threads": 8,
+                "refresh_lease_seconds": 30,
+                "refresh_wait_seconds": 10,
+                "background_lease_seconds": 60
+            },
+            "refresh": {
+                "shards": 16,
+                "interval_seconds": 60,
+                "lease_seconds": 180,
+                "batch_size": 50,
+                "period": "1mo"
+            },
             "yahoo_auth": {"enabled": False, "cookie": "", "username": "", "password": ""},
             "server": {"host": "localhost", "port": 5000, "debug": True}
         }
@@ -121,16 +229,30 @@ _config_instance = Config()
 
 # データベース設定
 DB_NAME: Final[str] = _config_instance.get('database', 'name', default='stock_tracking.db')
+DB_JOURNAL_MODE: Final[str] = _config_instance.get('database', 'journal_mode', default='wal') or ''
+DB_BUSY_TIMEOUT_MS: Final[int] = _config_instance.get('database', 'busy_timeout_ms', default=5000)
 
 # キャッシュ設定
 CACHE_MINUTES: Final[int] = _config_instance.get('cache', 'minutes', default=5)
 HISTORY_DAYS: Final[int] = _config_instance.get('cache', 'history_days', default=30)
 
+# 履歴クエリ設定
+HISTORY_QUERY_MAX_ROWS: Final[int] = _config_instance.get('history_query', 'max_rows', default=5000)
+HISTORY_QUERY_BATCH_SIZE: Final[int] = _config_instance.get('history_query', 'batch_size', default=1000)
+
 # API設定
 MAX_RETRIES: Final[int] = _config_instance.get('api', 'max_retries', default=2)
 RETRY_DELAY: Final[int] = _config_instance.get('api', 'retry_delay', default=1)
 DASHBOARD_REQUEST_DELAY: Final[float] = _config_instance.get('api', 'dashboard_request_delay', default=0.5)
 
+# 接続先設定（空の場合は yfinance で Yahoo Finance に接続）
+UPSTREAM_BASE_URL: Final[str] = _config_instance.get('upstream', 'base_url', default='')
+
+# 上流データの記録・再生設定
+CAPTURE_MODE: Final[str] = _config_instance.get('capture', 'mode', default='') or ''
+CAPTURE_PATH: Final[str] = _config_instance.get('capture', 'path', default='captures/upstream.jsonl.gz')
+CAPTURE_REPLAY_SPEED: Final[float] = _config_instance.get('capture', 'replay_speed', default=0)
+
 # 分析設定
 RSI_PERIOD: Final[int] = _config_instance.get('analysis', 'rsi_period', default=14)
 MA_SHORT: Final[int] = _config_instance.get('analysis', 'ma_short', default=20)
@@ -160,6 +282,107 @@ RSI_OVERBOUGHT: Final[float] = _config_instance.get('analysis', 'rsi_overbought'
 PRICE_POSITION_LOW: Final[float] = _config_instance.get('analysis', 'price_position_low', default=0.3)
 PRICE_POSITION_HIGH: Final[float] = _config_instance.get('analysis', 'price_position_high', default=0.7)
 
+# バックテスト設定
+BACKTEST_ENTRY_SCORE: Final[int] = _config_instance.get('backtest', 'entry_score', default=60)
+BACKTEST_EXIT_SCORE: Final[int] = _config_instance.get('backtest', 'exit_score', default=40)
+BACKTEST_COST_BPS: Final[float] = _config_instance.get('backtest', 'cost_bps', default=10.0)
+BACKTEST_MAX_WORKERS: Final[int] = _config_instance.get('backtest', 'max_workers', default=0)
+
+# リスク分析設定
+RISK_HISTORY_DAYS: Final[int] = _config_instance.get('risk', 'history_days', default=1825)
+RISK_SIMULATIONS: Final[int] = _config_instance.get('risk', 'simulations', default=10000)
+RISK_MAX_SIMULATIONS: Final[int] = _config_instance.get('risk', 'max_simulations', default=200000)
+RISK_HORIZON_DAYS: Final[int] = _config_instance.get('risk', 'horizon_days', default=1)
+RISK_CONFIDENCE_LEVELS: Final[List[float]] = _config_instance.get('risk', 'confidence_levels', default=[0.95, 0.99])
+RISK_CHUNK_ELEMENTS: Final[int] = _config_instance.get('risk', 'chunk_elements', default=2000000)
+
+# 為替設定
+FX_BASE_CURRENCY: Final[str] = _config_instance.get('fx', 'base_currency', default='JPY')
+FX_CACHE_MINUTES: Final[int] = _config_instance.get('fx', 'cache_minutes', default=60)
+FX_HISTORY_DAYS: Final[int] = _config_instance.get('fx', 'history_days', default=365)
+
+# 予測設定
+PREDICTION_HISTORY_PERIOD: Final[str] = _config_instance.get('prediction', 'history_period', default='2y')
+PREDICTION_ENGINE: Final[str] = _config_instance.get('prediction', 'engine', default='prophet')
+FORECAST_CACHE_DIR: Final[str] = _config_instance.get('prediction', 'cache_dir', default='cache/forecasts')
+FORECAST_CACHE_MAX_ENTRIES: Final[int] = _config_instance.get('prediction', 'cache_max_entries', default=256)
+FORECAST_CACHE_MAX_AGE_DAYS: Final[int] = _config_instance.get('prediction', 'cache_max_age_days', default=7)
+PREDICTION_MAX_WORKERS: Final[int] = _config_instance.get('prediction', 'max_workers', default=2)
+PREDICTION_MAX_PENDING: Final[int] = _config_instance.get('prediction', 'max_pending_jobs', default=32)
+PREDICTION_JOB_TTL_MINUTES: Final[int] = _config_instance.get('prediction', 'job_ttl_minutes', default=30)
+PREDICTION_JOB_POLL_SECONDS: Final[float] = _config_instance.get('prediction', 'job_poll_seconds', default=1.0)
+PREDICTION_WAIT_SECONDS: Final[float] = _config_instance.get('prediction', 'wait_seconds', default=2.0)
+PREDICTION_MAX_PERIODS: Final[int] = _config_instance.get('prediction', 'max_periods', default=365)
+PREDICTION_BATCH_TIME: Final[str] = _config_instance.get('prediction', 'batch_time', default='')
+PREDICTION_BATCH_PERIODS: Final[int] = _config_instance.get('prediction', 'batch_periods', default=30)
+PREDICTION_BATCH_WORKERS: Final[int] = _config_instance.get('prediction', 'batch_workers', default=0)
+PREDICTION_BATCH_CHUNK_SIZE: Final[int] = _config_instance.get('prediction', 'batch_chunk_size', default=50)
+PREDICTION_BATCH_MAX_AGE_DAYS: Final[int] = _config_instance.get('prediction', 'batch_max_age_days', default=1)
+PREDICTION_EVAL_HORIZONS: Final[List[int]] = _config_instance.get('prediction', 'eval_horizons', default=[1, 5, 20])
+PREDICTION_EVAL_CUTOFFS: Final[int] = _config_instance.get('prediction', 'eval_cutoffs', default=8)
+PREDICTION_EVAL_MIN_TRAIN: Final[int] = _config_instance.get('prediction', 'eval_min_train', default=250)
+PREDICTION_EVAL_HISTORY_DAYS: Final[int] = _config_instance.get('prediction', 'eval_history_days', default=1095)
+
+# アラート設定
+ALERT_WEBHOOK_URL: Final[str] = _config_instance.get('alerts', 'webhook_url', default='')
+ALERT_QUEUE_SIZE: Final[int] = _config_instance.get('alerts', 'queue_size', default=1000)
+ALERT_POLL_SECONDS: Final[float] = _config_instance.get('alerts', 'poll_seconds', default=5)
+
+# レスポンス圧縮設定
+COMPRESSION_ENABLED: Final[bool] = _config_instance.get('compression', 'enabled', default=True)
+COMPRESSION_MIN_SIZE: Final[int] = _config_instance.get('compression', 'min_size', default=1024)
+COMPRESSION_GZIP_LEVEL: Final[int] = _config_instance.get('compression', 'gzip_level', default=6)
+COMPRESSION_BROTLI_QUALITY: Final[int] = _config_instance.get('compression', 'brotli_quality', default=5)
+COMPRESSION_CACHE_MAX_MB: Final[int] = _config_instance.get('compression', 'cache_max_mb', default=64)
+
+# 銘柄インポート設定
+IMPORT_MAX_SYMBOLS: Final[int] = _config_instance.get('import', 'max_symbols', default=2000)
+IMPORT_JOB_TTL_MINUTES: Final[int] = _config_instance.get('import', 'job_ttl_minutes', default=60)
+
+# 銘柄情報取得キュー設定
+ENRICHMENT_BATCH_SIZE: Final[int] = _config_instance.get('enrichment', 'batch_size', default=50)
+ENRICHMENT_REQUESTS_PER_SECOND: Final[float] = _config_instance.get('enrichment', 'requests_per_second', default=2.0)
+ENRICHMENT_MAX_WORKERS: Final[int] = _config_instance.get('enrichment', 'max_workers', default=4)
+ENRICHMENT_MAX_ATTEMPTS: Final[int] = _config_instance.get('enrichment', 'max_attempts', default=8)
+ENRICHMENT_BACKOFF_SECONDS: Final[float] = _config_instance.get('enrichment', 'backoff_seconds', default=60)
+ENRICHMENT_MAX_BACKOFF_SECONDS: Final[float] = _config_instance.get('enrichment', 'max_backoff_seconds', default=3600)
+ENRICHMENT_POLL_SECONDS: Final[float] = _config_instance.get('enrichment', 'poll_seconds', default=30)
+
+# 価格ストリーム設定
+STREAM_BUFFER_SIZE: Final[int] = _config_instance.get('stream', 'buffer_size', default=1000)
+STREAM_HEARTBEAT_SECONDS: Final[float] = _config_instance.get('stream', 'heartbeat_seconds', default=15)
+STREAM_REFRESH_SECONDS: Final[float] = _config_instance.get('stream', 'refresh_seconds', default=60)
+STREAM_POLL_SECONDS: Final[float] = _config_instance.get('stream', 'poll_seconds', default=1.0)
+
+# メトリクス設定
+METRICS_ENABLED: Final[bool] = _config_instance.get('metrics', 'enabled', default=True)
+
+# リクエストトレース設定
+TRACING_ENABLED: Final[bool] = _config_instance.get('tracing', 'enabled', default=True)
+TRACING_SLOW_REQUEST_MS: Final[float] = _config_instance.get('tracing', 'slow_request_ms', default=2000)
+TRACING_SERVER_TIMING_MAX_ENTRIES: Final[int] = _config_instance.get('tracing', 'server_timing_max_entries', default=20)
+
+# プロファイリング設定（secret が空の場合は無効）
+PROFILING_SECRET: Final[str] = _config_instance.get('profiling', 'secret', default='') or ''
+PROFILING_OUTPUT_DIR: Final[str] = _config_instance.get('profiling', 'output_dir', default='logs/profiles')
+PROFILING_MAX_FILES: Final[int] = _config_instance.get('profiling', 'max_files', default=50)
+PROFILING_MAX_WINDOW_SECONDS: Final[float] = _config_instance.get('profiling', 'max_window_seconds', default=60)
+PROFILING_SAMPLE_INTERVAL_MS: Final[float] = _config_instance.get('profiling', 'sample_interval_ms', default=10)
+
+# 複数プロセス設定
+WORKER_PROCESSES: Final[int] = _config_instance.get('workers', 'processes', default=4)
+WORKER_THREADS: Final[int] = _config_instance.get('workers', 'threads', default=8)
+REFRESH_LEASE_SECONDS: Final[float] = _config_instance.get('workers', 'refresh_lease_seconds', default=30)
+REFRESH_WAIT_SECONDS: Final[float] = _config_instance.get('workers', 'refresh_wait_seconds', default=10)
+BACKGROUND_LEASE_SECONDS: Final[float] = _config_instance.get('workers', 'background_lease_seconds', default=60)
+
+# シャード更新ワーカー設定
+REFRESH_SHARDS: Final[int] = _config_instance.get('refresh', 'shards', default=16)
+REFRESH_SHARD_INTERVAL_SECONDS: Final[float] = _config_instance.get('refresh', 'interval_seconds', default=60)
+REFRESH_SHARD_LEASE_SECONDS: Final[float] = _config_instance.get('refresh', 'lease_seconds', default=180)
+REFRESH_SHARD_BATCH_SIZE: Final[int] = _config_instance.get('refresh', 'batch_size', default=50)
+REFRESH_SHARD_PERIOD: Final[str] = _config_instance.get('refresh', 'period', default='1mo')
+
 # Yahoo認証設定（コンフィグファイルから取得）
 YAHOO_AUTH_ENABLED: Final[bool] = _config_instance.get('yahoo_auth', 'enabled', default=False)
 YAHOO_COOKIE: Optional[str] = _config_instance.get('yahoo_auth', 'cookie', default='') or None
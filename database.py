@@ -1,15 +1,68 @@
 """データベース操作モジュール (SQLAlchemy版)"""
+import json
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import case, event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from models.database import db_session, init_db
-from models.stock import TrackedStock, StockPrice, PriceCache
+from models.stock import TrackedStock, StockPrice, PriceCache, FxRate, AlertRule, AlertEvent, ForecastResult, ForecastEvaluation, EnrichmentJob, Lease, Job, HistoryChange
+from metrics import CACHE_LOOKUPS, DB_QUERY_SECONDS, DB_COMMIT_SECONDS
+from tracing import traced_methods
 from config import CACHE_MINUTES, HISTORY_DAYS
 
 logger = logging.getLogger(__name__)
 
+# 最新の履歴がこの日数より古ければ stale とみなす（週末・祝日をまたぐ分の余裕を持たせる）
+HISTORY_STALE_DAYS = 4
 
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        # リスナーの登録前に実行が始まったクエリは計測しない
+        return
+    start = starts.pop()
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'unknown'
+    DB_QUERY_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # 失敗したクエリの開始時刻を捨てる
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+@event.listens_for(db_session, 'before_commit')
+def _before_commit(session):
+    session.info['commit_start'] = time.perf_counter()
+
+
+@event.listens_for(db_session, 'after_commit')
+def _after_commit(session):
+    start = session.info.pop('commit_start', None)
+    if start is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - start)
+
+
+@event.listens_for(db_session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('commit_start', None)
+
+
+@traced_methods('db')
 class Database:
     """データベース操作クラス"""
     
@@ -42,6 +95,61 @@ class Database:
             db_session.rollback()
             return False
     
+    def add_stocks(self, stocks: List[Dict]) -> List[str]:
+        """
+        複数の銘柄を1つのトランザクションで追加（追加済みの銘柄は無視）
+        
+        Args:
+            stocks: symbol, name（省略時は銘柄コード）、quantity、avg_price を持つ辞書のリスト
+        
+        Returns:
+            List[str]: 新たに追加した銘柄コード
+        """
+        if not stocks:
+            return []
+        now = datetime.now()
+        rows = {}
+        for stock in stocks:
+            symbol = stock['symbol'].upper()
+            rows.setdefault(symbol, {
+                'symbol': symbol,
+                'name': stock.get('name') or symbol,
+                'added_at': now,
+                'quantity': stock.get('quantity') or 0.0,
+                'avg_price': stock.get('avg_price') or 0.0,
+            })
+        try:
+            existing = {
+                symbol for (symbol,) in db_session.query(TrackedStock.symbol)
+                .filter(TrackedStock.symbol.in_(list(rows))).all()
+            }
+            added = [symbol for symbol in rows if symbol not in existing]
+            if added:
+                stmt = sqlite_insert(TrackedStock).on_conflict_do_nothing(index_elements=['symbol'])
+                db_session.execute(stmt, [rows[symbol] for symbol in added])
+            db_session.commit()
+            logger.info(f"Added {len(added)} stocks ({len(rows) - len(added)} already tracked)")
+            return added
+        except Exception as e:
+            logger.error(f"Error adding stocks: {e}")
+            db_session.rollback()
+            raise
+    
+    def update_stock_names(self, names: Dict[str, str], placeholder_only: bool = False):
+        """銘柄名を一括更新（placeholder_only の場合は銘柄コードのままの名前だけを更新）"""
+        if not names:
+            return
+        try:
+            for symbol, name in names.items():
+                query = db_session.query(TrackedStock).filter_by(symbol=symbol.upper())
+                if placeholder_only:
+                    query = query.filter((TrackedStock.name == TrackedStock.symbol) | TrackedStock.name.is_(None))
+                query.update({'name': name}, synchronize_session=False)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error updating stock names: {e}")
+            db_session.rollback()
+    
     def remove_stock(self, symbol: str):
         """銘柄を削除"""
         logger.info(f"Removing stock: {symbol}")
@@ -70,7 +178,11 @@ class Database:
             cache = db_session.query(PriceCache).filter_by(symbol=symbol.upper()).first()
             if cache and cache.cached_at:
                 if (datetime.now() - cache.cached_at).total_seconds() < cache_minutes * 60:
+                    CACHE_LOOKUPS.inc(cache='price', result='hit')
                     return cache.to_dict()
+                CACHE_LOOKUPS.inc(cache='price', result='stale')
+            else:
+                CACHE_LOOKUPS.inc(cache='price', result='miss')
         except Exception as e:
             logger.error(f"Error getting cached price: {e}")
         return None
@@ -102,50 +214,727 @@ class Database:
     def get_cached_history(self, symbol: str, days: int = HISTORY_DAYS) -> List[Dict]:
         """データベースから履歴データを取得（日付ベース）"""
         try:
-            from datetime import datetime, timedelta
             cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
             prices = db_session.query(StockPrice)\
                 .filter_by(symbol=symbol.upper())\
                 .filter(StockPrice.date >= cutoff_date)\
                 .order_by(StockPrice.date.desc())\
                 .all()
+            if not prices:
+                CACHE_LOOKUPS.inc(cache='history', result='miss')
+            elif prices[0].date < (datetime.now() - timedelta(days=HISTORY_STALE_DAYS)).strftime('%Y-%m-%d'):
+                CACHE_LOOKUPS.inc(cache='history', result='stale')
+            else:
+                CACHE_LOOKUPS.inc(cache='history', result='hit')
             return [price.to_dict() for price in prices]
         except Exception as e:
             logger.error(f"Error getting cached history: {e}")
             return []
     
+    def get_data_version(self, symbols: List[str], cache_minutes: int = CACHE_MINUTES) -> Dict:
+        """
+        価格データの更新状況を取得（条件付きGETのETag生成用）
+        
+        Returns:
+            Dict: cached_at（price_cache の最終更新日時）、history_date（stock_prices の最新日付）、
+                  fresh（全銘柄の price_cache が有効期限内か）
+        """
+        symbols = list({s.upper() for s in symbols})
+        if not symbols:
+            return {'cached_at': None, 'history_date': None, 'fresh': True}
+        try:
+            cutoff = datetime.now() - timedelta(minutes=cache_minutes)
+            cached_at, fresh_count = db_session.query(
+                func.max(PriceCache.cached_at),
+                func.sum(case((PriceCache.cached_at >= cutoff, 1), else_=0))
+            ).filter(PriceCache.symbol.in_(symbols)).one()
+            history_date = db_session.query(func.max(StockPrice.date))\
+                .filter(StockPrice.symbol.in_(symbols)).scalar()
+            return {
+                'cached_at': cached_at,
+                'history_date': history_date,
+                'fresh': (fresh_count or 0) == len(symbols)
+            }
+        except Exception as e:
+            logger.error(f"Error getting data version: {e}")
+            return {'cached_at': None, 'history_date': None, 'fresh': False}
+    
+    def get_latest_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """複数銘柄の最新価格を一括取得（キャッシュの有効期限は問わず、なければ最新終値）"""
+        if not symbols:
+            return {}
+        upper = [s.upper() for s in symbols]
+        prices = {}
+        try:
+            latest_dates = db_session.query(StockPrice.symbol, func.max(StockPrice.date).label('date'))\
+                .filter(StockPrice.symbol.in_(upper))\
+                .group_by(StockPrice.symbol)\
+                .subquery()
+            rows = db_session.query(StockPrice.symbol, StockPrice.close)\
+                .join(latest_dates, (StockPrice.symbol == latest_dates.c.symbol) & (StockPrice.date == latest_dates.c.date))\
+                .all()
+            prices.update({symbol: close for symbol, close in rows if close is not None})
+            
+            rows = db_session.query(PriceCache.symbol, PriceCache.current_price)\
+                .filter(PriceCache.symbol.in_(upper))\
+                .all()
+            prices.update({symbol: price for symbol, price in rows if price})
+        except Exception as e:
+            logger.error(f"Error getting latest prices: {e}")
+        return prices
+    
+    def get_closes(self, symbols: List[str], days: int = HISTORY_DAYS) -> List[Tuple[str, str, float]]:
+        """複数銘柄の終値を一括取得（symbol, date, close のタプル、日付昇順）"""
+        if not symbols:
+            return []
+        try:
+            cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            rows = db_session.query(StockPrice.symbol, StockPrice.date, StockPrice.close)\
+                .filter(StockPrice.symbol.in_([s.upper() for s in symbols]))\
+                .filter(StockPrice.date >= cutoff_date)\
+                .order_by(StockPrice.date.asc())\
+                .all()
+            return [tuple(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting closes: {e}")
+            return []
+    
+    def iter_price_history(
+        self,
+        symbol: str,
+        fields: Sequence[str],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        descending: bool = False,
+        batch_size: int = 1000
+    ) -> Iterator[Tuple]:
+        """
+        履歴データを日付範囲で検索し、(date, *fields) のタプルを日付順に返す
+        
+        (symbol, date) の一意制約のインデックスを使い、batch_size 件ごとに
+        直前の日付より後（降順の場合は前）を検索するため、全件をメモリに載せない。
+        """
+        columns = [StockPrice.date] + [getattr(StockPrice, field) for field in fields]
+        order = StockPrice.date.desc() if descending else StockPrice.date.asc()
+        cursor = None
+        while True:
+            try:
+                query = db_session.query(*columns).filter(StockPrice.symbol == symbol.upper())
+                if start:
+                    query = query.filter(StockPrice.date >= start)
+                if end:
+                    query = query.filter(StockPrice.date <= end)
+                if cursor:
+                    query = query.filter(StockPrice.date < cursor if descending else StockPrice.date > cursor)
+                rows = query.order_by(order).limit(batch_size).all()
+            except Exception as e:
+                logger.error(f"Error querying price history: {e}")
+                return
+            for row in rows:
+                yield tuple(row)
+            if len(rows) < batch_size:
+                return
+            cursor = rows[-1][0]
+    
     def save_price_history(self, symbol: str, price_data: List[Dict], days: int = HISTORY_DAYS):
-        """価格履歴を保存"""
-        try:
-            for item in price_data[-days:]:
-                # 既存データをチェック
-                existing = db_session.query(StockPrice).filter_by(
-                    symbol=symbol.upper(), 
-                    date=item['date']
-                ).first()
-                
-                if existing:
-                    existing.open = item['open']
-                    existing.high = item['high']
-                    existing.low = item['low']
-                    existing.close = item['close']
-                    existing.volume = item['volume']
-                else:
-                    price = StockPrice(
-                        symbol=symbol.upper(),
-                        date=item['date'],
-                        open=item['open'],
-                        high=item['high'],
-                        low=item['low'],
-                        close=item['close'],
-                        volume=item['volume']
-                    )
-                    db_session.add(price)
+        """価格履歴を保存（symbol, date 単位でアップサート）"""
+        rows = [
+            {
+                'symbol': symbol.upper(),
+                'date': item['date'],
+                'open': item['open'],
+                'high': item['high'],
+                'low': item['low'],
+                'close': item['close'],
+                'volume': item['volume'],
+            }
+            for item in price_data[-days:]
+        ]
+        if not rows:
+            return
+        try:
+            stmt = sqlite_insert(StockPrice)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['symbol', 'date'],
+                set_={
+                    'open': stmt.excluded.open,
+                    'high': stmt.excluded.high,
+                    'low': stmt.excluded.low,
+                    'close': stmt.excluded.close,
+                    'volume': stmt.excluded.volume,
+                }
+            )
+            db_session.execute(stmt, rows)
+            # 履歴だけを保存した場合（バックフィルなど）も他のプロセスが変更を検知できるよう、同じトランザクションで記録する
+            marker = sqlite_insert(HistoryChange).values(symbol=symbol.upper(), changed_at=datetime.now())
+            db_session.execute(marker.on_conflict_do_update(
+                index_elements=['symbol'], set_={'changed_at': marker.excluded.changed_at}
+            ))
             db_session.commit()
         except Exception as e:
             logger.error(f"Error saving price history: {e}")
             db_session.rollback()
 
+    def get_fx_rates(self, currencies: List[str], days: int = HISTORY_DAYS) -> List[Tuple[str, str, float]]:
+        """為替レート履歴を取得（currency, date, rate のタプル、日付昇順）"""
+        if not currencies:
+            return []
+        try:
+            cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            rows = db_session.query(FxRate.currency, FxRate.date, FxRate.rate)\
+                .filter(FxRate.currency.in_(currencies))\
+                .filter(FxRate.date >= cutoff_date)\
+                .order_by(FxRate.date.asc())\
+                .all()
+            return [tuple(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting fx rates: {e}")
+            return []
+    
+    def get_latest_fx_rates(self, currencies: List[str]) -> Dict[str, Tuple[str, float]]:
+        """通貨ごとの最新レートを取得（currency → (date, rate)）"""
+        if not currencies:
+            return {}
+        try:
+            latest_dates = db_session.query(FxRate.currency, func.max(FxRate.date).label('date'))\
+                .filter(FxRate.currency.in_(currencies))\
+                .group_by(FxRate.currency)\
+                .subquery()
+            rows = db_session.query(FxRate.currency, FxRate.date, FxRate.rate)\
+                .join(latest_dates, (FxRate.currency == latest_dates.c.currency) & (FxRate.date == latest_dates.c.date))\
+                .all()
+            return {currency: (date, rate) for currency, date, rate in rows}
+        except Exception as e:
+            logger.error(f"Error getting latest fx rates: {e}")
+            return {}
+    
+    def save_fx_rates(self, rates: List[Tuple[str, str, float]]):
+        """為替レートを保存（currency, date 単位でアップサート）"""
+        rows = [{'currency': currency, 'date': date, 'rate': rate} for currency, date, rate in rates]
+        if not rows:
+            return
+        try:
+            stmt = sqlite_insert(FxRate)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['currency', 'date'],
+                set_={'rate': stmt.excluded.rate}
+            )
+            db_session.execute(stmt, rows)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error saving fx rates: {e}")
+            db_session.rollback()
+
+    def get_price_cache_entries(self, symbols: List[str]) -> Dict[str, Dict]:
+        """複数銘柄の価格キャッシュを有効期限に関係なく一括取得"""
+        if not symbols:
+            return {}
+        try:
+            caches = db_session.query(PriceCache)\
+                .filter(PriceCache.symbol.in_([s.upper() for s in symbols]))\
+                .all()
+            return {cache.symbol: cache.to_dict() for cache in caches}
+        except Exception as e:
+            logger.error(f"Error getting price cache entries: {e}")
+            return {}
+
+    def get_price_cache_changes(self, since: Optional[datetime] = None) -> List[Dict]:
+        """cached_at が since より新しい価格キャッシュを保存順に取得（since 省略時は全件）"""
+        try:
+            query = db_session.query(PriceCache)
+            if since is not None:
+                query = query.filter(PriceCache.cached_at > since)
+            return [cache.to_dict() for cache in query.order_by(PriceCache.cached_at).all()]
+        except Exception as e:
+            logger.error(f"Error getting price cache changes: {e}")
+            return []
+
+    def get_history_changes(self, since: Optional[datetime] = None) -> List[Dict]:
+        """changed_at が since より新しい価格履歴の変更を保存順に取得（since 省略時は全件）"""
+        try:
+            query = db_session.query(HistoryChange)
+            if since is not None:
+                query = query.filter(HistoryChange.changed_at > since)
+            return [change.to_dict() for change in query.order_by(HistoryChange.changed_at).all()]
+        except Exception as e:
+            logger.error(f"Error getting history changes: {e}")
+            return []
+
+    def get_alert_rules(self, symbol: Optional[str] = None, enabled_only: bool = False) -> List[Dict]:
+        """アラートルール一覧を取得"""
+        try:
+            query = db_session.query(AlertRule)
+            if symbol:
+                query = query.filter_by(symbol=symbol.upper())
+            if enabled_only:
+                query = query.filter_by(enabled=True)
+            return [rule.to_dict() for rule in query.order_by(AlertRule.id).all()]
+        except Exception as e:
+            logger.error(f"Error getting alert rules: {e}")
+            return []
+
+    def get_alert_rules_version(self) -> Tuple[int, int]:
+        """有効なルールの (件数, 最大ID)（追加・削除・無効化で変わるため、他のプロセスでの変更の検知に使う）"""
+        try:
+            count, max_id = db_session.query(func.count(AlertRule.id), func.max(AlertRule.id))\
+                .filter(AlertRule.enabled.is_(True)).one()
+            return count, max_id or 0
+        except Exception as e:
+            # 既定値を返すと読み込み直しの判定を誤るため送出する
+            logger.error(f"Error getting alert rules version: {e}")
+            raise
+    
+    def add_alert_rule(self, symbol: str, rule_type: str, threshold: Optional[float], repeat: bool = True) -> Optional[Dict]:
+        """アラートルールを追加"""
+        try:
+            rule = AlertRule(symbol=symbol.upper(), rule_type=rule_type, threshold=threshold, repeat=repeat)
+            db_session.add(rule)
+            db_session.commit()
+            logger.info(f"Added alert rule {rule.id}: {symbol} {rule_type} {threshold}")
+            return rule.to_dict()
+        except Exception as e:
+            logger.error(f"Error adding alert rule: {e}")
+            db_session.rollback()
+            return None
+    
+    def remove_alert_rule(self, rule_id: int) -> bool:
+        """アラートルールを削除"""
+        try:
+            deleted = db_session.query(AlertRule).filter_by(id=rule_id).delete()
+            db_session.commit()
+            return deleted > 0
+        except Exception as e:
+            logger.error(f"Error removing alert rule: {e}")
+            db_session.rollback()
+            return False
+    
+    def record_alert_event(self, rule: Dict, value: float, message: str, event_key: Optional[str] = None) -> Optional[Dict]:
+        """アラート発火を記録（イベント追加とルール状態の更新を1トランザクションで行う）"""
+        try:
+            now = datetime.now()
+            event = AlertEvent(
+                rule_id=rule['id'],
+                symbol=rule['symbol'],
+                rule_type=rule['rule_type'],
+                threshold=rule['threshold'],
+                value=value,
+                message=message,
+                triggered_at=now
+            )
+            db_session.add(event)
+            updates = {'last_triggered_at': now}
+            if event_key is not None:
+                updates['last_event_key'] = event_key
+            if not rule['repeat']:
+                updates['enabled'] = False
+            db_session.query(AlertRule).filter_by(id=rule['id']).update(updates)
+            db_session.commit()
+            return event.to_dict()
+        except Exception as e:
+            logger.error(f"Error recording alert event: {e}")
+            db_session.rollback()
+            return None
+    
+    def get_alert_events(self, symbol: Optional[str] = None, since: Optional[datetime] = None, limit: int = 100) -> List[Dict]:
+        """アラート発火履歴を取得（新しい順）"""
+        try:
+            query = db_session.query(AlertEvent)
+            if symbol:
+                query = query.filter_by(symbol=symbol.upper())
+            if since:
+                query = query.filter(AlertEvent.triggered_at >= since)
+            events = query.order_by(AlertEvent.triggered_at.desc(), AlertEvent.id.desc()).limit(limit).all()
+            return [event.to_dict() for event in events]
+        except Exception as e:
+            logger.error(f"Error getting alert events: {e}")
+            return []
+    
+    def save_forecast_result(
+        self, symbol: str, run_date: str, engine: str, periods: int, as_of: Optional[str],
+        result: Optional[Dict] = None, error: Optional[str] = None, fit_seconds: Optional[float] = None
+    ):
+        """バッチ予測の結果を保存（symbol, run_date, engine, periods 単位でアップサート）"""
+        row = {
+            'symbol': symbol.upper(),
+            'run_date': run_date,
+            'engine': engine,
+            'periods': periods,
+            'as_of': as_of,
+            'status': 'error' if error else 'done',
+            'result': json.dumps(result, ensure_ascii=False) if result is not None else None,
+            'error': error,
+            'fit_seconds': fit_seconds,
+            'created_at': datetime.now()
+        }
+        try:
+            stmt = sqlite_insert(ForecastResult).values(row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['symbol', 'run_date', 'engine', 'periods'],
+                set_={k: stmt.excluded[k] for k in ('as_of', 'status', 'result', 'error', 'fit_seconds', 'created_at')}
+            )
+            db_session.execute(stmt)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error saving forecast result for {symbol}: {e}")
+            db_session.rollback()
+    
+    def get_forecast_run_status(self, run_date: str, engine: str, periods: int) -> Dict[str, Dict]:
+        """バッチ実行日の銘柄ごとの処理状況を取得"""
+        try:
+            rows = db_session.query(ForecastResult).filter_by(run_date=run_date, engine=engine, periods=periods).all()
+            return {row.symbol: row.to_dict() for row in rows}
+        except Exception as e:
+            logger.error(f"Error getting forecast run status: {e}")
+            return {}
+    
+    def get_latest_forecast_result(self, symbol: str, engine: str, periods: int, since_run_date: str) -> Optional[Dict]:
+        """指定日以降のバッチ実行で保存された最新の予測結果を取得"""
+        try:
+            row = db_session.query(ForecastResult).filter(
+                ForecastResult.symbol == symbol.upper(),
+                ForecastResult.engine == engine,
+                ForecastResult.periods == periods,
+                ForecastResult.status == 'done',
+                ForecastResult.run_date >= since_run_date
+            ).order_by(ForecastResult.run_date.desc()).first()
+            if row is None:
+                return None
+            return {**row.to_dict(), 'result': json.loads(row.result)}
+        except Exception as e:
+            logger.error(f"Error getting forecast result for {symbol}: {e}")
+            return None
+    
+    def save_forecast_evaluations(self, records: List[Dict]):
+        """予測精度評価の結果を一括保存"""
+        if not records:
+            return
+        try:
+            now = datetime.now()
+            db_session.execute(
+                sqlite_insert(ForecastEvaluation),
+                [{**record, 'created_at': now} for record in records]
+            )
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error saving forecast evaluations: {e}")
+            db_session.rollback()
+    
+    def get_forecast_evaluations(self, run_id: Optional[str] = None) -> List[Dict]:
+        """予測精度評価の結果を取得（run_id 省略時は最新の実行）"""
+        try:
+            if run_id is None:
+                latest = db_session.query(ForecastEvaluation.run_id)\
+                    .order_by(ForecastEvaluation.created_at.desc(), ForecastEvaluation.id.desc()).first()
+                if latest is None:
+                    return []
+                run_id = latest[0]
+            rows = db_session.query(ForecastEvaluation).filter_by(run_id=run_id)\
+                .order_by(ForecastEvaluation.engine, ForecastEvaluation.horizon, ForecastEvaluation.symbol).all()
+            return [row.to_dict() for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting forecast evaluations: {e}")
+            return []
+
+    def enqueue_enrichment(self, symbols: List[str]):
+        """銘柄情報の取得待ちに追加（登録済みの場合は待ち状態に戻して再試行回数をリセット）"""
+        if not symbols:
+            return
+        now = datetime.now()
+        rows = [
+            {'symbol': symbol.upper(), 'status': 'pending', 'attempts': 0, 'next_attempt_at': now,
+             'last_error': None, 'created_at': now, 'updated_at': now}
+            for symbol in dict.fromkeys(symbols)
+        ]
+        try:
+            stmt = sqlite_insert(EnrichmentJob)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['symbol'],
+                set_={k: stmt.excluded[k] for k in ('status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at')}
+            )
+            db_session.execute(stmt, rows)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error enqueueing enrichment: {e}")
+            db_session.rollback()
+
+    def get_due_enrichments(self, limit: int, now: Optional[datetime] = None) -> List[Dict]:
+        """再試行時刻を過ぎた取得待ちの銘柄を取得（古い順）"""
+        now = now or datetime.now()
+        try:
+            rows = db_session.query(EnrichmentJob)\
+                .filter(EnrichmentJob.status == 'pending', EnrichmentJob.next_attempt_at <= now)\
+                .order_by(EnrichmentJob.next_attempt_at)\
+                .limit(limit).all()
+            return [row.to_dict() for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting due enrichments: {e}")
+            return []
+
+    def get_next_enrichment_time(self) -> Optional[datetime]:
+        """次に取得待ちの銘柄を処理できる時刻"""
+        try:
+            return db_session.query(func.min(EnrichmentJob.next_attempt_at))\
+                .filter(EnrichmentJob.status == 'pending').scalar()
+        except Exception as e:
+            logger.error(f"Error getting next enrichment time: {e}")
+            return None
+
+    def finish_enrichment(self, symbol: str, error: Optional[str] = None, retry_at: Optional[datetime] = None):
+        """
+        取得結果を記録
+        
+        error がなければ完了、retry_at があれば再試行待ち、どちらもなければ失敗として確定する。
+        """
+        now = datetime.now()
+        try:
+            job = db_session.query(EnrichmentJob).filter_by(symbol=symbol.upper()).first()
+            if job is None:
+                return
+            job.attempts += 1
+            job.last_error = error
+            job.updated_at = now
+            if error is None:
+                job.status = 'done'
+            elif retry_at is not None:
+                job.next_attempt_at = retry_at
+            else:
+                job.status = 'failed'
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error finishing enrichment: {e}")
+            db_session.rollback()
+
+    def get_enrichments(self, symbols: List[str]) -> Dict[str, Dict]:
+        """指定した銘柄の取得状況を取得"""
+        if not symbols:
+            return {}
+        try:
+            rows = db_session.query(EnrichmentJob)\
+                .filter(EnrichmentJob.symbol.in_([s.upper() for s in symbols])).all()
+            return {row.symbol: row.to_dict() for row in rows}
+        except Exception as e:
+            logger.error(f"Error getting enrichments: {e}")
+            return {}
+
+    def get_enrichment_summary(self) -> Dict:
+        """取得待ちキューの状態ごとの件数と、未完了の銘柄"""
+        try:
+            counts = dict(
+                db_session.query(EnrichmentJob.status, func.count()).group_by(EnrichmentJob.status).all()
+            )
+            pending = db_session.query(EnrichmentJob)\
+                .filter(EnrichmentJob.status.in_(['pending', 'failed']))\
+                .order_by(EnrichmentJob.next_attempt_at).all()
+        except Exception as e:
+            logger.error(f"Error getting enrichment summary: {e}")
+            counts, pending = {}, []
+        return {
+            'counts': {status: counts.get(status, 0) for status in ('pending', 'done', 'failed')},
+            'jobs': [job.to_dict() for job in pending]
+        }
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float, now: Optional[datetime] = None) -> bool:
+        """
+        リースを取得または延長（未取得・失効済み・自分が保持している場合だけ成功する）
+
+        1つの INSERT ... ON CONFLICT DO UPDATE ... WHERE で判定と更新を行うため、複数プロセスから同時に呼んでも1つだけが成功する。
+        """
+        now = now or datetime.now()
+        stmt = sqlite_insert(Lease).values(
+            name=name, owner=owner, acquired_at=now, expires_at=now + timedelta(seconds=ttl_seconds)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={
+                'owner': stmt.excluded.owner,
+                'expires_at': stmt.excluded.expires_at,
+                # 延長の場合は取得時刻を変えない
+                'acquired_at': case((Lease.owner == stmt.excluded.owner, Lease.acquired_at), else_=stmt.excluded.acquired_at),
+            },
+            where=(Lease.expires_at <= now) | (Lease.owner == owner)
+        )
+        try:
+            acquired = db_session.execute(stmt).rowcount == 1
+            db_session.commit()
+            return acquired
+        except Exception as e:
+            logger.error(f"Error acquiring lease {name}: {e}")
+            db_session.rollback()
+            raise
+
+    def release_lease(self, name: str, owner: str):
+        """自分が保持しているリースを解放"""
+        try:
+            db_session.query(Lease).filter_by(name=name, owner=owner).delete()
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error releasing lease {name}: {e}")
+            db_session.rollback()
+
+    def get_leases(self, prefix: str = '', now: Optional[datetime] = None) -> List[Dict]:
+        """有効なリースの一覧（名前順）"""
+        now = now or datetime.now()
+        try:
+            query = db_session.query(Lease).filter(Lease.expires_at > now)
+            if prefix:
+                query = query.filter(Lease.name.startswith(prefix, autoescape=True))
+            return [lease.to_dict() for lease in query.order_by(Lease.name).all()]
+        except Exception as e:
+            # 空の一覧を返すと保持中のリースを失効とみなすため送出する
+            logger.error(f"Error getting leases: {e}")
+            raise
+
+    @staticmethod
+    def _job_dict(job: Job, with_payload: bool = False) -> Dict:
+        data = {
+            **job.to_dict(),
+            'params': json.loads(job.params) if job.params else {},
+            'result': json.loads(job.result) if job.result else None,
+        }
+        if with_payload:
+            data['payload'] = job.payload
+        return data
+
+    def create_job(
+        self, kind: str, params: Dict, status: str = 'queued', active_key: Optional[str] = None,
+        payload: Optional[str] = None, result: Optional[Dict] = None
+    ) -> Dict:
+        """
+        ジョブを登録
+
+        active_key が同じ実行待ち・実行中のジョブがある場合は登録せずにそのジョブを返す
+        （一意制約で判定するため、複数プロセスから同時に登録しても1件になる）。
+        """
+        now = datetime.now()
+        job_id = uuid.uuid4().hex
+        finished = status in ('done', 'error')
+        stmt = sqlite_insert(Job).values(
+            id=job_id, kind=kind, status=status, active_key=None if finished else active_key,
+            params=json.dumps(params, ensure_ascii=False), payload=payload,
+            result=json.dumps(result, ensure_ascii=False) if result is not None else None,
+            submitted_at=now, finished_at=now if finished else None
+        )
+        if active_key and not finished:
+            stmt = stmt.on_conflict_do_nothing(index_elements=['active_key'])
+        try:
+            db_session.execute(stmt)
+            db_session.commit()
+            job = db_session.get(Job, job_id)
+            if job is None:
+                job = db_session.query(Job).filter_by(active_key=active_key).first()
+            return self._job_dict(job)
+        except Exception as e:
+            logger.error(f"Error creating {kind} job: {e}")
+            db_session.rollback()
+            raise
+
+    def get_job(self, job_id: str, kind: Optional[str] = None) -> Optional[Dict]:
+        """ジョブを取得（kind を指定した場合は種類も一致するものだけ）"""
+        try:
+            job = db_session.get(Job, job_id)
+        except Exception as e:
+            # 見つからない（None）と区別できるよう送出する
+            logger.error(f"Error getting job {job_id}: {e}")
+            raise
+        if job is None or (kind and job.kind != kind):
+            return None
+        return self._job_dict(job)
+
+    def get_active_job(self, active_key: str) -> Optional[Dict]:
+        """実行待ち・実行中のジョブを重複排除用のキーで取得"""
+        try:
+            job = db_session.query(Job).filter_by(active_key=active_key).first()
+        except Exception as e:
+            logger.error(f"Error getting job {active_key}: {e}")
+            raise
+        return self._job_dict(job) if job else None
+
+    def count_active_jobs(self, kind: str) -> int:
+        """実行待ち・実行中のジョブ数"""
+        try:
+            return db_session.query(func.count(Job.id))\
+                .filter(Job.kind == kind, Job.status.in_(['queued', 'running'])).scalar()
+        except Exception as e:
+            logger.error(f"Error counting {kind} jobs: {e}")
+            raise
+
+    def claim_jobs(self, kind: str, owner: str, limit: int) -> List[Dict]:
+        """実行待ちのジョブを登録順に最大 limit 件取得して実行中にする（payload を含む）"""
+        claimed = []
+        try:
+            ids = [row[0] for row in db_session.query(Job.id)
+                   .filter(Job.kind == kind, Job.status == 'queued')
+                   .order_by(Job.submitted_at).limit(limit).all()]
+            for job_id in ids:
+                # 他のプロセスが先に取得したジョブは更新されない
+                updated = db_session.query(Job).filter(Job.id == job_id, Job.status == 'queued')\
+                    .update({'status': 'running', 'owner': owner, 'started_at': datetime.now()}, synchronize_session=False)
+                db_session.commit()
+                if updated:
+                    claimed.append(self._job_dict(db_session.get(Job, job_id, populate_existing=True), with_payload=True))
+        except Exception as e:
+            logger.error(f"Error claiming {kind} jobs: {e}")
+            db_session.rollback()
+            raise
+        return claimed
+
+    def finish_job(self, job_id: str, result: Optional[Dict] = None, error: Optional[str] = None,
+                   status_code: Optional[int] = None, owner: Optional[str] = None):
+        """
+        ジョブを完了（error がある場合は失敗）にし、重複排除用のキーと payload を消す
+
+        owner を指定した場合は、そのプロセスが実行中のジョブだけを更新する
+        （実行待ちに戻されて他のプロセスが引き継いだジョブは上書きしない）。
+        """
+        query = db_session.query(Job).filter(Job.id == job_id)
+        if owner is not None:
+            query = query.filter(Job.status == 'running', Job.owner == owner)
+        try:
+            query.update({
+                'status': 'error' if error else 'done',
+                'active_key': None,
+                'payload': None,
+                'result': json.dumps(result, ensure_ascii=False) if result is not None else None,
+                'error': error,
+                'status_code': status_code,
+                'finished_at': datetime.now(),
+            }, synchronize_session=False)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error finishing job {job_id}: {e}")
+            db_session.rollback()
+
+    def requeue_jobs(self, kind: str, keep_owners: Sequence[str] = (), owner: Optional[str] = None) -> int:
+        """
+        実行中のジョブを実行待ちに戻す
+
+        keep_owners（実行中のプロセス）のジョブは除く。owner を指定した場合はそのプロセスのジョブだけを戻す。
+        """
+        query = db_session.query(Job).filter(Job.kind == kind, Job.status == 'running')
+        if keep_owners:
+            query = query.filter(Job.owner.notin_(list(keep_owners)))
+        if owner is not None:
+            query = query.filter(Job.owner == owner)
+        try:
+            count = query.update({'status': 'queued', 'owner': None, 'started_at': None}, synchronize_session=False)
+            db_session.commit()
+            return count
+        except Exception as e:
+            logger.error(f"Error requeueing {kind} jobs: {e}")
+            db_session.rollback()
+            return 0
+
+    def purge_jobs(self, kind: str, finished_before: datetime):
+        """完了後に保持期間を過ぎたジョブを削除"""
+        try:
+            db_session.query(Job)\
+                .filter(Job.kind == kind, Job.finished_at.isnot(None), Job.finished_at < finished_before)\
+                .delete(synchronize_session=False)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error purging {kind} jobs: {e}")
+            db_session.rollback()
+
 
 # グローバルインスタンス
 db = Database()
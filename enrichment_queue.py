@@ -0,0 +1,186 @@
+"""銘柄情報取得キューモジュール - 銘柄名や価格の取得をバックグラウンドで再試行しながら実行"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from database import db
+from stock_api import StockAPI, save_price_data
+from config import (
+    ENRICHMENT_BATCH_SIZE, ENRICHMENT_REQUESTS_PER_SECOND, ENRICHMENT_MAX_WORKERS,
+    ENRICHMENT_MAX_ATTEMPTS, ENRICHMENT_BACKOFF_SECONDS, ENRICHMENT_MAX_BACKOFF_SECONDS, ENRICHMENT_POLL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """複数スレッドで共有するリクエスト間隔の制御（1秒あたり rate 回まで）"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """次のリクエスト枠まで待機"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class EnrichmentWorker:
+    """
+    銘柄情報の取得ワーカー
+
+    取得待ちの銘柄は enrichment_jobs テーブルに保存するため、サーバーを再起動しても失われない。
+    ワーカーは再試行時刻を過ぎた銘柄を batch_size 件ずつ取り出し、価格履歴は一括ダウンロード、
+    ticker.info は共有のレート制限の範囲で並行して取得する。
+    失敗した銘柄は指数バックオフで再試行し、max_attempts 回で失敗として確定する。
+    銘柄名は銘柄コードのまま（仮の名前）の場合だけ更新する。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = ENRICHMENT_BATCH_SIZE,
+        requests_per_second: float = ENRICHMENT_REQUESTS_PER_SECOND,
+        max_workers: int = ENRICHMENT_MAX_WORKERS,
+        max_attempts: int = ENRICHMENT_MAX_ATTEMPTS,
+        backoff_seconds: float = ENRICHMENT_BACKOFF_SECONDS,
+        max_backoff_seconds: float = ENRICHMENT_MAX_BACKOFF_SECONDS,
+        poll_seconds: float = ENRICHMENT_POLL_SECONDS
+    ):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.limiter = RateLimiter(requests_per_second)
+        # False の場合は enqueue で開始しない（複数プロセスでは担当プロセスだけが start する）
+        self.autostart = True
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, symbols: List[str]):
+        """銘柄を取得待ちに追加してワーカーを起こす（ワーカーが未起動なら開始する）"""
+        db.enqueue_enrichment(symbols)
+        if self.autostart:
+            self.start()
+        self._wake.set()
+
+    def start(self):
+        """ワーカースレッドを開始（前回の起動時に残った取得待ちも処理する）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, args=(self._stop,), name='enrichment-worker', daemon=True)
+            self._thread.start()
+        logger.info("Enrichment worker started")
+
+    def stop(self):
+        """ワーカースレッドを停止（処理中のバッチは完了まで続き、残りは取得待ちのまま次の担当プロセスが処理する）"""
+        with self._lock:
+            self._thread = None
+            self._stop.set()
+        self._wake.set()
+
+    def _loop(self, stop: threading.Event):
+        from models.database import db_session
+
+        while not stop.is_set():
+            try:
+                processed = self.run_once()
+                next_time = None if processed else db.get_next_enrichment_time()
+            except Exception as e:
+                logger.error(f"Enrichment worker failed: {e}")
+                processed, next_time = 0, None
+            finally:
+                db_session.remove()
+            if processed:
+                continue
+            timeout = self.poll_seconds
+            if next_time is not None:
+                timeout = min(timeout, max((next_time - datetime.now()).total_seconds(), 0))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def run_once(self) -> int:
+        """再試行時刻を過ぎた銘柄を1バッチ処理（処理した件数を返す）"""
+        jobs = db.get_due_enrichments(self.batch_size)
+        if jobs:
+            self.process(jobs)
+        return len(jobs)
+
+    def drain(self, progress: Optional[Callable[[int], None]] = None) -> int:
+        """現時点で処理できる銘柄がなくなるまで処理（CLI用）"""
+        total = 0
+        while True:
+            processed = self.run_once()
+            if not processed:
+                return total
+            total += processed
+            if progress:
+                progress(total)
+
+    def process(self, jobs: List[Dict]):
+        """取得待ちの銘柄の情報を取得して保存し、結果をキューに記録"""
+        symbols = [job['symbol'] for job in jobs]
+        histories = StockAPI.get_multiple_stocks_history(symbols, period='1mo')
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            infos = dict(zip(symbols, executor.map(self._fetch_info, symbols)))
+
+        names = {}
+        for job in jobs:
+            symbol = job['symbol']
+            info, error = infos[symbol]
+            if info and info.get('name'):
+                names[symbol] = info['name']
+            hist = self._prepare_history(histories.get(symbol))
+            if hist is not None:
+                save_price_data(symbol, hist, info)
+            elif error is None:
+                error = '価格データが見つかりません'
+            db.finish_enrichment(symbol, error, self._retry_at(job['attempts']) if error else None)
+            if error:
+                logger.warning(f"Enrichment failed for {symbol} (attempt {job['attempts'] + 1}): {error}")
+        db.update_stock_names(names, placeholder_only=True)
+
+    def _retry_at(self, attempts: int) -> Optional[datetime]:
+        """次の再試行時刻（上限回数に達した場合は None）"""
+        if attempts + 1 >= self.max_attempts:
+            return None
+        delay = min(self.backoff_seconds * 2 ** attempts, self.max_backoff_seconds)
+        return datetime.now() + timedelta(seconds=delay)
+
+    def _fetch_info(self, symbol: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """ticker.info を取得（失敗時の再試行はキューのバックオフに任せる）"""
+        self.limiter.wait()
+        try:
+            return StockAPI.summarize_info(symbol, StockAPI.fetch_info(symbol)), None
+        except Exception as e:
+            return None, str(e)
+
+    @staticmethod
+    def _prepare_history(hist: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """一括ダウンロードの結果を単一銘柄の履歴に整える"""
+        if hist is None:
+            return None
+        if isinstance(hist.columns, pd.MultiIndex):
+            hist = hist.droplevel(0, axis=1)
+        if hist.empty or 'Close' not in hist:
+            return None
+        hist = hist.dropna(subset=['Close'])
+        return hist if not hist.empty else None
+
+
+# グローバルインスタンス
+enrichment_worker = EnrichmentWorker()
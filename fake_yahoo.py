@@ -0,0 +1,181 @@
+"""Yahoo Finance の代替サーバー - 負荷試験をオフラインで行うためのローカルHTTPサーバー
+
+chart（/v8/finance/chart/<symbol>）と quoteSummary（/v10/finance/quoteSummary/<symbol>）を
+yahoo_http が読める形式で返す。価格は銘柄名から決まる乱数の種で生成するため、同じ銘柄は常に同じ値になる。
+遅延・レート制限（429）・障害（500）の発生率を指定できる。
+"""
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+from benchmarks import synthetic_history
+
+logger = logging.getLogger(__name__)
+
+# range パラメータごとの本数（営業日）
+RANGE_BARS = {
+    '1d': 1, '5d': 5, '1mo': 22, '3mo': 66, '6mo': 130, '1y': 252,
+    '2y': 504, '5y': 1260, '10y': 2520, 'ytd': 200, 'max': 2520,
+}
+DIVIDEND_INTERVAL_BARS = 63
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: '_Server'
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        status, body = fake.respond(parts, params)
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: 'FakeYahooServer'
+
+
+class FakeYahooServer:
+    """
+    Yahoo Finance の代替サーバー
+
+    with 文で使うと空いているポートで起動し、終了時に停止する（base_url で接続先を取得）。
+    rate_limit_rate・failure_rate は各リクエストで 429・500 を返す確率。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0,
+                 jitter_ms: float = 0, rate_limit_rate: float = 0, failure_rate: float = 0, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.failure_rate = failure_rate
+        self.counts: Dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> 'FakeYahooServer':
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-yahoo', daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Yahoo server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _draw(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def respond(self, parts, params: Dict[str, str]):
+        """パスとクエリから (ステータス, JSON) を返す"""
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, self.latency_ms + self._draw() * self.jitter_ms) / 1000)
+
+        if len(parts) != 4 or parts[0] not in ('v8', 'v10') or parts[2] not in ('chart', 'quoteSummary'):
+            self._count('not_found')
+            return 404, {'error': 'Not Found'}
+        endpoint, symbol = parts[2], parts[3]
+
+        draw = self._draw()
+        if draw < self.rate_limit_rate:
+            self._count('rate_limited')
+            return 429, {'error': 'Too Many Requests'}
+        if draw < self.rate_limit_rate + self.failure_rate:
+            self._count('failed')
+            return 500, {'error': 'Internal Server Error'}
+
+        self._count(endpoint)
+        if endpoint == 'chart':
+            return 200, self.chart(symbol, params.get('range', '1mo'))
+        return 200, self.quote_summary(symbol)
+
+    @staticmethod
+    def _seed(symbol: str) -> int:
+        return zlib.crc32(symbol.encode('utf-8'))
+
+    def chart(self, symbol: str, period: str) -> Dict:
+        """chart API の形式の日足（配当は約3か月ごと）"""
+        bars = RANGE_BARS.get(period, RANGE_BARS['1mo'])
+        hist = synthetic_history(bars, seed=self._seed(symbol), end=datetime.now())
+        timestamps = [int(ts.timestamp()) for ts in hist.index.tz_localize('UTC')]
+        dividends = {
+            str(timestamps[i]): {'amount': round(float(hist['Close'].iloc[i]) * 0.005, 4), 'date': timestamps[i]}
+            for i in range(DIVIDEND_INTERVAL_BARS - 1, bars, DIVIDEND_INTERVAL_BARS)
+        }
+        return {'chart': {'result': [{
+            'meta': {'symbol': symbol, 'currency': 'JPY' if symbol.endswith('.T') else 'USD',
+                     'exchangeTimezoneName': 'UTC'},
+            'timestamp': timestamps,
+            'events': {'dividends': dividends},
+            'indicators': {'quote': [{
+                'open': hist['Open'].round(4).tolist(),
+                'high': hist['High'].round(4).tolist(),
+                'low': hist['Low'].round(4).tolist(),
+                'close': hist['Close'].round(4).tolist(),
+                'volume': hist['Volume'].tolist(),
+            }]},
+        }], 'error': None}}
+
+    def quote_summary(self, symbol: str) -> Dict:
+        """quoteSummary API の形式の銘柄情報（{'raw': ..., 'fmt': ...} 形式）"""
+        rng = random.Random(self._seed(symbol))
+        price = round(rng.uniform(50, 5000), 2)
+
+        def value(raw):
+            return {'raw': raw, 'fmt': f'{raw:,.2f}'}
+
+        return {'quoteSummary': {'result': [{
+            'price': {'shortName': f'{symbol} Corp', 'longName': f'{symbol} Corporation',
+                      'currency': 'JPY' if symbol.endswith('.T') else 'USD',
+                      'regularMarketPrice': value(price), 'marketCap': value(round(price * rng.uniform(1e7, 1e9)))},
+            'summaryDetail': {'trailingPE': value(round(rng.uniform(5, 40), 2)),
+                              'dividendYield': value(round(rng.uniform(0, 0.05), 4)),
+                              'fiftyTwoWeekHigh': value(round(price * 1.3, 2)),
+                              'fiftyTwoWeekLow': value(round(price * 0.7, 2))},
+            'assetProfile': {'sector': 'Technology', 'industry': 'Software'},
+            'financialData': {'totalRevenue': value(round(price * 1e6)),
+                              'profitMargins': value(round(rng.uniform(0.01, 0.3), 4))},
+        }], 'error': None}}
@@ -0,0 +1,129 @@
+"""軽量予測エンジンモジュール - NumPyのみで動作する高速な予測モデル"""
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+# Prophetの既定 interval_width=0.8 に合わせた両側80%区間の z 値
+INTERVAL_Z = 1.2815515655446004
+
+
+class FastForecaster:
+    """
+    軽量予測エンジン
+
+    いずれのモデルも対数価格に対して学習し、Prophetの予測結果と同じ列
+    (ds, yhat, yhat_lower, yhat_upper, trend) を持つDataFrameを返す。
+    学習期間の当てはめ値も含むため、StockPredictor の整形処理をそのまま使える。
+
+    - holt_winters: 減衰トレンド付き指数平滑化（平滑化係数はグリッド探索で一括推定）
+    - drift: 対数リターンの平均ドリフト + 対数正規分布の予測区間
+    - linear: 対数価格の線形トレンド
+    """
+
+    ENGINES = ('holt_winters', 'drift', 'linear')
+
+    # Holtモデルの探索グリッドと減衰係数
+    ALPHA_GRID = np.linspace(0.05, 0.95, 19)
+    BETA_GRID = np.array([0.0, 0.01, 0.02, 0.05, 0.1, 0.2])
+    PHI = 0.98
+
+    @staticmethod
+    def forecast(engine: str, hist_data: pd.DataFrame, periods: int = 30) -> pd.DataFrame:
+        """
+        指定エンジンで予測を実行
+
+        Args:
+            engine (str): 予測エンジン名（ENGINES のいずれか）
+            hist_data (pd.DataFrame): 履歴データ (indexがDate、Close列を含む)
+            periods (int): 予測する営業日数
+
+        Returns:
+            pd.DataFrame: 学習期間 + 予測期間の予測結果
+        """
+        closes = hist_data['Close'].astype(float).to_numpy()
+        log_prices = np.log(closes)
+
+        if engine == 'holt_winters':
+            fitted, future, future_sd = FastForecaster._holt(log_prices, periods)
+        elif engine == 'drift':
+            fitted, future, future_sd = FastForecaster._drift(log_prices, periods)
+        elif engine == 'linear':
+            fitted, future, future_sd = FastForecaster._linear(log_prices, periods)
+        else:
+            raise ValueError(f"Unknown forecast engine: {engine}")
+
+        resid_sd = float(np.nanstd(log_prices[1:] - fitted[1:]))
+        yhat = np.concatenate([fitted, future])
+        sd = np.concatenate([np.full(len(fitted), resid_sd), future_sd])
+
+        index = pd.DatetimeIndex(hist_data.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        future_dates = pd.bdate_range(start=index[-1].normalize() + pd.offsets.BDay(1), periods=periods)
+
+        return pd.DataFrame({
+            'ds': index.normalize().append(future_dates),
+            'yhat': np.exp(yhat),
+            'yhat_lower': np.exp(yhat - INTERVAL_Z * sd),
+            'yhat_upper': np.exp(yhat + INTERVAL_Z * sd),
+            'trend': np.exp(yhat)
+        })
+
+    @staticmethod
+    def _holt(y: np.ndarray, periods: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """減衰トレンド付き指数平滑化（全パラメータ組み合わせを同時に計算）"""
+        alpha, beta = np.meshgrid(FastForecaster.ALPHA_GRID, FastForecaster.BETA_GRID)
+        alpha, beta = alpha.ravel(), beta.ravel()
+        phi = FastForecaster.PHI
+
+        n = len(y)
+        level = np.full(alpha.shape, y[0])
+        trend = np.full(alpha.shape, y[1] - y[0] if n > 1 else 0.0)
+        fitted = np.empty((n, len(alpha)))
+        fitted[0] = y[0]
+        for t in range(1, n):
+            pred = level + phi * trend
+            fitted[t] = pred
+            error = y[t] - pred
+            level = pred + alpha * error
+            trend = phi * trend + alpha * beta * error
+
+        sse = np.sum((y[1:, None] - fitted[1:]) ** 2, axis=0)
+        best = int(np.argmin(sse))
+        a, b = alpha[best], beta[best]
+        sigma = np.sqrt(sse[best] / max(n - 1, 1))
+
+        steps = np.arange(1, periods + 1)
+        damped = np.cumsum(phi ** steps)
+        future = level[best] + damped * trend[best]
+
+        # h期先の予測分散: sigma^2 * (1 + Σ_{j<h} c_j^2), c_j = α(1 + βφ(1-φ^j)/(1-φ))
+        c = a * (1 + b * phi * (1 - phi ** steps[:-1]) / (1 - phi))
+        variance = sigma ** 2 * (1 + np.concatenate([[0.0], np.cumsum(c ** 2)]))
+        return fitted[:, best], future, np.sqrt(variance)
+
+    @staticmethod
+    def _drift(y: np.ndarray, periods: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """対数リターンの平均ドリフト（予測区間は対数正規分布）"""
+        returns = np.diff(y)
+        mu = float(returns.mean()) if len(returns) else 0.0
+        sigma = float(returns.std(ddof=1)) if len(returns) > 1 else 0.0
+
+        fitted = np.concatenate([[y[0]], y[:-1] + mu])
+        steps = np.arange(1, periods + 1)
+        return fitted, y[-1] + mu * steps, sigma * np.sqrt(steps)
+
+    @staticmethod
+    def _linear(y: np.ndarray, periods: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """対数価格の線形トレンド（予測区間は回帰の予測誤差）"""
+        n = len(y)
+        x = np.arange(n, dtype=float)
+        slope, intercept = np.polyfit(x, y, 1)
+        fitted = intercept + slope * x
+        sigma = np.sqrt(np.sum((y - fitted) ** 2) / max(n - 2, 1))
+
+        future_x = np.arange(n, n + periods, dtype=float)
+        x_mean = x.mean()
+        sxx = np.sum((x - x_mean) ** 2) or 1.0
+        sd = sigma * np.sqrt(1 + 1 / n + (future_x - x_mean) ** 2 / sxx)
+        return fitted, intercept + slope * future_x, sd
@@ -0,0 +1,208 @@
+"""予測バッチモジュール - 追跡銘柄の予測を一括で事前計算"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from database import db
+from stock_api import StockAPI
+from symbol_utils import normalize_symbol
+from config import (
+    PREDICTION_HISTORY_PERIOD, PREDICTION_ENGINE,
+    PREDICTION_BATCH_PERIODS, PREDICTION_BATCH_WORKERS, PREDICTION_BATCH_CHUNK_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastBatchRunner:
+    """
+    予測バッチ
+
+    履歴データは銘柄をまとめて一括ダウンロードし、予測はプロセスプールで並列に実行する。
+    結果は1銘柄ごとに forecast_results テーブルへ保存するため、途中で停止しても
+    同じ実行日で再実行すれば完了済みの銘柄をスキップして再開できる。
+    """
+
+    @staticmethod
+    def run(
+        symbols: Optional[List[str]] = None,
+        engine: str = PREDICTION_ENGINE,
+        periods: int = PREDICTION_BATCH_PERIODS,
+        max_workers: int = PREDICTION_BATCH_WORKERS,
+        run_date: Optional[str] = None,
+        resume: bool = True,
+        chunk_size: int = PREDICTION_BATCH_CHUNK_SIZE,
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        予測バッチを実行
+
+        Args:
+            symbols: 対象銘柄（省略時は追跡中の全銘柄）
+            engine: 予測エンジン
+            periods: 予測する日数
+            max_workers: ワーカープロセス数（0 の場合はCPU数）
+            run_date: 実行日（省略時は本日）
+            resume: 同じ実行日で完了済みの銘柄をスキップする
+            chunk_size: 履歴を一括ダウンロードする銘柄数
+            progress: 進捗が更新されるたびに呼び出される関数
+
+        Returns:
+            Dict: 実行結果（total, done, failed, skipped, failures など）
+        """
+        run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+        if symbols is None:
+            symbols = [stock['symbol'] for stock in db.get_tracked_stocks()]
+        symbols = list(dict.fromkeys(normalize_symbol(s) for s in symbols))
+
+        completed = db.get_forecast_run_status(run_date, engine, periods) if resume else {}
+        pending = [s for s in symbols if completed.get(s.upper(), {}).get('status') != 'done']
+
+        state = {
+            'run_date': run_date,
+            'engine': engine,
+            'periods': periods,
+            'total': len(symbols),
+            'skipped': len(symbols) - len(pending),
+            'done': 0,
+            'failed': 0,
+            'failures': {},
+            'started_at': datetime.now().isoformat(),
+            'finished_at': None,
+        }
+        logger.info(f"Forecast batch {run_date} ({engine}): {len(pending)} symbols, {state['skipped']} already done")
+
+        def record(symbol: str, as_of: Optional[str], result: Optional[Dict], error: Optional[str], fit_seconds: Optional[float]):
+            db.save_forecast_result(symbol, run_date, engine, periods, as_of, result, error, fit_seconds)
+            if error:
+                state['failed'] += 1
+                state['failures'][symbol] = error
+                logger.warning(f"Forecast batch failed for {symbol}: {error}")
+            else:
+                state['done'] += 1
+            if progress:
+                progress(dict(state))
+
+        def drain(futures: Dict, block: bool):
+            for future in [f for f in futures if block or f.done()]:
+                symbol = futures.pop(future)
+                try:
+                    record(symbol, *future.result())
+                except Exception as e:
+                    record(symbol, None, None, str(e), None)
+
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=max_workers or None,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_batch_worker,
+                initargs=(engine,)
+            ) as executor:
+                futures = {}
+                for start in range(0, len(pending), chunk_size):
+                    chunk = pending[start:start + chunk_size]
+                    # ダウンロード中も前のチャンクの予測は並行して進む
+                    histories = StockAPI.get_multiple_stocks_history(chunk, period=PREDICTION_HISTORY_PERIOD)
+                    for symbol in chunk:
+                        hist = histories.get(symbol)
+                        if hist is not None and isinstance(hist.columns, pd.MultiIndex):
+                            hist = hist.droplevel(0, axis=1)
+                        if hist is None or hist.empty or 'Close' not in hist:
+                            record(symbol, None, None, '予測に必要なデータが見つかりません', None)
+                            continue
+                        hist = hist.dropna(subset=['Close']).rename_axis('Date')
+                        if len(hist) < 30:
+                            record(symbol, None, None, 'データ不足のため予測できません', None)
+                            continue
+                        futures[executor.submit(_run_batch_task, symbol, hist, engine, periods)] = symbol
+                    drain(futures, block=False)
+                drain(futures, block=True)
+
+        state['finished_at'] = datetime.now().isoformat()
+        logger.info(
+            f"Forecast batch {run_date} ({engine}) finished: "
+            f"{state['done']} done, {state['failed']} failed, {state['skipped']} skipped"
+        )
+        return state
+
+
+def _init_batch_worker(engine: str):
+    """バッチ用ワーカーの初期化（Prophetは最初に読み込んでおく）"""
+    if engine == 'prophet':
+        import prophet  # noqa: F401
+
+
+def _run_batch_task(symbol: str, hist: pd.DataFrame, engine: str, periods: int):
+    """1銘柄の予測を実行（例外はエラーとして返し、バッチ全体は止めない）"""
+    from stock_predictor import StockPredictor
+
+    as_of = hist.index[-1].strftime('%Y-%m-%d')
+    started = time.perf_counter()
+    try:
+        result = StockPredictor(engine=engine).predict(hist, periods=periods, symbol=symbol)
+        return as_of, result, None, time.perf_counter() - started
+    except Exception as e:
+        return as_of, None, str(e), time.perf_counter() - started
+
+
+class ForecastBatchScheduler:
+    """予測バッチの定時実行（平日の指定時刻にバックグラウンドスレッドで実行）"""
+
+    def __init__(self):
+        self.last_state: Optional[Dict] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def next_run(run_time: str, now: Optional[datetime] = None) -> datetime:
+        """次回実行日時を計算（HH:MM 形式、土日はスキップ）"""
+        now = now or datetime.now()
+        hour, minute = (int(v) for v in run_time.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        while candidate.weekday() >= 5:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def start(self, run_time: str):
+        """スケジューラを開始"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            # 停止前のスレッドが再開後に動き続けないよう、開始ごとに別の停止イベントを渡す
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, args=(run_time, self._stop), name='forecast-batch', daemon=True)
+            self._thread.start()
+        logger.info(f"Forecast batch scheduled at {run_time} on weekdays")
+
+    def stop(self):
+        """スケジューラを停止（実行中のバッチは完了まで続く）"""
+        with self._lock:
+            self._thread = None
+            self._stop.set()
+
+    def _loop(self, run_time: str, stop: threading.Event):
+        while True:
+            wait = (self.next_run(run_time) - datetime.now()).total_seconds()
+            if stop.wait(max(wait, 0)):
+                return
+            try:
+                self.last_state = ForecastBatchRunner.run(progress=self._update)
+            except Exception as e:
+                logger.error(f"Forecast batch failed: {e}")
+            finally:
+                from models.database import db_session
+                db_session.remove()
+
+    def _update(self, state: Dict):
+        self.last_state = state
+
+
+# グローバルインスタンス
+forecast_batch_scheduler = ForecastBatchScheduler()
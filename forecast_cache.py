@@ -0,0 +1,247 @@
+"""予測キャッシュモジュール - 学習済みモデルと予測結果の保存"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from config import FORECAST_CACHE_DIR, FORECAST_CACHE_MAX_ENTRIES, FORECAST_CACHE_MAX_AGE_DAYS
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastCache:
+    """
+    予測キャッシュ（メモリLRU + ディスク永続化）
+
+    エントリは (銘柄, 最終バー日付, モデルパラメータ) をキーとし、
+    シリアライズ済みの学習済みモデルと予測日数ごとの予測結果を保持する。
+    最終バーが変わらない限りモデルは再学習しない。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = FORECAST_CACHE_DIR,
+        max_entries: int = FORECAST_CACHE_MAX_ENTRIES,
+        max_age_days: int = FORECAST_CACHE_MAX_AGE_DAYS
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._latest: Dict[str, str] = {}
+        self._index_loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def params_hash(params: Dict) -> str:
+        """モデルパラメータのハッシュ"""
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+
+    @staticmethod
+    def _safe_symbol(symbol: str) -> str:
+        return re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+
+    @staticmethod
+    def make_key(symbol: str, last_bar_date: str, params: Dict) -> str:
+        """キャッシュキーを生成（ファイル名としても使用）"""
+        return f"{ForecastCache._safe_symbol(symbol)}_{last_bar_date}_{ForecastCache.params_hash(params)}"
+
+    @staticmethod
+    def _series_key(symbol: str, params: Dict) -> str:
+        return f"{ForecastCache._safe_symbol(symbol)}:{ForecastCache.params_hash(params)}"
+
+    @staticmethod
+    def _series_key_of(key: str) -> Optional[str]:
+        """キャッシュキー（ファイル名）から銘柄・パラメータの系列キーを取得（日付とハッシュは '_' を含まない）"""
+        parts = key.rsplit('_', 2)
+        if len(parts) != 3:
+            return None
+        return f"{parts[0]}:{parts[2]}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    # ---- 参照 ----
+
+    def get(self, key: str) -> Optional[Dict]:
+        """エントリを取得（メモリになければディスクから読み込む）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read(key)
+        if entry is not None:
+            with self._lock:
+                self._store(key, entry)
+        return entry
+
+    def get_checked_today(self, symbol: str, params: Dict, periods: int) -> Optional[Dict]:
+        """
+        本日すでに最新バーを確認済みのエントリから予測結果を取得
+
+        該当すれば履歴データのダウンロードも省略できる。
+        """
+        if not self._index_loaded:
+            self.load_index()
+        with self._lock:
+            key = self._latest.get(self._series_key(symbol, params))
+        if key is None:
+            return None
+        entry = self.get(key)
+        if entry is None or entry.get('symbol') != symbol.upper():
+            return None
+        if entry.get('checked_on') != datetime.now().strftime('%Y-%m-%d'):
+            return None
+        return entry['forecasts'].get(str(periods))
+
+    # ---- 更新 ----
+
+    def put(self, key: str, symbol: str, params: Dict, model_json: Optional[str]) -> Dict:
+        """学習済みモデルのエントリを登録（同じ銘柄・パラメータの古いエントリは削除）"""
+        entry = {
+            'symbol': symbol.upper(),
+            'params': params,
+            'model': model_json,
+            'forecasts': {},
+            'created_at': datetime.now().isoformat(),
+            'checked_on': datetime.now().strftime('%Y-%m-%d'),
+        }
+        series_key = self._series_key(symbol, params)
+        with self._lock:
+            previous = self._latest.get(series_key)
+            self._store(key, entry)
+            self._latest[series_key] = key
+            if previous and previous != key:
+                self._entries.pop(previous, None)
+        if previous and previous != key:
+            self._remove_file(previous)
+        self._write(key, entry)
+        return entry
+
+    def mark_checked(self, key: str, symbol: str, params: Dict):
+        """最新バーが変わっていないことを確認した日付を記録"""
+        entry = self.get(key)
+        if entry is None:
+            return
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            self._latest[self._series_key(symbol, params)] = key
+            changed = entry.get('checked_on') != today
+            entry['checked_on'] = today
+        if changed:
+            self._write(key, entry)
+
+    def add_forecast(self, key: str, periods: int, result: Dict):
+        """予測日数ごとの予測結果を登録"""
+        entry = self.get(key)
+        if entry is None:
+            return
+        with self._lock:
+            entry['forecasts'][str(periods)] = result
+        self._write(key, entry)
+
+    def _store(self, key: str, entry: Dict):
+        """メモリに格納し、上限を超えた古いエントリを追い出す（呼び出し側でロック取得済み）"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._latest.setdefault(self._series_key(entry['symbol'], entry['params']), key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ---- ディスク ----
+
+    def _read(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read forecast cache {key}: {e}")
+            return None
+
+    def _write(self, key: str, entry: Dict):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"Failed to write forecast cache {key}: {e}")
+
+    def _remove_file(self, key: str):
+        if not self.cache_dir:
+            return
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to remove forecast cache {key}: {e}")
+
+    def purge_expired(self) -> int:
+        """有効期限を過ぎたディスク上のエントリを削除"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).timestamp()
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                expired = name.endswith('.json') and os.path.getmtime(path) < cutoff
+            except FileNotFoundError:
+                continue
+            if expired:
+                key = name[:-len('.json')]
+                with self._lock:
+                    self._entries.pop(key, None)
+                self._remove_file(key)
+                removed += 1
+        return removed
+
+    def load_index(self):
+        """
+        ディスク上のファイル名から銘柄ごとの最新キーを復元
+
+        最初の参照（リクエストスレッド）で呼ばれるため、エントリは読み込まずファイル名だけから復元し、
+        有効期限を過ぎたエントリの削除は別スレッドで行う。
+        """
+        self._index_loaded = True
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for name in sorted(os.listdir(self.cache_dir)):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            series_key = self._series_key_of(key)
+            if series_key is None:
+                continue
+            with self._lock:
+                current = self._latest.get(series_key)
+                # ファイル名は日付順にソートされるため、後から見つかったものが新しい
+                if current is None or current < key:
+                    self._latest[series_key] = key
+        threading.Thread(target=self._purge_in_background, name='forecast-cache-purge', daemon=True).start()
+
+    def _purge_in_background(self):
+        try:
+            removed = self.purge_expired()
+            if removed:
+                logger.info(f"Purged {removed} expired forecast cache entries")
+        except Exception as e:
+            logger.warning(f"Failed to purge forecast cache: {e}")
+
+
+# グローバルインスタンス
+forecast_cache = ForecastCache()
@@ -0,0 +1,183 @@
+"""予測精度評価モジュール - ローリングオリジン方式で予測エンジンを比較"""
+import logging
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from database import db
+from config import (
+    PREDICTION_EVAL_HORIZONS, PREDICTION_EVAL_CUTOFFS, PREDICTION_EVAL_MIN_TRAIN,
+    PREDICTION_EVAL_HISTORY_DAYS, PREDICTION_BATCH_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastEvaluator:
+    """
+    予測精度評価
+
+    保存済みの日足履歴に対し、複数の基準日（cutoff）で学習 → 予測 → 実績との比較を繰り返す。
+    予測値と実績は基準日からの営業日数（バー数）で対応付ける。
+    銘柄×エンジンの組み合わせをプロセスプールに分散して実行する。
+    """
+
+    @staticmethod
+    def cutoff_indices(n_bars: int, max_horizon: int, n_cutoffs: int, min_train: int) -> List[int]:
+        """基準日（学習データ最終バーの位置）を等間隔に選ぶ"""
+        first, last = min_train - 1, n_bars - 1 - max_horizon
+        if last < first:
+            return []
+        return sorted({int(i) for i in np.linspace(first, last, max(n_cutoffs, 1)).round()})
+
+    @staticmethod
+    def evaluate(
+        hist: pd.DataFrame,
+        engine: str,
+        horizons: List[int] = PREDICTION_EVAL_HORIZONS,
+        n_cutoffs: int = PREDICTION_EVAL_CUTOFFS,
+        min_train: int = PREDICTION_EVAL_MIN_TRAIN
+    ) -> Dict:
+        """
+        1銘柄・1エンジンをローリングオリジン方式で評価
+
+        Returns:
+            Dict: cutoffs（評価回数）、fit_seconds（1回あたりの平均学習時間）、
+                  horizons（予測日数 → mape, rmse, coverage）
+        """
+        from stock_predictor import StockPredictor
+
+        max_horizon = max(horizons)
+        closes = hist['Close'].to_numpy(dtype=float)
+        cutoffs = ForecastEvaluator.cutoff_indices(len(closes), max_horizon, n_cutoffs, min_train)
+        if not cutoffs:
+            return {'cutoffs': 0, 'fit_seconds': None, 'horizons': {}}
+
+        predictor = StockPredictor(cache=None, engine=engine)
+        yhat = np.empty((len(cutoffs), max_horizon))
+        lower = np.empty_like(yhat)
+        upper = np.empty_like(yhat)
+        elapsed = 0.0
+        for row, cutoff in enumerate(cutoffs):
+            started = time.perf_counter()
+            result = predictor.predict(hist.iloc[:cutoff + 1], periods=max_horizon)
+            elapsed += time.perf_counter() - started
+            forecast = result['forecast']
+            yhat[row] = forecast['yhat'][-max_horizon:]
+            lower[row] = forecast['lower'][-max_horizon:]
+            upper[row] = forecast['upper'][-max_horizon:]
+
+        # 基準日ごとの実績（行: 基準日、列: 予測ステップ）
+        offsets = np.asarray(cutoffs)[:, None] + np.arange(1, max_horizon + 1)
+        actual = closes[offsets]
+        errors = yhat - actual
+        inside = (actual >= lower) & (actual <= upper)
+
+        metrics = {}
+        for h in horizons:
+            step = h - 1
+            metrics[h] = {
+                'mape': float(np.mean(np.abs(errors[:, step]) / actual[:, step]) * 100),
+                'rmse': float(np.sqrt(np.mean(errors[:, step] ** 2))),
+                'coverage': float(inside[:, step].mean())
+            }
+        return {'cutoffs': len(cutoffs), 'fit_seconds': elapsed / len(cutoffs), 'horizons': metrics}
+
+    @staticmethod
+    def load_histories(symbols: List[str], days: int = PREDICTION_EVAL_HISTORY_DAYS) -> Dict[str, pd.DataFrame]:
+        """保存済みの日足履歴を銘柄ごとの DataFrame (index: Date, Close) で取得"""
+        rows = db.get_closes(symbols, days)
+        if not rows:
+            return {}
+        frame = pd.DataFrame.from_records(rows, columns=['symbol', 'Date', 'Close'])
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        return {
+            symbol: group.set_index('Date')[['Close']].dropna()
+            for symbol, group in frame.groupby('symbol', sort=False)
+        }
+
+    @staticmethod
+    def run(
+        symbols: Optional[List[str]] = None,
+        engines: Optional[List[str]] = None,
+        horizons: List[int] = PREDICTION_EVAL_HORIZONS,
+        n_cutoffs: int = PREDICTION_EVAL_CUTOFFS,
+        min_train: int = PREDICTION_EVAL_MIN_TRAIN,
+        days: int = PREDICTION_EVAL_HISTORY_DAYS,
+        max_workers: int = PREDICTION_BATCH_WORKERS
+    ) -> Dict:
+        """
+        複数銘柄・複数エンジンを並列に評価し、結果を forecast_evaluations テーブルに保存
+
+        Returns:
+            Dict: run_id、エンジン×予測日数ごとの集計（summary）、失敗した組み合わせ（failures）
+        """
+        from stock_predictor import StockPredictor
+
+        engines = engines or list(StockPredictor.ENGINES)
+        if symbols is None:
+            symbols = [stock['symbol'] for stock in db.get_tracked_stocks()]
+        histories = ForecastEvaluator.load_histories(symbols, days)
+        run_id = uuid.uuid4().hex[:12]
+
+        records, failures = [], {}
+        with ProcessPoolExecutor(
+            max_workers=max_workers or None,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_evaluation_worker,
+            initargs=(engines,)
+        ) as executor:
+            futures = {
+                executor.submit(ForecastEvaluator.evaluate, hist, engine, horizons, n_cutoffs, min_train): (symbol, engine)
+                for symbol, hist in histories.items()
+                for engine in engines
+            }
+            for future in as_completed(futures):
+                symbol, engine = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures[f"{symbol}:{engine}"] = str(e)
+                    logger.warning(f"Evaluation failed for {symbol} ({engine}): {e}")
+                    continue
+                records.extend(
+                    {
+                        'run_id': run_id, 'symbol': symbol, 'engine': engine, 'horizon': h,
+                        'cutoffs': result['cutoffs'], 'fit_seconds': result['fit_seconds'], **metrics
+                    }
+                    for h, metrics in result['horizons'].items()
+                )
+
+        db.save_forecast_evaluations(records)
+        logger.info(f"Forecast evaluation {run_id}: {len(histories)} symbols x {len(engines)} engines")
+        return {
+            'run_id': run_id,
+            'symbols': len(histories),
+            'missing_symbols': sorted(set(s.upper() for s in symbols) - set(histories)),
+            'summary': ForecastEvaluator.summarize(records),
+            'failures': failures
+        }
+
+    @staticmethod
+    def summarize(records: List[Dict]) -> List[Dict]:
+        """エンジン×予測日数ごとに銘柄横断で集計（RMSEは価格水準に依存するため含めない）"""
+        if not records:
+            return []
+        frame = pd.DataFrame(records)
+        summary = frame.groupby(['engine', 'horizon']).agg(
+            symbols=('symbol', 'nunique'),
+            mape=('mape', 'mean'),
+            median_mape=('mape', 'median'),
+            coverage=('coverage', 'mean'),
+            fit_seconds=('fit_seconds', 'mean')
+        ).reset_index()
+        return summary.round(4).to_dict(orient='records')
+
+
+def _init_evaluation_worker(engines: List[str]):
+    """評価用ワーカーの初期化（Prophetは最初に読み込んでおく）"""
+    if 'prophet' in engines:
+        import prophet  # noqa: F401
@@ -0,0 +1,139 @@
+"""為替レート管理モジュール"""
+import logging
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+from database import db
+from stock_api import StockAPI
+from config import FX_CACHE_MINUTES, FX_HISTORY_DAYS
+
+logger = logging.getLogger(__name__)
+
+
+class FxRateStore:
+    """
+    為替レートストア
+
+    レートは「1 USD あたりの通貨量」で保持する（Yahoo Finance の `XXX=X` と同じ向き）。
+    日次履歴はデータベースに保存し、最新レートはTTL付きでメモリにキャッシュする。
+    取得は常に対象通貨をまとめて1回のダウンロードで行う。
+    """
+
+    def __init__(self, cache_minutes: int = FX_CACHE_MINUTES):
+        self.cache_minutes = cache_minutes
+        self._latest: Dict[str, float] = {}
+        self._fetched_at: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fx_symbol(currency: str) -> str:
+        """通貨コードからYahoo Financeの為替シンボルを取得"""
+        return f"{currency}=X"
+
+    def _download(self, currencies: Iterable[str], period: str) -> List[Tuple[str, str, float]]:
+        """対象通貨のレートを一括ダウンロードしてデータベースに保存"""
+        targets = sorted({c for c in currencies if c != 'USD'})
+        if not targets:
+            return []
+
+        histories = StockAPI.get_multiple_stocks_history([self.fx_symbol(c) for c in targets], period=period)
+        rows = []
+        for currency in targets:
+            hist = histories.get(self.fx_symbol(currency))
+            if hist is None or hist.empty or 'Close' not in hist:
+                continue
+            closes = hist['Close']
+            if isinstance(closes, pd.DataFrame):
+                closes = closes.iloc[:, 0]
+            rows.extend(
+                (currency, date.strftime('%Y-%m-%d'), float(rate))
+                for date, rate in closes.dropna().items() if rate > 0
+            )
+
+        db.save_fx_rates(rows)
+        logger.info(f"Downloaded {len(rows)} fx rates for {len(targets)} currencies ({period})")
+        return rows
+
+    def get_latest_rates(self, currencies: Iterable[str]) -> Dict[str, float]:
+        """
+        最新レートを取得（TTLキャッシュ → 一括ダウンロード → データベースの順）
+
+        Returns:
+            Dict[str, float]: 通貨 → 1 USD あたりの通貨量（取得できない通貨は含まない）
+        """
+        currencies = set(currencies) | {'USD'}
+        rates = {'USD': 1.0}
+
+        with self._lock:
+            now = datetime.now()
+            ttl = self.cache_minutes * 60
+            stale = [
+                c for c in currencies
+                if c != 'USD' and (c not in self._latest or (now - self._fetched_at[c]).total_seconds() >= ttl)
+            ]
+
+            if stale:
+                fetched = {}
+                try:
+                    for currency, _, rate in self._download(stale, '5d'):
+                        fetched[currency] = rate  # 日付昇順なので最後の値が最新
+                except Exception as e:
+                    logger.warning(f"Failed to download fx rates: {e}")
+
+                missing = [c for c in stale if c not in fetched]
+                if missing:
+                    fetched.update({c: rate for c, (_, rate) in db.get_latest_fx_rates(missing).items()})
+
+                for currency, rate in fetched.items():
+                    self._latest[currency] = rate
+                    self._fetched_at[currency] = now
+
+            rates.update({c: self._latest[c] for c in currencies if c in self._latest})
+
+        return rates
+
+    def get_rate_history(self, currencies: Iterable[str], days: int = FX_HISTORY_DAYS) -> pd.DataFrame:
+        """
+        日次レート履歴を 日付×通貨 の DataFrame で取得
+
+        データベースの履歴が不足している通貨はまとめてダウンロードして補完する。
+        """
+        currencies = sorted(set(currencies) | {'USD'})
+        targets = [c for c in currencies if c != 'USD']
+
+        rows = db.get_fx_rates(targets, days)
+        first_dates = {}
+        for currency, date, _ in rows:
+            first_dates.setdefault(currency, date)
+
+        # 週末・祝日を考慮して1週間の余裕を持たせる
+        required = (datetime.now() - timedelta(days=max(days - 7, 0))).strftime('%Y-%m-%d')
+        insufficient = [c for c in targets if first_dates.get(c, '9999-12-31') > required]
+        if insufficient:
+            try:
+                self._download(insufficient, StockAPI.period_for_days(days))
+                rows = db.get_fx_rates(targets, days)
+            except Exception as e:
+                logger.warning(f"Failed to backfill fx history: {e}")
+
+        if rows:
+            frame = pd.DataFrame.from_records(rows, columns=['currency', 'date', 'rate'])
+            history = frame.pivot_table(index='date', columns='currency', values='rate', aggfunc='last')
+            history.index = pd.to_datetime(history.index)
+        else:
+            history = pd.DataFrame(index=pd.DatetimeIndex([]))
+        history['USD'] = 1.0
+        return history.sort_index()
+
+    def conversion_factors(self, currencies: Iterable[str], base_currency: str) -> Dict[str, float]:
+        """各通貨から基準通貨への換算係数を取得（金額 × 係数 = 基準通貨建て金額）"""
+        currencies = set(currencies)
+        rates = self.get_latest_rates(currencies | {base_currency})
+        if base_currency not in rates:
+            return {}
+        return {c: rates[base_currency] / rates[c] for c in currencies if c in rates}
+
+
+# グローバルインスタンス
+fx_store = FxRateStore()
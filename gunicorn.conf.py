@@ -0,0 +1,34 @@
+"""gunicorn の設定 - 複数のワーカープロセスで起動する場合に使用
+
+使用例:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+アプリは親プロセスで1回だけ読み込み（preload_app）、データベースの初期化も親プロセスで行う。
+各ワーカーは fork 後に SQLite の接続を作り直し、バックグラウンド処理の担当プロセスの選出に参加する。
+"""
+from config import SERVER_HOST, SERVER_PORT, WORKER_PROCESSES, WORKER_THREADS
+
+bind = f'{SERVER_HOST}:{SERVER_PORT}'
+workers = WORKER_PROCESSES
+threads = WORKER_THREADS
+worker_class = 'gthread'
+preload_app = True
+# 予測や一括取得は時間がかかるため、既定の30秒より長くする
+timeout = 120
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    # 親プロセスで開いた接続は子プロセスで共有しない（close=False で親の接続は閉じない）
+    from models.database import engine, db_session
+    db_session.remove()
+    engine.dispose(close=False)
+
+    from app import start_background_services
+    start_background_services()
+
+
+def worker_exit(server, worker):
+    # 担当していたリースを解放し、他のワーカーがすぐに引き継げるようにする
+    from app import background_lease
+    background_lease.stop()
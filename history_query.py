@@ -0,0 +1,146 @@
+"""履歴クエリモジュール - 保存済みの履歴を期間・列・足の種類を指定して配信"""
+import json
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from database import db
+from stock_api import HISTORY_FIELDS
+from config import HISTORY_QUERY_MAX_ROWS, HISTORY_QUERY_BATCH_SIZE
+
+# 足の種類（日足はそのまま、週足・月足はサーバー側で集約）
+HISTORY_INTERVALS = ('1d', '1wk', '1mo')
+
+
+class HistoryQuery:
+    """
+    履歴クエリ
+
+    stock_prices を日付範囲で検索し、指定された列だけを行ごとの配列として JSON で返す。
+    行は検索しながら少しずつ書き出すため、長い期間でもレスポンス全体をメモリに載せない。
+    limit 件を超える場合は next に次のページの開始日（降順の場合は終了日）を入れる。
+    """
+
+    # 集約時の各列の計算方法
+    AGGREGATES = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+    def __init__(
+        self,
+        symbol: str,
+        fields: Optional[Sequence[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        interval: str = '1d',
+        limit: Optional[int] = None,
+        descending: bool = False
+    ):
+        """
+        Raises:
+            ValueError: パラメータが不正な場合
+        """
+        fields = list(fields or HISTORY_FIELDS)
+        unknown = [f for f in fields if f not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f"不明な列です: {', '.join(unknown)}")
+        if interval not in HISTORY_INTERVALS:
+            raise ValueError(f'不明な足の種類です: {interval}')
+        for value in (start, end):
+            if value is not None:
+                date.fromisoformat(value)
+        if limit is not None and limit <= 0:
+            raise ValueError('limit は1以上を指定してください')
+
+        self.symbol = symbol.upper()
+        self.fields = list(dict.fromkeys(fields))
+        self.start = start
+        self.end = end
+        self.interval = interval
+        self.limit = min(limit or HISTORY_QUERY_MAX_ROWS, HISTORY_QUERY_MAX_ROWS)
+        self.descending = descending
+
+    def rows(self) -> Iterator[Tuple]:
+        """(date, *fields) の行を返す（週足・月足は集約後の行）"""
+        rows = db.iter_price_history(
+            self.symbol, self.fields, self.start, self.end, self.descending, HISTORY_QUERY_BATCH_SIZE
+        )
+        if self.interval == '1d':
+            return rows
+        return self.resample(rows, self.fields, self.interval, self.descending)
+
+    @staticmethod
+    def bucket(day: str, interval: str):
+        """日付が属する週（ISO週）または月"""
+        if interval == '1mo':
+            return day[:7]
+        return date.fromisoformat(day).isocalendar()[:2]
+
+    @staticmethod
+    def resample(rows: Iterable[Tuple], fields: List[str], interval: str, descending: bool = False) -> Iterator[Tuple]:
+        """
+        日付順の行を週足・月足に集約（入力の順序のまま1本ずつ返す）
+
+        日付は期間内の最初の取引日。欠損値（None）は集約から除外する。
+        """
+        aggregates = [HistoryQuery.AGGREGATES[field] for field in fields]
+        current_key, bar, first_day = None, None, None
+        for row in rows:
+            key = HistoryQuery.bucket(row[0], interval)
+            if key != current_key:
+                if bar is not None:
+                    yield (first_day, *bar)
+                current_key, bar, first_day = key, list(row[1:]), row[0]
+                continue
+            # 降順の場合は後から来る行のほうが古い
+            first_day = row[0] if descending else first_day
+            for i, (how, value) in enumerate(zip(aggregates, row[1:])):
+                if value is None:
+                    continue
+                if bar[i] is None:
+                    bar[i] = value
+                elif how == 'max':
+                    bar[i] = max(bar[i], value)
+                elif how == 'min':
+                    bar[i] = min(bar[i], value)
+                elif how == 'sum':
+                    bar[i] += value
+                elif (how == 'last') != descending:
+                    bar[i] = value
+        if bar is not None:
+            yield (first_day, *bar)
+
+    def stream(self, chunk_rows: int = 500) -> Iterator[str]:
+        """JSON本文を chunk_rows 行ずつ生成"""
+        head = {
+            'symbol': self.symbol,
+            'interval': self.interval,
+            'order': 'desc' if self.descending else 'asc',
+            'fields': ['date'] + self.fields,
+        }
+        yield json.dumps(head)[:-1] + ', "rows": ['
+
+        count, batch, next_cursor = 0, [], None
+        for row in self.rows():
+            if count == self.limit:
+                # 次のページは超過した最初の行の日付から（集約時は期間の境界になる）
+                next_cursor = self._cursor(row)
+                break
+            batch.append(row)
+            count += 1
+            if len(batch) == chunk_rows:
+                yield ('' if count == len(batch) else ', ') + json.dumps(batch)[1:-1]
+                batch = []
+        if batch:
+            yield ('' if count == len(batch) else ', ') + json.dumps(batch)[1:-1]
+
+        yield f'], "count": {count}, "next": {json.dumps(next_cursor)}}}'
+
+    def _cursor(self, row: Tuple) -> str:
+        """次のページの start（降順の場合は end）"""
+        if self.interval == '1d' or not self.descending:
+            return row[0]
+        # 降順の集約行の日付は期間の最初の取引日のため、期間の最終日を求める
+        if self.interval == '1mo':
+            first = date.fromisoformat(row[0][:8] + '01')
+            last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        else:
+            year, week = date.fromisoformat(row[0]).isocalendar()[:2]
+            last = date.fromisocalendar(year, week, 7)
+        return last.isoformat()
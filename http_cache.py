@@ -0,0 +1,187 @@
+"""HTTPキャッシュモジュール - ETag / Last-Modified による条件付きGETと圧縮済みレスポンスのキャッシュ"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from flask import Response, request
+from tracing import traced
+from config import (
+    COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY, COMPRESSION_CACHE_MAX_MB
+)
+
+try:
+    import brotli
+except ImportError:  # brotli は任意の依存パッケージ
+    brotli = None
+
+
+class ConditionalGet:
+    """
+    条件付きGETのヘルパー
+
+    ETagはデータの更新状況（price_cache.cached_at、stock_prices の最新日付など）と
+    リクエストパラメータから生成する。レスポンス本体をシリアライズする前に
+    not_modified() で判定することで、変更がない場合の処理を省略できる。
+    """
+
+    @staticmethod
+    def make_etag(*parts) -> str:
+        """更新状況を表す値からETagを生成"""
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+    @staticmethod
+    def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+        """
+        クライアントのキャッシュが有効なら 304 レスポンスを返す
+
+        If-None-Match がある場合はそちらを優先し、ない場合のみ If-Modified-Since で判定する。
+        """
+        if request.if_none_match:
+            matched = request.if_none_match.contains(etag)
+        elif request.if_modified_since and last_modified:
+            # HTTP日付は秒単位のため切り捨てて比較
+            matched = ConditionalGet._to_utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+        else:
+            matched = False
+
+        if not matched:
+            return None
+        return ConditionalGet.apply(Response(status=304), etag, last_modified)
+
+    @staticmethod
+    def apply(response: Response, etag: str, last_modified: Optional[datetime] = None) -> Response:
+        """レスポンスにETag / Last-Modified を付与（ブラウザには毎回再検証させる）"""
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = ConditionalGet._to_utc(last_modified)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def _to_utc(value: datetime) -> datetime:
+        """データベースのローカル時刻をUTCに変換"""
+        return value.astimezone(timezone.utc)
+
+
+class CompressedResponseCache:
+    """
+    圧縮済みレスポンスのキャッシュ
+
+    本文はETag（データの版）をキーに保持し、コーデックごとの圧縮結果は最初に要求されたときに作成する。
+    同じ版のレスポンスは全クライアントに同じバイト列を返すため、圧縮・シリアライズは版ごとに1回で済む。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = COMPRESSION_ENABLED,
+        min_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        max_bytes: int = COMPRESSION_CACHE_MAX_MB * 1024 * 1024
+    ):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_bytes = max_bytes
+        self.codecs = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._entries: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def negotiate(self) -> str:
+        """Accept-Encoding からコーデックを選択（同じ優先度ならbrotliを優先）"""
+        if not self.enabled:
+            return 'identity'
+        return request.accept_encodings.best_match(self.codecs, default='identity')
+
+    @traced('compress')
+    def compress(self, body: bytes, codec: str) -> bytes:
+        """本文を指定コーデックで圧縮"""
+        if codec == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        if codec == 'gzip':
+            return gzip.compress(body, compresslevel=self.gzip_level)
+        return body
+
+    def respond(self, key: str) -> Optional[Response]:
+        """キャッシュ済みの版があれば、ネゴシエートしたコーデックのレスポンスを返す"""
+        codec = self.negotiate()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            body = entry.get(codec)
+            identity = entry['identity']
+
+        if body is None:
+            body = self.compress(identity, codec)
+            with self._lock:
+                if key in self._entries and codec not in self._entries[key]:
+                    self._entries[key][codec] = body
+                    self._size += len(body)
+                    self._evict()
+        return self._build(body, codec)
+
+    def store(self, key: str, response: Response) -> Response:
+        """
+        レスポンス本文を版として保存し、圧縮したレスポンスを返す
+
+        正常なJSONレスポンスのみ対象とし、それ以外はそのまま返す。
+        """
+        if not self._compressible(response):
+            return response
+        body = response.get_data()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = {'identity': body}
+                self._size += len(body)
+                self._evict()
+        return self.respond(key) or self.compress_response(response)
+
+    def compress_response(self, response: Response) -> Response:
+        """キャッシュせずにレスポンスを圧縮（版が確定しないレスポンス用）"""
+        if not self._compressible(response):
+            return response
+        codec = self.negotiate()
+        if codec == 'identity':
+            response.vary.add('Accept-Encoding')
+            return response
+        return self._build(self.compress(response.get_data(), codec), codec, response.status_code)
+
+    def clear(self):
+        """キャッシュを破棄"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _compressible(self, response: Response) -> bool:
+        return (
+            self.enabled
+            and response.status_code == 200
+            and response.mimetype == 'application/json'
+            and not response.direct_passthrough
+            and response.calculate_content_length() is not None
+            and response.calculate_content_length() >= self.min_size
+        )
+
+    def _build(self, body: bytes, codec: str, status: int = 200) -> Response:
+        response = Response(body, status=status, mimetype='application/json')
+        if codec != 'identity':
+            response.headers['Content-Encoding'] = codec
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def _evict(self):
+        """上限を超えた古い版を削除（呼び出し側でロック取得済み）"""
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= sum(len(body) for body in entry.values())
+
+
+# グローバルインスタンス
+compressed_cache = CompressedResponseCache()
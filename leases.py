@@ -0,0 +1,176 @@
+"""リースモジュール - 複数のワーカープロセスで同じ処理を重複させないための SQLite のリース"""
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional, TypeVar
+from database import db
+from metrics import REFRESH_LEASES
+from config import REFRESH_LEASE_SECONDS, REFRESH_WAIT_SECONDS, BACKGROUND_LEASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def owner_id() -> str:
+    """このプロセスの識別子（ホスト名:プロセスID、fork 後は子プロセスの値になる）"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class RefreshLeases:
+    """
+    銘柄ごとの取得のリース
+
+    リースを取得できたスレッドだけが Yahoo Finance から取得し、他のプロセス・スレッドは
+    その結果が price_cache に保存されるのを待って使う。リースは ttl_seconds で失効するため、
+    取得中のプロセスが終了しても他のプロセスが引き継げる。ttl_seconds が 0 の場合は常に自分で取得する。
+    """
+
+    def __init__(self, ttl_seconds: float = REFRESH_LEASE_SECONDS, wait_seconds: float = REFRESH_WAIT_SECONDS,
+                 poll_seconds: float = 0.1):
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+
+    def run(self, key: str, fetch: Callable[[], T], shared: Callable[[datetime], Optional[T]]) -> T:
+        """
+        リースを取得できれば fetch を呼び、できなければ shared（待ち始めた時刻以降に保存された結果）を待つ
+
+        wait_seconds を過ぎても結果が保存されない場合は fetch を呼ぶ。
+        """
+        if self.ttl_seconds <= 0:
+            return fetch()
+        name = f'refresh:{key}'
+        owner = f'{owner_id()}:{threading.get_ident()}'
+        since = datetime.now()
+        deadline = time.monotonic() + self.wait_seconds
+        waited = False
+        while True:
+            try:
+                acquired = db.acquire_lease(name, owner, self.ttl_seconds)
+            except Exception as e:
+                logger.error(f"Error acquiring lease {name}: {e}")
+                REFRESH_LEASES.inc(result='error')
+                return fetch()
+            if acquired:
+                try:
+                    # 待っている間に保持者が保存して解放した場合は、その結果を使う
+                    result = shared(since) if waited else None
+                    if result is not None:
+                        REFRESH_LEASES.inc(result='shared')
+                        return result
+                    REFRESH_LEASES.inc(result='acquired')
+                    return fetch()
+                finally:
+                    db.release_lease(name, owner)
+            if time.monotonic() >= deadline:
+                REFRESH_LEASES.inc(result='timeout')
+                logger.warning(f"Timed out waiting for {name}, fetching without lease")
+                return fetch()
+            time.sleep(self.poll_seconds)
+            waited = True
+            result = shared(since)
+            if result is not None:
+                REFRESH_LEASES.inc(result='shared')
+                return result
+
+class RoleLease:
+    """
+    1つのプロセスだけが担当する処理（予測バッチ・銘柄情報の取得など）のリース
+
+    各プロセスのスレッドが ttl_seconds / 3 ごとにリースの取得・延長を試み、取得できたプロセスで on_acquire を呼ぶ。
+    担当プロセスが終了すると ttl_seconds 後にリースが失効し、他のプロセスが引き継ぐ。
+    延長が遅れて他のプロセスに取得された場合と stop で解放する場合は on_release を呼び、担当の処理を止める。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        on_acquire: Callable[[], None],
+        on_release: Optional[Callable[[], None]] = None,
+        ttl_seconds: float = BACKGROUND_LEASE_SECONDS
+    ):
+        self.name = f'role:{name}'
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+        self.ttl_seconds = ttl_seconds
+        self.holding = False
+        self._owner: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """リースの取得・延長を行うスレッドを開始（fork 後の各プロセスで呼ぶ）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._owner = owner_id()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=f'lease-{self.name}', daemon=True)
+            self._thread.start()
+        # 正常終了時はリースを解放し、失効を待たずに他のプロセスが引き継げるようにする
+        atexit.register(self.stop)
+
+    def stop(self):
+        """スレッドを止め、保持しているリースを解放"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        if self.holding:
+            self.holding = False
+            self._release()
+            db.release_lease(self.name, self._owner)
+
+    def renew(self) -> bool:
+        """リースの取得・延長を1回試み、新たに取得した場合は on_acquire を呼ぶ"""
+        try:
+            acquired = db.acquire_lease(self.name, self._owner or owner_id(), self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Error renewing lease {self.name}: {e}")
+            acquired = False
+        if acquired and not self.holding:
+            self.holding = True
+            logger.info(f"{owner_id()} acquired {self.name}")
+            try:
+                self.on_acquire()
+            except Exception as e:
+                # 開始できなかった処理を止めてリースを手放し、他のプロセス（または次の延長）で開始し直す
+                logger.error(f"Error starting {self.name}: {e}")
+                self.holding = False
+                self._release()
+                db.release_lease(self.name, self._owner or owner_id())
+                return False
+        elif not acquired and self.holding:
+            # 延長が遅れて他のプロセスに取得された（取得したプロセスと処理が重複しないよう止める）
+            self.holding = False
+            logger.warning(f"{owner_id()} lost {self.name}")
+            self._release()
+        return acquired
+
+    def _release(self):
+        """on_release を呼ぶ（例外はリースの延長を止めないよう記録だけ行う）"""
+        if self.on_release is None:
+            return
+        try:
+            self.on_release()
+        except Exception as e:
+            logger.error(f"Error stopping {self.name}: {e}")
+
+    def _loop(self):
+        from models.database import db_session
+
+        while True:
+            try:
+                self.renew()
+            finally:
+                db_session.remove()
+            if self._stop.wait(self.ttl_seconds / 3):
+                return
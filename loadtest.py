@@ -0,0 +1,252 @@
+"""負荷試験モジュール - ローカルの代替サーバー（fake_yahoo）に接続したアプリに対して複数の利用者のリクエストを再現する
+
+Yahoo Finance には接続しないため、オフラインで何度でも同じ条件で実行できる。
+"""
+import json
+import logging
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import requests
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT_DIR, 'app.py')
+GUNICORN_CONF_PATH = os.path.join(ROOT_DIR, 'gunicorn.conf.py')
+
+# シナリオごとのリクエスト（銘柄を受け取ってパスを返す）
+SCENARIOS: Dict[str, Callable[[str], str]] = {
+    'dashboard': lambda symbol: '/api/dashboard',
+    'detail': lambda symbol: f'/api/stocks/{symbol}/detail?engine=drift',
+    'prediction': lambda symbol: f'/api/stocks/{symbol}/prediction?engine=drift',
+    'price': lambda symbol: f'/api/stocks/{symbol}/price',
+}
+DEFAULT_MIX = {'dashboard': 0.5, 'detail': 0.3, 'prediction': 0.2}
+DEFAULT_SYMBOLS = ('AAPL', 'MSFT', 'GOOGL', 'AMZN', '7203.T', '6758.T', '9984.T', '8306.T')
+
+
+def free_port(host: str = '127.0.0.1') -> int:
+    """空いているポート番号"""
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """最近傍順位法によるパーセンタイル（q は 0〜100）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[Tuple[float, bool]], elapsed: float) -> Dict:
+    """(所要時間ミリ秒, エラーか) の一覧を集計"""
+    latencies = [latency for latency, _ in samples]
+    errors = sum(1 for _, error in samples if error)
+
+    def rounded(value):
+        return round(value, 2) if value is not None else None
+
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'rps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': rounded(percentile(latencies, 50)),
+        'p95_ms': rounded(percentile(latencies, 95)),
+        'p99_ms': rounded(percentile(latencies, 99)),
+        'max_ms': rounded(max(latencies) if latencies else None),
+    }
+
+
+class AppServer:
+    """
+    app.py を別プロセスで起動する
+
+    一時ディレクトリに config.json を書き出し、そこを作業ディレクトリとして起動する
+    （データベース・予測キャッシュ・プロファイルも一時ディレクトリに作られ、終了時に削除される）。
+    workers を指定した場合は gunicorn（gunicorn.conf.py）でその数のワーカープロセスを起動する。
+    """
+
+    def __init__(self, upstream_url: str, port: Optional[int] = None, config: Optional[Dict] = None,
+                 startup_timeout: float = 60, workers: int = 0):
+        self.upstream_url = upstream_url
+        self.port = port or free_port()
+        self.config = config or {}
+        self.startup_timeout = startup_timeout
+        self.workers = workers
+        self.process: Optional[subprocess.Popen] = None
+        self._dir: Optional[tempfile.TemporaryDirectory] = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def _write_config(self, workdir: str):
+        config = {
+            'server': {'host': '127.0.0.1', 'port': self.port, 'debug': False},
+            'database': {'name': os.path.join(workdir, 'load_test.db')},
+            'upstream': {'base_url': self.upstream_url},
+            'prediction': {'batch_time': ''},
+        }
+        if self.workers:
+            config['workers'] = {'processes': self.workers}
+        for section, values in self.config.items():
+            config.setdefault(section, {}).update(values)
+        with open(os.path.join(workdir, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2)
+
+    def start(self) -> 'AppServer':
+        self._dir = tempfile.TemporaryDirectory()
+        self._write_config(self._dir.name)
+        env = {key: value for key, value in os.environ.items()
+               if key not in ('SERVER_HOST', 'SERVER_PORT', 'SERVER_DEBUG', 'DB_NAME')}
+        if self.workers:
+            # gunicorn.conf.py と wsgi はプロジェクトのモジュールを読み込むため、作業ディレクトリとは別にパスを通す
+            env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT_DIR, env.get('PYTHONPATH')]))
+            command = [sys.executable, '-m', 'gunicorn', '-c', GUNICORN_CONF_PATH, 'wsgi:app']
+        else:
+            command = [sys.executable, APP_PATH]
+        self.process = subprocess.Popen(
+            command, cwd=self._dir.name, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                error = self.process.stderr.read().decode('utf-8', 'replace')
+                self.stop()
+                raise RuntimeError(f'{command[-1]} exited during startup: {error[-2000:]}')
+            try:
+                if requests.get(f'{self.base_url}/api/stocks', timeout=1).status_code == 200:
+                    logger.info(f"App server listening on {self.base_url}")
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f'{command[-1]} did not start within {self.startup_timeout}s')
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process.stderr.close()
+            self.process = None
+        if self._dir is not None:
+            self._dir.cleanup()
+            self._dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class LoadTest:
+    """
+    仮想利用者によるクローズドモデルの負荷試験
+
+    各利用者は mix の比率でシナリオを選び、応答を待ってから think_time 秒待って次のリクエストを送る。
+    利用者は ramp_up 秒かけて均等に開始する。結果はシナリオごとのスループット・パーセンタイル・エラー率にまとめる。
+    """
+
+    def __init__(self, base_url: str, symbols: Sequence[str] = DEFAULT_SYMBOLS, users: int = 10,
+                 duration: float = 30, ramp_up: float = 0, think_time: float = 0,
+                 mix: Optional[Dict[str, float]] = None, seed: int = 0, timeout: float = 60):
+        mix = mix or DEFAULT_MIX
+        unknown = [name for name in mix if name not in SCENARIOS]
+        if unknown:
+            raise ValueError(f"Unknown scenario: {', '.join(unknown)}")
+        self.base_url = base_url.rstrip('/')
+        self.symbols = list(symbols)
+        self.users = users
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.think_time = think_time
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        self.seed = seed
+        self.timeout = timeout
+        self._samples: Dict[str, List[Tuple[float, bool]]] = {name: [] for name in self.mix}
+        self._lock = threading.Lock()
+
+    def seed_symbols(self):
+        """銘柄を登録（登録済みの場合は 400 になるため無視する）"""
+        for symbol in self.symbols:
+            requests.post(f'{self.base_url}/api/stocks', json={'symbol': symbol}, timeout=self.timeout)
+
+    def _user(self, index: int, deadline: float):
+        rng = random.Random(self.seed * 1000003 + index)
+        names, weights = list(self.mix), list(self.mix.values())
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            url = self.base_url + SCENARIOS[name](rng.choice(self.symbols))
+            start = time.perf_counter()
+            try:
+                error = session.get(url, timeout=self.timeout).status_code >= 400
+            except requests.RequestException as e:
+                logger.debug(f"{name} request failed: {e}")
+                error = True
+            latency = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._samples[name].append((latency, error))
+            if self.think_time:
+                time.sleep(self.think_time)
+        session.close()
+
+    def run(self) -> Dict:
+        """負荷をかけてレポートを返す"""
+        self._samples = {name: [] for name in self.mix}
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = []
+        for index in range(self.users):
+            delay = self.ramp_up * index / self.users if self.users else 0
+            timer = threading.Timer(delay, self._user, args=(index, deadline))
+            timer.daemon = True
+            timer.start()
+            threads.append(timer)
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        endpoints = {name: summarize(samples, elapsed) for name, samples in self._samples.items()}
+        total = summarize([sample for samples in self._samples.values() for sample in samples], elapsed)
+        return {
+            'users': self.users,
+            'duration_s': round(elapsed, 2),
+            'ramp_up_s': self.ramp_up,
+            'think_time_s': self.think_time,
+            'mix': self.mix,
+            'symbols': self.symbols,
+            'total': total,
+            'endpoints': endpoints,
+        }
+
+    @staticmethod
+    def check(report: Dict, max_error_rate: Optional[float] = None, max_p95_ms: Optional[float] = None) -> List[str]:
+        """閾値を超えた項目の説明（空ならすべて合格）"""
+        failures = []
+        for name, stats in report['endpoints'].items():
+            if max_error_rate is not None and stats['error_rate'] > max_error_rate:
+                failures.append(f"{name}: error rate {stats['error_rate']:.2%} > {max_error_rate:.2%}")
+            if max_p95_ms is not None and stats['p95_ms'] is not None and stats['p95_ms'] > max_p95_ms:
+                failures.append(f"{name}: p95 {stats['p95_ms']:.1f}ms > {max_p95_ms:.1f}ms")
+        return failures
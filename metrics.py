@@ -0,0 +1,239 @@
+"""メトリクスモジュール - Prometheus 形式のカウンター・ヒストグラム・ゲージ"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+from tracing import span
+
+# レイテンシ用のバケット（秒）
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    """ラベル付きメトリクスの共通部分"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (
+            f'{name}="' + value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+            for name, value in pairs
+        )
+        return '{' + ','.join(escaped) + '}'
+
+    def remove(self, **labels):
+        """ラベルの値の組を出力から外す（更新されなくなった値を残さない）"""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    type_name = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{self._format_labels(key)} {value:g}' for key, value in items]
+
+
+class Gauge(_Metric):
+    """増減する現在値"""
+
+    type_name = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{self._format_labels(key)} {value:g}' for key, value in items]
+
+
+class Histogram(_Metric):
+    """
+    固定バケットのヒストグラム
+
+    観測時はバケットの位置を二分探索して1つだけ加算し、累積値は出力時に計算する。
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルごとに [バケットごとの件数..., +Inf の件数, 合計]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{self.name}_bucket{self._format_labels(key, (("le", le),))} {cumulative:g}')
+            lines.append(f'{self.name}_sum{self._format_labels(key)} {state[-1]:.6f}')
+            lines.append(f'{self.name}_count{self._format_labels(key)} {cumulative:g}')
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録と Prometheus テキスト形式での出力"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# グローバルインスタンス
+metrics = MetricsRegistry()
+
+UPSTREAM_REQUESTS = metrics.counter(
+    'stocktracking_upstream_requests_total', 'Yahoo Finance へのリクエスト数', ('kind', 'outcome'))
+UPSTREAM_SECONDS = metrics.histogram(
+    'stocktracking_upstream_request_seconds', 'Yahoo Finance へのリクエストの所要時間', ('kind',))
+CACHE_LOOKUPS = metrics.counter(
+    'stocktracking_cache_lookups_total', 'キャッシュの参照数（hit / miss / stale）', ('cache', 'result'))
+DB_QUERY_SECONDS = metrics.histogram(
+    'stocktracking_db_query_seconds', 'SQLite のクエリの所要時間', ('operation',))
+DB_COMMIT_SECONDS = metrics.histogram(
+    'stocktracking_db_commit_seconds', 'SQLite のコミット（flush を含む）の所要時間')
+FETCH_POOL_TASKS = metrics.gauge(
+    'stocktracking_fetch_pool_tasks', '並列取得のスレッドプールのタスク数（queued / running）', ('state',))
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'stocktracking_http_request_seconds', 'ルートごとのレスポンス時間', ('method', 'route', 'status'))
+REFRESH_LEASES = metrics.counter(
+    'stocktracking_refresh_leases_total', '銘柄の取得のリースの結果（acquired / shared / timeout / error）', ('result',))
+REFRESH_SHARDS_OWNED = metrics.gauge(
+    'stocktracking_refresh_shards_owned', 'このワーカーが担当している更新シャード数')
+REFRESH_SHARD_LAG = metrics.gauge(
+    'stocktracking_refresh_shard_lag_seconds', '更新シャード内で最も古い価格キャッシュの経過秒数', ('shard',))
+REFRESH_SHARD_PENDING = metrics.gauge(
+    'stocktracking_refresh_shard_pending', '更新シャード内で未取得または期限切れの銘柄数', ('shard',))
+REFRESH_SHARD_SYMBOLS = metrics.counter(
+    'stocktracking_refresh_shard_symbols_total', 'シャード更新で処理した銘柄数（refreshed / failed）', ('result',))
+
+
+def classify_error(error: Exception) -> str:
+    """例外をメトリクスのラベル用に分類"""
+    message = str(error).lower()
+    if 'rate limit' in message or 'too many requests' in message or '429' in message:
+        return 'rate_limit'
+    if '404' in message or 'not found' in message:
+        return 'not_found'
+    if isinstance(error, TimeoutError) or 'timed out' in message or 'timeout' in message:
+        return 'timeout'
+    if isinstance(error, ConnectionError) or 'connection' in message:
+        return 'connection'
+    return 'error'
+
+
+def observe_upstream(kind: str, func: Callable, *args, **kwargs):
+    """
+    Yahoo Finance への呼び出しを計測して結果を返す
+
+    kind は history / info / dividends / download のいずれか。例外は分類して記録した上で再送出する。
+    """
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        with span(f'yahoo.{kind}'):
+            return func(*args, **kwargs)
+    except Exception as e:
+        outcome = classify_error(e)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, kind=kind)
+        UPSTREAM_REQUESTS.inc(kind=kind, outcome=outcome)
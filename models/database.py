@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
-from config import DB_NAME
+from config import DB_NAME, DB_JOURNAL_MODE, DB_BUSY_TIMEOUT_MS
 
 engine = create_engine(f'sqlite:///{DB_NAME}')
 db_session = scoped_session(sessionmaker(autocommit=False,
@@ -9,6 +9,15 @@ db_session = scoped_session(sessionmaker(autocommit=False,
 Base = declarative_base()
 Base.query = db_session.query_property()
 
+@event.listens_for(engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    # 複数プロセスで同じファイルを使うため、書き込み中も読み込めるようにし、ロック待ちの時間を設定する
+    cursor = dbapi_connection.cursor()
+    if DB_JOURNAL_MODE:
+        cursor.execute(f'PRAGMA journal_mode={DB_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}')
+    cursor.close()
+
 def init_db():
     # Import all models here so that they are registered properly on the metadata
     import models.stock
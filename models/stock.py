@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Index, UniqueConstraint
 from datetime import datetime
 from models.database import Base
 
@@ -77,3 +77,224 @@ class PriceCache(Base):
             'week_52_low': self.week_52_low,
             'cached_at': self.cached_at.isoformat() if self.cached_at else None
         }
+
+class FxRate(Base):
+    __tablename__ = 'fx_rates'
+    
+    id = Column(Integer, primary_key=True)
+    currency = Column(String, nullable=False)
+    date = Column(String, nullable=False)
+    rate = Column(Float, nullable=False)  # 1 USD あたりの通貨量
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (UniqueConstraint('currency', 'date', name='_currency_date_uc'),)
+
+    def to_dict(self):
+        return {
+            'currency': self.currency,
+            'date': self.date,
+            'rate': self.rate
+        }
+
+class AlertRule(Base):
+    __tablename__ = 'alert_rules'
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False, index=True)
+    rule_type = Column(String, nullable=False)
+    threshold = Column(Float)
+    repeat = Column(Boolean, default=True)
+    enabled = Column(Boolean, default=True)
+    last_event_key = Column(String)  # 同一バーでの重複通知防止用
+    last_triggered_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'rule_type': self.rule_type,
+            'threshold': self.threshold,
+            'repeat': bool(self.repeat),
+            'enabled': bool(self.enabled),
+            'last_event_key': self.last_event_key,
+            'last_triggered_at': self.last_triggered_at.isoformat() if self.last_triggered_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class AlertEvent(Base):
+    __tablename__ = 'alert_events'
+    
+    id = Column(Integer, primary_key=True)
+    rule_id = Column(Integer, nullable=False)
+    symbol = Column(String, nullable=False)
+    rule_type = Column(String, nullable=False)
+    threshold = Column(Float)
+    value = Column(Float)
+    message = Column(String)
+    triggered_at = Column(DateTime, default=datetime.now, index=True)
+
+    __table_args__ = (Index('ix_alert_events_symbol_triggered', 'symbol', 'triggered_at'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'rule_id': self.rule_id,
+            'symbol': self.symbol,
+            'rule_type': self.rule_type,
+            'threshold': self.threshold,
+            'value': self.value,
+            'message': self.message,
+            'triggered_at': self.triggered_at.isoformat() if self.triggered_at else None
+        }
+
+class ForecastResult(Base):
+    __tablename__ = 'forecast_results'
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    run_date = Column(String, nullable=False)  # バッチ実行日
+    engine = Column(String, nullable=False)
+    periods = Column(Integer, nullable=False)
+    as_of = Column(String)  # 学習に使った最終バーの日付
+    status = Column(String, nullable=False)  # done / error
+    result = Column(Text)  # StockPredictor の出力（JSON）
+    error = Column(String)
+    fit_seconds = Column(Float)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('symbol', 'run_date', 'engine', 'periods', name='_forecast_run_uc'),
+        Index('ix_forecast_results_run', 'run_date', 'engine', 'periods'),
+    )
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'run_date': self.run_date,
+            'engine': self.engine,
+            'periods': self.periods,
+            'as_of': self.as_of,
+            'status': self.status,
+            'error': self.error,
+            'fit_seconds': self.fit_seconds,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ForecastEvaluation(Base):
+    __tablename__ = 'forecast_evaluations'
+    
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, nullable=False, index=True)
+    symbol = Column(String, nullable=False)
+    engine = Column(String, nullable=False)
+    horizon = Column(Integer, nullable=False)  # 予測日数（営業日）
+    cutoffs = Column(Integer)  # 評価に使った基準日の数
+    mape = Column(Float)
+    rmse = Column(Float)
+    coverage = Column(Float)  # 実績が予測区間に入った割合
+    fit_seconds = Column(Float)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def to_dict(self):
+        return {
+            'run_id': self.run_id,
+            'symbol': self.symbol,
+            'engine': self.engine,
+            'horizon': self.horizon,
+            'cutoffs': self.cutoffs,
+            'mape': self.mape,
+            'rmse': self.rmse,
+            'coverage': self.coverage,
+            'fit_seconds': self.fit_seconds,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class EnrichmentJob(Base):
+    """銘柄情報の取得待ちキュー（失敗時は next_attempt_at まで待って再試行）"""
+    __tablename__ = 'enrichment_jobs'
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, unique=True, nullable=False)
+    status = Column(String, nullable=False, default='pending')  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (Index('ix_enrichment_due', 'status', 'next_attempt_at'),)
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class Lease(Base):
+    """複数プロセス間の排他用のリース（expires_at を過ぎたリースは他のプロセスが取得できる）"""
+    __tablename__ = 'leases'
+    
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    acquired_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+class Job(Base):
+    """予測・インポートのジョブ（どのワーカープロセスからも状態を参照できるよう SQLite に保存する）"""
+    __tablename__ = 'jobs'
+    
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)  # prediction, import
+    status = Column(String, nullable=False, default='queued')  # queued, running, done, error
+    active_key = Column(String, unique=True)  # 実行待ち・実行中のジョブの重複排除用（完了時に NULL）
+    params = Column(Text)  # JSON
+    payload = Column(Text)  # 実行に渡すデータ（取得済みの履歴など、完了時に削除）
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    status_code = Column(Integer)
+    owner = Column(String)  # 実行中のプロセス
+    submitted_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (Index('ix_jobs_queue', 'kind', 'status', 'submitted_at'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'status_code': self.status_code,
+            'owner': self.owner,
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class HistoryChange(Base):
+    """銘柄ごとの価格履歴の最終更新時刻（他のプロセスが保存した履歴の変更を検知するため）"""
+    __tablename__ = 'history_changes'
+    
+    symbol = Column(String, primary_key=True)
+    changed_at = Column(DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'changed_at': self.changed_at.isoformat() if self.changed_at else None
+        }
@@ -0,0 +1,232 @@
+"""ポートフォリオリスク分析モジュール"""
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+from config import (
+    TRADING_DAYS_PER_YEAR,
+    RISK_SIMULATIONS, RISK_HORIZON_DAYS, RISK_CONFIDENCE_LEVELS, RISK_CHUNK_ELEMENTS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioRisk:
+    """共分散・相関・モンテカルロVaRの計算クラス"""
+
+    @staticmethod
+    def build_price_matrix(rows: Sequence[Tuple[str, str, float]]) -> pd.DataFrame:
+        """(symbol, date, close) の行から 日付×銘柄 の価格行列を構築"""
+        if not rows:
+            return pd.DataFrame()
+        frame = pd.DataFrame.from_records(rows, columns=['symbol', 'date', 'close'])
+        prices = frame.pivot_table(index='date', columns='symbol', values='close', aggfunc='last')
+        prices.index = pd.to_datetime(prices.index)
+        return prices.sort_index()
+
+    @staticmethod
+    def build_return_matrix(prices: pd.DataFrame) -> pd.DataFrame:
+        """
+        日付を揃えた対数リターン行列を構築
+
+        休場日などの欠損は直前の価格で補完し、上場前の期間はリターン0として扱う。
+        """
+        if prices.empty:
+            return prices
+        returns = np.log(prices.ffill()).diff().iloc[1:]
+        return returns.fillna(0.0)
+
+    @staticmethod
+    def covariance(returns: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """日次リターンの共分散行列と相関行列を計算"""
+        matrix = returns.to_numpy(dtype=np.float64)
+        if matrix.shape[0] < 2:
+            n = matrix.shape[1]
+            return np.zeros((n, n)), np.eye(n)
+
+        cov = np.atleast_2d(np.cov(matrix, rowvar=False))
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        corr[~np.isfinite(corr)] = 0.0
+        np.fill_diagonal(corr, 1.0)
+        return cov, corr
+
+    @staticmethod
+    def risk_contributions(weights: np.ndarray, cov: np.ndarray) -> Dict:
+        """ポートフォリオボラティリティと銘柄別寄与を計算"""
+        marginal = cov @ weights
+        variance = float(weights @ marginal)
+        volatility = variance ** 0.5 if variance > 0 else 0.0
+        if volatility > 0:
+            contribution = weights * marginal / volatility
+        else:
+            contribution = np.zeros_like(weights)
+        return {
+            'volatility': volatility,
+            'marginal': marginal / volatility if volatility > 0 else np.zeros_like(weights),
+            'contribution': contribution,
+        }
+
+    @staticmethod
+    def _cholesky(cov: np.ndarray) -> np.ndarray:
+        """共分散行列の分解（半正定値の場合は固有値分解にフォールバック）"""
+        try:
+            return np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            eigenvalues, eigenvectors = np.linalg.eigh(cov)
+            return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+    @staticmethod
+    def simulate_pnl(
+        values: np.ndarray,
+        returns: np.ndarray,
+        cov: np.ndarray,
+        simulations: int = RISK_SIMULATIONS,
+        horizon_days: int = RISK_HORIZON_DAYS,
+        method: str = 'normal',
+        chunk_elements: int = RISK_CHUNK_ELEMENTS,
+        seed: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        保有期間の損益をモンテカルロ法でシミュレート
+
+        Args:
+            values: 銘柄別の評価額
+            returns: 日次対数リターン行列（日付×銘柄）
+            cov: 日次リターンの共分散行列
+            simulations: パス数
+            horizon_days: 保有日数
+            method: 'normal'（多変量正規）または 'historical'（過去リターンのブートストラップ）
+            chunk_elements: 1チャンクあたりの乱数要素数の上限（メモリ使用量を制限）
+            seed: 乱数シード
+
+        Returns:
+            np.ndarray: パスごとの損益（評価額ベース）
+        """
+        rng = np.random.default_rng(seed)
+        n_assets = len(values)
+        pnl = np.empty(simulations, dtype=np.float64)
+
+        if method == 'historical':
+            per_path = max(1, horizon_days * n_assets)
+            chunk = max(1, min(simulations, chunk_elements // per_path))
+            n_obs = returns.shape[0]
+            for start in range(0, simulations, chunk):
+                size = min(chunk, simulations - start)
+                idx = rng.integers(0, n_obs, size=(size, horizon_days))
+                path_returns = returns[idx].sum(axis=1)
+                pnl[start:start + size] = np.expm1(path_returns) @ values
+        elif method == 'normal':
+            mean = returns.mean(axis=0) * horizon_days
+            factor = PortfolioRisk._cholesky(cov * horizon_days).T
+            chunk = max(1, min(simulations, chunk_elements // max(1, n_assets)))
+            for start in range(0, simulations, chunk):
+                size = min(chunk, simulations - start)
+                z = rng.standard_normal((size, n_assets))
+                path_returns = z @ factor + mean
+                pnl[start:start + size] = np.expm1(path_returns) @ values
+        else:
+            raise ValueError(f"Unknown simulation method: {method}")
+
+        return pnl
+
+    @staticmethod
+    def value_at_risk(pnl: np.ndarray, confidence_levels: Sequence[float], total_value: float) -> List[Dict]:
+        """損益分布からVaR/CVaRを計算（損失を正の値で返す）"""
+        sorted_pnl = np.sort(pnl)
+        levels = []
+        for confidence in confidence_levels:
+            cutoff = max(1, int(np.floor(len(sorted_pnl) * (1 - confidence))))
+            var = float(-sorted_pnl[cutoff - 1])
+            cvar = float(-sorted_pnl[:cutoff].mean())
+            levels.append({
+                'confidence': confidence,
+                'var': var,
+                'cvar': cvar,
+                'var_percent': var / total_value * 100 if total_value else 0.0,
+                'cvar_percent': cvar / total_value * 100 if total_value else 0.0,
+            })
+        return levels
+
+    @staticmethod
+    def analyze(
+        prices: pd.DataFrame,
+        values: Dict[str, float],
+        simulations: int = RISK_SIMULATIONS,
+        horizon_days: int = RISK_HORIZON_DAYS,
+        confidence_levels: Sequence[float] = RISK_CONFIDENCE_LEVELS,
+        method: str = 'normal',
+        seed: Optional[int] = None,
+        include_matrix: bool = True
+    ) -> Dict:
+        """
+        ポートフォリオのリスク分析を実行
+
+        Args:
+            prices: 日付×銘柄 の終値行列
+            values: 銘柄 → 評価額（同一通貨であること）
+            その他: simulate_pnl を参照
+
+        Returns:
+            Dict: ボラティリティ、銘柄別寄与、相関行列、VaR/CVaR
+        """
+        symbols = [s for s in prices.columns if values.get(s)]
+        if not symbols:
+            return {'positions': [], 'total_value': 0.0, 'observations': 0}
+
+        returns = PortfolioRisk.build_return_matrix(prices[symbols])
+        cov, corr = PortfolioRisk.covariance(returns)
+
+        value_vector = np.array([values[s] for s in symbols], dtype=np.float64)
+        total_value = float(value_vector.sum())
+        weights = value_vector / total_value if total_value else np.zeros_like(value_vector)
+        risk = PortfolioRisk.risk_contributions(weights, cov)
+
+        annualize = TRADING_DAYS_PER_YEAR ** 0.5
+        asset_vol = np.sqrt(np.diag(cov))
+        contribution_pct = risk['contribution'] / risk['volatility'] * 100 if risk['volatility'] > 0 \
+            else np.zeros_like(weights)
+
+        positions = [
+            {
+                'symbol': symbol,
+                'value': float(value_vector[i]),
+                'weight': float(weights[i] * 100),
+                'volatility': float(asset_vol[i] * annualize * 100),
+                'marginal_volatility': float(risk['marginal'][i] * annualize * 100),
+                'contribution': float(risk['contribution'][i] * annualize * 100),
+                'contribution_percent': float(contribution_pct[i]),
+            }
+            for i, symbol in enumerate(symbols)
+        ]
+
+        result = {
+            'total_value': total_value,
+            'observations': int(returns.shape[0]),
+            'start': returns.index[0].strftime('%Y-%m-%d') if len(returns) else None,
+            'end': returns.index[-1].strftime('%Y-%m-%d') if len(returns) else None,
+            'volatility': {
+                'daily': risk['volatility'] * 100,
+                'annual': risk['volatility'] * annualize * 100,
+            },
+            'positions': positions,
+        }
+
+        if include_matrix:
+            result['correlation'] = {'symbols': symbols, 'matrix': np.round(corr, 4).tolist()}
+
+        if len(returns) >= 2 and simulations > 0:
+            pnl = PortfolioRisk.simulate_pnl(
+                value_vector, returns.to_numpy(dtype=np.float64), cov,
+                simulations=simulations, horizon_days=horizon_days, method=method, seed=seed
+            )
+            result['var'] = {
+                'method': method,
+                'simulations': simulations,
+                'horizon_days': horizon_days,
+                'expected_pnl': float(pnl.mean()),
+                'levels': PortfolioRisk.value_at_risk(pnl, confidence_levels, total_value),
+            }
+
+        return result
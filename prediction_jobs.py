@@ -0,0 +1,276 @@
+"""予測ジョブキューモジュール - SQLite に登録した予測ジョブをプロセスプールで実行"""
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import pandas as pd
+from database import db
+from exceptions import StockTrackingError
+from leases import owner_id
+from upstream_capture import encode_payload, decode_payload
+from config import (
+    PREDICTION_HISTORY_PERIOD, PREDICTION_MAX_WORKERS, PREDICTION_MAX_PENDING, PREDICTION_JOB_TTL_MINUTES,
+    PREDICTION_JOB_POLL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# wait でジョブの状態を確認する間隔（秒）
+WAIT_POLL_SECONDS = 0.1
+
+# ジョブを実行中のプロセスが保持するリース（失効したプロセスのジョブは他のプロセスが引き継ぐ）
+RUNNER_LEASE_PREFIX = 'job-runner:'
+RUNNER_LEASE_SECONDS = 30
+
+
+def _init_worker():
+    """ワーカープロセスの初期化（Prophet/Stanを事前に読み込む）"""
+    import stock_predictor  # noqa: F401
+    import prophet  # noqa: F401
+
+
+def _run_prediction(symbol: str, periods: int, hist: Optional[pd.DataFrame] = None) -> Dict:
+    """ワーカープロセスで予測を実行（hist を渡した場合は履歴を取得しない）"""
+    from stock_api import StockAPI
+    from stock_predictor import StockPredictor
+    from forecast_cache import ForecastCache
+
+    if hist is None:
+        hist = StockAPI.get_history(symbol, PREDICTION_HISTORY_PERIOD)
+    if hist is None or hist.empty:
+        raise StockTrackingError('予測に必要なデータが見つかりません', 404)
+    if len(hist) < 30:
+        raise StockTrackingError('データ不足のため予測できません', 400)
+
+    predictor = StockPredictor(engine='prophet')
+    result = predictor.predict(hist, periods=periods, symbol=symbol)
+    cache_key = ForecastCache.make_key(symbol, hist.index[-1].strftime('%Y-%m-%d'), predictor.params)
+    return {'result': result, 'cache_key': cache_key, 'params': predictor.params}
+
+
+class PredictionJobQueue:
+    """
+    予測ジョブキュー
+
+    ジョブは SQLite の jobs テーブルに登録し、どのワーカープロセスからも状態を参照できるようにする。
+    計算は start を呼んだ1つのプロセス（バックグラウンド処理の担当）がプロセスプールで実行し、
+    Flaskのリクエストスレッドから計算負荷を切り離す。
+    実行するプロセスはリースを延長し続け、リースが失効したプロセス（終了したプロセス）の実行中のジョブだけを
+    他のプロセスが実行待ちに戻す。担当を外れて shutdown したプロセスは自分の実行中のジョブを実行待ちに戻す。
+    同じ (銘柄, 予測日数) のジョブが実行待ち・実行中の場合は既存のジョブを返す。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PREDICTION_MAX_WORKERS,
+        max_pending: int = PREDICTION_MAX_PENDING,
+        job_ttl_minutes: int = PREDICTION_JOB_TTL_MINUTES,
+        poll_seconds: float = PREDICTION_JOB_POLL_SECONDS
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = timedelta(minutes=job_ttl_minutes)
+        self.poll_seconds = poll_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner: Optional[str] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Flaskのスレッド状態を引き継がないよう spawn で起動する
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers or None,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            atexit.register(self.shutdown)
+        return self._executor
+
+    def start(self):
+        """実行待ちのジョブを取り出して実行するスレッドを開始（バックグラウンド処理を担当するプロセスで呼ぶ）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._owner = owner_id()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='prediction-jobs', daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """
+        ジョブの取り出しとプロセスプールを停止し、実行中のジョブを実行待ちに戻す
+
+        実行中の計算の結果は、引き継いだプロセスのジョブを上書きしないよう保存しない。
+        """
+        from models.database import db_session
+
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if self._owner is not None:
+            try:
+                count = db.requeue_jobs('prediction', owner=self._owner)
+                if count:
+                    logger.info(f"Requeued {count} prediction jobs of {self._owner}")
+                db.release_lease(self._runner_lease, self._owner)
+            except Exception as e:
+                logger.error(f"Error requeueing prediction jobs: {e}")
+            finally:
+                db_session.remove()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def _runner_lease(self) -> str:
+        return f'{RUNNER_LEASE_PREFIX}{self._owner}'
+
+    def submit(self, symbol: str, periods: int = 30, hist: Optional[pd.DataFrame] = None) -> Dict:
+        """
+        予測ジョブを登録（hist は取得済みの履歴で、ワーカープロセスに渡して再取得を省く）
+
+        Returns:
+            Dict: ジョブ情報（本日の予測がキャッシュ済みの場合は完了状態で返す）
+        """
+        cached = self._get_cached(symbol, periods)
+        db.purge_jobs('prediction', datetime.now() - self.job_ttl)
+        params = {'symbol': symbol, 'periods': periods}
+
+        if cached:
+            return self._snapshot(db.create_job('prediction', params, status='done', result=cached))
+
+        active_key = f'prediction:{symbol}:{periods}'
+        job = db.get_active_job(active_key)
+        if job is not None:
+            return self._snapshot(job)
+
+        if db.count_active_jobs('prediction') >= self.max_pending:
+            raise StockTrackingError('予測ジョブが混雑しています。しばらく待ってから再度お試しください', 503)
+
+        payload = json.dumps(encode_payload(hist)) if hist is not None else None
+        job = db.create_job('prediction', params, active_key=active_key, payload=payload)
+        self._wake.set()
+        return self._snapshot(job)
+
+    def _get_cached(self, symbol: str, periods: int) -> Optional[Dict]:
+        """本日確認済みの予測結果を取得"""
+        from stock_predictor import StockPredictor
+        return StockPredictor(engine='prophet').get_cached(symbol, periods)
+
+    def _loop(self):
+        from models.database import db_session
+
+        while not self._stop.is_set():
+            try:
+                self.requeue_orphaned()
+                self.dispatch()
+            except Exception as e:
+                logger.error(f"Prediction job dispatch failed: {e}")
+            finally:
+                db_session.remove()
+            # 同じプロセスで登録されたジョブはすぐに、他のプロセスのジョブは poll_seconds ごとに取り出す
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def requeue_orphaned(self) -> int:
+        """リースを延長し、リースが失効したプロセスが実行中のまま残したジョブを実行待ちに戻す"""
+        self._owner = self._owner or owner_id()
+        db.acquire_lease(self._runner_lease, self._owner, RUNNER_LEASE_SECONDS)
+        runners = [lease['owner'] for lease in db.get_leases(RUNNER_LEASE_PREFIX)]
+        count = db.requeue_jobs('prediction', keep_owners=runners)
+        if count:
+            logger.info(f"Requeued {count} orphaned prediction jobs")
+        return count
+
+    def dispatch(self) -> int:
+        """実行待ちのジョブをプロセスプールの空きの数だけ取り出して実行する"""
+        with self._lock:
+            free = (self.max_workers or os.cpu_count() or 1) - len(self._futures)
+        if free <= 0:
+            return 0
+        self._owner = self._owner or owner_id()
+        jobs = db.claim_jobs('prediction', self._owner, free)
+        for job in jobs:
+            hist = decode_payload(json.loads(job['payload'])) if job['payload'] else None
+            future = self._get_executor().submit(_run_prediction, job['params']['symbol'], job['params']['periods'], hist)
+            with self._lock:
+                self._futures[job['id']] = future
+            future.add_done_callback(
+                lambda f, job_id=job['id'], symbol=job['params']['symbol'], owner=self._owner:
+                    self._on_done(job_id, symbol, f, owner)
+            )
+        return len(jobs)
+
+    def _on_done(self, job_id: str, symbol: str, future: Future, owner: Optional[str] = None):
+        """ジョブ完了時の処理（結果をデータベースに保存）"""
+        from models.database import db_session
+
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            # shutdown で実行待ちに戻したジョブ
+            return
+
+        result, error, status_code = None, None, None
+        try:
+            output = future.result()
+            result = output['result']
+            # ワーカーがディスクに保存したエントリをこのプロセスの予測キャッシュにも認識させる
+            from forecast_cache import forecast_cache
+            forecast_cache.mark_checked(output['cache_key'], symbol, output['params'])
+        except StockTrackingError as e:
+            error, status_code = str(e), e.status_code
+        except Exception as e:
+            logger.error(f"Prediction job {job_id} failed: {e}")
+            error, status_code = f'予測の実行に失敗しました: {e}', 500
+
+        try:
+            db.finish_job(job_id, result=result, error=error, status_code=status_code, owner=owner)
+        finally:
+            db_session.remove()
+        self._wake.set()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """ジョブの状態を取得"""
+        job = db.get_job(job_id, kind='prediction')
+        return self._snapshot(job) if job else None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """ジョブの完了を最大 timeout 秒待ってから状態を返す（実行するプロセスは別の場合がある）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in ('done', 'error') or remaining <= 0:
+                return job
+            time.sleep(min(WAIT_POLL_SECONDS, remaining))
+
+    @staticmethod
+    def _snapshot(job: Dict) -> Dict:
+        return {
+            'id': job['id'],
+            **job['params'],
+            'status': job['status'],
+            'submitted_at': job['submitted_at'],
+            'finished_at': job['finished_at'],
+            'result': job['result'],
+            'error': job['error'],
+            'status_code': job['status_code'],
+        }
+
+
+# グローバルインスタンス
+prediction_jobs = PredictionJobQueue()
@@ -0,0 +1,174 @@
+"""価格ストリームモジュール - Server-Sent Events による価格差分の配信"""
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+from database import db
+from leases import owner_id
+from price_watcher import PriceCacheWatcher
+from config import STREAM_BUFFER_SIZE, STREAM_HEARTBEAT_SECONDS, STREAM_REFRESH_SECONDS, STREAM_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStream:
+    """
+    価格ストリーム
+
+    price_cache の変更を PriceCacheWatcher で poll_seconds ごとに確認し（保存したプロセスは問わない）、
+    銘柄ごとに変化した項目だけをイベントとして共有バッファに積む。イベント本文は1回だけ整形し、接続中の全クライアントは
+    同じバッファを自分のカーソル位置から読む。
+
+    イベントIDは「ストリームID-連番」の形式で、再接続時の Last-Event-ID として使う。
+    サーバー再起動やバッファ溢れで再開できない場合は reset イベントを送り、
+    クライアントに一覧の再取得を促す。
+
+    価格キャッシュの更新は、複数プロセスのうち stream-refresh のリースを取得した1つのプロセスだけが行う。
+    """
+
+    REFRESH_LEASE = 'stream-refresh'
+
+    FIELDS = ('current_price', 'previous_close', 'change', 'change_percent', 'volume')
+
+    def __init__(
+        self,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+        heartbeat_seconds: float = STREAM_HEARTBEAT_SECONDS,
+        refresh_seconds: float = STREAM_REFRESH_SECONDS,
+        poll_seconds: float = STREAM_POLL_SECONDS
+    ):
+        self.stream_id = uuid.uuid4().hex[:8]
+        self.heartbeat_seconds = heartbeat_seconds
+        self.refresh_seconds = refresh_seconds
+        self.poll_seconds = poll_seconds
+        self.watcher = PriceCacheWatcher()
+        self.watcher.add_listener(self.on_data_saved)
+        self._events: deque = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._last: Dict[str, Dict] = {}
+        self._cond = threading.Condition()
+        self._subscribers = 0
+        self._refresher: Optional[threading.Thread] = None
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    def on_data_saved(self, kind: str, symbol: str, data):
+        """PriceCacheWatcher の通知先（price_cache の変更から差分イベントを作成）"""
+        if kind != 'price':
+            return
+        values = {field: data.get(field) for field in self.FIELDS}
+        with self._cond:
+            previous = self._last.get(symbol, {})
+            delta = {field: value for field, value in values.items() if previous.get(field) != value}
+            if not delta:
+                return
+            self._last[symbol] = values
+            self._seq += 1
+            payload = json.dumps({'symbol': symbol, **delta, 'updated_at': datetime.now().isoformat()})
+            self._events.append(f"id: {self.stream_id}-{self._seq}\nevent: price\ndata: {payload}\n\n")
+            self._cond.notify_all()
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Last-Event-ID から連番を取得（別のストリームのIDなら None）"""
+        if not event_id:
+            return None
+        stream_id, _, seq = event_id.rpartition('-')
+        if stream_id != self.stream_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _reset_event(self) -> str:
+        return f"id: {self.stream_id}-{self._seq}\nevent: reset\ndata: {{}}\n\n"
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """
+        クライアント1接続分のイベントを生成（SSE形式の文字列）
+
+        接続が切れると Werkzeug が GeneratorExit を送るため、finally で購読数を戻す。
+        """
+        with self._cond:
+            self._subscribers += 1
+            self._ensure_refresher()
+            cursor = self._seq
+            resumed = self._parse_event_id(last_event_id)
+            first = "retry: 5000\n\n"
+            if last_event_id is not None:
+                if resumed is None or resumed > self._seq or self._seq - resumed > len(self._events):
+                    first += self._reset_event()
+                else:
+                    cursor = resumed
+
+        try:
+            yield first
+            while True:
+                with self._cond:
+                    if self._seq <= cursor:
+                        self._cond.wait(timeout=self.heartbeat_seconds)
+                    count = self._seq - cursor
+                    if count > len(self._events):
+                        # バッファから溢れるほど遅れたクライアントには再取得を促す
+                        chunk = self._reset_event()
+                    elif count:
+                        chunk = ''.join(itertools.islice(self._events, len(self._events) - count, None))
+                    else:
+                        chunk = ': keepalive\n\n'
+                    cursor = self._seq
+                yield chunk
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def _ensure_refresher(self):
+        """購読者がいる間だけ価格キャッシュを監視・更新するスレッドを起動（呼び出し側でロック取得済み）"""
+        if self._refresher is None or not self._refresher.is_alive():
+            self._refresher = threading.Thread(target=self._refresh_loop, name='price-stream-refresh', daemon=True)
+            self._refresher.start()
+
+    def refresh(self, owner: str) -> bool:
+        """
+        リースを取得できた場合だけ期限切れの価格キャッシュを更新
+
+        更新はクライアント数・プロセス数に関係なく1か所で行い、保存された差分は各プロセスの監視で配信される。
+        """
+        from services.stock_service import StockService
+
+        if not db.acquire_lease(self.REFRESH_LEASE, owner, self.refresh_seconds * 2):
+            return False
+        StockService.get_dashboard_data()
+        return True
+
+    def _refresh_loop(self):
+        """poll_seconds ごとに変更を確認し、refresh_seconds ごとに更新する"""
+        from models.database import db_session
+
+        owner = owner_id()
+        next_refresh = 0.0
+        try:
+            while self._subscribers > 0:
+                try:
+                    self.watcher.poll()
+                    if time.monotonic() >= next_refresh:
+                        next_refresh = time.monotonic() + self.refresh_seconds
+                        self.refresh(owner)
+                except Exception as e:
+                    logger.error(f"Price stream refresh failed: {e}")
+                finally:
+                    db_session.remove()
+                time.sleep(self.poll_seconds)
+        finally:
+            # 購読者がいなくなったら、他のプロセスがすぐに更新を引き継げるようにする
+            try:
+                db.release_lease(self.REFRESH_LEASE, owner)
+            finally:
+                db_session.remove()
+
+
+# グローバルインスタンス
+price_stream = PriceStream()
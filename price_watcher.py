@@ -0,0 +1,92 @@
+"""価格キャッシュ監視モジュール - 他のプロセスが保存した価格キャッシュ・価格履歴の変更を検知"""
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# 保存時刻はコミット前に設定されるため、コミットが遅れた行も拾えるよう前回の確認時刻から遡る秒数
+COMMIT_LAG_SECONDS = 10
+
+
+class _ChangeCursor:
+    """1つのテーブルの変更の確認位置（保存時刻と銘柄ごとに通知済みの保存時刻）"""
+
+    def __init__(self, fetch: Callable[[Optional[datetime]], List[Dict]], time_field: str):
+        self.fetch = fetch
+        self.time_field = time_field
+        self.since: Optional[datetime] = None
+        self.seen: Dict[str, str] = {}
+
+    def changes(self) -> List[Dict]:
+        since = self.since - timedelta(seconds=COMMIT_LAG_SECONDS) if self.since else None
+        changed = []
+        for entry in self.fetch(since):
+            symbol, saved_at = entry['symbol'], entry[self.time_field]
+            if not saved_at or self.seen.get(symbol) == saved_at:
+                continue
+            self.seen[symbol] = saved_at
+            changed.append(entry)
+            saved = datetime.fromisoformat(saved_at)
+            if self.since is None or saved > self.since:
+                self.since = saved
+        if self.since is None:
+            self.since = datetime.now()
+        return changed
+
+    def reset(self):
+        self.since = None
+        self.seen.clear()
+
+
+class PriceCacheWatcher:
+    """
+    価格キャッシュ・価格履歴の変更検知
+
+    gunicorn の他のワーカーやシャード更新ワーカーが保存した価格も届くよう、poll を呼ぶたびに
+    history_changes の changed_at と price_cache の cached_at を確認し、前回より新しい行を
+    callback(kind, symbol, data) の形式で通知する。
+
+    save_price_data は履歴を保存してから価格キャッシュを保存するため、'history'（履歴の変更）をすべて
+    通知してから 'price'（価格キャッシュの変更）を通知する。履歴だけの保存（バックフィルなど）は
+    'history' だけが通知される。最初の poll は基準の記録だけを行い、既存の行は通知しない。
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[str, str, object], None]] = []
+        self._cursors = {
+            'history': _ChangeCursor(db.get_history_changes, 'changed_at'),
+            'price': _ChangeCursor(db.get_price_cache_changes, 'cached_at'),
+        }
+        self._started = False
+
+    def add_listener(self, callback: Callable[[str, str, object], None]):
+        """変更の通知先を登録"""
+        self._listeners.append(callback)
+
+    def reset(self):
+        """基準を破棄（次の poll は基準の記録だけを行う）"""
+        for cursor in self._cursors.values():
+            cursor.reset()
+        self._started = False
+
+    def poll(self) -> int:
+        """前回から変更された価格履歴・価格キャッシュを通知し、通知した変更の数を返す"""
+        changes = {kind: cursor.changes() for kind, cursor in self._cursors.items()}
+        if not self._started:
+            self._started = True
+            return 0
+
+        for kind, changed in changes.items():
+            for entry in changed:
+                self._notify(kind, entry['symbol'], entry)
+        return sum(len(changed) for changed in changes.values())
+
+    def _notify(self, kind: str, symbol: str, data):
+        """通知先の例外は他の通知先に影響させない"""
+        for callback in list(self._listeners):
+            try:
+                callback(kind, symbol, data)
+            except Exception as e:
+                logger.error(f"Error in {kind} watcher for {symbol}: {e}")
@@ -0,0 +1,299 @@
+"""プロファイリングモジュール - 稼働中のサーバーでのリクエスト単位・時間指定のプロファイルとメモリ割り当ての調査"""
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from exceptions import StockTrackingError
+from config import (
+    PROFILING_SECRET, PROFILING_OUTPUT_DIR, PROFILING_MAX_FILES,
+    PROFILING_MAX_WINDOW_SECONDS, PROFILING_SAMPLE_INTERVAL_MS
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sample')
+TRACEMALLOC_GROUPS = ('lineno', 'filename', 'traceback')
+
+
+class StackSampler:
+    """
+    サンプリングプロファイラー
+
+    別スレッドから一定間隔で全スレッドのスタック（sys._current_frames）を取得し、
+    collapsed 形式（スレッド名;関数;... 回数）で集計する。ワーカースレッドの処理も含めて計測できる。
+    """
+
+    def __init__(self, interval_ms: float = PROFILING_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> 'StackSampler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """collapsed 形式のテキスト（flamegraph.pl / speedscope で読み込める）"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    プロファイルの実行と保存
+
+    すべての操作は設定の secret と一致するトークンが必要（secret が空の場合は無効）。
+    結果は output_dir に保存し、ID で取得する（cProfile は .prof、サンプリングは .collapsed）。
+    """
+
+    def __init__(self, secret: str = PROFILING_SECRET, output_dir: str = PROFILING_OUTPUT_DIR,
+                 max_files: int = PROFILING_MAX_FILES, max_window_seconds: float = PROFILING_MAX_WINDOW_SECONDS):
+        self.secret = secret
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.max_window_seconds = max_window_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    def authorize(self, token: Optional[str]):
+        """
+        トークンを検証
+
+        Raises:
+            StockTrackingError: 無効な場合は 404、トークンが一致しない場合は 403
+        """
+        if not self.enabled:
+            raise StockTrackingError('プロファイリングは無効です', 404)
+        if not token or not hmac.compare_digest(token.encode('utf-8'), self.secret.encode('utf-8')):
+            raise StockTrackingError('プロファイリングのトークンが無効です', 403)
+
+    def is_authorized(self, token: Optional[str]) -> bool:
+        """トークンが一致するか（リクエスト単位のプロファイル用、例外を出さない）"""
+        try:
+            self.authorize(token)
+        except StockTrackingError:
+            return False
+        return True
+
+    def begin(self, mode: str):
+        """現在のスレッドでプロファイルを開始（cprofile は現在のスレッドのみ、sample は全スレッド）"""
+        if mode == 'sample':
+            sampler = StackSampler()
+            sampler.start()
+            return sampler
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def end(self, handle, label: str) -> str:
+        """プロファイルを終了して保存し、IDを返す"""
+        if isinstance(handle, StackSampler):
+            return self._save_collapsed(handle.stop(), label)
+        handle.disable()
+        return self._save_pstats(handle, label)
+
+    def sample_window(self, seconds: float, interval_ms: float = PROFILING_SAMPLE_INTERVAL_MS) -> Tuple[str, StackSampler]:
+        """
+        指定秒数の間、全スレッドをサンプリングして保存
+
+        Raises:
+            StockTrackingError: 秒数が範囲外の場合
+        """
+        if not 0 < seconds <= self.max_window_seconds:
+            raise StockTrackingError(f'秒数は0より大きく{self.max_window_seconds}以下で指定してください', 400)
+        if interval_ms <= 0:
+            raise StockTrackingError('サンプリング間隔は0より大きい値を指定してください', 400)
+        sampler = StackSampler(interval_ms)
+        sampler.start()
+        time.sleep(seconds)
+        sampler.stop()
+        return self._save_collapsed(sampler, f'window {seconds:g}s'), sampler
+
+    def list_profiles(self) -> List[Dict]:
+        """保存済みのプロファイル一覧（新しい順）"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        profiles = []
+        for name in os.listdir(self.output_dir):
+            profile_id, ext = os.path.splitext(name)
+            if ext not in ('.prof', '.collapsed'):
+                continue
+            path = os.path.join(self.output_dir, name)
+            profiles.append({
+                'id': profile_id,
+                'mode': 'cprofile' if ext == '.prof' else 'sample',
+                'size': os.path.getsize(path),
+                'created_at': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+            })
+        return sorted(profiles, key=lambda p: p['created_at'], reverse=True)
+
+    def load(self, profile_id: str, output_format: str = 'text', limit: int = 50) -> Tuple[bytes, str]:
+        """
+        保存済みのプロファイルを取得
+
+        Args:
+            output_format: text（cProfile は累積時間順の統計、サンプリングは collapsed）または raw（.prof のバイト列）
+
+        Returns:
+            Tuple[bytes, str]: (本文, MIMEタイプ)
+
+        Raises:
+            StockTrackingError: 見つからない場合
+        """
+        if not profile_id.isalnum():
+            raise StockTrackingError('プロファイルが見つかりません', 404)
+        path = self._path(profile_id, '.prof')
+        if os.path.exists(path):
+            if output_format == 'raw':
+                with open(path, 'rb') as f:
+                    return f.read(), 'application/octet-stream'
+            stream = io.StringIO()
+            pstats.Stats(path, stream=stream).sort_stats('cumulative').print_stats(limit)
+            return stream.getvalue().encode('utf-8'), 'text/plain'
+        path = self._path(profile_id, '.collapsed')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read(), 'text/plain'
+        raise StockTrackingError('プロファイルが見つかりません', 404)
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        return os.path.join(self.output_dir, profile_id + ext)
+
+    def _new_id(self) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        return datetime.now().strftime('%Y%m%d%H%M%S') + uuid.uuid4().hex[:8]
+
+    def _save_pstats(self, profile: cProfile.Profile, label: str) -> str:
+        profile_id = self._new_id()
+        profile.dump_stats(self._path(profile_id, '.prof'))
+        self._prune()
+        logger.info(f"Saved profile {profile_id} ({label})")
+        return profile_id
+
+    def _save_collapsed(self, sampler: StackSampler, label: str) -> str:
+        profile_id = self._new_id()
+        with open(self._path(profile_id, '.collapsed'), 'w', encoding='utf-8') as f:
+            f.write(sampler.collapsed())
+        self._prune()
+        logger.info(f"Saved profile {profile_id} ({label}, {sampler.samples} samples)")
+        return profile_id
+
+    def _prune(self):
+        """保存数の上限を超えた古いプロファイルを削除"""
+        with self._lock:
+            for profile in self.list_profiles()[self.max_files:]:
+                ext = '.prof' if profile['mode'] == 'cprofile' else '.collapsed'
+                try:
+                    os.remove(self._path(profile['id'], ext))
+                except OSError:
+                    pass
+
+
+class AllocationTracker:
+    """tracemalloc によるメモリ割り当ての調査（開始時のスナップショットとの差分を割り当て箇所ごとに集計）"""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 10) -> Dict:
+        """トレースを開始し、差分の基準となるスナップショットを取る"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = self._snapshot()
+        return self.status()
+
+    def stop(self) -> Dict:
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+        return self.status()
+
+    def status(self) -> Dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'frames': tracemalloc.get_traceback_limit(),
+            'current_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, group_by: str = 'lineno', limit: int = 20) -> Dict:
+        """
+        割り当て箇所ごとのサイズと件数（開始時からの増加量の多い順）
+
+        Raises:
+            StockTrackingError: トレースしていない場合、group_by が不正な場合
+        """
+        if group_by not in TRACEMALLOC_GROUPS:
+            raise StockTrackingError(f'group_by は {", ".join(TRACEMALLOC_GROUPS)} のいずれかです', 400)
+        if not tracemalloc.is_tracing():
+            raise StockTrackingError('tracemalloc が開始されていません', 409)
+        snapshot = self._snapshot()
+        with self._lock:
+            baseline = self._baseline
+        if baseline is not None:
+            stats = snapshot.compare_to(baseline, group_by)
+        else:
+            stats = snapshot.statistics(group_by)
+        sites = []
+        for stat in stats[:limit]:
+            sites.append({
+                'site': [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback],
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count,
+                'size_diff_kb': round(getattr(stat, 'size_diff', stat.size) / 1024, 1),
+                'count_diff': getattr(stat, 'count_diff', stat.count),
+            })
+        return {**self.status(), 'group_by': group_by, 'sites': sites}
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+
+# グローバルインスタンス
+profiler = Profiler()
+allocation_tracker = AllocationTracker()
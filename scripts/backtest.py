@@ -0,0 +1,86 @@
+"""評価スコアのバックテストを実行するCLI
+
+使用例:
+    python scripts/backtest.py --symbols AAPL MSFT 7203.T --period 5y
+    python scripts/backtest.py --sweep --rsi-periods 9 14 21 --entry-scores 60 70 --exit-scores 40 50
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtester import Backtester
+from config import (
+    RSI_PERIOD, MA_SHORT, MA_LONG,
+    BACKTEST_ENTRY_SCORE, BACKTEST_EXIT_SCORE, BACKTEST_COST_BPS, BACKTEST_MAX_WORKERS
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='評価スコアの売買ルールをバックテストします')
+    parser.add_argument('--symbols', nargs='*', help='対象銘柄（省略時は追跡中の全銘柄）')
+    parser.add_argument('--period', default='5y', help='取得期間（例: 1y, 5y, max）')
+    parser.add_argument('--entry-score', type=float, default=BACKTEST_ENTRY_SCORE)
+    parser.add_argument('--exit-score', type=float, default=BACKTEST_EXIT_SCORE)
+    parser.add_argument('--cost-bps', type=float, default=BACKTEST_COST_BPS)
+    parser.add_argument('--lookback', type=int, default=None, help='価格範囲・ボラティリティの参照バー数')
+    parser.add_argument('--sweep', action='store_true', help='パラメータスイープを実行')
+    parser.add_argument('--rsi-periods', type=int, nargs='+', default=[RSI_PERIOD])
+    parser.add_argument('--ma-shorts', type=int, nargs='+', default=[MA_SHORT])
+    parser.add_argument('--ma-longs', type=int, nargs='+', default=[MA_LONG])
+    parser.add_argument('--entry-scores', type=float, nargs='+', default=[BACKTEST_ENTRY_SCORE])
+    parser.add_argument('--exit-scores', type=float, nargs='+', default=[BACKTEST_EXIT_SCORE])
+    parser.add_argument('--workers', type=int, default=BACKTEST_MAX_WORKERS, help='ワーカープロセス数（0 はCPU数）')
+    parser.add_argument('--top', type=int, default=10, help='スイープ結果の表示件数')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        from database import db
+        symbols = [stock['symbol'] for stock in db.get_tracked_stocks()]
+    if not symbols:
+        logger.error("No symbols to backtest")
+        return
+
+    closes = Backtester.load_closes(symbols, period=args.period)
+    if closes.empty:
+        logger.error("No price data available")
+        return
+    logger.info(f"Loaded {closes.shape[0]} bars x {closes.shape[1]} symbols")
+
+    if args.sweep:
+        grid = {
+            'rsi_period': args.rsi_periods,
+            'ma_short': args.ma_shorts,
+            'ma_long': args.ma_longs,
+            'entry_score': args.entry_scores,
+            'exit_score': args.exit_scores,
+        }
+        results = Backtester.sweep(
+            closes, grid, max_workers=args.workers,
+            cost_bps=args.cost_bps, lookback=args.lookback
+        )
+        print(json.dumps(results[:args.top], indent=2, ensure_ascii=False))
+    else:
+        result = Backtester.run(
+            closes,
+            entry_score=args.entry_score,
+            exit_score=args.exit_score,
+            cost_bps=args.cost_bps,
+            lookback=args.lookback
+        )
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
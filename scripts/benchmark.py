@@ -0,0 +1,64 @@
+"""分析・シリアライズ・データベースのベンチマークを実行するCLI
+
+使用例:
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --profile full --output bench-full.json
+    python scripts/benchmark.py --only analyze dashboard --compare bench.json --threshold 0.25
+
+--compare を指定すると、中央値が基準のレポートより threshold（割合）以上遅くなった項目を表示し、
+該当があれば終了コード 1 で終了します（デプロイ前のチェック用）。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import BenchmarkSuite, BENCHMARK_SIZES, BENCHMARK_NAMES
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='合成データで主要な処理の所要時間を計測します')
+    parser.add_argument('--profile', choices=list(BENCHMARK_SIZES), default='quick', help='計測する規模')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARK_NAMES, help='実行するベンチマーク')
+    parser.add_argument('--repeat', type=int, default=5, help='各項目の繰り返し回数')
+    parser.add_argument('--output', help='レポートの保存先（省略時は標準出力）')
+    parser.add_argument('--compare', help='比較する基準のレポート')
+    parser.add_argument('--threshold', type=float, default=0.2, help='遅くなったとみなす割合')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # 計測中のデータベース操作のログを抑える
+    logging.getLogger('database').setLevel(logging.WARNING)
+
+    report = BenchmarkSuite(profile=args.profile, repeat=args.repeat, names=args.only).run()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Report saved to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = BenchmarkSuite.compare(baseline, report, args.threshold)
+        for item in regressions:
+            logger.warning(
+                f"Regression: {item['name']} {item['params']} "
+                f"{item['baseline_ms']:.2f}ms -> {item['current_ms']:.2f}ms (x{item['ratio']})"
+            )
+        if regressions:
+            sys.exit(1)
+        logger.info(f"No regressions against {args.compare} (commit {baseline.get('commit')})")
+
+
+if __name__ == "__main__":
+    main()
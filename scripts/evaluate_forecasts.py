@@ -0,0 +1,68 @@
+"""予測エンジンの精度をローリングオリジン方式で評価するCLI
+
+使用例:
+    python scripts/evaluate_forecasts.py
+    python scripts/evaluate_forecasts.py --engines drift holt_winters linear --horizons 1 5 20 --cutoffs 12
+    python scripts/evaluate_forecasts.py --symbols AAPL 7203.T --backfill
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast_evaluation import ForecastEvaluator
+from stock_predictor import StockPredictor
+from config import (
+    PREDICTION_EVAL_HORIZONS, PREDICTION_EVAL_CUTOFFS, PREDICTION_EVAL_MIN_TRAIN,
+    PREDICTION_EVAL_HISTORY_DAYS, PREDICTION_BATCH_WORKERS
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='予測エンジンの精度と学習時間を比較します')
+    parser.add_argument('--symbols', nargs='*', help='対象銘柄（省略時は追跡中の全銘柄）')
+    parser.add_argument('--engines', nargs='+', choices=StockPredictor.ENGINES, default=list(StockPredictor.ENGINES))
+    parser.add_argument('--horizons', type=int, nargs='+', default=PREDICTION_EVAL_HORIZONS, help='評価する予測日数')
+    parser.add_argument('--cutoffs', type=int, default=PREDICTION_EVAL_CUTOFFS, help='銘柄ごとの基準日の数')
+    parser.add_argument('--min-train', type=int, default=PREDICTION_EVAL_MIN_TRAIN, help='最小学習バー数')
+    parser.add_argument('--days', type=int, default=PREDICTION_EVAL_HISTORY_DAYS, help='使用する履歴の日数')
+    parser.add_argument('--workers', type=int, default=PREDICTION_BATCH_WORKERS, help='ワーカープロセス数（0 はCPU数）')
+    parser.add_argument('--backfill', action='store_true', help='評価前に履歴をダウンロードして保存する')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from database import db
+    db.init_app()
+
+    symbols = args.symbols or [stock['symbol'] for stock in db.get_tracked_stocks()]
+    if not symbols:
+        logger.error("No symbols to evaluate")
+        return
+
+    if args.backfill:
+        from services.portfolio_service import PortfolioService
+        PortfolioService.backfill_history(symbols, days=args.days)
+
+    result = ForecastEvaluator.run(
+        symbols=symbols,
+        engines=args.engines,
+        horizons=args.horizons,
+        n_cutoffs=args.cutoffs,
+        min_train=args.min_train,
+        days=args.days,
+        max_workers=args.workers
+    )
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""追跡銘柄の予測を一括で事前計算するCLI
+
+使用例:
+    python scripts/forecast_batch.py
+    python scripts/forecast_batch.py --engine holt_winters --symbols AAPL 7203.T
+    python scripts/forecast_batch.py --run-date 2026-01-05   # 中断したバッチを再開
+
+cron などから市場終了後に実行することを想定しています。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast_batch import ForecastBatchRunner
+from stock_predictor import StockPredictor
+from config import PREDICTION_ENGINE, PREDICTION_BATCH_PERIODS, PREDICTION_BATCH_WORKERS, PREDICTION_BATCH_CHUNK_SIZE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='追跡銘柄の予測を一括で計算して保存します')
+    parser.add_argument('--symbols', nargs='*', help='対象銘柄（省略時は追跡中の全銘柄）')
+    parser.add_argument('--engine', default=PREDICTION_ENGINE, choices=StockPredictor.ENGINES)
+    parser.add_argument('--periods', type=int, default=PREDICTION_BATCH_PERIODS, help='予測する日数')
+    parser.add_argument('--workers', type=int, default=PREDICTION_BATCH_WORKERS, help='ワーカープロセス数（0 はCPU数）')
+    parser.add_argument('--chunk-size', type=int, default=PREDICTION_BATCH_CHUNK_SIZE, help='履歴を一括ダウンロードする銘柄数')
+    parser.add_argument('--run-date', default=None, help='実行日（YYYY-MM-DD、省略時は本日）')
+    parser.add_argument('--no-resume', action='store_true', help='完了済みの銘柄も再計算する')
+    return parser.parse_args()
+
+
+def report_progress(state):
+    finished = state['done'] + state['failed']
+    pending = state['total'] - state['skipped']
+    logger.info(f"[{finished}/{pending}] done={state['done']} failed={state['failed']}")
+
+
+def main():
+    args = parse_args()
+
+    from database import db
+    db.init_app()
+
+    state = ForecastBatchRunner.run(
+        symbols=args.symbols or None,
+        engine=args.engine,
+        periods=args.periods,
+        max_workers=args.workers,
+        run_date=args.run_date,
+        resume=not args.no_resume,
+        chunk_size=args.chunk_size,
+        progress=report_progress
+    )
+    print(json.dumps(state, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
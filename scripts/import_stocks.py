@@ -0,0 +1,65 @@
+"""銘柄リスト（CSV / JSON）を一括でインポートするCLI
+
+使用例:
+    python scripts/import_stocks.py watchlist.csv
+    python scripts/import_stocks.py watchlist.json
+    cat symbols.txt | python scripts/import_stocks.py - --no-enrich
+
+銘柄はまとめて登録し、銘柄名や価格はバッチごとにレート制限の範囲で取得します。
+取得に失敗した銘柄は銘柄情報取得キューに残り、サーバーのワーカーが再試行します。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stock_import import StockImporter, stock_imports
+from exceptions import StockTrackingError
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='銘柄リストを一括で登録します')
+    parser.add_argument('path', help='CSV / JSON ファイル（- の場合は標準入力）')
+    parser.add_argument('--format', choices=['csv', 'json'], help='ファイル形式（省略時は拡張子から判定）')
+    parser.add_argument('--no-enrich', action='store_true', help='銘柄情報を取得せずに登録だけ行う')
+    return parser.parse_args()
+
+
+def report_progress(job):
+    logger.info(f"[{job['added'] - job['pending']}/{job['added']}] enriched={job['enriched']} failed={job['failed']}")
+
+
+def main():
+    args = parse_args()
+
+    if args.path == '-':
+        content = sys.stdin.read()
+    else:
+        with open(args.path, encoding='utf-8-sig') as f:
+            content = f.read()
+    content_format = args.format or ('json' if args.path.lower().endswith('.json') else 'csv')
+
+    from database import db
+    db.init_app()
+
+    try:
+        job = stock_imports.start(
+            StockImporter.parse(content, content_format),
+            enrich=not args.no_enrich,
+            background=False,
+            progress=report_progress
+        )
+    except StockTrackingError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    print(json.dumps(job, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""上流データの記録ファイル（capture.mode = record で作成）の内容を表示するCLI
+
+使用例:
+    python scripts/inspect_capture.py captures/upstream.jsonl.gz
+    python scripts/inspect_capture.py captures/upstream.jsonl.gz --records --symbol 7203.T
+
+既定では銘柄・種類ごとの件数・エラー数・平均所要時間を表示し、--records では応答本体を除いた記録を順に表示します。
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from upstream_capture import read_records, summarize
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='上流データの記録ファイルの内容を表示します')
+    parser.add_argument('path', help='記録ファイル')
+    parser.add_argument('--records', action='store_true', help='記録を1件ずつ表示')
+    parser.add_argument('--symbol', help='表示する銘柄')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.path):
+        print(f"記録ファイルが見つかりません: {args.path}")
+        sys.exit(1)
+
+    if args.records:
+        for record in read_records(args.path):
+            if args.symbol and record['symbol'] != args.symbol:
+                continue
+            record.pop('payload', None)
+            print(json.dumps(record, ensure_ascii=False))
+        return
+
+    rows = [row for row in summarize(args.path) if not args.symbol or row['symbol'] == args.symbol]
+    print(f"{'symbol':<20} {'kind':<10} {'count':>6} {'errors':>6} {'latency_ms':>11}")
+    for row in rows:
+        print(f"{row['symbol']:<20} {row['kind']:<10} {row['count']:>6} {row['errors']:>6} {row['mean_latency_ms']:>11.1f}")
+    print(f"{len(rows)} 件（合計 {sum(row['count'] for row in rows)} 回の呼び出し）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""追跡銘柄をシャードに分けて価格キャッシュを更新するワーカーのCLI
+
+使用例:
+    python scripts/refresh_worker.py
+    python scripts/refresh_worker.py --metrics-port 9101
+    python scripts/refresh_worker.py --once --shards 4
+
+同じデータベースを参照できるホストで複数起動すると、シャードを分担して更新します。
+SIGTERM / Ctrl+C で停止すると担当シャードを解放し、他のワーカーがすぐに引き継ぎます。
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shard_refresh import ShardedRefresher
+from metrics import metrics
+from config import (
+    REFRESH_SHARDS, REFRESH_SHARD_INTERVAL_SECONDS, REFRESH_SHARD_LEASE_SECONDS,
+    REFRESH_SHARD_BATCH_SIZE, REFRESH_SHARD_PERIOD
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='追跡銘柄をシャードに分けて価格キャッシュを更新します')
+    parser.add_argument('--shards', type=int, default=REFRESH_SHARDS, help='シャード数（全ワーカーで同じ値にする）')
+    parser.add_argument('--interval', type=float, default=REFRESH_SHARD_INTERVAL_SECONDS, help='担当シャードを確認する間隔（秒）')
+    parser.add_argument('--lease', type=float, default=REFRESH_SHARD_LEASE_SECONDS, help='シャードのリースの有効期間（秒）')
+    parser.add_argument('--batch-size', type=int, default=REFRESH_SHARD_BATCH_SIZE, help='一括ダウンロードする銘柄数')
+    parser.add_argument('--period', default=REFRESH_SHARD_PERIOD, help='取得する履歴の期間')
+    parser.add_argument('--once', action='store_true', help='1回だけ更新して終了')
+    parser.add_argument('--metrics-port', type=int, default=0, help='メトリクスを公開するポート（0 は公開しない）')
+    return parser.parse_args()
+
+
+def serve_metrics(port: int):
+    """このワーカーのメトリクスを Prometheus のテキスト形式で公開"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='refresh-worker-metrics', daemon=True).start()
+    logger.info(f"Metrics on http://0.0.0.0:{port}/metrics")
+
+
+def main():
+    args = parse_args()
+
+    from database import db
+    db.init_app()
+
+    refresher = ShardedRefresher(
+        shards=args.shards,
+        interval_seconds=args.interval,
+        lease_seconds=args.lease,
+        batch_size=args.batch_size,
+        period=args.period
+    )
+
+    if args.once:
+        try:
+            results = refresher.run_once()
+        finally:
+            refresher.release()
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: refresher.stop())
+    refresher.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""ローカルの代替サーバーに接続したアプリに負荷をかけるCLI（Yahoo Finance には接続しません）
+
+使用例:
+    python scripts/run_loadtest.py --users 20 --duration 60
+    python scripts/run_loadtest.py --mix dashboard=0.7 detail=0.2 prediction=0.1 --latency-ms 150 --jitter-ms 100
+    python scripts/run_loadtest.py --rate-limit-rate 0.05 --failure-rate 0.01 --output load.json
+    python scripts/run_loadtest.py --max-error-rate 0.01 --max-p95-ms 500
+    python scripts/run_loadtest.py --replay captures/upstream.jsonl.gz --replay-speed 1
+
+app.py を一時ディレクトリで起動し、データベースは毎回空の状態から始めます。
+--replay を指定すると代替サーバーの代わりに記録した上流データを再生します（同じデータで性能を比較する場合）。
+--max-error-rate / --max-p95-ms を指定すると、超えたシナリオがあれば終了コード 1 で終了します。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add the project root to sys.path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_yahoo import FakeYahooServer
+from loadtest import AppServer, LoadTest, DEFAULT_MIX, DEFAULT_SYMBOLS, SCENARIOS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_mix(items):
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"不明なシナリオです: {name}（{', '.join(SCENARIOS)}）")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='代替サーバーを使ってAPIの負荷試験を行います')
+    parser.add_argument('--users', type=int, default=10, help='同時利用者数')
+    parser.add_argument('--duration', type=float, default=30, help='負荷をかける秒数')
+    parser.add_argument('--ramp-up', type=float, default=0, help='全利用者が開始するまでの秒数')
+    parser.add_argument('--think-time', type=float, default=0, help='利用者ごとのリクエスト間の待機秒数')
+    parser.add_argument('--mix', nargs='+', metavar='NAME=WEIGHT',
+                        default=[f'{name}={weight}' for name, weight in DEFAULT_MIX.items()],
+                        help=f"シナリオの比率（{', '.join(SCENARIOS)}）")
+    parser.add_argument('--symbols', nargs='+', default=list(DEFAULT_SYMBOLS), help='登録する銘柄')
+    parser.add_argument('--seed', type=int, default=0, help='乱数の種')
+    parser.add_argument('--latency-ms', type=float, default=50, help='代替サーバーの応答遅延（ミリ秒）')
+    parser.add_argument('--jitter-ms', type=float, default=50, help='応答遅延に加えるばらつきの最大値（ミリ秒）')
+    parser.add_argument('--rate-limit-rate', type=float, default=0, help='429 を返す確率')
+    parser.add_argument('--failure-rate', type=float, default=0, help='500 を返す確率')
+    parser.add_argument('--request-delay', type=float, default=None,
+                        help='ダッシュボードの取得間隔（api.dashboard_request_delay、省略時は設定の既定値）')
+    parser.add_argument('--replay', help='再生する上流データの記録ファイル（capture.path）')
+    parser.add_argument('--replay-speed', type=float, default=0, help='再生時の速さ（0 は待たない、1 は記録時と同じ）')
+    parser.add_argument('--output', help='レポートの保存先（省略時は標準出力）')
+    parser.add_argument('--max-error-rate', type=float, help='シナリオごとのエラー率の上限')
+    parser.add_argument('--max-p95-ms', type=float, help='シナリオごとの p95 の上限（ミリ秒）')
+    args = parser.parse_args()
+    try:
+        args.mix = parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    return args
+
+
+def main():
+    args = parse_args()
+    config = {'api': {'dashboard_request_delay': args.request_delay}} if args.request_delay is not None else {}
+    if args.replay:
+        config['capture'] = {'mode': 'replay', 'path': os.path.abspath(args.replay), 'replay_speed': args.replay_speed}
+
+    with FakeYahooServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit_rate=args.rate_limit_rate,
+                         failure_rate=args.failure_rate, seed=args.seed) as upstream:
+        with AppServer(upstream.base_url, config=config) as app:
+            test = LoadTest(app.base_url, symbols=args.symbols, users=args.users, duration=args.duration,
+                            ramp_up=args.ramp_up, think_time=args.think_time, mix=args.mix, seed=args.seed)
+            test.seed_symbols()
+            logger.info(f"Running {args.users} users for {args.duration:g}s against {app.base_url}")
+            report = test.run()
+        report['upstream'] = dict(upstream.counts)
+
+    for name, stats in {**report['endpoints'], 'total': report['total']}.items():
+        logger.info(
+            f"{name:<12} {stats['count']:>6} req {stats['rps']:>8.2f} req/s  "
+            f"p50 {stats['p50_ms'] or 0:>8.1f}ms  p95 {stats['p95_ms'] or 0:>8.1f}ms  "
+            f"p99 {stats['p99_ms'] or 0:>8.1f}ms  errors {stats['error_rate']:.2%}"
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Report saved to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    failures = LoadTest.check(report, args.max_error_rate, args.max_p95_ms)
+    for failure in failures:
+        logger.warning(f"Threshold exceeded: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
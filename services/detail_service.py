@@ -0,0 +1,185 @@
+"""銘柄詳細サービス層 - 詳細画面に必要なデータを1回の取得からまとめて構築"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+import pandas as pd
+from database import db
+from stock_api import StockAPI, get_stock_price_with_fallback
+from stock_analyzer import StockAnalyzer
+from tracing import bind
+from symbol_utils import SymbolUtils, normalize_symbol, get_currency
+from config import CACHE_MINUTES, PREDICTION_HISTORY_PERIOD, PREDICTION_ENGINE, PREDICTION_BATCH_MAX_AGE_DAYS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 詳細APIで選択できる項目
+DETAIL_FIELDS = ('price', 'analysis', 'financials', 'dividends', 'prediction')
+DEFAULT_DETAIL_FIELDS = ('price', 'analysis')
+
+
+class DetailService:
+    """
+    銘柄詳細のビジネスロジック
+
+    履歴は1回だけ取得し（予測を含む場合は予測に必要な期間まで広げて取得して切り詰める）、
+    価格・分析・予測はその DataFrame から作る。ticker.info は価格と財務で共有し、
+    履歴・info・配当の取得は互いに独立なので並行して実行する。
+
+    価格は有効期限内の価格キャッシュがあればそれを使い、なければ get_stock_price_with_fallback で
+    銘柄ごとのリースの下で保存する（価格だけの場合は履歴の取得もリースの下で行う）。
+    """
+
+    @staticmethod
+    def analysis_response(symbol: str, hist: pd.DataFrame) -> Dict:
+        """履歴から分析評価のレスポンスを構築"""
+        currency = get_currency(symbol)
+        return {
+            'symbol': symbol,
+            'currency': currency,
+            'currency_symbol': SymbolUtils.get_currency_symbol(currency),
+            'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            **StockAnalyzer.analyze(hist)
+        }
+
+    @staticmethod
+    def get_detail(
+        symbol: str,
+        period: str = '3mo',
+        fields: Iterable[str] = DEFAULT_DETAIL_FIELDS,
+        history_format: str = 'rows',
+        periods: int = 30,
+        engine: str = PREDICTION_ENGINE
+    ) -> Tuple[Dict, int]:
+        """
+        銘柄詳細を取得
+
+        Args:
+            symbol: 銘柄コード
+            period: 価格・分析に使う期間
+            fields: 取得する項目（DETAIL_FIELDS のいずれか）
+            history_format: 価格の履歴データの形式
+            periods: 予測する日数
+            engine: 予測エンジン
+
+        Returns:
+            Tuple[Dict, int]: (レスポンスデータ, HTTPステータスコード)
+            取得に失敗した項目は errors に理由を入れ、他の項目は返す。
+        """
+        symbol = normalize_symbol(symbol)
+        fields = [f for f in DETAIL_FIELDS if f in set(fields)]
+        cached_price = db.get_cached_price(symbol, CACHE_MINUTES) if 'price' in fields else None
+        need_history = bool({'analysis', 'prediction'} & set(fields))
+        need_info = 'financials' in fields or ('price' in fields and need_history and not cached_price)
+        fetch_period = StockAPI.longer_period(period, PREDICTION_HISTORY_PERIOD) if 'prediction' in fields else period
+
+        tasks = {}
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            if need_history:
+                tasks['history'] = executor.submit(bind(StockAPI.fetch_history), symbol, fetch_period)
+            if need_info:
+                tasks['info'] = executor.submit(bind(StockAPI.fetch_info), symbol)
+            if 'dividends' in fields:
+                tasks['dividends'] = executor.submit(bind(StockAPI.fetch_dividends), symbol)
+
+        fetched, errors = {}, {}
+        for name, future in tasks.items():
+            try:
+                fetched[name] = future.result()
+            except Exception as e:
+                logger.warning(f"Error fetching {name} for {symbol}: {e}")
+                errors[name] = str(e)
+
+        full_hist = fetched.get('history')
+        if full_hist is not None and full_hist.empty:
+            full_hist = None
+        hist = StockAPI.trim_history(full_hist, period)
+        raw_info = fetched.get('info')
+        info = StockAPI.summarize_info(symbol, raw_info) if raw_info is not None else None
+
+        response = {'symbol': symbol, 'period': period, 'fields': fields}
+        builders = {
+            'price': lambda: DetailService._price(
+                symbol, period, hist, info, cached_price, history_format, errors.get('history')
+            ),
+            'analysis': lambda: DetailService.analysis_response(symbol, hist) if hist is not None else None,
+            'financials': lambda: StockAPI.format_financials(symbol, raw_info) if raw_info is not None else None,
+            'dividends': lambda: (
+                StockAPI.format_dividends(symbol, fetched['dividends']) if 'dividends' in fetched else None
+            ),
+            'prediction': lambda: DetailService._prediction(symbol, full_hist, periods, engine),
+        }
+        failures = {}
+        for field in fields:
+            try:
+                value = builders[field]()
+            except Exception as e:
+                logger.error(f"Error building {field} for {symbol}: {e}")
+                value, failures[field] = None, str(e)
+            if value is None:
+                failures.setdefault(field, 'データが見つかりません')
+            response[field] = value
+
+        if failures:
+            response['errors'] = failures
+        if fields and len(failures) == len(fields):
+            return {'error': 'データが見つかりません', 'errors': failures}, 404
+        return response, 200
+
+    @staticmethod
+    def _price(
+        symbol: str, period: str, hist: Optional[pd.DataFrame], info: Optional[Dict], cached_price: Optional[Dict],
+        history_format: str, error: Optional[str]
+    ) -> Optional[Dict]:
+        """価格を構築（有効なキャッシュを優先し、取得済みの履歴は銘柄ごとのリースの下で保存する）"""
+        if cached_price:
+            return StockAPI.build_cached_response(
+                symbol, cached_price, db.get_cached_history(symbol, StockAPI.days_for_period(period)),
+                'キャッシュされたデータを使用しています', history_format
+            )
+        if hist is not None or not error:
+            return get_stock_price_with_fallback(symbol, period, history_format=history_format, hist=hist, info=info)
+
+        # 共有の履歴の取得に失敗した場合は、もう一度問い合わせずに保存済みのデータを使う
+        cached_history = db.get_cached_history(symbol)
+        if cached_history:
+            return StockAPI.build_history_response(
+                symbol, cached_history, '保存された履歴データを使用しています', history_format
+            )
+        return None
+
+    @staticmethod
+    def _prediction(symbol: str, hist: Optional[pd.DataFrame], periods: int, engine: str) -> Optional[Dict]:
+        """
+        予測を取得
+
+        予測バッチの結果があればそれを使い、軽量エンジンは共有の履歴から計算する。
+        Prophet は予測ジョブを登録して状態だけを返す（結果は /api/prediction/jobs/<job_id> で取得）。
+        """
+        from stock_predictor import StockPredictor
+        from prediction_jobs import prediction_jobs
+
+        if engine not in StockPredictor.ENGINES:
+            raise ValueError(f'不明な予測エンジンです: {engine}')
+
+        since = (datetime.now() - timedelta(days=PREDICTION_BATCH_MAX_AGE_DAYS)).strftime('%Y-%m-%d')
+        precomputed = db.get_latest_forecast_result(symbol, engine, periods, since)
+        if precomputed:
+            return {**precomputed['result'], 'precomputed': True, 'as_of': precomputed['as_of']}
+
+        if engine != 'prophet':
+            if hist is None:
+                return None
+            if len(hist) < 30:
+                raise ValueError('データ不足のため予測できません')
+            hist = StockAPI.trim_history(hist, PREDICTION_HISTORY_PERIOD)
+            return StockPredictor(engine=engine).predict(hist, periods=periods, symbol=symbol)
+
+        # 取得済みの履歴をジョブに渡し、ワーカープロセスで再取得しない
+        shared_hist = StockAPI.trim_history(hist, PREDICTION_HISTORY_PERIOD) if hist is not None else None
+        job = prediction_jobs.submit(symbol, periods, hist=shared_hist)
+        if job['status'] == 'done':
+            return job['result']
+        if job['status'] == 'error':
+            raise ValueError(job['error'])
+        return {'job_id': job['id'], 'status': job['status'], 'periods': periods}
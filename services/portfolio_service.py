@@ -0,0 +1,209 @@
+"""ポートフォリオサービス層 - 保有銘柄の集計・リスク分析"""
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from database import db
+from stock_api import StockAPI
+from portfolio_risk import PortfolioRisk
+from fx_rates import fx_store
+from symbol_utils import SymbolUtils, get_currency
+from config import (
+    RISK_HISTORY_DAYS, RISK_SIMULATIONS, RISK_MAX_SIMULATIONS,
+    RISK_HORIZON_DAYS, RISK_CONFIDENCE_LEVELS,
+    FX_BASE_CURRENCY, FX_HISTORY_DAYS
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioService:
+    """ポートフォリオ関連のビジネスロジック"""
+
+    @staticmethod
+    def get_positions() -> List[Dict]:
+        """数量が設定されている保有銘柄を取得"""
+        return [stock for stock in db.get_tracked_stocks() if stock['quantity'] > 0]
+
+    @staticmethod
+    def _to_records(frame: pd.DataFrame) -> List[Dict]:
+        """DataFrameをJSON化可能なレコードに変換（NaN は None）"""
+        return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+    @staticmethod
+    def get_portfolio(base_currency: str = FX_BASE_CURRENCY, history_days: int = FX_HISTORY_DAYS) -> Tuple[Dict, int]:
+        """
+        保有銘柄を基準通貨建てで評価
+
+        Args:
+            base_currency: 基準通貨（例: 'JPY', 'USD'）
+            history_days: 評価額推移の日数（0 の場合は推移を返さない）
+
+        Returns:
+            Tuple[Dict, int]: (レスポンスデータ, HTTPステータスコード)
+        """
+        base_currency = base_currency.upper()
+        if base_currency not in SymbolUtils.CURRENCY_SYMBOLS:
+            return {'error': f'未対応の通貨です: {base_currency}'}, 400
+
+        response = {
+            'base_currency': base_currency,
+            'currency_symbol': SymbolUtils.get_currency_symbol(base_currency),
+            'total_value': 0.0,
+            'total_cost': 0.0,
+            'unrealized_pnl': 0.0,
+            'unrealized_pnl_percent': 0.0,
+            'positions': [],
+            'by_currency': [],
+            'rates': {},
+            'unpriced_symbols': [],
+        }
+
+        positions = PortfolioService.get_positions()
+        if not positions:
+            return response, 200
+
+        frame = pd.DataFrame(positions, columns=['symbol', 'name', 'quantity', 'avg_price'])
+        frame['currency'] = frame['symbol'].map(get_currency)
+        frame['price'] = frame['symbol'].map(db.get_latest_prices(frame['symbol'].tolist()))
+
+        factors = fx_store.conversion_factors(frame['currency'].unique(), base_currency)
+        frame['fx_rate'] = frame['currency'].map(factors)
+
+        frame['value_local'] = frame['quantity'] * frame['price']
+        frame['value'] = frame['value_local'] * frame['fx_rate']
+        frame['cost'] = frame['quantity'] * frame['avg_price'] * frame['fx_rate']
+        frame['pnl'] = frame['value'] - frame['cost']
+        frame['pnl_percent'] = frame['pnl'] / frame['cost'].where(frame['cost'] > 0) * 100
+
+        total_value = float(frame['value'].sum())
+        total_cost = float(frame['cost'].where(frame['value'].notna()).sum())
+        frame['weight'] = frame['value'] / total_value * 100 if total_value else 0.0
+
+        by_currency = frame.groupby('currency', as_index=False)[['value_local', 'value']].sum()
+        by_currency['weight'] = by_currency['value'] / total_value * 100 if total_value else 0.0
+
+        response.update({
+            'total_value': total_value,
+            'total_cost': total_cost,
+            'unrealized_pnl': total_value - total_cost,
+            'unrealized_pnl_percent': (total_value - total_cost) / total_cost * 100 if total_cost else 0.0,
+            'positions': PortfolioService._to_records(frame),
+            'by_currency': PortfolioService._to_records(by_currency),
+            'rates': factors,
+            'unpriced_symbols': frame.loc[frame['value'].isna(), 'symbol'].tolist(),
+        })
+
+        if history_days > 0:
+            response['history'] = PortfolioService.get_value_history(frame, base_currency, history_days)
+
+        return response, 200
+
+    @staticmethod
+    def get_value_history(frame: pd.DataFrame, base_currency: str, days: int) -> Dict:
+        """保有数量 × 終値 × 為替レート で基準通貨建ての評価額推移を計算"""
+        closes = PortfolioRisk.build_price_matrix(db.get_closes(frame['symbol'].tolist(), days))
+        if closes.empty:
+            return {'dates': [], 'values': []}
+
+        currencies = frame.set_index('symbol')['currency']
+        rates = fx_store.get_rate_history(currencies.unique().tolist() + [base_currency], days)
+        rates = rates.reindex(rates.index.union(closes.index)).ffill().bfill().reindex(closes.index)
+        if base_currency not in rates:
+            return {'dates': [], 'values': []}
+
+        # 通貨ごとの換算係数を銘柄列に展開
+        factors = rates.rdiv(rates[base_currency], axis=0)
+        symbol_factors = factors.reindex(columns=currencies.reindex(closes.columns).tolist())
+        symbol_factors.columns = closes.columns
+
+        quantities = frame.set_index('symbol')['quantity'].reindex(closes.columns)
+        values = (closes.ffill() * quantities * symbol_factors).sum(axis=1, min_count=1).dropna()
+
+        return {
+            'dates': values.index.strftime('%Y-%m-%d').tolist(),
+            'values': values.round(2).tolist(),
+        }
+
+    @staticmethod
+    def backfill_history(symbols: List[str], days: int = RISK_HISTORY_DAYS) -> int:
+        """
+        リスク計算用の履歴を一括ダウンロードしてデータベースに保存
+
+        Returns:
+            int: 保存した銘柄数
+        """
+        histories = StockAPI.get_multiple_stocks_history(symbols, period=StockAPI.period_for_days(days))
+        saved = 0
+        for symbol, hist in histories.items():
+            hist = hist.dropna(subset=['Close']) if hist is not None else None
+            if hist is None or hist.empty:
+                continue
+            history_data = StockAPI.format_history_data(hist.fillna(0))
+            db.save_price_history(symbol, history_data, days=len(history_data))
+            saved += 1
+        logger.info(f"Backfilled history for {saved}/{len(symbols)} symbols")
+        return saved
+
+    @staticmethod
+    def get_risk(
+        days: int = RISK_HISTORY_DAYS,
+        simulations: int = RISK_SIMULATIONS,
+        horizon_days: int = RISK_HORIZON_DAYS,
+        method: str = 'normal',
+        confidence_levels: Optional[List[float]] = None,
+        seed: Optional[int] = None,
+        backfill: bool = False,
+        include_matrix: bool = True,
+        base_currency: str = FX_BASE_CURRENCY
+    ) -> Tuple[Dict, int]:
+        """
+        保有銘柄のリスク分析を実行（評価額は基準通貨に換算）
+
+        Returns:
+            Tuple[Dict, int]: (レスポンスデータ, HTTPステータスコード)
+        """
+        if method not in ('normal', 'historical'):
+            return {'error': 'method は normal または historical を指定してください'}, 400
+        if not 0 <= simulations <= RISK_MAX_SIMULATIONS:
+            return {'error': f'simulations は 0〜{RISK_MAX_SIMULATIONS} の範囲で指定してください'}, 400
+        if horizon_days < 1:
+            return {'error': 'horizon は1以上で指定してください'}, 400
+        confidence_levels = confidence_levels or RISK_CONFIDENCE_LEVELS
+        if any(not 0 < c < 1 for c in confidence_levels):
+            return {'error': 'confidence は 0〜1 の範囲で指定してください'}, 400
+        if base_currency.upper() not in SymbolUtils.CURRENCY_SYMBOLS:
+            return {'error': f'未対応の通貨です: {base_currency}'}, 400
+
+        positions = PortfolioService.get_positions()
+        if not positions:
+            return {'error': '数量が設定された保有銘柄がありません'}, 404
+
+        symbols = [p['symbol'] for p in positions]
+        if backfill:
+            PortfolioService.backfill_history(symbols, days)
+
+        prices = PortfolioRisk.build_price_matrix(db.get_closes(symbols, days))
+        if prices.empty:
+            return {'error': 'リスク計算に必要な履歴データがありません'}, 404
+
+        base_currency = base_currency.upper()
+        latest = prices.ffill().iloc[-1]
+        factors = fx_store.conversion_factors({get_currency(s) for s in symbols}, base_currency)
+        values = {
+            p['symbol']: p['quantity'] * float(latest[p['symbol']]) * factors[get_currency(p['symbol'])]
+            for p in positions
+            if p['symbol'] in latest.index and get_currency(p['symbol']) in factors
+        }
+
+        result = PortfolioRisk.analyze(
+            prices, values,
+            simulations=simulations,
+            horizon_days=horizon_days,
+            confidence_levels=confidence_levels,
+            method=method,
+            seed=seed,
+            include_matrix=include_matrix
+        )
+        result['base_currency'] = base_currency
+        result['missing_symbols'] = [s for s in symbols if s not in values]
+        return result, 200
@@ -2,9 +2,9 @@
 from typing import Dict, List, Optional, Tuple
 from database import db
 from stock_api import StockAPI, get_stock_price_with_fallback
-from symbol_utils import normalize_symbol
-from config import MAX_RETRIES, RETRY_DELAY, DASHBOARD_REQUEST_DELAY
-import time
+from enrichment_queue import enrichment_worker
+from symbol_utils import SymbolUtils, normalize_symbol
+from config import DASHBOARD_REQUEST_DELAY
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,13 +14,15 @@ class StockService:
     """株価関連のビジネスロジック"""
     
     @staticmethod
-    def add_stock(raw_symbol: str, force_add: bool = False) -> Tuple[Dict, int]:
+    def add_stock(raw_symbol: str) -> Tuple[Dict, int]:
         """
         銘柄を追加
         
+        銘柄は既知の企業名（なければ銘柄コード）ですぐに登録し、
+        銘柄名や価格は銘柄情報取得キューでバックグラウンドに取得する。
+        
         Args:
             raw_symbol: 生の銘柄コード
-            force_add: レート制限時でも強制的に追加するか
         
         Returns:
             Tuple[Dict, int]: (レスポンスデータ, HTTPステータスコード)
@@ -30,69 +32,30 @@ class StockService:
         
         # シンボルを正規化（日本株対応）
         symbol = normalize_symbol(raw_symbol)
+        name = SymbolUtils.get_stock_info(symbol).get('known_name') or symbol
         
-        # リトライループ
-        for attempt in range(MAX_RETRIES):
-            try:
-                # 銘柄情報を取得
-                info = StockAPI.get_ticker_info(symbol)
-                name = info.get('name') if info else symbol
-                
-                # データベースに追加
-                if db.add_stock(symbol, name):
-                    return {
-                        'message': '銘柄を追加しました',
-                        'symbol': symbol,
-                        'name': name,
-                        'info_loaded': info is not None
-                    }, 201
-                else:
-                    return {'error': 'この銘柄は既に追加されています'}, 400
-                    
-            except Exception as e:
-                error_msg = str(e)
-                # レート制限エラーの場合
-                if 'rate limit' in error_msg.lower() or 'too many requests' in error_msg.lower():
-                    if force_add or attempt >= MAX_RETRIES - 1:
-                        # レート制限でも強制的に追加（シンボル名のみ）
-                        if db.add_stock(symbol, symbol):
-                            return {
-                                'message': '銘柄を追加しました（レート制限のため、詳細情報は後で取得されます）',
-                                'symbol': symbol,
-                                'name': symbol,
-                                'info_loaded': False,
-                                'warning': 'APIレート制限のため、詳細情報は後で更新されます'
-                            }, 201
-                        else:
-                            return {'error': 'この銘柄は既に追加されています'}, 400
-                    else:
-                        time.sleep(RETRY_DELAY * (attempt + 1))
-                        continue
-                else:
-                    # その他のエラー
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY)
-                        continue
-                    else:
-                        # エラーでもシンボル名で追加を試みる
-                        if db.add_stock(symbol, symbol):
-                            return {
-                                'message': '銘柄を追加しました（詳細情報の取得に失敗しました）',
-                                'symbol': symbol,
-                                'name': symbol,
-                                'info_loaded': False,
-                                'warning': f'詳細情報の取得に失敗: {error_msg}'
-                            }, 201
-                        else:
-                            return {'error': 'この銘柄は既に追加されています'}, 400
+        if not db.add_stock(symbol, name):
+            return {'error': 'この銘柄は既に追加されています'}, 400
         
-        return {'error': '銘柄の追加に失敗しました。しばらく待ってから再度お試しください。'}, 500
+        try:
+            enrichment_worker.enqueue([symbol])
+        except Exception as e:
+            logger.error(f"Failed to enqueue enrichment for {symbol}: {e}")
+        return {
+            'message': '銘柄を追加しました（詳細情報はバックグラウンドで取得されます）',
+            'symbol': symbol,
+            'name': name,
+            'info_loaded': False
+        }, 201
     
     @staticmethod
-    def get_dashboard_data() -> List[Dict]:
+    def get_dashboard_data(history_format: str = 'rows') -> List[Dict]:
         """
         ダッシュボードデータを取得
         
+        Args:
+            history_format: 履歴データの形式（rows / columns / packed）
+        
         Returns:
             List[Dict]: ダッシュボード用の銘柄データリスト（順序保持）
         """
@@ -104,7 +67,7 @@ class StockService:
         
         # 並列処理で一括取得
         # ダッシュボード表示時は少し遅延を入れてレート制限を回避
-        dashboard_data = StockAPI.fetch_stocks_data_parallel(symbols, delay=DASHBOARD_REQUEST_DELAY)
+        dashboard_data = StockAPI.fetch_stocks_data_parallel(symbols, delay=DASHBOARD_REQUEST_DELAY, history_format=history_format)
         
         # 取得結果には銘柄名が含まれていない場合があるため（エラー時など）、補完する
         stock_map = {stock['symbol']: stock['name'] for stock in stocks}
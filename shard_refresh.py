@@ -0,0 +1,264 @@
+"""シャード更新モジュール - 追跡銘柄をシャードに分け、複数のワーカーで価格キャッシュを更新"""
+import logging
+import math
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from database import db
+from leases import owner_id
+from metrics import REFRESH_SHARD_LAG, REFRESH_SHARD_PENDING, REFRESH_SHARDS_OWNED, REFRESH_SHARD_SYMBOLS
+from stock_api import StockAPI, save_price_data
+from symbol_utils import normalize_symbol
+from config import (
+    CACHE_MINUTES, REFRESH_SHARDS, REFRESH_SHARD_INTERVAL_SECONDS,
+    REFRESH_SHARD_LEASE_SECONDS, REFRESH_SHARD_BATCH_SIZE, REFRESH_SHARD_PERIOD
+)
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    """銘柄のシャード番号（プロセス・ホストが違っても同じ値になるよう crc32 を使う）"""
+    return zlib.crc32(symbol.upper().encode('utf-8')) % shards
+
+
+def shard_status(shards: int = REFRESH_SHARDS, cache_minutes: int = CACHE_MINUTES, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    シャードごとの担当ワーカーと遅れ
+
+    lag_seconds は最も古い価格キャッシュの経過秒数、pending は未取得または経過秒数が cache_minutes を超えた銘柄数。
+    """
+    now = now or datetime.now()
+    owners = {lease['name']: lease['owner'] for lease in db.get_leases('shard:', now=now)}
+    members: Dict[int, List[str]] = {shard: [] for shard in range(shards)}
+    for stock in db.get_tracked_stocks():
+        members[shard_of(stock['symbol'], shards)].append(stock['symbol'])
+    entries = db.get_price_cache_entries([symbol for symbols in members.values() for symbol in symbols])
+
+    status = []
+    for shard, symbols in members.items():
+        ages = [_age_seconds(entries.get(symbol.upper()), now) for symbol in symbols]
+        status.append({
+            'shard': shard,
+            'owner': owners.get(f'shard:{shard}'),
+            'symbols': len(symbols),
+            'pending': _count_pending(ages, cache_minutes),
+            'lag_seconds': _lag_seconds(ages),
+        })
+    return status
+
+
+def _age_seconds(entry: Optional[Dict], now: datetime) -> Optional[float]:
+    if not entry or not entry.get('cached_at'):
+        return None
+    return (now - datetime.fromisoformat(entry['cached_at'])).total_seconds()
+
+
+def _count_pending(ages: List[Optional[float]], cache_minutes: int) -> int:
+    return sum(1 for age in ages if age is None or age >= cache_minutes * 60)
+
+
+def _lag_seconds(ages: List[Optional[float]]) -> float:
+    return round(max((age for age in ages if age is not None), default=0.0), 1)
+
+
+class ShardedRefresher:
+    """
+    シャード単位の価格キャッシュ更新ワーカー
+
+    追跡銘柄を crc32 で shards 個のシャードに分け、各シャードを shard:N のリースで1つのワーカーに割り当てる。
+    ワーカーは refresh-worker:<owner> のリースを生存通知として延長し、生存しているワーカー数で割った
+    担当数（切り上げ）を超えたシャードは解放し、足りなければ空いているシャードを取得する。
+    ワーカーが終了するとそのリースは lease_seconds 後に失効し、残ったワーカーが引き継ぐ。
+
+    担当シャードでは、次の周回までに cache_minutes を超える銘柄だけを batch_size 件ずつ一括ダウンロードする。
+    同じデータベースを参照できれば、別のホストのワーカーも同じ方法で分担できる。
+    """
+
+    def __init__(
+        self,
+        shards: int = REFRESH_SHARDS,
+        interval_seconds: float = REFRESH_SHARD_INTERVAL_SECONDS,
+        lease_seconds: float = REFRESH_SHARD_LEASE_SECONDS,
+        batch_size: int = REFRESH_SHARD_BATCH_SIZE,
+        period: str = REFRESH_SHARD_PERIOD,
+        cache_minutes: int = CACHE_MINUTES,
+        owner: Optional[str] = None
+    ):
+        self.shards = shards
+        self.interval_seconds = interval_seconds
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.period = period
+        self.cache_minutes = cache_minutes
+        self.owner = owner or owner_id()
+        self.owned: Set[int] = set()
+        self._stop = threading.Event()
+
+    @property
+    def pass_seconds(self) -> float:
+        """周回の間隔（リースが失効する前に延長できるよう、リースの 1/3 以内にする）"""
+        return min(self.interval_seconds, self.lease_seconds / 3)
+
+    @property
+    def heartbeat_name(self) -> str:
+        return f'refresh-worker:{self.owner}'
+
+    def workers(self, now: Optional[datetime] = None) -> List[str]:
+        """生存しているワーカーの一覧"""
+        return [lease['owner'] for lease in db.get_leases('refresh-worker:', now=now)]
+
+    def balance(self, now: Optional[datetime] = None) -> List[int]:
+        """生存通知を延長し、担当シャードを延長・解放・取得して担当シャードの一覧を返す"""
+        db.acquire_lease(self.heartbeat_name, self.owner, self.lease_seconds, now=now)
+        target = math.ceil(self.shards / max(len(self.workers(now)), 1))
+
+        self.renew(now)
+        # 新しいワーカーが加わった場合は、担当数を超えた分を解放して引き渡す
+        for shard in sorted(self.owned, reverse=True)[:max(len(self.owned) - target, 0)]:
+            db.release_lease(f'shard:{shard}', self.owner)
+            self.owned.discard(shard)
+            self._clear_shard_metrics(shard)
+            logger.info(f"{self.owner} released shard {shard}")
+
+        # 取得の競合を減らすため、ワーカーごとに異なるシャードから探す
+        start = zlib.crc32(self.owner.encode('utf-8')) % self.shards
+        for offset in range(self.shards):
+            if len(self.owned) >= target:
+                break
+            shard = (start + offset) % self.shards
+            if shard not in self.owned and db.acquire_lease(f'shard:{shard}', self.owner, self.lease_seconds, now=now):
+                self.owned.add(shard)
+                logger.info(f"{self.owner} claimed shard {shard}")
+
+        REFRESH_SHARDS_OWNED.set(len(self.owned))
+        return sorted(self.owned)
+
+    def renew(self, now: Optional[datetime] = None):
+        """担当シャードのリースを延長（他のワーカーに取得されていたシャードは外す）"""
+        for shard in sorted(self.owned):
+            if not db.acquire_lease(f'shard:{shard}', self.owner, self.lease_seconds, now=now):
+                self.owned.discard(shard)
+                self._clear_shard_metrics(shard)
+                logger.warning(f"{self.owner} lost shard {shard}")
+
+    @staticmethod
+    def _clear_shard_metrics(shard: int):
+        """担当しなくなったシャードの遅れ・未取得数を出力しない（引き継いだワーカーが出力する）"""
+        REFRESH_SHARD_LAG.remove(shard=str(shard))
+        REFRESH_SHARD_PENDING.remove(shard=str(shard))
+
+    def refresh_shard(self, shard: int, symbols: Optional[List[str]] = None, now: Optional[datetime] = None) -> Dict:
+        """
+        シャード1つ分の期限が近い価格キャッシュを更新
+
+        Returns:
+            Dict: shard, symbols, refreshed, failed, lag_seconds（更新前の最も古い価格キャッシュの経過秒数）
+        """
+        now = now or datetime.now()
+        if symbols is None:
+            symbols = [s['symbol'] for s in db.get_tracked_stocks() if shard_of(s['symbol'], self.shards) == shard]
+        entries = db.get_price_cache_entries(symbols)
+        ages = {symbol: _age_seconds(entries.get(symbol.upper()), now) for symbol in symbols}
+
+        # 次の周回を待つと期限切れになる銘柄を今回更新する
+        horizon = self.cache_minutes * 60 - self.pass_seconds
+        due = [symbol for symbol, age in ages.items() if age is None or age >= horizon]
+        lag = _lag_seconds(list(ages.values()))
+        REFRESH_SHARD_LAG.set(lag, shard=str(shard))
+        REFRESH_SHARD_PENDING.set(_count_pending(list(ages.values()), self.cache_minutes), shard=str(shard))
+
+        refreshed = failed = 0
+        for i in range(0, len(due), self.batch_size):
+            batch = due[i:i + self.batch_size]
+            by_normalized = {normalize_symbol(symbol): symbol for symbol in batch}
+            histories = StockAPI.get_multiple_stocks_history(list(by_normalized), period=self.period)
+            for normalized, symbol in by_normalized.items():
+                hist = histories.get(normalized)
+                if hist is not None:
+                    hist = hist.dropna(how='all')
+                if hist is None or hist.empty:
+                    failed += 1
+                    continue
+                try:
+                    save_price_data(symbol, hist, self._info(symbol, entries.get(symbol.upper())))
+                    refreshed += 1
+                except Exception as e:
+                    logger.error(f"Error refreshing {symbol} in shard {shard}: {e}")
+                    failed += 1
+            # 大きなシャードの更新中にリースが失効しないよう、バッチごとに延長する
+            self.renew()
+            if shard not in self.owned:
+                break
+
+        REFRESH_SHARD_SYMBOLS.inc(refreshed, result='refreshed')
+        REFRESH_SHARD_SYMBOLS.inc(failed, result='failed')
+        return {'shard': shard, 'symbols': len(symbols), 'refreshed': refreshed, 'failed': failed, 'lag_seconds': lag}
+
+    @staticmethod
+    def _info(symbol: str, entry: Optional[Dict]) -> Optional[Dict]:
+        """時価総額などは既存の価格キャッシュの値を引き継ぎ、初回だけ銘柄情報を問い合わせる"""
+        if entry is None:
+            return StockAPI.get_ticker_info(symbol)
+        return {
+            'market_cap': entry.get('market_cap'),
+            'pe_ratio': entry.get('pe_ratio'),
+            'dividend_yield': entry.get('dividend_yield'),
+            '52_week_high': entry.get('week_52_high'),
+            '52_week_low': entry.get('week_52_low'),
+        }
+
+    def run_once(self) -> List[Dict]:
+        """担当シャードを調整し、各シャードを1回ずつ更新"""
+        from models.database import db_session
+
+        results = []
+        try:
+            members: Dict[int, List[str]] = {shard: [] for shard in self.balance()}
+            for stock in db.get_tracked_stocks():
+                shard = shard_of(stock['symbol'], self.shards)
+                if shard in members:
+                    members[shard].append(stock['symbol'])
+            for shard, symbols in members.items():
+                if self._stop.is_set() or shard not in self.owned:
+                    continue
+                results.append(self.refresh_shard(shard, symbols))
+        finally:
+            db_session.remove()
+        return results
+
+    def run(self):
+        """stop が呼ばれるまで pass_seconds ごとに更新（担当シャードの調整もこの間隔で行う）"""
+        logger.info(f"Refresh worker {self.owner} started ({self.shards} shards)")
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    for result in self.run_once():
+                        logger.info(f"shard {result['shard']}: refreshed={result['refreshed']} "
+                                    f"failed={result['failed']} lag={result['lag_seconds']}s")
+                except Exception as e:
+                    logger.error(f"Refresh worker pass failed: {e}")
+                self._stop.wait(max(self.pass_seconds - (time.monotonic() - started), 0))
+        finally:
+            self.release()
+
+    def stop(self):
+        """run のループを止める（シャードは run の終了時に解放する）"""
+        self._stop.set()
+
+    def release(self):
+        """担当シャードと生存通知のリースを解放し、失効を待たずに他のワーカーへ引き渡す"""
+        from models.database import db_session
+
+        try:
+            for shard in sorted(self.owned):
+                db.release_lease(f'shard:{shard}', self.owner)
+                self._clear_shard_metrics(shard)
+            db.release_lease(self.heartbeat_name, self.owner)
+            self.owned.clear()
+            REFRESH_SHARDS_OWNED.set(0)
+        finally:
+            db_session.remove()
@@ -316,19 +316,93 @@ function initAutoRefresh() {
 }
 
 function startAutoRefresh(intervalMs = 60000) {
+    // SSEが使える場合は価格ストリームを購読し、使えない場合のみポーリングする
+    if (window.EventSource) {
+        startPriceStream(intervalMs);
+    } else {
+        startPolling(intervalMs);
+    }
+}
+
+function startPolling(intervalMs = 60000) {
     if (autoRefreshInterval) clearInterval(autoRefreshInterval);
     autoRefreshInterval = setInterval(() => {
         loadStocks(false); // Pass false to indicate background refresh if supported
     }, intervalMs);
 }
 
-function stopAutoRefresh() {
+function stopPolling() {
     if (autoRefreshInterval) {
         clearInterval(autoRefreshInterval);
         autoRefreshInterval = null;
     }
 }
 
+function stopAutoRefresh() {
+    stopPolling();
+    if (priceStream) {
+        priceStream.close();
+        priceStream = null;
+    }
+}
+
+// ========================================
+// 価格ストリーム（Server-Sent Events）
+// ========================================
+
+let priceStream = null;
+
+function startPriceStream(fallbackIntervalMs = 60000) {
+    if (priceStream) priceStream.close();
+    // 再接続時はブラウザが Last-Event-ID を送り、サーバーが続きから再送する
+    priceStream = new EventSource(`${API_BASE}/stream`);
+
+    priceStream.addEventListener('open', () => stopPolling());
+
+    priceStream.addEventListener('price', (e) => {
+        applyPriceDelta(JSON.parse(e.data));
+    });
+
+    // 再送できない場合（サーバー再起動など）は一覧を取り直す
+    priceStream.addEventListener('reset', () => loadStocks(false));
+
+    // 切断中はポーリングで補完する（EventSourceは自動で再接続を続ける）
+    priceStream.addEventListener('error', () => {
+        if (!autoRefreshInterval) startPolling(fallbackIntervalMs);
+    });
+}
+
+function applyPriceDelta(delta) {
+    const stock = stocksData.find(s => s.symbol === delta.symbol);
+    if (!stock) return;
+    Object.assign(stock, delta);
+    renderStockList(stocksData);
+    updatePortfolioSummary(stocksData);
+}
+
+// ========================================
+// 条件付きGET（ETag）
+// ========================================
+
+// URLごとに最後に受信したETagと本文を保持し、304の場合は保持している本文を返す
+const etagCache = new Map();
+
+async function fetchWithEtag(url) {
+    const cached = etagCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, { status: 200, headers: { 'Content-Type': 'application/json' } });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        etagCache.set(url, { etag, body: await response.clone().text() });
+    }
+    return response;
+}
+
 // ========================================
 // 銘柄管理
 // ========================================
@@ -336,8 +410,9 @@ function stopAutoRefresh() {
 async function loadStocks() {
     try {
         const [stocksResponse, dashboardResponse] = await Promise.all([
-            fetch(`${API_BASE}/stocks`),
-            fetch(`${API_BASE}/dashboard`)
+            fetchWithEtag(`${API_BASE}/stocks`),
+            // 一覧では履歴を使わないため、最もサイズの小さい形式で受け取る
+            fetchWithEtag(`${API_BASE}/dashboard?history_format=packed`)
         ]);
 
         if (!stocksResponse.ok) throw new Error('Failed to fetch stocks');
@@ -486,23 +561,33 @@ function selectStock(symbol) {
     showStockDetail(symbol);
 }
 
+// 詳細APIで取得した財務・配当（タブ切り替え時に再取得しない）
+let detailExtras = {};
+
 async function showStockDetail(symbol) {
     const detailPanel = document.getElementById('stockDetail');
     detailPanel.innerHTML = '<div class="loading"><div class="spinner"></div>読み込み中...</div>';
 
     try {
-        const [priceResponse, analysisResponse] = await Promise.all([
-            fetch(`${API_BASE}/stocks/${symbol}/price?period=${currentPeriod}`),
-            fetch(`${API_BASE}/stocks/${symbol}/analysis?period=${currentPeriod}`)
-        ]);
-
-        const priceData = await priceResponse.json();
-        const analysisData = await analysisResponse.json();
-
-        if (!priceResponse.ok) {
-            throw new Error(priceData.error || 'データの取得に失敗しました');
+        // 価格・分析に加え、銘柄を切り替えたときは財務・配当も同じリクエストで取得する
+        const sameSymbol = detailExtras.symbol === symbol;
+        const fields = ['price', 'analysis', ...(sameSymbol ? [] : ['financials', 'dividends'])];
+        const response = await fetchWithEtag(
+            `${API_BASE}/stocks/${symbol}/detail?period=${currentPeriod}&fields=${fields.join(',')}&history_format=columns`
+        );
+        const detail = await response.json();
+
+        if (!response.ok || !detail.price) {
+            throw new Error(detail.error || 'データの取得に失敗しました');
+        }
+        if (!sameSymbol) {
+            detailExtras = { symbol, financials: detail.financials, dividends: detail.dividends };
         }
 
+        const priceData = detail.price;
+        priceData.history = DataTransformer.fromColumns(priceData.history);
+        const analysisData = detail.analysis || { error: (detail.errors || {}).analysis };
+
         renderStockDetail(priceData, analysisData);
     } catch (error) {
         detailPanel.innerHTML = `
@@ -778,8 +863,8 @@ async function renderFinancialsTab(container, symbol, currencySymbol, currency)
     container.innerHTML = '<div class="loading"><div class="spinner"></div>読み込み中...</div>';
 
     try {
-        const response = await fetch(`${API_BASE}/stocks/${symbol}/financials`);
-        const data = await response.json();
+        const data = (detailExtras.symbol === symbol && detailExtras.financials)
+            || await (await fetch(`${API_BASE}/stocks/${symbol}/financials`)).json();
         if (data.error) { container.innerHTML = `<div class="error">${data.error}</div>`; return; }
 
         const cs = data.currency_symbol || currencySymbol;
@@ -832,8 +917,8 @@ async function renderDividendsTab(container, symbol, currencySymbol, currency) {
     container.innerHTML = '<div class="loading"><div class="spinner"></div>読み込み中...</div>';
 
     try {
-        const response = await fetch(`${API_BASE}/stocks/${symbol}/dividends`);
-        const data = await response.json();
+        const data = (detailExtras.symbol === symbol && detailExtras.dividends)
+            || await (await fetch(`${API_BASE}/stocks/${symbol}/dividends`)).json();
         if (data.error) { container.innerHTML = `<div class="error">${data.error}</div>`; return; }
         if (!data.has_data || data.dividends.length === 0) {
             container.innerHTML = `<div class="empty-detail" style="height:auto;padding:40px"><div class="empty-icon">💵</div><h2>配当データなし</h2><p>この銘柄は配当を実施していないか、データがありません</p></div>`;
@@ -872,6 +957,23 @@ async function renderDividendsTab(container, symbol, currencySymbol, currency) {
  * データ変換ユーティリティ
  */
 const DataTransformer = {
+    /**
+     * 列形式の履歴データ（history_format=columns）を行形式に変換
+     * @param {Object} columns - 列ごとの配列（dateはエポック秒）
+     * @returns {Array} 履歴データ配列
+     */
+    fromColumns(columns) {
+        if (!columns || Array.isArray(columns)) return columns || [];
+        return columns.date.map((date, i) => ({
+            date,
+            open: columns.open[i],
+            high: columns.high[i],
+            low: columns.low[i],
+            close: columns.close[i],
+            volume: columns.volume[i]
+        }));
+    },
+
     /**
      * OHLC形式に変換
      * @param {Array} history - 履歴データ配列
@@ -1238,16 +1340,34 @@ function showError(message) {
     showMessage(message, 'error');
 }
 
+// 予測ジョブが完了するまでポーリング（202の場合はジョブIDが返る）
+async function fetchPrediction(symbol, periods) {
+    let response = await fetch(`${API_BASE}/stocks/${symbol}/prediction?periods=${periods}`);
+    let data = await response.json();
+
+    if (response.status === 202) {
+        const jobId = data.job_id;
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            response = await fetch(`${API_BASE}/prediction/jobs/${jobId}`);
+            data = await response.json();
+            if (!response.ok) break;
+            if (data.status === 'done') return data.result;
+            if (data.status === 'error') throw new Error(data.error || '予測データの取得に失敗しました');
+        }
+    }
+
+    if (!response.ok) {
+        throw new Error(data.error || '予測データの取得に失敗しました');
+    }
+    return data;
+}
+
 async function renderPredictionTab(container, symbol, currencySymbol, currency) {
     container.innerHTML = '<div class="loading"><div class="spinner"></div>AI予測を計算中... (数秒かかります)</div>';
 
     try {
-        const response = await fetch(`${API_BASE}/stocks/${symbol}/prediction?periods=30`);
-        const data = await response.json();
-
-        if (!response.ok) {
-            throw new Error(data.error || '予測データの取得に失敗しました');
-        }
+        const data = await fetchPrediction(symbol, 30);
 
         const lastPrice = data.current_price;
         const nextDay = data.summary.next_day;
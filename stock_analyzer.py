@@ -1,6 +1,6 @@
 """株価分析モジュール"""
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional, Union
 from config import (
     RSI_PERIOD, MA_SHORT, MA_LONG, TRADING_DAYS_PER_YEAR,
     SCORE_EXCELLENT, SCORE_GOOD, SCORE_FAIR, SCORE_POOR,
@@ -9,6 +9,7 @@ from config import (
     PRICE_POSITION_LOW, PRICE_POSITION_HIGH,
     MACD_FAST, MACD_SLOW, MACD_SIGNAL
 )
+from tracing import traced
 
 
 class StockAnalyzer:
@@ -107,6 +108,73 @@ class StockAnalyzer:
         
         return max(0, min(100, score))
     
+    @staticmethod
+    @traced('analyzer.calculate_score_series')
+    def calculate_score_series(
+        closes: Union[pd.Series, pd.DataFrame],
+        rsi_period: int = RSI_PERIOD,
+        ma_short: int = MA_SHORT,
+        ma_long: int = MA_LONG,
+        lookback: Optional[int] = None
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """
+        全バーの評価スコアをベクトル演算で計算
+        
+        各バー時点までのデータで analyze を実行した場合と同じスコアを返す。
+        DataFrame（列=銘柄）を渡すと全銘柄を一括で計算する。
+        
+        Args:
+            closes: 終値（Series または 日付×銘柄 の DataFrame）
+            rsi_period: RSI計算期間
+            ma_short: 短期移動平均期間
+            ma_long: 長期移動平均期間
+            lookback: 価格範囲・ボラティリティの参照バー数（None の場合は先頭から全期間）
+            
+        Returns:
+            closes と同じ形状のスコア（データのないバーは NaN）
+        """
+        def moving_average(window: int):
+            # analyze と同様、期間に満たない場合は現在値を使用
+            if lookback is not None and lookback < window:
+                return closes
+            return closes.rolling(window=window).mean().fillna(closes)
+        
+        ma_20 = moving_average(ma_short)
+        ma_50 = moving_average(ma_long)
+        
+        delta = closes.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
+        rsi = 100 - (100 / (1 + gain / loss))
+        
+        returns = closes / closes.shift(1) - 1
+        if lookback is None:
+            price_max = closes.expanding().max()
+            price_min = closes.expanding().min()
+            returns_std = returns.expanding().std()
+        else:
+            price_max = closes.rolling(window=lookback, min_periods=1).max()
+            price_min = closes.rolling(window=lookback, min_periods=1).min()
+            returns_std = returns.rolling(window=max(lookback - 1, 1), min_periods=1).std()
+        volatility = returns_std * (TRADING_DAYS_PER_YEAR ** 0.5) * 100
+        
+        price_range = price_max - price_min
+        price_pos = ((closes - price_min) / price_range.where(price_range > 0)).fillna(0.5)
+        
+        score = (
+            50
+            + (closes > ma_20) * 10
+            + (closes > ma_50) * 10
+            + (ma_20 > ma_50) * 5
+            + ((rsi > RSI_OVERSOLD) & (rsi < RSI_OVERBOUGHT)) * 10
+            + (rsi < RSI_OVERSOLD) * 5
+            - (rsi > RSI_OVERBOUGHT) * 5
+            + (volatility < VOLATILITY_LOW) * 10
+            - (volatility > VOLATILITY_HIGH) * 10
+            + ((price_pos > PRICE_POSITION_LOW) & (price_pos < PRICE_POSITION_HIGH)) * 5
+        )
+        return score.clip(lower=0, upper=100).where(closes.notna())
+    
     @staticmethod
     def get_score_level(score: int) -> Dict[str, str]:
         """スコアから評価レベルを取得"""
@@ -134,6 +202,7 @@ class StockAnalyzer:
         return {'trend': trend, 'momentum': momentum, 'risk': risk}
     
     @staticmethod
+    @traced('analyzer.analyze')
     def analyze(hist: pd.DataFrame) -> Dict:
         """株価を分析"""
         closes = hist['Close']
@@ -1,18 +1,44 @@
 """株価API操作モジュール"""
+import base64
 import logging
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from typing import Dict, Optional, Tuple, List
 from datetime import datetime
 from database import db
-from config import CACHE_MINUTES, HISTORY_DAYS, USE_YAHOO_AUTH
+from models.database import db_session
+from config import CACHE_MINUTES, HISTORY_DAYS, USE_YAHOO_AUTH, UPSTREAM_BASE_URL
 from yahoo_auth import yahoo_auth
+import yahoo_http
+from upstream_capture import upstream_capture
+from leases import RefreshLeases
 from symbol_utils import SymbolUtils, normalize_symbol, get_currency, format_price
+from metrics import observe_upstream, FETCH_POOL_TASKS
+from tracing import bind, span
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
 logger = logging.getLogger(__name__)
 
+# 履歴データのレスポンス形式
+HISTORY_FORMATS = ('rows', 'columns', 'packed')
+HISTORY_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+PACKED_HISTORY_DTYPES = {
+    'date': '<i8', 'open': '<f4', 'high': '<f4', 'low': '<f4', 'close': '<f4', 'volume': '<i8'
+}
+
+# 銘柄ごとの取得のリース（複数プロセス・スレッドでの重複取得を防ぐ）
+refresh_leases = RefreshLeases()
+
+# 取得期間（yfinanceのperiod）ごとの遡る期間（max は全期間）
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1), '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1), '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1), '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
 
 class ResponseBuilder:
     """APIレスポンス構築ヘルパー"""
@@ -57,6 +83,14 @@ class StockAPI:
         # シンボルを正規化（日本株対応）
         normalized_symbol = normalize_symbol(symbol)
         
+        # 記録した応答を再生する場合は接続しない
+        if upstream_capture.replaying:
+            return upstream_capture.replay_ticker(normalized_symbol)
+        
+        # 接続先が指定されている場合は互換HTTPクライアントを使う（負荷試験・オフライン用）
+        if UPSTREAM_BASE_URL:
+            return upstream_capture.wrap(normalized_symbol, yahoo_http.YahooHttpTicker(normalized_symbol, UPSTREAM_BASE_URL))
+        
         # Yahoo認証が有効な場合、セッションを設定
         if USE_YAHOO_AUTH:
             session = yahoo_auth.get_session()
@@ -72,56 +106,77 @@ class StockAPI:
                     os.environ['YAHOO_COOKIE'] = cookie_string
         
         ticker = yf.Ticker(normalized_symbol)
-        return ticker
+        return upstream_capture.wrap(normalized_symbol, ticker)
     
     @staticmethod
     def normalize_symbol(symbol: str) -> str:
         """銘柄コードを正規化（日本株対応）"""
         return normalize_symbol(symbol)
     
+    @staticmethod
+    def fetch_info(symbol: str) -> Dict:
+        """ticker.info を取得（整形前の値、失敗時は例外を送出する）"""
+        ticker = StockAPI._get_ticker(symbol)
+        return observe_upstream('info', lambda: ticker.info)
+    
+    @staticmethod
+    def fetch_dividends(symbol: str) -> pd.Series:
+        """ticker.dividends を取得（整形前の値、失敗時は例外を送出する）"""
+        ticker = StockAPI._get_ticker(symbol)
+        return observe_upstream('dividends', lambda: ticker.dividends)
+    
+    @staticmethod
+    def fetch_history(symbol: str, period: str = '1mo') -> pd.DataFrame:
+        """ticker.history を取得（空の場合もそのまま返し、失敗時は例外を送出する）"""
+        ticker = StockAPI._get_ticker(symbol)
+        return observe_upstream('history', ticker.history, period=period)
+    
     @staticmethod
     def get_ticker_info(symbol: str) -> Optional[Dict]:
         """銘柄情報を取得"""
         try:
-            normalized = normalize_symbol(symbol)
-            ticker = StockAPI._get_ticker(symbol)
-            info = ticker.info
-            
-            # 通貨情報を取得
-            currency = get_currency(normalized)
-            symbol_info = SymbolUtils.get_stock_info(symbol)
-            
-            if info and ('longName' in info or 'shortName' in info):
-                return {
-                    'name': info.get('longName') or info.get('shortName') or symbol_info.get('known_name') or symbol,
-                    'market_cap': info.get('marketCap'),
-                    'pe_ratio': info.get('trailingPE'),
-                    'dividend_yield': info.get('dividendYield'),
-                    '52_week_high': info.get('fiftyTwoWeekHigh'),
-                    '52_week_low': info.get('fiftyTwoWeekLow'),
-                    'currency': currency,
-                    'market': symbol_info.get('market'),
-                    'sector': info.get('sector'),
-                    'industry': info.get('industry'),
-                }
-            
-            # infoが取得できない場合でも、シンボルベースの情報を返す
-            if symbol_info.get('known_name'):
-                return {
-                    'name': symbol_info.get('known_name'),
-                    'currency': currency,
-                    'market': symbol_info.get('market'),
-                }
+            return StockAPI.summarize_info(symbol, StockAPI.fetch_info(symbol))
         except Exception as e:
             logger.warning(f"Error getting ticker info for {symbol}: {e}")
         return None
     
+    @staticmethod
+    def summarize_info(symbol: str, info: Optional[Dict]) -> Optional[Dict]:
+        """ticker.info から銘柄情報を抽出"""
+        normalized = normalize_symbol(symbol)
+        
+        # 通貨情報を取得
+        currency = get_currency(normalized)
+        symbol_info = SymbolUtils.get_stock_info(symbol)
+        
+        if info and ('longName' in info or 'shortName' in info):
+            return {
+                'name': info.get('longName') or info.get('shortName') or symbol_info.get('known_name') or symbol,
+                'market_cap': info.get('marketCap'),
+                'pe_ratio': info.get('trailingPE'),
+                'dividend_yield': info.get('dividendYield'),
+                '52_week_high': info.get('fiftyTwoWeekHigh'),
+                '52_week_low': info.get('fiftyTwoWeekLow'),
+                'currency': currency,
+                'market': symbol_info.get('market'),
+                'sector': info.get('sector'),
+                'industry': info.get('industry'),
+            }
+        
+        # infoが取得できない場合でも、シンボルベースの情報を返す
+        if symbol_info.get('known_name'):
+            return {
+                'name': symbol_info.get('known_name'),
+                'currency': currency,
+                'market': symbol_info.get('market'),
+            }
+        return None
+    
     @staticmethod
     def get_history(symbol: str, period: str = '1mo') -> Optional[pd.DataFrame]:
         """株価履歴を取得"""
         try:
-            ticker = StockAPI._get_ticker(symbol)
-            hist = ticker.history(period=period)
+            hist = StockAPI.fetch_history(symbol, period)
             return hist if not hist.empty else None
         except Exception as e:
             logger.error(f"Error getting history for {symbol}: {e}")
@@ -130,17 +185,79 @@ class StockAPI:
     @staticmethod
     def format_history_data(hist: pd.DataFrame) -> List[Dict]:
         """履歴データを整形"""
-        data = []
-        for date, row in hist.iterrows():
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': float(row['Open']),
-                'high': float(row['High']),
-                'low': float(row['Low']),
-                'close': float(row['Close']),
-                'volume': int(row['Volume'])
-            })
-        return data
+        dates = hist.index.strftime('%Y-%m-%d')
+        columns = [hist[c].to_numpy(dtype=float).tolist() for c in ('Open', 'High', 'Low', 'Close')]
+        volumes = hist['Volume'].to_numpy(dtype=np.int64).tolist()
+        return [
+            {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for d, o, h, l, c, v in zip(dates, *columns, volumes)
+        ]
+    
+    @staticmethod
+    def format_history_columns(hist: pd.DataFrame) -> Dict[str, list]:
+        """
+        履歴データを列形式に整形（日付はUTC 0時のエポック秒）
+        
+        format_history_data と同じ日付（取引所のローカル日付）を表す。
+        """
+        index = pd.DatetimeIndex(hist.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return {
+            'date': index.normalize().to_numpy().astype('datetime64[s]').astype(np.int64).tolist(),
+            'open': hist['Open'].to_numpy(dtype=float).tolist(),
+            'high': hist['High'].to_numpy(dtype=float).tolist(),
+            'low': hist['Low'].to_numpy(dtype=float).tolist(),
+            'close': hist['Close'].to_numpy(dtype=float).tolist(),
+            'volume': hist['Volume'].to_numpy(dtype=np.int64).tolist()
+        }
+    
+    @staticmethod
+    def history_rows_to_columns(rows: List[Dict]) -> Dict[str, list]:
+        """行形式の履歴データ（データベースのキャッシュなど）を列形式に変換"""
+        dates = np.array([row['date'] for row in rows], dtype='datetime64[D]')
+        columns = {'date': (dates.astype(np.int64) * 86400).tolist()}
+        for field in HISTORY_FIELDS:
+            columns[field] = [row.get(field) for row in rows]
+        return columns
+    
+    @staticmethod
+    def pack_history_columns(columns: Dict[str, list]) -> Dict:
+        """
+        列形式の履歴データをバイナリ（リトルエンディアン配列のBase64）に変換
+        
+        日付と出来高は int64、価格は float32。
+        """
+        packed = {}
+        for field, values in columns.items():
+            dtype = PACKED_HISTORY_DTYPES[field]
+            array = np.asarray([np.nan if v is None else v for v in values] if dtype == '<f4' else values, dtype=dtype)
+            packed[field] = base64.b64encode(array.tobytes()).decode('ascii')
+        return {
+            'encoding': 'base64',
+            'length': len(columns['date']),
+            'dtypes': {field: PACKED_HISTORY_DTYPES[field] for field in packed},
+            'columns': packed
+        }
+    
+    @staticmethod
+    def encode_history(history, history_format: str = 'rows'):
+        """
+        履歴データ（DataFrameまたは行形式のリスト）を指定形式に変換
+        
+        history_format: rows（行ごとの辞書）、columns（列ごとの配列）、packed（列ごとのバイナリ）
+        """
+        if history_format not in HISTORY_FORMATS:
+            raise ValueError(f"Unknown history format: {history_format}")
+        if isinstance(history, pd.DataFrame):
+            if history_format == 'rows':
+                return StockAPI.format_history_data(history)
+            columns = StockAPI.format_history_columns(history)
+        else:
+            if history_format == 'rows':
+                return history
+            columns = StockAPI.history_rows_to_columns(history)
+        return columns if history_format == 'columns' else StockAPI.pack_history_columns(columns)
     
     @staticmethod
     def calculate_price_change(hist: pd.DataFrame) -> Tuple[float, float, float, float]:
@@ -161,7 +278,8 @@ class StockAPI:
         hist: Optional[pd.DataFrame],
         info: Optional[Dict],
         cached: bool = False,
-        message: Optional[str] = None
+        message: Optional[str] = None,
+        history_format: str = 'rows'
     ) -> Dict:
         """価格レスポンスを構築"""
         if hist is None or hist.empty:
@@ -169,7 +287,7 @@ class StockAPI:
         
         normalized = normalize_symbol(symbol)
         current_price, previous_close, change, change_percent = StockAPI.calculate_price_change(hist)
-        history_data = StockAPI.format_history_data(hist)
+        history_data = StockAPI.encode_history(hist, history_format)
         
         # 通貨情報を取得
         currency = info.get('currency') if info else get_currency(normalized)
@@ -202,7 +320,9 @@ class StockAPI:
         return response
     
     @staticmethod
-    def build_cached_response(symbol: str, cached_price: Dict, cached_history: List[Dict], message: str) -> Dict:
+    def build_cached_response(
+        symbol: str, cached_price: Dict, cached_history: List[Dict], message: str, history_format: str = 'rows'
+    ) -> Dict:
         """キャッシュデータからレスポンスを構築"""
         normalized = normalize_symbol(symbol)
         currency = get_currency(normalized)
@@ -223,13 +343,13 @@ class StockAPI:
             'currency': currency,
             'currency_symbol': SymbolUtils.get_currency_symbol(currency),
             'market': SymbolUtils.get_market_name(normalized),
-            'history': cached_history,
+            'history': StockAPI.encode_history(cached_history, history_format),
             'cached': True,
             'message': message
         }
     
     @staticmethod
-    def build_history_response(symbol: str, cached_history: List[Dict], message: str) -> Dict:
+    def build_history_response(symbol: str, cached_history: List[Dict], message: str, history_format: str = 'rows') -> Dict:
         """履歴データからレスポンスを構築"""
         if not cached_history:
             return None
@@ -255,7 +375,7 @@ class StockAPI:
             'currency': currency,
             'currency_symbol': SymbolUtils.get_currency_symbol(currency),
             'market': SymbolUtils.get_market_name(normalized),
-            'history': cached_history,
+            'history': StockAPI.encode_history(cached_history, history_format),
             'cached': True,
             'message': message
         }
@@ -264,94 +384,141 @@ class StockAPI:
     def get_dividends(symbol: str) -> Optional[Dict]:
         """配当履歴を取得"""
         try:
-            ticker = StockAPI._get_ticker(symbol)
-            dividends = ticker.dividends
-            
-            if dividends.empty:
-                return {'symbol': normalize_symbol(symbol), 'dividends': [], 'has_data': False}
-            
-            data = [
-                {'date': date.strftime('%Y-%m-%d'), 'amount': float(amount)}
-                for date, amount in dividends.items()
-            ]
-            
-            # 年間配当を計算（直近1年分を合計）
-            recent_dividends = dividends.tail(4)  # 四半期配当の場合、直近4回
-            annual_dividend = float(recent_dividends.sum()) if not recent_dividends.empty else 0
-            
-            return {
-                'symbol': normalize_symbol(symbol),
-                'dividends': data,
-                'has_data': True,
-                'annual_dividend': annual_dividend,
-                'currency': get_currency(normalize_symbol(symbol))
-            }
+            return StockAPI.format_dividends(symbol, StockAPI.fetch_dividends(symbol))
         except Exception as e:
             logger.error(f"Error getting dividends for {symbol}: {e}")
             return None
     
+    @staticmethod
+    def format_dividends(symbol: str, dividends: pd.Series) -> Dict:
+        """ticker.dividends を配当履歴のレスポンスに整形"""
+        if dividends.empty:
+            return {'symbol': normalize_symbol(symbol), 'dividends': [], 'has_data': False}
+        
+        data = [
+            {'date': date.strftime('%Y-%m-%d'), 'amount': float(amount)}
+            for date, amount in dividends.items()
+        ]
+        
+        # 年間配当を計算（直近1年分を合計）
+        recent_dividends = dividends.tail(4)  # 四半期配当の場合、直近4回
+        annual_dividend = float(recent_dividends.sum()) if not recent_dividends.empty else 0
+        
+        return {
+            'symbol': normalize_symbol(symbol),
+            'dividends': data,
+            'has_data': True,
+            'annual_dividend': annual_dividend,
+            'currency': get_currency(normalize_symbol(symbol))
+        }
+    
     @staticmethod
     def get_financials(symbol: str) -> Optional[Dict]:
         """財務情報を取得"""
         try:
-            ticker = StockAPI._get_ticker(symbol)
-            info = ticker.info
-            normalized = normalize_symbol(symbol)
-            currency = get_currency(normalized)
-            
-            return {
-                'symbol': normalized,
-                'currency': currency,
-                'currency_symbol': SymbolUtils.get_currency_symbol(currency),
-                'market_cap': info.get('marketCap'),
-                'enterprise_value': info.get('enterpriseValue'),
-                'pe_ratio': info.get('trailingPE'),
-                'forward_pe': info.get('forwardPE'),
-                'peg_ratio': info.get('pegRatio'),
-                'price_to_book': info.get('priceToBook'),
-                'eps': info.get('trailingEps'),
-                'forward_eps': info.get('forwardEps'),
-                'book_value': info.get('bookValue'),
-                'dividend_rate': info.get('dividendRate'),
-                'dividend_yield': info.get('dividendYield'),
-                'ex_dividend_date': info.get('exDividendDate'),
-                'payout_ratio': info.get('payoutRatio'),
-                'profit_margin': info.get('profitMargins'),
-                'operating_margin': info.get('operatingMargins'),
-                'revenue': info.get('totalRevenue'),
-                'revenue_per_share': info.get('revenuePerShare'),
-                'gross_profit': info.get('grossProfits'),
-                'ebitda': info.get('ebitda'),
-                'net_income': info.get('netIncomeToCommon'),
-                'free_cash_flow': info.get('freeCashflow'),
-                'operating_cash_flow': info.get('operatingCashflow'),
-                'total_cash': info.get('totalCash'),
-                'total_debt': info.get('totalDebt'),
-                'debt_to_equity': info.get('debtToEquity'),
-                'current_ratio': info.get('currentRatio'),
-                'quick_ratio': info.get('quickRatio'),
-                'return_on_equity': info.get('returnOnEquity'),
-                'return_on_assets': info.get('returnOnAssets'),
-                'beta': info.get('beta'),
-                'shares_outstanding': info.get('sharesOutstanding'),
-                'float_shares': info.get('floatShares'),
-            }
+            return StockAPI.format_financials(symbol, StockAPI.fetch_info(symbol))
         except Exception as e:
             logger.error(f"Error getting financials for {symbol}: {e}")
             return None
     
+    @staticmethod
+    def format_financials(symbol: str, info: Dict) -> Dict:
+        """ticker.info から財務情報を抽出"""
+        normalized = normalize_symbol(symbol)
+        currency = get_currency(normalized)
+        
+        return {
+            'symbol': normalized,
+            'currency': currency,
+            'currency_symbol': SymbolUtils.get_currency_symbol(currency),
+            'market_cap': info.get('marketCap'),
+            'enterprise_value': info.get('enterpriseValue'),
+            'pe_ratio': info.get('trailingPE'),
+            'forward_pe': info.get('forwardPE'),
+            'peg_ratio': info.get('pegRatio'),
+            'price_to_book': info.get('priceToBook'),
+            'eps': info.get('trailingEps'),
+            'forward_eps': info.get('forwardEps'),
+            'book_value': info.get('bookValue'),
+            'dividend_rate': info.get('dividendRate'),
+            'dividend_yield': info.get('dividendYield'),
+            'ex_dividend_date': info.get('exDividendDate'),
+            'payout_ratio': info.get('payoutRatio'),
+            'profit_margin': info.get('profitMargins'),
+            'operating_margin': info.get('operatingMargins'),
+            'revenue': info.get('totalRevenue'),
+            'revenue_per_share': info.get('revenuePerShare'),
+            'gross_profit': info.get('grossProfits'),
+            'ebitda': info.get('ebitda'),
+            'net_income': info.get('netIncomeToCommon'),
+            'free_cash_flow': info.get('freeCashflow'),
+            'operating_cash_flow': info.get('operatingCashflow'),
+            'total_cash': info.get('totalCash'),
+            'total_debt': info.get('totalDebt'),
+            'debt_to_equity': info.get('debtToEquity'),
+            'current_ratio': info.get('currentRatio'),
+            'quick_ratio': info.get('quickRatio'),
+            'return_on_equity': info.get('returnOnEquity'),
+            'return_on_assets': info.get('returnOnAssets'),
+            'beta': info.get('beta'),
+            'shares_outstanding': info.get('sharesOutstanding'),
+            'float_shares': info.get('floatShares'),
+        }
+    
     @staticmethod
     def get_history_with_interval(symbol: str, period: str = '1mo', interval: str = '1d') -> Optional[pd.DataFrame]:
         """インターバル指定付きで株価履歴を取得"""
         try:
             ticker = StockAPI._get_ticker(symbol)
             # interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo
-            hist = ticker.history(period=period, interval=interval)
+            hist = observe_upstream('history', ticker.history, period=period, interval=interval)
             return hist if not hist.empty else None
         except Exception as e:
             logger.error(f"Error getting history with interval for {symbol}: {e}")
             return None
     
+    @staticmethod
+    def period_for_days(days: int) -> str:
+        """日数をカバーする取得期間（yfinanceのperiod）に変換"""
+        for limit, period in ((31, '1mo'), (92, '3mo'), (183, '6mo'), (366, '1y'), (731, '2y'), (1827, '5y'), (3653, '10y')):
+            if days <= limit:
+                return period
+        return 'max'
+    
+    @staticmethod
+    def days_for_period(period: str) -> int:
+        """取得期間（yfinanceのperiod）をカバーする日数（保存済みの履歴を読む範囲、最短は HISTORY_DAYS）"""
+        if period not in PERIOD_OFFSETS:
+            return HISTORY_DAYS
+        now = pd.Timestamp.now()
+        return max((now - (now - PERIOD_OFFSETS[period])).days, HISTORY_DAYS)
+    
+    @staticmethod
+    def longer_period(*periods: str) -> str:
+        """複数の取得期間のうち最も長いものを返す（ytd は1年として扱う）"""
+        now = pd.Timestamp.now()
+        
+        def start(period: str) -> pd.Timestamp:
+            if period == 'max':
+                return pd.Timestamp.min
+            return now - PERIOD_OFFSETS.get(period, PERIOD_OFFSETS['1y'])
+        
+        return min(periods, key=start)
+    
+    @staticmethod
+    def trim_history(hist: pd.DataFrame, period: str) -> pd.DataFrame:
+        """長めに取得した履歴を指定期間に切り詰める（最終バーの日付から遡る）"""
+        if hist is None or hist.empty or period == 'max':
+            return hist
+        last = hist.index[-1]
+        if period == 'ytd':
+            start = last.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        elif period in PERIOD_OFFSETS:
+            start = last - PERIOD_OFFSETS[period]
+        else:
+            return hist
+        return hist[hist.index > start]
+    
     @staticmethod
     def get_multiple_stocks_history(symbols: List[str], period: str = '1mo') -> Dict[str, pd.DataFrame]:
         """複数銘柄の履歴を一括取得（効率的）"""
@@ -362,25 +529,36 @@ class StockAPI:
             if not normalized_symbols:
                 return {}
             
-            # yf.downloadは複数銘柄を一度のリクエストで取得可能
-            data = yf.download(normalized_symbols, period=period, group_by='ticker', progress=False)
-            
-            result = {}
-            if len(normalized_symbols) == 1:
-                # 単一銘柄の場合、データ構造が異なる
-                result[normalized_symbols[0]] = data
-            else:
-                for symbol in normalized_symbols:
-                    if symbol in data.columns.get_level_values(0):
-                        result[symbol] = data[symbol]
-            
-            return result
+            return observe_upstream(
+                'download', upstream_capture.call, ','.join(normalized_symbols), 'download', {'period': period},
+                lambda: StockAPI._download(normalized_symbols, period)
+            )
         except Exception as e:
             logger.error(f"Error in bulk download: {e}")
             return {}
 
     @staticmethod
-    def fetch_stocks_data_parallel(symbols: List[str], delay: float = 0.5) -> List[Dict]:
+    def _download(normalized_symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
+        """複数銘柄の履歴を一括で問い合わせ、銘柄ごとの DataFrame に分ける"""
+        if UPSTREAM_BASE_URL:
+            return yahoo_http.download(normalized_symbols, UPSTREAM_BASE_URL, period=period)
+        
+        # yf.downloadは複数銘柄を一度のリクエストで取得可能
+        data = yf.download(normalized_symbols, period=period, group_by='ticker', progress=False)
+        
+        result = {}
+        if len(normalized_symbols) == 1:
+            # 単一銘柄の場合、データ構造が異なる
+            result[normalized_symbols[0]] = data
+        else:
+            for symbol in normalized_symbols:
+                if symbol in data.columns.get_level_values(0):
+                    result[symbol] = data[symbol]
+        
+        return result
+
+    @staticmethod
+    def fetch_stocks_data_parallel(symbols: List[str], delay: float = 0.5, history_format: str = 'rows') -> List[Dict]:
         """複数銘柄のデータを並列で取得"""
         results = []
         
@@ -393,7 +571,7 @@ class StockAPI:
                 cached_history = db.get_cached_history(symbol)
                 result = StockAPI.build_cached_response(
                     symbol, cached_price, cached_history,
-                    'キャッシュされたデータを使用しています'
+                    'キャッシュされたデータを使用しています', history_format
                 )
                 results.append(result)
             else:
@@ -405,14 +583,17 @@ class StockAPI:
         # 残りの銘柄を並列で取得
         # リクエスト間に遅延を入れるために、各スレッドで呼び出すラッパー関数
         def fetch_wrapper(symbol):
+            FETCH_POOL_TASKS.dec(state='queued')
+            FETCH_POOL_TASKS.inc(state='running')
             try:
                 # ランダムな遅延を入れる（レート制限回避のため）
                 # 並列実行のため、開始タイミングを少しずらす
                 if delay > 0:
                     import random
                     jitter = random.uniform(0, delay * 0.5)  # 0〜50%のランダム遅延を追加
-                    time.sleep(delay + jitter) 
-                result = get_stock_price_with_fallback(symbol, use_cache=False)
+                    with span('sleep'):
+                        time.sleep(delay + jitter)
+                result = get_stock_price_with_fallback(symbol, use_cache=False, history_format=history_format)
                 if result is None:
                     return {
                         'symbol': symbol,
@@ -426,9 +607,15 @@ class StockAPI:
                     'symbol': symbol,
                     'error': str(e)
                 }
+            finally:
+                FETCH_POOL_TASKS.dec(state='running')
+                db_session.remove()
 
+        # キュー待ちのタスク数をメトリクスに反映（ワーカーが取り出すたびに減る）
+        FETCH_POOL_TASKS.inc(len(symbols_to_fetch), state='queued')
         with ThreadPoolExecutor(max_workers=min(10, len(symbols_to_fetch))) as executor:
-            future_to_symbol = {executor.submit(fetch_wrapper, sym): sym for sym in symbols_to_fetch}
+            worker = bind(fetch_wrapper)
+            future_to_symbol = {executor.submit(worker, sym): sym for sym in symbols_to_fetch}
             for future in as_completed(future_to_symbol):
                 symbol = future_to_symbol[future]
                 try:
@@ -441,9 +628,46 @@ class StockAPI:
         return results
 
 
-def get_stock_price_with_fallback(symbol: str, period: str = '1mo', use_cache: bool = True) -> Optional[Dict]:
-    """株価データを取得（フォールバック機能付き）"""
+def save_price_data(symbol: str, hist: pd.DataFrame, info: Optional[Dict]):
+    """
+    取得した履歴を stock_prices に、価格を price_cache に保存
+
+    他のワーカーは price_cache の更新を取得完了の合図として履歴を読むため、履歴を先に保存する。
+    """
+    # 履歴データを保存
+    history_data = StockAPI.format_history_data(hist)
+    db.save_price_history(symbol, history_data)
+    
+    # 価格変動を計算
+    current_price, previous_close, change, change_percent = StockAPI.calculate_price_change(hist)
+    
+    # キャッシュに保存
+    price_data = {
+        'current_price': current_price,
+        'previous_close': previous_close,
+        'change': change,
+        'change_percent': change_percent,
+        'volume': int(hist['Volume'].iloc[-1]),
+        'market_cap': info.get('market_cap') if info else None,
+        'pe_ratio': info.get('pe_ratio') if info else None,
+        'dividend_yield': info.get('dividend_yield') if info else None,
+        '52_week_high': info.get('52_week_high') if info else None,
+        '52_week_low': info.get('52_week_low') if info else None
+    }
+    db.save_price_cache(symbol, price_data)
+
+
+def get_stock_price_with_fallback(
+    symbol: str, period: str = '1mo', use_cache: bool = True, history_format: str = 'rows',
+    hist: Optional[pd.DataFrame] = None, info: Optional[Dict] = None
+) -> Optional[Dict]:
+    """
+    株価データを取得（フォールバック機能付き、history_format は StockAPI.encode_history を参照）
+
+    hist・info を渡した場合は、取得済みのデータとして Yahoo Finance に問い合わせずに使う。
+    """
     symbol = symbol.upper()
+    prefetched_hist, prefetched_info = hist, info
     
     # キャッシュをチェック
     cached_price = None
@@ -451,46 +675,38 @@ def get_stock_price_with_fallback(symbol: str, period: str = '1mo', use_cache: b
         cached_price = db.get_cached_price(symbol, CACHE_MINUTES)
     
     # APIからデータを取得
-    try:
-        hist = StockAPI.get_history(symbol, period)
+    def fetch():
+        hist = prefetched_hist if prefetched_hist is not None else StockAPI.get_history(symbol, period)
         if hist is None or hist.empty:
             # データが見つからない場合、キャッシュまたは履歴データを使用
             if cached_price:
                 cached_history = db.get_cached_history(symbol)
                 return StockAPI.build_cached_response(
                     symbol, cached_price, cached_history,
-                    'キャッシュされたデータを使用しています'
+                    'キャッシュされたデータを使用しています', history_format
                 )
             return None
         
         # 情報を取得
-        info = StockAPI.get_ticker_info(symbol)
-        
-        # 価格変動を計算
-        current_price, previous_close, change, change_percent = StockAPI.calculate_price_change(hist)
-        
-        # キャッシュに保存
-        price_data = {
-            'current_price': current_price,
-            'previous_close': previous_close,
-            'change': change,
-            'change_percent': change_percent,
-            'volume': int(hist['Volume'].iloc[-1]),
-            'market_cap': info.get('market_cap') if info else None,
-            'pe_ratio': info.get('pe_ratio') if info else None,
-            'dividend_yield': info.get('dividend_yield') if info else None,
-            '52_week_high': info.get('52_week_high') if info else None,
-            '52_week_low': info.get('52_week_low') if info else None
-        }
-        db.save_price_cache(symbol, price_data)
-        
-        # 履歴データを保存
-        history_data = StockAPI.format_history_data(hist)
-        db.save_price_history(symbol, history_data)
+        info = prefetched_info if prefetched_info is not None else StockAPI.get_ticker_info(symbol)
+        save_price_data(symbol, hist, info)
         
         # レスポンスを構築
-        return StockAPI.build_price_response(symbol, hist, info, cached=False)
-        
+        return StockAPI.build_price_response(symbol, hist, info, cached=False, history_format=history_format)
+    
+    def shared(since: datetime):
+        """他のワーカーが取得中だった場合、その結果として保存された価格キャッシュ"""
+        fresh = db.get_cached_price(symbol, CACHE_MINUTES)
+        if not fresh or datetime.fromisoformat(fresh['cached_at']) < since:
+            return None
+        return StockAPI.build_cached_response(
+            symbol, fresh, db.get_cached_history(symbol, StockAPI.days_for_period(period)),
+            '他のワーカーが取得したデータを使用しています', history_format
+        )
+    
+    try:
+        # 同じ銘柄を複数のワーカーが同時に取得しないようにする
+        return refresh_leases.run(f'{symbol}:{period}', fetch, shared)
     except Exception as e:
         error_msg = str(e)
         # レート制限エラーの場合、キャッシュまたは履歴データを使用
@@ -500,14 +716,14 @@ def get_stock_price_with_fallback(symbol: str, period: str = '1mo', use_cache: b
                 cached_history = db.get_cached_history(symbol)
                 return StockAPI.build_cached_response(
                     symbol, cached_price, cached_history,
-                    'APIレート制限のため、キャッシュされたデータを使用しています'
+                    'APIレート制限のため、キャッシュされたデータを使用しています', history_format
                 )
             # キャッシュがない場合、履歴データを取得
             cached_history = db.get_cached_history(symbol, HISTORY_DAYS)
             if cached_history:
                 return StockAPI.build_history_response(
                     symbol, cached_history,
-                    'APIレート制限のため、保存された履歴データを使用しています'
+                    'APIレート制限のため、保存された履歴データを使用しています', history_format
                 )
         logger.error(f"Failed to get price for {symbol}: {e}")
         raise
@@ -0,0 +1,191 @@
+"""銘柄一括インポートモジュール - 銘柄リストの一括登録"""
+import csv
+import io
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from database import db
+from enrichment_queue import enrichment_worker
+from symbol_utils import SymbolUtils
+from exceptions import StockTrackingError
+from config import IMPORT_MAX_SYMBOLS, IMPORT_JOB_TTL_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# 銘柄コードとして受け付ける形式（英数字とサフィックス・指数・為替の記号）
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.\-=^]{0,19}$')
+SYMBOL_COLUMNS = ('symbol', 'ticker', 'code')
+
+
+class StockImporter:
+    """銘柄リスト（CSV / JSON）の解析と正規化"""
+
+    @staticmethod
+    def parse(content: str, content_format: str) -> List[Dict]:
+        """
+        銘柄リストを解析
+
+        CSV はヘッダーに symbol（ticker, code も可）列があればその列を、なければ1列目を銘柄コードとする。
+        name, quantity, avg_price 列があれば併せて取り込む。
+        JSON は銘柄コードの配列、{"symbol": ...} の配列、またはそれらを "symbols" に持つオブジェクト。
+
+        Raises:
+            StockTrackingError: 解析できない場合
+        """
+        if content_format == 'json':
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                raise StockTrackingError(f'JSONの形式が無効です: {e}', 400)
+            if isinstance(data, dict):
+                data = data.get('symbols')
+            if not isinstance(data, list):
+                raise StockTrackingError('銘柄コードの配列が必要です', 400)
+            return [item if isinstance(item, dict) else {'symbol': str(item)} for item in data]
+
+        if content_format != 'csv':
+            raise StockTrackingError(f'不明な形式です: {content_format}', 400)
+        rows = [row for row in csv.reader(io.StringIO(content)) if any(cell.strip() for cell in row)]
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        symbol_column = next((c for c in SYMBOL_COLUMNS if c in header), None)
+        if symbol_column is None:
+            return [{'symbol': row[0]} for row in rows]
+        entries = []
+        for row in rows[1:]:
+            entry = dict(zip(header, (cell.strip() for cell in row)))
+            entry['symbol'] = entry.pop(symbol_column, '')
+            entries.append(entry)
+        return entries
+
+    @staticmethod
+    def normalize(entries: List[Dict]) -> Tuple[List[Dict], List[str]]:
+        """
+        銘柄コードを正規化して重複を除く
+
+        Returns:
+            Tuple[List[Dict], List[str]]: (登録する銘柄, 無効な銘柄コード)
+        """
+        stocks: Dict[str, Dict] = {}
+        invalid = []
+        for entry in entries:
+            raw = str(entry.get('symbol') or '').strip()
+            symbol = SymbolUtils.normalize_symbol(raw) if raw else ''
+            if not SYMBOL_PATTERN.match(symbol):
+                invalid.append(raw)
+                continue
+            try:
+                quantity = float(entry.get('quantity') or 0)
+                avg_price = float(entry.get('avg_price') or 0)
+            except (TypeError, ValueError):
+                invalid.append(raw)
+                continue
+            stocks.setdefault(symbol, {
+                'symbol': symbol,
+                'name': (entry.get('name') or '').strip() or None,
+                'quantity': quantity,
+                'avg_price': avg_price,
+            })
+        return list(stocks.values()), invalid
+
+
+class StockImportQueue:
+    """
+    銘柄の一括インポート
+
+    銘柄は1つのトランザクションでまとめて登録し、銘柄名や価格などの情報は
+    銘柄情報取得キュー（enrichment_worker）に追加してバックグラウンドで取得する。
+    ジョブは SQLite の jobs テーブルに保存し、進捗はキューに記録された各銘柄の状態から集計する
+    （登録したプロセスと別のワーカープロセスでも状態を返せる）。
+    """
+
+    def __init__(self, max_symbols: int = IMPORT_MAX_SYMBOLS, job_ttl_minutes: int = IMPORT_JOB_TTL_MINUTES):
+        self.max_symbols = max_symbols
+        self.job_ttl = timedelta(minutes=job_ttl_minutes)
+
+    def start(self, entries: List[Dict], enrich: bool = True, background: bool = True,
+              progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        銘柄を登録し、情報の取得を開始
+
+        Args:
+            entries: StockImporter.parse の結果
+            enrich: 銘柄情報を取得する
+            background: 情報の取得をワーカースレッドに任せる（False の場合は取得できる分を処理してから返す）
+            progress: 進捗が更新されるたびに呼び出される関数（background=False の場合）
+
+        Returns:
+            Dict: ジョブ情報
+
+        Raises:
+            StockTrackingError: 銘柄数が上限を超える場合、登録に失敗した場合
+        """
+        stocks, invalid = StockImporter.normalize(entries)
+        if len(stocks) > self.max_symbols:
+            raise StockTrackingError(f'一度にインポートできる銘柄は{self.max_symbols}件までです', 400)
+        try:
+            added = db.add_stocks(stocks)
+        except Exception as e:
+            raise StockTrackingError(f'銘柄の登録に失敗しました: {e}', 500)
+
+        added_set = set(added)
+        symbols = added if enrich else []
+        params = {
+            'symbols': symbols,
+            'total': len(stocks),
+            'added': len(added),
+            'duplicates': [stock['symbol'] for stock in stocks if stock['symbol'] not in added_set],
+            'invalid': invalid,
+        }
+        db.purge_jobs('import', datetime.now() - self.job_ttl)
+        job = db.create_job('import', params, status='running' if symbols else 'done')
+
+        if symbols:
+            if background:
+                enrichment_worker.enqueue(symbols)
+            else:
+                db.enqueue_enrichment(symbols)
+                report = (lambda _: progress(self.get(job['id']))) if progress else None
+                enrichment_worker.drain(progress=report)
+        return self.get(job['id'])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """ジョブの状態を取得（銘柄ごとの取得状況を集計）"""
+        job = db.get_job(job_id, kind='import')
+        if job is None:
+            return None
+        params = dict(job['params'])
+        symbols = params.pop('symbols')
+
+        states = db.get_enrichments(symbols)
+        counts = {'pending': 0, 'done': 0, 'failed': 0}
+        failures = {}
+        for symbol in symbols:
+            state = states.get(symbol, {'status': 'pending', 'last_error': None})
+            counts[state['status']] += 1
+            if state['last_error']:
+                failures[symbol] = state['last_error']
+
+        finished_at = job['finished_at']
+        if counts['pending'] == 0 and finished_at is None:
+            # 完了を記録して保持期間の起点にする
+            db.finish_job(job_id)
+            finished_at = datetime.now().isoformat()
+        return {
+            'id': job['id'],
+            **params,
+            'submitted_at': job['submitted_at'],
+            'finished_at': finished_at,
+            'status': 'enriching' if counts['pending'] else 'done',
+            'enriched': counts['done'],
+            'failed': counts['failed'],
+            'pending': counts['pending'],
+            'failures': failures,
+        }
+
+
+# グローバルインスタンス
+stock_imports = StockImportQueue()
@@ -1,55 +1,125 @@
 import pandas as pd
-from prophet import Prophet
 import logging
+from typing import Dict, Optional
+from forecast_cache import ForecastCache, forecast_cache
+from fast_forecast import FastForecaster
+from config import PREDICTION_ENGINE
 
 # ロギング設定
 logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
 logging.getLogger('prophet').setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 class StockPredictor:
-    def __init__(self):
-        pass
+    # prophet 以外は FastForecaster の軽量エンジン（Prophetの読み込み不要）
+    ENGINES = ('prophet',) + FastForecaster.ENGINES
 
-    def predict(self, hist_data: pd.DataFrame, periods: int = 30) -> dict:
+    # 日次データ、株価なのでトレンドの変化に追従しやすい設定に
+    DEFAULT_PARAMS = {
+        'daily_seasonality': False,
+        'weekly_seasonality': True,
+        'yearly_seasonality': True,
+        'changepoint_prior_scale': 0.05
+    }
+
+    def __init__(self, cache: Optional[ForecastCache] = forecast_cache, engine: str = PREDICTION_ENGINE, **params):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown forecast engine: {engine}")
+        self.engine = engine
+        self.params = {**self.DEFAULT_PARAMS, **params}
+        self.cache = cache
+
+    def get_cached(self, symbol: str, periods: int = 30) -> Optional[dict]:
+        """本日確認済みの予測結果があれば返す（履歴データの取得も不要）"""
+        if self.cache is None or self.engine != 'prophet':
+            return None
+        result = self.cache.get_checked_today(symbol, self.params, periods)
+        return {**result, 'cached': True} if result else None
+
+    def predict(self, hist_data: pd.DataFrame, periods: int = 30, symbol: Optional[str] = None) -> dict:
         """
         株価データを元に将来の価格を予測する
-        
+
         Args:
             hist_data (pd.DataFrame): yfinanceから取得した履歴データ (indexがDate)
             periods (int): 予測する日数
-            
+            symbol (str): 銘柄コード（指定時は学習済みモデルと予測結果をキャッシュする）
+
         Returns:
             dict: 予測結果 (dates, trend, yhat, yhat_lower, yhat_upper)
         """
+        if self.engine != 'prophet':
+            # 軽量エンジンは学習が十分速いためキャッシュしない
+            forecast = FastForecaster.forecast(self.engine, hist_data, periods)
+            return self._format(forecast, hist_data, periods)
+
+        from prophet.serialize import model_to_json, model_from_json
+
+        if symbol is None or self.cache is None:
+            return self._forecast(self._fit(hist_data), hist_data, periods)
+
+        # 最終バーが同じなら学習済みモデル・予測結果を再利用
+        last_bar = hist_data.index[-1].strftime('%Y-%m-%d')
+        key = ForecastCache.make_key(symbol, last_bar, self.params)
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            self.cache.mark_checked(key, symbol, self.params)
+            cached = entry['forecasts'].get(str(periods))
+            if cached:
+                return {**cached, 'cached': True}
+            if entry.get('model'):
+                try:
+                    model = model_from_json(entry['model'])
+                    result = self._forecast(model, hist_data, periods)
+                    self.cache.add_forecast(key, periods, result)
+                    return result
+                except Exception as e:
+                    logger.warning(f"Failed to restore cached model for {symbol}: {e}")
+
+        model = self._fit(hist_data)
+        result = self._forecast(model, hist_data, periods)
+        try:
+            model_json = model_to_json(model)
+        except Exception as e:
+            logger.warning(f"Failed to serialize model for {symbol}: {e}")
+            model_json = None
+        self.cache.put(key, symbol, self.params, model_json)
+        self.cache.add_forecast(key, periods, result)
+        return result
+
+    def _fit(self, hist_data: pd.DataFrame):
+        """Prophetモデルを学習"""
+        from prophet import Prophet
+
         # データ準備
         df = hist_data.reset_index()[['Date', 'Close']].copy()
         df.columns = ['ds', 'y']
-        
+
         # タイムゾーン情報の削除（Prophetの要件）
         if df['ds'].dt.tz is not None:
             df['ds'] = df['ds'].dt.tz_localize(None)
 
         # モデルの初期化と学習
-        # 日次データ、株価なのでトレンドの変化に追従しやすい設定に
-        model = Prophet(
-            daily_seasonality=False,
-            weekly_seasonality=True,
-            yearly_seasonality=True,
-            changepoint_prior_scale=0.05
-        )
-        
+        model = Prophet(**self.params)
         model.fit(df)
-        
+        return model
+
+    def _forecast(self, model, hist_data: pd.DataFrame, periods: int) -> dict:
+        """学習済みモデルで予測を実行し、レスポンス形式に整形"""
         # 将来のデータフレーム作成（平日のみ）
         future = model.make_future_dataframe(periods=periods, freq='B')
-        
+
         # 予測実行
         forecast = model.predict(future)
-        
+        return self._format(forecast, hist_data, periods)
+
+    def _format(self, forecast: pd.DataFrame, hist_data: pd.DataFrame, periods: int) -> dict:
+        """予測結果 (ds, yhat, yhat_lower, yhat_upper, trend) をレスポンス形式に整形"""
         # 結果の整形
         # 直近の実績 + 予測期間
         result_df = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend']].tail(periods + 30)
-        
+
         return {
             'dates': result_df['ds'].dt.strftime('%Y-%m-%d').tolist(),
             'current_price': float(hist_data['Close'].iloc[-1]),
@@ -59,26 +129,27 @@ class StockPredictor:
                 'upper': result_df['yhat_upper'].tolist(),
                 'trend': result_df['trend'].tolist()
             },
-            'summary': self._generate_summary(forecast, hist_data)
+            'summary': self._generate_summary(forecast, hist_data),
+            'engine': self.engine
         }
 
     def _generate_summary(self, forecast, hist_data):
         last_close = hist_data['Close'].iloc[-1]
         next_day_pred = forecast['yhat'].iloc[-1] # 注: tailで切り取る前の最後の値を見るべきだが、ここでは簡易化
-        
+
         # 正確には直近の実績日以降の最初の予測値を取得する
         last_date = hist_data.index[-1].replace(tzinfo=None)
         future_pred = forecast[forecast['ds'] > last_date].iloc[0]
-        
+
         pred_price = future_pred['yhat']
         lower = future_pred['yhat_lower']
         upper = future_pred['yhat_upper']
-        
+
         diff = pred_price - last_close
         diff_percent = (diff / last_close) * 100
-        
+
         trend = "上昇" if diff > 0 else "下落"
-        
+
         return {
             'next_day': {
                 'date': future_pred['ds'].strftime('%Y-%m-%d'),
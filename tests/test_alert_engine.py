@@ -0,0 +1,144 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from alert_engine import AlertEngine, ThresholdIndex
+
+class TestThresholdIndex(unittest.TestCase):
+
+    def test_crossing(self):
+        index = ThresholdIndex()
+        for rule_id, threshold in enumerate([90, 100, 100, 110]):
+            index.add(threshold, rule_id)
+
+        self.assertEqual(sorted(index.crossed_up(95, 105)), [1, 2])
+        self.assertEqual(index.crossed_up(105, 95), [])
+        self.assertEqual(index.crossed_up(100, 105), [])
+        self.assertEqual(sorted(index.crossed_down(105, 90)), [0, 1, 2])
+
+        index.remove(100, 1)
+        self.assertEqual(index.crossed_up(95, 105), [2])
+        self.assertEqual(len(index), 3)
+
+class TestAlertEngine(unittest.TestCase):
+    """価格キャッシュの変更を PriceCacheWatcher で検知して評価する"""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        self.alerts = AlertEngine(webhook_url='')
+        # 最初の poll は基準の記録だけを行う
+        self.alerts.watcher.poll()
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def save_price(self, symbol, price):
+        db.save_price_cache(symbol, {'current_price': price, 'change_percent': 0.0})
+        return self.alerts.watcher.poll()
+
+    def test_price_crossing(self):
+        self.save_price('AAPL', 95.0)
+        self.alerts.add_rule('AAPL', 'price_above', 100)
+        once = self.alerts.add_rule('AAPL', 'price_above', 102, repeat=False)
+
+        self.save_price('AAPL', 99.0)
+        self.assertEqual(db.get_alert_events(), [])
+
+        self.save_price('AAPL', 105.0)
+        events = db.get_alert_events('AAPL')
+        self.assertEqual(len(events), 2)
+        self.assertEqual(self.alerts.events.qsize(), 2)
+
+        # 一度きりのルールは無効化される
+        rules = {r['id']: r for r in db.get_alert_rules()}
+        self.assertFalse(rules[once['id']]['enabled'])
+
+        # 閾値を跨がない更新では発火しない
+        self.save_price('AAPL', 106.0)
+        self.assertEqual(len(db.get_alert_events('AAPL')), 2)
+
+        # 下落後に再度上抜けると繰り返しルールだけが発火する
+        self.save_price('AAPL', 98.0)
+        self.save_price('AAPL', 103.0)
+        self.assertEqual(len(db.get_alert_events('AAPL')), 3)
+
+    def test_saved_prices_are_evaluated_on_poll(self):
+        self.save_price('AAPL', 95.0)
+        self.alerts.add_rule('AAPL', 'price_above', 100)
+
+        # 保存しただけでは評価せず、次の poll で評価する（他のプロセスの保存も同じ）
+        db.save_price_cache('AAPL', {'current_price': 105.0, 'change_percent': 0.0})
+        self.assertEqual(db.get_alert_events('AAPL'), [])
+        self.assertEqual(self.alerts.watcher.poll(), 1)
+        self.assertEqual(len(db.get_alert_events('AAPL')), 1)
+        self.assertEqual(self.alerts.watcher.poll(), 0)
+
+    def test_rules_changed_by_other_process_are_reloaded(self):
+        self.save_price('AAPL', 95.0)
+        self.save_price('AAPL', 96.0)
+
+        # 別のプロセスの AlertEngine で追加したルールも、次の評価で読み込まれる
+        other = AlertEngine(webhook_url='')
+        rule = other.add_rule('AAPL', 'price_above', 100)
+        self.save_price('AAPL', 105.0)
+        self.assertEqual(len(db.get_alert_events('AAPL')), 1)
+
+        other.remove_rule(rule['id'])
+        self.save_price('AAPL', 98.0)
+        self.save_price('AAPL', 103.0)
+        self.assertEqual(len(db.get_alert_events('AAPL')), 1)
+
+    def test_new_52w_high_once_per_bar(self):
+        self.alerts.add_rule('MSFT', 'new_52w_high')
+        start = datetime.now() - timedelta(days=30)
+        bars = [
+            {'date': (start + timedelta(days=i)).strftime('%Y-%m-%d'),
+             'open': 100, 'high': 100, 'low': 100, 'close': 100.0 - i * 0.1, 'volume': 0}
+            for i in range(20)
+        ]
+        # save_price_data と同じく履歴を保存してから価格キャッシュを保存する
+        db.save_price_history('MSFT', bars)
+        self.save_price('MSFT', bars[-1]['close'])
+        self.assertEqual(db.get_alert_events('MSFT'), [])
+
+        bars[-1] = {**bars[-1], 'close': 120.0}
+        for _ in range(2):
+            db.save_price_history('MSFT', bars)
+            self.save_price('MSFT', 120.0)
+        events = db.get_alert_events('MSFT')
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['rule_type'], 'new_52w_high')
+
+    def test_history_only_saves_are_evaluated(self):
+        self.alerts.add_rule('MSFT', 'new_52w_high')
+        start = datetime.now() - timedelta(days=30)
+        bars = [
+            {'date': (start + timedelta(days=i)).strftime('%Y-%m-%d'),
+             'open': 100, 'high': 100, 'low': 100, 'close': 100.0 - i * 0.1, 'volume': 0}
+            for i in range(20)
+        ]
+        db.save_price_history('MSFT', bars)
+        self.assertEqual(self.alerts.watcher.poll(), 1)
+
+        # バックフィルのように価格キャッシュを更新せず履歴だけを保存した場合も評価する
+        bars.append({**bars[-1], 'date': datetime.now().strftime('%Y-%m-%d'), 'close': 120.0})
+        db.save_price_history('MSFT', bars)
+        self.assertEqual(self.alerts.watcher.poll(), 1)
+        self.assertEqual(self.alerts.watcher.poll(), 0)
+        events = db.get_alert_events('MSFT')
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['rule_type'], 'new_52w_high')
+        self.assertIsNone(db.get_price_cache_entries(['MSFT']).get('MSFT'))
+
+if __name__ == '__main__':
+    unittest.main()
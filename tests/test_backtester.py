@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_analyzer import StockAnalyzer
+from backtester import Backtester
+
+class TestBacktester(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        dates = pd.date_range(start='2022-01-03', periods=200, freq='B')
+        self.closes = pd.DataFrame({
+            'AAA': 100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, 200))),
+            'BBB': 50 * np.exp(np.cumsum(rng.normal(-0.001, 0.01, 200))),
+        }, index=dates)
+
+    def test_score_series_matches_analyze(self):
+        scores = StockAnalyzer.calculate_score_series(self.closes)
+        for t in (5, 30, 60, 120, 199):
+            hist = pd.DataFrame({'Close': self.closes['AAA'].iloc[:t + 1]})
+            self.assertEqual(scores['AAA'].iloc[t], StockAnalyzer.analyze(hist)['score'])
+
+    def test_simulate_enters_next_bar(self):
+        scores = pd.DataFrame({'AAA': [50, 70, 70, 30, 30]}, index=self.closes.index[:5])
+        closes = self.closes[['AAA']].iloc[:5]
+        sim = Backtester.simulate(closes, scores, entry_score=60, exit_score=40, cost_bps=0)
+        self.assertEqual(sim['position']['AAA'].tolist(), [0.0, 0.0, 1.0, 1.0, 0.0])
+
+    def test_simulate_invalid_thresholds(self):
+        with self.assertRaises(ValueError):
+            Backtester.simulate(self.closes, self.closes, entry_score=40, exit_score=60)
+
+    def test_run(self):
+        result = Backtester.run(self.closes, cost_bps=10)
+        self.assertEqual(result['bars'], 200)
+        self.assertIn('AAA', result['symbols'])
+        metrics = result['symbols']['AAA']
+        for key in ('total_return', 'max_drawdown', 'hit_rate', 'trades', 'buy_and_hold_return'):
+            self.assertIn(key, metrics)
+        self.assertLessEqual(metrics['max_drawdown'], 0)
+        self.assertIn('sharpe', result['portfolio'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import BenchmarkSuite, synthetic_history
+from models.database import db_session, engine
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_synthetic_history(self):
+        hist = synthetic_history(300000)
+        self.assertEqual(len(hist), 300000)
+        self.assertTrue(hist.index.is_monotonic_increasing)
+        self.assertTrue((hist['High'] >= hist['Close']).all())
+        self.assertTrue((hist['Low'] <= hist['Open']).all())
+
+    def test_run_small_report(self):
+        suite = BenchmarkSuite(repeat=1, sizes={
+            'analyze_bars': [100], 'format_bars': [100], 'db_symbols': [2], 'dashboard_symbols': [3]
+        })
+        report = suite.run()
+
+        names = {(r['name'], tuple(sorted(r['params'].items()))) for r in report['results']}
+        self.assertIn(('analyze', (('bars', 100),)), names)
+        self.assertIn(('encode_history', (('bars', 100), ('format', 'packed'))), names)
+        self.assertIn(('get_cached_history', (('symbols', 2),)), names)
+        self.assertIn(('dashboard', (('cache', 'warm'), ('symbols', 3))), names)
+        self.assertTrue(all(r['median_ms'] >= 0 for r in report['results']))
+        # 一時データベースから元の接続先に戻す
+        self.assertIs(db_session.get_bind(), engine)
+        db_session.remove()
+
+    def test_compare(self):
+        baseline = {'results': [
+            {'name': 'analyze', 'params': {'bars': 100}, 'median_ms': 10.0},
+            {'name': 'analyze', 'params': {'bars': 1000}, 'median_ms': 10.0},
+        ]}
+        current = {'results': [
+            {'name': 'analyze', 'params': {'bars': 100}, 'median_ms': 11.0},
+            {'name': 'analyze', 'params': {'bars': 1000}, 'median_ms': 13.0},
+            {'name': 'dashboard', 'params': {'symbols': 10}, 'median_ms': 50.0},
+        ]}
+        regressions = BenchmarkSuite.compare(baseline, current, threshold=0.2)
+        self.assertEqual([r['params'] for r in regressions], [{'bars': 1000}])
+        self.assertEqual(regressions[0]['ratio'], 1.3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -64,5 +64,23 @@ class TestDatabase(unittest.TestCase):
         expired = self.db.get_cached_price(symbol, cache_minutes=0)
         self.assertIsNone(expired)
 
+    def test_query_errors(self):
+        Base.metadata.drop_all(self.engine)
+        
+        # 参照の失敗は既定値を返し、判定に使う参照（リース・ジョブ）は例外を送出する
+        self.assertEqual(self.db.get_alert_events(), [])
+        self.assertEqual(self.db.get_price_cache_changes(), [])
+        self.assertIsNone(self.db.get_latest_forecast_result('AAPL', 'drift', 30, '2026-01-01'))
+        self.assertEqual(self.db.get_enrichment_summary()['counts'], {'pending': 0, 'done': 0, 'failed': 0})
+        with self.assertRaises(Exception):
+            self.db.get_leases()
+        with self.assertRaises(Exception):
+            self.db.get_job('missing')
+        
+        # 失敗した更新はロールバックされ、以降の操作に影響しない
+        self.db.save_fx_rates([('JPY', '2026-01-05', 150.0)])
+        Base.metadata.create_all(self.engine)
+        self.assertTrue(self.db.add_stock('AAPL', 'Apple Inc.'))
+
 if __name__ == '__main__':
     unittest.main()
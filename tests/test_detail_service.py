@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch, MagicMock, PropertyMock
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.detail_service import DetailService
+from stock_api import StockAPI
+from leases import RefreshLeases
+
+class TestDetailService(unittest.TestCase):
+
+    def setUp(self):
+        dates = pd.bdate_range('2023-01-02', periods=600, tz='America/New_York')
+        closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, len(dates))))
+        self.hist = pd.DataFrame({
+            'Open': closes, 'High': closes * 1.01, 'Low': closes * 0.99, 'Close': closes,
+            'Volume': np.full(len(dates), 1000)
+        }, index=dates)
+        self.ticker = MagicMock()
+        self.ticker.history.return_value = self.hist
+        type(self.ticker).info = PropertyMock(return_value={'longName': 'Apple Inc.', 'marketCap': 1000, 'trailingPE': 20.0})
+        self.ticker.dividends = pd.Series([0.24, 0.25], index=pd.to_datetime(['2024-02-09', '2024-05-10']))
+
+        patches = [
+            patch('stock_api.StockAPI._get_ticker', return_value=self.ticker),
+            patch('stock_api.save_price_data'),
+            patch('stock_api.db'),
+            patch('stock_api.refresh_leases', RefreshLeases(ttl_seconds=0)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        db_patch = patch('services.detail_service.db')
+        self.db = db_patch.start()
+        self.addCleanup(db_patch.stop)
+        self.db.get_latest_forecast_result.return_value = None
+        self.db.get_cached_price.return_value = None
+
+    def test_trim_history(self):
+        trimmed = StockAPI.trim_history(self.hist, '3mo')
+        self.assertLess(len(trimmed), 70)
+        self.assertEqual(trimmed.index[-1], self.hist.index[-1])
+        self.assertGreater(trimmed.index[0], self.hist.index[-1] - pd.DateOffset(months=3))
+        self.assertIs(StockAPI.trim_history(self.hist, 'max'), self.hist)
+        self.assertEqual(StockAPI.longer_period('3mo', '2y'), '2y')
+        self.assertEqual(StockAPI.longer_period('max', '2y'), 'max')
+
+    def test_price_and_analysis_share_one_history_download(self):
+        data, status = DetailService.get_detail('AAPL', '3mo', ('price', 'analysis'), 'columns')
+
+        self.assertEqual(status, 200)
+        self.ticker.history.assert_called_once_with(period='3mo')
+        self.assertEqual(data['price']['name'], 'Apple Inc.')
+        self.assertEqual(data['price']['current_price'], self.hist['Close'].iloc[-1])
+        self.assertEqual(len(data['price']['history']['date']), len(StockAPI.trim_history(self.hist, '3mo')))
+        self.assertIn('symbol', data['analysis'])
+        self.assertNotIn('errors', data)
+
+    def test_prediction_widens_history_and_trims_price(self):
+        data, status = DetailService.get_detail(
+            'AAPL', '1mo', ('price', 'financials', 'dividends', 'prediction'), 'columns', 10, 'drift'
+        )
+
+        self.assertEqual(status, 200)
+        self.ticker.history.assert_called_once_with(period='2y')
+        self.assertLess(len(data['price']['history']['date']), 25)
+        self.assertEqual(data['financials']['pe_ratio'], 20.0)
+        self.assertEqual(data['dividends']['annual_dividend'], 0.49)
+        self.assertEqual(data['prediction']['engine'], 'drift')
+        self.assertEqual(len(data['prediction']['dates']), 40)
+
+    def test_fresh_price_cache_skips_upstream(self):
+        self.db.get_cached_price.return_value = {
+            'symbol': 'AAPL', 'current_price': 123.0, 'previous_close': 120.0, 'change': 3.0, 'change_percent': 2.5,
+            'volume': 1000, 'cached_at': '2024-01-01T09:00:00'
+        }
+        self.db.get_cached_history.return_value = []
+
+        data, status = DetailService.get_detail('AAPL', '1mo', ('price',))
+
+        self.assertEqual(status, 200)
+        self.ticker.history.assert_not_called()
+        self.assertTrue(data['price']['cached'])
+        self.assertEqual(data['price']['current_price'], 123.0)
+
+    def test_price_only_fetches_history_through_fallback(self):
+        data, status = DetailService.get_detail('AAPL', '1mo', ('price',))
+
+        self.assertEqual(status, 200)
+        self.ticker.history.assert_called_once()
+        self.assertEqual(data['price']['current_price'], self.hist['Close'].iloc[-1])
+
+    def test_prophet_job_receives_shared_history(self):
+        with patch('prediction_jobs.prediction_jobs.submit', return_value={'id': 'job', 'status': 'queued'}) as submit:
+            data, status = DetailService.get_detail('AAPL', '1mo', ('analysis', 'prediction'), periods=10, engine='prophet')
+
+        self.assertEqual(status, 200)
+        self.ticker.history.assert_called_once_with(period='2y')
+        self.assertEqual(data['prediction'], {'job_id': 'job', 'status': 'queued', 'periods': 10})
+        self.assertEqual(len(submit.call_args.kwargs['hist']), len(StockAPI.trim_history(self.hist, '2y')))
+
+    def test_failed_fields_are_reported_without_failing_the_request(self):
+        type(self.ticker).info = PropertyMock(side_effect=Exception('API Error'))
+
+        data, status = DetailService.get_detail('AAPL', '3mo', ('analysis', 'financials'))
+
+        self.assertEqual(status, 200)
+        self.assertIsNotNone(data['analysis'])
+        self.assertIsNone(data['financials'])
+        self.assertIn('financials', data['errors'])
+
+if __name__ == '__main__':
+    unittest.main()
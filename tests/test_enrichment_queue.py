@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from enrichment_queue import EnrichmentWorker
+from services.stock_service import StockService
+
+class TestEnrichmentWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        self.worker = EnrichmentWorker(batch_size=10, requests_per_second=0, max_workers=2,
+                                       max_attempts=3, backoff_seconds=60, max_backoff_seconds=100)
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def history(self):
+        dates = pd.bdate_range('2024-01-02', periods=5)
+        closes = np.linspace(100, 104, 5)
+        return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1000}, index=dates)
+
+    @patch('services.stock_service.enrichment_worker')
+    def test_add_stock_registers_without_fetching(self, mock_worker):
+        data, status = StockService.add_stock('7203')
+
+        self.assertEqual(status, 201)
+        self.assertEqual(data['symbol'], '7203.T')
+        self.assertFalse(data['info_loaded'])
+        mock_worker.enqueue.assert_called_once_with(['7203.T'])
+        self.assertEqual(StockService.add_stock('7203')[1], 400)
+
+    def test_due_jobs_and_placeholder_names(self):
+        db.add_stock('AAPL', 'AAPL')
+        db.add_stock('MSFT', 'My Microsoft')
+        db.enqueue_enrichment(['AAPL', 'MSFT'])
+        db.finish_enrichment('MSFT', 'timeout', datetime.now() + timedelta(minutes=5))
+
+        self.assertEqual([job['symbol'] for job in db.get_due_enrichments(10)], ['AAPL'])
+        self.assertIsNotNone(db.get_next_enrichment_time())
+
+        db.update_stock_names({'AAPL': 'Apple Inc.', 'MSFT': 'Microsoft Corp'}, placeholder_only=True)
+        names = {s['symbol']: s['name'] for s in db.get_tracked_stocks()}
+        self.assertEqual(names, {'AAPL': 'Apple Inc.', 'MSFT': 'My Microsoft'})
+
+    @patch('enrichment_queue.StockAPI.get_multiple_stocks_history')
+    @patch('enrichment_queue.StockAPI.fetch_info')
+    def test_failures_back_off_until_max_attempts(self, mock_fetch_info, mock_history):
+        mock_fetch_info.return_value = {'longName': 'Apple Inc.'}
+        mock_history.return_value = {}
+        db.add_stock('AAPL', 'AAPL')
+        db.enqueue_enrichment(['AAPL'])
+
+        self.assertEqual(self.worker.run_once(), 1)
+        state = db.get_enrichments(['AAPL'])['AAPL']
+        self.assertEqual((state['status'], state['attempts']), ('pending', 1))
+        self.assertEqual(self.worker.run_once(), 0)
+
+        # 60秒から倍々に延び、max_backoff_seconds で頭打ち
+        delay = datetime.fromisoformat(state['next_attempt_at']) - datetime.now()
+        self.assertAlmostEqual(delay.total_seconds(), 60, delta=5)
+        self.assertAlmostEqual((self.worker._retry_at(1) - datetime.now()).total_seconds(), 100, delta=5)
+        self.assertIsNone(self.worker._retry_at(2))
+
+        self.worker.process([{'symbol': 'AAPL', 'attempts': 2}])
+        state = db.get_enrichments(['AAPL'])['AAPL']
+        self.assertEqual(state['status'], 'failed')
+        self.assertEqual(db.get_enrichment_summary()['counts']['failed'], 1)
+
+        mock_history.return_value = {'AAPL': self.history()}
+        db.enqueue_enrichment(['AAPL'])
+        self.assertEqual(self.worker.drain(), 1)
+        self.assertEqual(db.get_enrichments(['AAPL'])['AAPL']['status'], 'done')
+        self.assertEqual(db.get_tracked_stocks()[0]['name'], 'Apple Inc.')
+        self.assertEqual(db.get_cached_price('AAPL')['current_price'], 104.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fast_forecast import FastForecaster
+from stock_predictor import StockPredictor
+
+class TestFastForecaster(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        dates = pd.bdate_range(start='2024-01-01', periods=300, tz='Asia/Tokyo')
+        closes = 100 * np.exp(np.cumsum(0.001 + 0.01 * rng.standard_normal(len(dates))))
+        self.hist = pd.DataFrame({'Close': closes}, index=pd.Index(dates, name='Date'))
+
+    def test_forecast_shape_and_bands(self):
+        for engine in FastForecaster.ENGINES:
+            with self.subTest(engine=engine):
+                forecast = FastForecaster.forecast(engine, self.hist, periods=30)
+                self.assertEqual(len(forecast), len(self.hist) + 30)
+                future = forecast.tail(30)
+                self.assertTrue((future['ds'].dt.dayofweek < 5).all())
+                self.assertTrue(future['ds'].iloc[0] > self.hist.index[-1].tz_localize(None))
+                self.assertTrue((future['yhat_lower'] < future['yhat']).all())
+                self.assertTrue((future['yhat'] < future['yhat_upper']).all())
+                # 予測区間は先の日付ほど広がる
+                width = (future['yhat_upper'] - future['yhat_lower']).to_numpy()
+                self.assertGreater(width[-1], width[0])
+
+    def test_drift_follows_mean_log_return(self):
+        forecast = FastForecaster.forecast('drift', self.hist, periods=5)
+        mu = np.diff(np.log(self.hist['Close'].to_numpy())).mean()
+        expected = self.hist['Close'].iloc[-1] * np.exp(mu * 5)
+        self.assertAlmostEqual(forecast['yhat'].iloc[-1], expected, places=6)
+
+    def test_predictor_response_shape(self):
+        result = StockPredictor(cache=None, engine='holt_winters').predict(self.hist, periods=30, symbol='AAPL')
+        self.assertEqual(result['engine'], 'holt_winters')
+        self.assertEqual(len(result['dates']), 60)
+        self.assertEqual(set(result['forecast']), {'yhat', 'lower', 'upper', 'trend'})
+        self.assertIn('next_day', result['summary'])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            StockPredictor(engine='unknown')
+
+class TestPredictionRoute(unittest.TestCase):
+    """GET /api/stocks/<symbol>/prediction の入力検証とエラー応答"""
+
+    def setUp(self):
+        from app import app
+        self.client = app.test_client()
+        patcher = patch('app.db.get_latest_forecast_result', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_invalid_periods(self):
+        for periods in ('abc', '0', '-5', '100000'):
+            with self.subTest(periods=periods):
+                response = self.client.get(f'/api/stocks/AAPL/prediction?engine=drift&periods={periods}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('periods', response.get_json()['error'])
+
+    def test_fast_engine_failure_returns_json_error(self):
+        with patch('app.StockAPI.get_history', side_effect=RuntimeError('upstream down')):
+            response = self.client.get('/api/stocks/AAPL/prediction?engine=drift&periods=5')
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('upstream down', response.get_json()['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import sys
+import os
+from datetime import datetime
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from forecast_batch import ForecastBatchRunner, ForecastBatchScheduler
+from config import PREDICTION_HISTORY_PERIOD
+
+class TestForecastBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+        dates = pd.bdate_range(start='2025-01-01', periods=120, name='Date')
+        closes = 100 * np.exp(np.cumsum(np.full(len(dates), 0.001)))
+        self.histories = {
+            'AAPL': pd.DataFrame({'Close': closes}, index=dates),
+            'MSFT': pd.DataFrame({'Close': closes * 2}, index=dates),
+            'SHORT': pd.DataFrame({'Close': closes[:10]}, index=dates[:10]),
+        }
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def download(self, symbols, period):
+        return {s: self.histories[s] for s in symbols if s in self.histories}
+
+    def test_run_saves_results_and_resumes(self):
+        with patch('forecast_batch.StockAPI.get_multiple_stocks_history', side_effect=self.download) as mock_download:
+            state = ForecastBatchRunner.run(
+                symbols=['AAPL', 'MSFT', 'SHORT', 'MISSING'], engine='drift',
+                max_workers=1, run_date='2026-01-05', chunk_size=2
+            )
+            self.assertEqual((state['done'], state['failed'], state['skipped']), (2, 2, 0))
+            self.assertEqual(set(state['failures']), {'SHORT', 'MISSING'})
+
+            saved = db.get_latest_forecast_result('AAPL', 'drift', 30, '2026-01-05')
+            self.assertEqual(saved['as_of'], self.histories['AAPL'].index[-1].strftime('%Y-%m-%d'))
+            self.assertEqual(len(saved['result']['dates']), 60)
+
+            # 再実行時は完了済みの銘柄をスキップし、失敗した銘柄のみ再計算
+            mock_download.reset_mock()
+            state = ForecastBatchRunner.run(
+                symbols=['AAPL', 'MSFT', 'SHORT', 'MISSING'], engine='drift',
+                max_workers=1, run_date='2026-01-05'
+            )
+            self.assertEqual(state['skipped'], 2)
+            mock_download.assert_called_once_with(['SHORT', 'MISSING'], period=PREDICTION_HISTORY_PERIOD)
+
+    def test_next_run_skips_weekend(self):
+        friday_evening = datetime(2026, 1, 9, 20, 0)
+        self.assertEqual(ForecastBatchScheduler.next_run('18:00', friday_evening), datetime(2026, 1, 12, 18, 0))
+        self.assertEqual(ForecastBatchScheduler.next_run('21:00', friday_evening), datetime(2026, 1, 9, 21, 0))
+
+    def test_scheduler_stops_and_restarts(self):
+        scheduler = ForecastBatchScheduler()
+        scheduler.start('18:00')
+        thread = scheduler._thread
+        scheduler.stop()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+        # バックグラウンド処理の担当に戻った場合は再開できる
+        scheduler.start('18:00')
+        self.assertIsNot(scheduler._thread, thread)
+        self.assertTrue(scheduler._thread.is_alive())
+        scheduler.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast_cache import ForecastCache
+
+class TestForecastCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.params = {'changepoint_prior_scale': 0.05}
+        self.cache = ForecastCache(cache_dir=self.tmpdir.name, max_entries=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_bar_and_params(self):
+        key = ForecastCache.make_key('7203.T', '2026-01-05', self.params)
+        self.assertNotEqual(key, ForecastCache.make_key('7203.T', '2026-01-06', self.params))
+        self.assertNotEqual(key, ForecastCache.make_key('7203.T', '2026-01-05', {'changepoint_prior_scale': 0.1}))
+
+    def test_put_and_reload_from_disk(self):
+        key = ForecastCache.make_key('AAPL', '2026-01-05', self.params)
+        self.cache.put(key, 'AAPL', self.params, '{"model": 1}')
+        self.cache.add_forecast(key, 30, {'dates': ['2026-01-06']})
+
+        self.assertEqual(self.cache.get_checked_today('AAPL', self.params, 30), {'dates': ['2026-01-06']})
+        self.assertIsNone(self.cache.get_checked_today('AAPL', self.params, 60))
+
+        # 新しいインスタンスでもディスクから復元できる
+        reloaded = ForecastCache(cache_dir=self.tmpdir.name)
+        self.assertEqual(reloaded.get_checked_today('AAPL', self.params, 30), {'dates': ['2026-01-06']})
+        self.assertEqual(reloaded.get(key)['model'], '{"model": 1}')
+
+    def test_new_bar_replaces_previous_entry(self):
+        old_key = ForecastCache.make_key('AAPL', '2026-01-05', self.params)
+        new_key = ForecastCache.make_key('AAPL', '2026-01-06', self.params)
+        self.cache.put(old_key, 'AAPL', self.params, None)
+        self.cache.put(new_key, 'AAPL', self.params, None)
+        self.assertEqual(os.listdir(self.tmpdir.name), [f"{new_key}.json"])
+
+    def test_lru_eviction(self):
+        keys = [ForecastCache.make_key(s, '2026-01-05', self.params) for s in ('A', 'B', 'C')]
+        for symbol, key in zip(('A', 'B', 'C'), keys):
+            self.cache.put(key, symbol, self.params, None)
+        self.assertNotIn(keys[0], self.cache._entries)
+        # ディスクからは引き続き取得できる
+        self.assertIsNotNone(self.cache.get(keys[0]))
+
+    def test_index_is_loaded_from_file_names(self):
+        key = ForecastCache.make_key('^N225', '2026-01-05', self.params)
+        self.cache.put(key, '^N225', self.params, None)
+        self.cache.add_forecast(key, 30, {'dates': ['2026-01-06']})
+        expired = ForecastCache.make_key('MSFT', '2025-01-05', self.params)
+        self.cache.put(expired, 'MSFT', self.params, None)
+        old = time.time() - 30 * 86400
+        os.utime(os.path.join(self.tmpdir.name, f"{expired}.json"), (old, old))
+
+        # 索引の復元ではエントリを読み込まず、期限切れの削除は別スレッドで行う
+        reloaded = ForecastCache(cache_dir=self.tmpdir.name)
+        with patch.object(reloaded, '_read', wraps=reloaded._read) as read, \
+                patch('forecast_cache.threading.Thread') as thread:
+            reloaded.load_index()
+            read.assert_not_called()
+            self.assertEqual(thread.call_args.kwargs['target'], reloaded._purge_in_background)
+            thread.return_value.start.assert_called_once()
+        self.assertEqual(reloaded.get_checked_today('^N225', self.params, 30), {'dates': ['2026-01-06']})
+
+        self.assertEqual(reloaded.purge_expired(), 1)
+        self.assertEqual(os.listdir(self.tmpdir.name), [f"{key}.json"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from forecast_evaluation import ForecastEvaluator
+
+class TestForecastEvaluation(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def test_cutoff_indices(self):
+        cutoffs = ForecastEvaluator.cutoff_indices(n_bars=100, max_horizon=10, n_cutoffs=5, min_train=50)
+        self.assertEqual(cutoffs[0], 49)
+        self.assertEqual(cutoffs[-1], 89)
+        self.assertEqual(len(cutoffs), 5)
+        self.assertEqual(ForecastEvaluator.cutoff_indices(40, 10, 5, 50), [])
+
+    def test_exact_drift_is_perfect(self):
+        dates = pd.bdate_range(start='2025-01-01', periods=120, name='Date')
+        hist = pd.DataFrame({'Close': 100 * np.exp(0.002 * np.arange(len(dates)))}, index=dates)
+        result = ForecastEvaluator.evaluate(hist, 'drift', horizons=[1, 5], n_cutoffs=4, min_train=60)
+        self.assertEqual(result['cutoffs'], 4)
+        self.assertAlmostEqual(result['horizons'][5]['mape'], 0.0, places=6)
+        self.assertAlmostEqual(result['horizons'][5]['rmse'], 0.0, places=6)
+
+    def test_run_saves_results(self):
+        rng = np.random.default_rng(1)
+        start = datetime.now() - timedelta(days=400)
+        for symbol in ('AAPL', 'MSFT'):
+            closes = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal(200)))
+            db.save_price_history(symbol, [
+                {'date': (start + timedelta(days=i)).strftime('%Y-%m-%d'), 'open': c, 'high': c, 'low': c, 'close': c, 'volume': 0}
+                for i, c in enumerate(closes)
+            ], days=len(closes))
+
+        result = ForecastEvaluator.run(
+            symbols=['AAPL', 'MSFT', 'NONE'], engines=['drift', 'linear'],
+            horizons=[1, 5], n_cutoffs=3, min_train=100, days=500, max_workers=1
+        )
+        self.assertEqual(result['symbols'], 2)
+        self.assertEqual(result['missing_symbols'], ['NONE'])
+        self.assertEqual(len(result['summary']), 4)
+        for row in result['summary']:
+            self.assertEqual(row['symbols'], 2)
+            self.assertTrue(0.0 <= row['coverage'] <= 1.0)
+
+        saved = db.get_forecast_evaluations()
+        self.assertEqual(len(saved), 8)
+        self.assertTrue(all(r['run_id'] == result['run_id'] for r in saved))
+
+if __name__ == '__main__':
+    unittest.main()
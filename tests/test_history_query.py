@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import json
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from history_query import HistoryQuery
+
+class TestHistoryQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+        # 2024-01-29 (月) 〜 2024-02-09 (金) の10営業日
+        days = ['2024-01-29', '2024-01-30', '2024-01-31', '2024-02-01', '2024-02-02',
+                '2024-02-05', '2024-02-06', '2024-02-07', '2024-02-08', '2024-02-09']
+        db.save_price_history('AAPL', [
+            {'date': d, 'open': 100.0 + i, 'high': 110.0 + i, 'low': 90.0 + i, 'close': 105.0 + i, 'volume': 10}
+            for i, d in enumerate(days)
+        ], days=len(days))
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def fetch(self, **kwargs):
+        return json.loads(''.join(HistoryQuery('AAPL', **kwargs).stream(chunk_rows=3)))
+
+    def test_range_and_projection(self):
+        data = self.fetch(fields=['close'], start='2024-01-31', end='2024-02-05')
+
+        self.assertEqual(data['fields'], ['date', 'close'])
+        self.assertEqual(data['rows'], [
+            ['2024-01-31', 107.0], ['2024-02-01', 108.0], ['2024-02-02', 109.0], ['2024-02-05', 110.0]
+        ])
+        self.assertEqual(data['count'], 4)
+        self.assertIsNone(data['next'])
+
+    def test_paging_with_limit(self):
+        first = self.fetch(fields=['close'], limit=4)
+        second = self.fetch(fields=['close'], limit=4, start=first['next'])
+        self.assertEqual(first['next'], '2024-02-02')
+        self.assertEqual(second['rows'][0][0], '2024-02-02')
+
+        latest = self.fetch(fields=['close'], limit=3, descending=True)
+        self.assertEqual([r[0] for r in latest['rows']], ['2024-02-09', '2024-02-08', '2024-02-07'])
+        self.assertEqual(latest['next'], '2024-02-06')
+
+    def test_weekly_resample(self):
+        data = self.fetch(interval='1wk')
+        self.assertEqual(data['rows'], [
+            ['2024-01-29', 100.0, 114.0, 90.0, 109.0, 50],
+            ['2024-02-05', 105.0, 119.0, 95.0, 114.0, 50],
+        ])
+
+        descending = self.fetch(interval='1mo', fields=['open', 'close'], descending=True, limit=1)
+        self.assertEqual(descending['rows'], [['2024-02-01', 103.0, 114.0]])
+        self.assertEqual(descending['next'], '2024-01-31')
+
+    def test_invalid_parameters(self):
+        for kwargs in ({'fields': ['adj_close']}, {'interval': '1h'}, {'start': '2024/01/01'}, {'limit': 0}):
+            with self.assertRaises(ValueError):
+                HistoryQuery('AAPL', **kwargs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import gzip
+import json
+import sys
+import os
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from http_cache import ConditionalGet, CompressedResponseCache
+
+class TestConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def test_if_none_match(self):
+        etag = ConditionalGet.make_etag('dashboard', ('AAPL',), '2026-01-05T10:00:00')
+        with self.app.test_request_context(headers={'If-None-Match': f'"{etag}"'}):
+            response = ConditionalGet.not_modified(etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers['ETag'], f'"{etag}"')
+        with self.app.test_request_context(headers={'If-None-Match': '"other"'}):
+            self.assertIsNone(ConditionalGet.not_modified(etag))
+
+    def test_if_modified_since(self):
+        last_modified = datetime(2026, 1, 5, 10, 0, 0, 500000)
+        with self.app.test_request_context():
+            header = ConditionalGet.apply(self.app.response_class(), 'x', last_modified).headers['Last-Modified']
+        with self.app.test_request_context(headers={'If-Modified-Since': header}):
+            self.assertIsNotNone(ConditionalGet.not_modified('x', last_modified))
+            self.assertIsNone(ConditionalGet.not_modified('x', last_modified + timedelta(seconds=2)))
+
+    def test_data_version(self):
+        db.save_price_cache('AAPL', {'current_price': 100.0})
+        db.save_price_history('AAPL', [
+            {'date': datetime.now().strftime('%Y-%m-%d'), 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 0}
+        ])
+        version = db.get_data_version(['AAPL'])
+        self.assertTrue(version['fresh'])
+        self.assertEqual(version['history_date'], datetime.now().strftime('%Y-%m-%d'))
+        self.assertIsNotNone(version['cached_at'])
+
+        # キャッシュのない銘柄が含まれる場合は fresh ではない
+        self.assertFalse(db.get_data_version(['AAPL', 'MSFT'])['fresh'])
+        self.assertFalse(db.get_data_version(['AAPL'], cache_minutes=0)['fresh'])
+
+class TestCompressedResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.cache = CompressedResponseCache(min_size=100, max_bytes=10000)
+        self.payload = [{'symbol': f'S{i}', 'price': 100.0} for i in range(50)]
+
+    def _store(self, key, accept='gzip'):
+        with self.app.test_request_context(headers={'Accept-Encoding': accept}):
+            return self.cache.store(key, self.app.json.response(self.payload))
+
+    def test_store_and_respond_with_negotiated_codec(self):
+        response = self._store('v1')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.get_data())), self.payload)
+
+        with self.app.test_request_context(headers={'Accept-Encoding': 'identity'}):
+            plain = self.cache.respond('v1')
+            self.assertNotIn('Content-Encoding', plain.headers)
+            self.assertEqual(json.loads(plain.get_data()), self.payload)
+        with self.app.test_request_context():
+            self.assertIsNone(self.cache.respond('v2'))
+
+    def test_small_and_error_responses_are_not_cached(self):
+        with self.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            small = self.cache.store('small', self.app.json.response({'a': 1}))
+            self.assertNotIn('Content-Encoding', small.headers)
+            error = self.app.json.response(self.payload)
+            error.status_code = 500
+            self.assertIs(self.cache.store('error', error), error)
+            self.assertIsNone(self.cache.respond('small'))
+
+    def test_eviction_by_size(self):
+        for i in range(10):
+            self._store(f'v{i}')
+        self.assertLessEqual(self.cache._size, self.cache.max_bytes)
+        with self.app.test_request_context():
+            self.assertIsNone(self.cache.respond('v0'))
+            self.assertIsNotNone(self.cache.respond('v9'))
+
+if __name__ == '__main__':
+    unittest.main()
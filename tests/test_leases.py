@@ -0,0 +1,176 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base, engine as default_engine
+from database import db
+from leases import RefreshLeases, RoleLease
+from stock_api import get_stock_price_with_fallback
+
+class LeaseTestCase(unittest.TestCase):
+    """ファイル上のSQLite（スレッドごとに別の接続で同時に書き込む）"""
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._dir.name, 'leases.db')}")
+        db_session.remove()
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        db_session.remove()
+        db_session.configure(bind=default_engine)
+        self.engine.dispose()
+        self._dir.cleanup()
+
+class TestDatabaseLeases(LeaseTestCase):
+
+    def test_acquire_renew_expire_release(self):
+        now = datetime(2024, 1, 1, 9, 0)
+        self.assertTrue(db.acquire_lease('refresh:AAPL', 'a', 30, now=now))
+        self.assertFalse(db.acquire_lease('refresh:AAPL', 'b', 30, now=now + timedelta(seconds=10)))
+        # 保持者は延長でき、取得時刻は変わらない
+        self.assertTrue(db.acquire_lease('refresh:AAPL', 'a', 30, now=now + timedelta(seconds=20)))
+        lease = db.get_leases(now=now + timedelta(seconds=20))[0]
+        self.assertEqual(lease['acquired_at'], now.isoformat())
+        self.assertEqual(lease['expires_at'], (now + timedelta(seconds=50)).isoformat())
+        # 失効後は他の所有者が取得できる
+        self.assertTrue(db.acquire_lease('refresh:AAPL', 'b', 30, now=now + timedelta(seconds=51)))
+
+        db.release_lease('refresh:AAPL', 'a')
+        self.assertEqual(db.get_leases('refresh:', now=now + timedelta(seconds=52))[0]['owner'], 'b')
+        db.release_lease('refresh:AAPL', 'b')
+        self.assertEqual(db.get_leases(now=now), [])
+
+    def test_only_one_concurrent_acquirer(self):
+        barrier = threading.Barrier(8)
+
+        def acquire(owner):
+            barrier.wait()
+            try:
+                return db.acquire_lease('role:background', owner, 30)
+            finally:
+                db_session.remove()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(acquire, [f'worker-{i}' for i in range(8)]))
+        self.assertEqual(results.count(True), 1)
+
+class TestRefreshLeases(LeaseTestCase):
+
+    def test_waits_for_shared_result(self):
+        leases = RefreshLeases(ttl_seconds=30, wait_seconds=5, poll_seconds=0.01)
+        db.acquire_lease('refresh:AAPL:1mo', 'other-worker', 30)
+        saved = []
+        threading.Timer(0.05, lambda: saved.append('saved')).start()
+
+        result = leases.run('AAPL:1mo', lambda: 'fetched', lambda since: 'shared' if saved else None)
+        self.assertEqual(result, 'shared')
+
+    def test_fetches_after_holder_releases_or_timeout(self):
+        leases = RefreshLeases(ttl_seconds=30, wait_seconds=0.05, poll_seconds=0.01)
+        db.acquire_lease('refresh:AAPL:1mo', 'other-worker', 30)
+        self.assertEqual(leases.run('AAPL:1mo', lambda: 'fetched', lambda since: None), 'fetched')
+
+        db.release_lease('refresh:AAPL:1mo', 'other-worker')
+        self.assertEqual(leases.run('AAPL:1mo', lambda: 'fetched', lambda since: None), 'fetched')
+        # 取得後はリースを解放する
+        self.assertEqual(db.get_leases(), [])
+        self.assertEqual(RefreshLeases(ttl_seconds=0).run('AAPL', lambda: 'direct', lambda since: None), 'direct')
+
+    def test_concurrent_requests_fetch_once(self):
+        dates = pd.bdate_range(end=datetime.now(), periods=5)
+        closes = np.linspace(100, 104, 5)
+        hist = pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1000}, index=dates)
+        calls = []
+
+        def slow_history(symbol, period):
+            calls.append(symbol)
+            time.sleep(0.2)
+            return hist
+
+        def request(_):
+            try:
+                return get_stock_price_with_fallback('AAPL', use_cache=False)
+            finally:
+                db_session.remove()
+
+        with patch('stock_api.refresh_leases', RefreshLeases(ttl_seconds=30, wait_seconds=5, poll_seconds=0.02)), \
+                patch('stock_api.StockAPI.get_history', side_effect=slow_history), \
+                patch('stock_api.StockAPI.get_ticker_info', return_value={'name': 'Apple Inc.'}):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(request, range(4)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sum(1 for r in results if r['cached']), 3)
+        self.assertTrue(all(r['current_price'] == 104 for r in results))
+        self.assertEqual(len(results[0]['history']), 5)
+
+class TestRoleLease(LeaseTestCase):
+
+    def test_single_holder_and_takeover(self):
+        started = []
+        first = RoleLease('background', lambda: started.append('first'), ttl_seconds=30)
+        second = RoleLease('background', lambda: started.append('second'), ttl_seconds=30)
+        first._owner, second._owner = 'host:1', 'host:2'
+
+        self.assertTrue(first.renew())
+        self.assertFalse(second.renew())
+        self.assertTrue(first.renew())
+        self.assertEqual(started, ['first'])
+
+        # 担当プロセスが終了してリースを解放すると、他のプロセスが引き継ぐ
+        db.release_lease(first.name, first._owner)
+        self.assertTrue(second.renew())
+        self.assertEqual(started, ['first', 'second'])
+        self.assertFalse(first.renew())
+        self.assertFalse(first.holding)
+
+    def test_lost_lease_stops_role(self):
+        events = []
+        first = RoleLease('background', lambda: events.append('start'), lambda: events.append('stop'), ttl_seconds=30)
+        first._owner = 'host:1'
+        self.assertTrue(first.renew())
+
+        # 延長が遅れて他のプロセスに取得されると、担当の処理を止める
+        now = datetime.now() + timedelta(seconds=31)
+        self.assertTrue(db.acquire_lease(first.name, 'host:2', 30, now=now))
+        self.assertFalse(first.renew())
+        self.assertFalse(first.holding)
+        self.assertEqual(events, ['start', 'stop'])
+
+    def test_failed_start_releases_lease(self):
+        attempts = []
+        stopped = []
+
+        def start():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('boom')
+
+        lease = RoleLease('background', start, lambda: stopped.append(1), ttl_seconds=30)
+        lease._owner = 'host:1'
+
+        # 開始に失敗したらリースを手放し、次の延長で開始し直す
+        self.assertFalse(lease.renew())
+        self.assertFalse(lease.holding)
+        self.assertEqual(db.get_leases('role:'), [])
+        self.assertEqual(stopped, [1])
+        self.assertTrue(lease.renew())
+        self.assertTrue(lease.holding)
+        self.assertEqual(len(attempts), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_yahoo import FakeYahooServer
+from loadtest import AppServer, LoadTest, percentile, summarize
+from stock_api import StockAPI
+import yahoo_http
+
+class TestFakeYahoo(unittest.TestCase):
+
+    def test_http_ticker_reads_fake_upstream(self):
+        with FakeYahooServer() as upstream:
+            ticker = yahoo_http.YahooHttpTicker('7203.T', upstream.base_url)
+            hist = ticker.history(period='3mo')
+            self.assertEqual(len(hist), 66)
+            self.assertEqual(list(hist.columns), ['Open', 'High', 'Low', 'Close', 'Volume'])
+            self.assertIsNotNone(hist.index.tz)
+            # 同じ銘柄は常に同じ値
+            self.assertTrue(hist['Close'].equals(ticker.history(period='3mo')['Close']))
+
+            info = ticker.info
+            self.assertEqual(info['longName'], '7203.T Corporation')
+            self.assertIsInstance(info['marketCap'], int)
+            self.assertEqual(len(ticker.dividends), 2520 // 63)
+
+            downloaded = yahoo_http.download(['AAPL', 'MSFT'], upstream.base_url)
+            self.assertEqual(sorted(downloaded), ['AAPL', 'MSFT'])
+            self.assertEqual(upstream.counts['quoteSummary'], 1)
+
+    def test_stock_api_uses_configured_upstream(self):
+        with FakeYahooServer() as upstream, \
+                patch('stock_api.UPSTREAM_BASE_URL', upstream.base_url):
+            self.assertIsInstance(StockAPI._get_ticker('7203'), yahoo_http.YahooHttpTicker)
+            self.assertEqual(StockAPI.get_ticker_info('AAPL')['name'], 'AAPL Corporation')
+            self.assertEqual(sorted(StockAPI.get_multiple_stocks_history(['AAPL', 'MSFT'])), ['AAPL', 'MSFT'])
+
+    def test_rate_limit_and_failures(self):
+        with FakeYahooServer(rate_limit_rate=1.0) as upstream:
+            with self.assertRaisesRegex(Exception, 'Too Many Requests'):
+                yahoo_http.YahooHttpTicker('AAPL', upstream.base_url).history()
+            self.assertEqual(yahoo_http.download(['AAPL'], upstream.base_url), {})
+            self.assertEqual(upstream.counts, {'rate_limited': 2})
+        with FakeYahooServer(failure_rate=1.0) as upstream:
+            with self.assertRaises(Exception):
+                yahoo_http.YahooHttpTicker('AAPL', upstream.base_url).info
+            self.assertEqual(upstream.counts, {'failed': 1})
+
+class TestLoadTestReport(unittest.TestCase):
+
+    def test_percentile_and_summary(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+        stats = summarize([(10.0, False), (20.0, False), (30.0, True), (40.0, False)], elapsed=2.0)
+        self.assertEqual(stats['count'], 4)
+        self.assertEqual(stats['error_rate'], 0.25)
+        self.assertEqual(stats['rps'], 2.0)
+        self.assertEqual(stats['p50_ms'], 20.0)
+        self.assertEqual(stats['max_ms'], 40.0)
+
+    def test_check_thresholds(self):
+        report = {'endpoints': {
+            'dashboard': {'error_rate': 0.0, 'p95_ms': 120.0},
+            'detail': {'error_rate': 0.1, 'p95_ms': 900.0},
+        }}
+        failures = LoadTest.check(report, max_error_rate=0.05, max_p95_ms=500)
+        self.assertEqual(len(failures), 2)
+        self.assertTrue(all(failure.startswith('detail') for failure in failures))
+        self.assertEqual(LoadTest.check(report), [])
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(ValueError):
+            LoadTest('http://127.0.0.1', mix={'unknown': 1})
+
+class TestEndToEnd(unittest.TestCase):
+
+    def test_short_run_against_app(self):
+        with FakeYahooServer() as upstream:
+            with AppServer(upstream.base_url, config={'api': {'dashboard_request_delay': 0}}) as app:
+                test = LoadTest(app.base_url, symbols=['AAPL', '7203.T'], users=2, duration=1.5)
+                test.seed_symbols()
+                report = test.run()
+        self.assertEqual(set(report['endpoints']), {'dashboard', 'detail', 'prediction'})
+        self.assertGreater(report['total']['count'], 0)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertGreater(upstream.counts.get('chart', 0), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from metrics import (
+    MetricsRegistry, observe_upstream, UPSTREAM_REQUESTS, UPSTREAM_SECONDS,
+    CACHE_LOOKUPS, DB_QUERY_SECONDS, DB_COMMIT_SECONDS
+)
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        requests = registry.counter('requests_total', 'Requests', ('route',))
+        latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+        requests.inc(route='/a')
+        requests.inc(2, route='/b"')
+        for value in (0.05, 0.5, 3.0):
+            latency.observe(value, route='/a')
+
+        text = registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{route="/a"} 1', text)
+        self.assertIn('requests_total{route="/b\\""} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{route="/a"} 3.550000', text)
+        self.assertIn('latency_seconds_count{route="/a"} 3', text)
+        self.assertIs(registry.counter('requests_total', 'Requests', ('route',)), requests)
+
+    def test_observe_upstream_classifies_errors(self):
+        before_ok = UPSTREAM_REQUESTS.value(kind='history', outcome='ok')
+        before_limited = UPSTREAM_REQUESTS.value(kind='history', outcome='rate_limit')
+        before_count = UPSTREAM_SECONDS.count(kind='history')
+
+        self.assertEqual(observe_upstream('history', lambda period: period, period='1mo'), '1mo')
+        with self.assertRaises(Exception):
+            observe_upstream('history', lambda: (_ for _ in ()).throw(Exception('Too Many Requests')))
+
+        self.assertEqual(UPSTREAM_REQUESTS.value(kind='history', outcome='ok'), before_ok + 1)
+        self.assertEqual(UPSTREAM_REQUESTS.value(kind='history', outcome='rate_limit'), before_limited + 1)
+        self.assertEqual(UPSTREAM_SECONDS.count(kind='history'), before_count + 2)
+
+
+class TestDatabaseMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def test_cache_lookups(self):
+        before = {result: CACHE_LOOKUPS.value(cache='price', result=result) for result in ('hit', 'miss', 'stale')}
+        db.get_cached_price('AAPL')
+        db.save_price_cache('AAPL', {'current_price': 100.0})
+        db.get_cached_price('AAPL')
+        db.get_cached_price('AAPL', cache_minutes=0)
+
+        for result in ('hit', 'miss', 'stale'):
+            self.assertEqual(CACHE_LOOKUPS.value(cache='price', result=result), before[result] + 1)
+
+        before_stale = CACHE_LOOKUPS.value(cache='history', result='stale')
+        old = (datetime.now() - timedelta(days=10)).strftime('%Y-%m-%d')
+        db.save_price_history('AAPL', [{'date': old, 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1}])
+        self.assertEqual(len(db.get_cached_history('AAPL')), 1)
+        self.assertEqual(CACHE_LOOKUPS.value(cache='history', result='stale'), before_stale + 1)
+
+    def test_query_and_commit_latency(self):
+        before_select = DB_QUERY_SECONDS.count(operation='select')
+        before_commit = DB_COMMIT_SECONDS.count()
+
+        db.add_stock('AAPL', 'Apple Inc.')
+        db.get_tracked_stocks()
+
+        self.assertGreater(DB_QUERY_SECONDS.count(operation='select'), before_select)
+        self.assertGreater(DB_COMMIT_SECONDS.count(), before_commit)
+
+if __name__ == '__main__':
+    unittest.main()
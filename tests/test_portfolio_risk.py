@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio_risk import PortfolioRisk
+
+class TestPortfolioRisk(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        dates = pd.bdate_range(start='2024-01-01', periods=250)
+        market = rng.normal(0, 0.01, (250, 1))
+        returns = rng.normal(0, 0.01, (250, 3)) + market
+        self.prices = pd.DataFrame(
+            100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=['AAA', 'BBB', 'CCC']
+        )
+        self.values = {'AAA': 1000.0, 'BBB': 2000.0, 'CCC': 1000.0}
+
+    def test_build_price_matrix(self):
+        rows = [('AAA', '2024-01-02', 10.0), ('BBB', '2024-01-02', 20.0), ('AAA', '2024-01-03', 11.0)]
+        prices = PortfolioRisk.build_price_matrix(rows)
+        self.assertEqual(list(prices.columns), ['AAA', 'BBB'])
+        self.assertEqual(len(prices), 2)
+        returns = PortfolioRisk.build_return_matrix(prices)
+        self.assertAlmostEqual(returns['AAA'].iloc[0], np.log(1.1))
+        self.assertEqual(returns['BBB'].iloc[0], 0.0)
+
+    def test_analyze(self):
+        result = PortfolioRisk.analyze(self.prices, self.values, simulations=5000, seed=1)
+        self.assertEqual(result['total_value'], 4000.0)
+        self.assertAlmostEqual(sum(p['contribution_percent'] for p in result['positions']), 100.0)
+        self.assertEqual(result['correlation']['matrix'][0][0], 1.0)
+        levels = result['var']['levels']
+        self.assertEqual(len(levels), 2)
+        self.assertGreater(levels[0]['var'], 0)
+        self.assertGreaterEqual(levels[0]['cvar'], levels[0]['var'])
+        self.assertGreaterEqual(levels[1]['var'], levels[0]['var'])
+
+    def test_simulation_chunking(self):
+        returns = PortfolioRisk.build_return_matrix(self.prices)
+        cov, _ = PortfolioRisk.covariance(returns)
+        values = np.array([1000.0, 2000.0, 1000.0])
+        for method in ('normal', 'historical'):
+            pnl = PortfolioRisk.simulate_pnl(
+                values, returns.to_numpy(), cov, simulations=1001, method=method, chunk_elements=30, seed=3
+            )
+            self.assertEqual(pnl.shape, (1001,))
+            self.assertTrue(np.isfinite(pnl).all())
+
+if __name__ == '__main__':
+    unittest.main()
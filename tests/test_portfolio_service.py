@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+import pandas as pd
+import sys
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from fx_rates import FxRateStore
+from services.portfolio_service import PortfolioService
+
+class TestPortfolioService(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+        db.add_stock('AAPL', 'Apple Inc.')
+        db.add_stock('7203.T', 'トヨタ自動車')
+        db.update_portfolio('AAPL', 10, 100.0)
+        db.update_portfolio('7203.T', 100, 2000.0)
+
+        dates = [(datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d') for i in (2, 1)]
+        for symbol, closes in (('AAPL', [100.0, 110.0]), ('7203.T', [2000.0, 2500.0])):
+            db.save_price_history(symbol, [
+                {'date': d, 'open': c, 'high': c, 'low': c, 'close': c, 'volume': 0}
+                for d, c in zip(dates, closes)
+            ])
+        db.save_fx_rates([('JPY', d, 150.0) for d in dates])
+        self.store = FxRateStore()
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def test_latest_rates_fall_back_to_database(self):
+        with patch('fx_rates.StockAPI.get_multiple_stocks_history', return_value={}) as mock_download:
+            rates = self.store.get_latest_rates(['JPY', 'USD'])
+            self.assertEqual(rates, {'USD': 1.0, 'JPY': 150.0})
+            # 2回目はTTLキャッシュから返す
+            self.store.get_latest_rates(['JPY'])
+            self.assertEqual(mock_download.call_count, 1)
+
+    @patch('fx_rates.StockAPI.get_multiple_stocks_history')
+    def test_latest_rates_batch_download(self, mock_download):
+        index = pd.to_datetime(['2026-01-05', '2026-01-06'])
+        mock_download.return_value = {
+            'JPY=X': pd.DataFrame({'Close': [151.0, 152.0]}, index=index),
+            'EUR=X': pd.DataFrame({'Close': [0.9, 0.8]}, index=index),
+        }
+        rates = self.store.get_latest_rates(['JPY', 'EUR'])
+        self.assertEqual(rates['JPY'], 152.0)
+        self.assertEqual(rates['EUR'], 0.8)
+        mock_download.assert_called_once()
+        self.assertEqual(sorted(mock_download.call_args[0][0]), ['EUR=X', 'JPY=X'])
+
+    def test_get_portfolio_in_base_currency(self):
+        with patch('services.portfolio_service.fx_store', self.store), \
+                patch('fx_rates.StockAPI.get_multiple_stocks_history', return_value={}):
+            result, status = PortfolioService.get_portfolio('JPY', history_days=30)
+
+        self.assertEqual(status, 200)
+        positions = {p['symbol']: p for p in result['positions']}
+        self.assertAlmostEqual(positions['AAPL']['value'], 10 * 110.0 * 150.0)
+        self.assertAlmostEqual(positions['7203.T']['value'], 100 * 2500.0)
+        self.assertAlmostEqual(result['total_value'], 165000.0 + 250000.0)
+        self.assertAlmostEqual(result['total_cost'], 150000.0 + 200000.0)
+        self.assertEqual(result['history']['values'], [350000.0, 415000.0])
+
+    def test_get_portfolio_invalid_currency(self):
+        _, status = PortfolioService.get_portfolio('XXX')
+        self.assertEqual(status, 400)
+
+if __name__ == '__main__':
+    unittest.main()
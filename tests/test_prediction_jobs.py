@@ -0,0 +1,209 @@
+import unittest
+import importlib.util
+import sys
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base, engine as default_engine
+from database import db
+from prediction_jobs import PredictionJobQueue, RUNNER_LEASE_PREFIX
+from exceptions import StockTrackingError
+from fake_yahoo import FakeYahooServer
+from loadtest import AppServer
+
+class TestPredictionJobQueue(unittest.TestCase):
+    """ファイル上のSQLite（完了処理はプールのスレッドから別の接続で書き込む）"""
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._dir.name, 'jobs.db')}")
+        db_session.remove()
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+        self.release = threading.Event()
+        self.calls = []
+        self.queue = self.make_queue()
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.queue._executor = self.executor
+
+        def fake_run(symbol, periods, hist=None):
+            self.calls.append((symbol, periods, hist))
+            self.release.wait(5)
+            if symbol == 'FAIL':
+                raise StockTrackingError('データ不足のため予測できません', 400)
+            return {'result': {'current_price': 100.0}, 'cache_key': f'{symbol}_key', 'params': {}}
+
+        patcher = patch('prediction_jobs._run_prediction', side_effect=fake_run)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        mark_patcher = patch('forecast_cache.forecast_cache.mark_checked')
+        self.mark_checked = mark_patcher.start()
+        self.addCleanup(mark_patcher.stop)
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown(wait=True)
+        db_session.remove()
+        db_session.configure(bind=default_engine)
+        self.engine.dispose()
+        self._dir.cleanup()
+
+    def make_queue(self):
+        queue = PredictionJobQueue(max_workers=2, max_pending=2, job_ttl_minutes=30)
+        queue._get_cached = lambda symbol, periods: None
+        return queue
+
+    def test_duplicate_jobs_are_deduplicated(self):
+        first = self.queue.submit('AAPL', 30)
+        second = self.make_queue().submit('AAPL', 30)
+        other = self.queue.submit('AAPL', 60)
+
+        self.assertEqual(first['id'], second['id'])
+        self.assertNotEqual(first['id'], other['id'])
+        self.assertEqual(first['status'], 'queued')
+
+        self.assertEqual(self.queue.dispatch(), 2)
+        self.release.set()
+        job = self.queue.wait(first['id'], timeout=5)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result'], {'current_price': 100.0})
+        self.assertEqual([call[:2] for call in self.calls].count(('AAPL', 30)), 1)
+        self.mark_checked.assert_any_call('AAPL_key', 'AAPL', {})
+
+        # 完了後は新しいジョブとして登録される
+        third = self.queue.submit('AAPL', 30)
+        self.assertNotEqual(third['id'], first['id'])
+
+    def test_status_is_shared_between_processes(self):
+        # 登録したキューと実行するキューが別でも、どちらからも同じ状態を参照できる
+        job = self.make_queue().submit('AAPL', 30)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'queued')
+
+        self.queue.dispatch()
+        self.assertEqual(self.make_queue().get(job['id'])['status'], 'running')
+        self.release.set()
+        self.assertEqual(self.make_queue().wait(job['id'], timeout=5)['status'], 'done')
+        self.assertIsNone(self.make_queue().get('missing'))
+
+    def test_history_is_passed_to_worker(self):
+        dates = pd.bdate_range('2024-01-02', periods=40)
+        hist = pd.DataFrame({'Close': np.linspace(100, 139, 40), 'Volume': 1000}, index=dates)
+        self.release.set()
+
+        job = self.queue.submit('AAPL', 30, hist=hist)
+        self.queue.dispatch()
+        self.queue.wait(job['id'], timeout=5)
+
+        pd.testing.assert_frame_equal(self.calls[0][2], hist, check_freq=False)
+        self.assertIsNone(db.get_active_job('prediction:AAPL:30'))
+
+    def test_error_is_recorded_with_status_code(self):
+        self.release.set()
+        job = self.queue.submit('FAIL', 30)
+        self.queue.dispatch()
+        job = self.queue.wait(job['id'], timeout=5)
+        self.assertEqual(job['status'], 'error')
+        self.assertEqual(job['status_code'], 400)
+
+    def test_pending_limit(self):
+        self.queue.submit('AAPL', 30)
+        self.queue.submit('MSFT', 30)
+        with self.assertRaises(StockTrackingError) as ctx:
+            self.queue.submit('GOOG', 30)
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_orphaned_jobs_are_requeued(self):
+        job = self.queue.submit('AAPL', 30)
+        db.claim_jobs('prediction', 'host-a:1', 1)
+        self.assertEqual(self.queue.dispatch(), 0)
+
+        # 実行中のプロセスのリースが有効な間は引き継がない
+        db.acquire_lease(RUNNER_LEASE_PREFIX + 'host-a:1', 'host-a:1', 30)
+        self.assertEqual(self.queue.requeue_orphaned(), 0)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'running')
+
+        # 実行中のまま終了したプロセスのジョブは、リースの失効後に次の担当プロセスが引き継ぐ
+        db.release_lease(RUNNER_LEASE_PREFIX + 'host-a:1', 'host-a:1')
+        self.assertEqual(self.queue.requeue_orphaned(), 1)
+        self.release.set()
+        self.assertEqual(self.queue.dispatch(), 1)
+        self.assertEqual(self.queue.wait(job['id'], timeout=5)['status'], 'done')
+
+    def test_shutdown_requeues_running_jobs(self):
+        self.queue._owner = 'host-a:1'
+        job = self.queue.submit('AAPL', 30)
+        self.queue.requeue_orphaned()
+        self.assertEqual(self.queue.dispatch(), 1)
+        future = self.queue._futures[job['id']]
+
+        # 担当を外れたプロセスは実行中のジョブを実行待ちに戻し、他のプロセスが実行する
+        self.queue.shutdown()
+        self.assertEqual(self.queue.get(job['id'])['status'], 'queued')
+        self.assertEqual(db.get_leases(RUNNER_LEASE_PREFIX), [])
+        other = self.make_queue()
+        other._owner = 'host-b:1'
+        self.assertEqual(db.claim_jobs('prediction', other._owner, 1)[0]['id'], job['id'])
+
+        # 停止前に実行していた計算の結果は、引き継いだプロセスのジョブを上書きしない
+        self.release.set()
+        future.result(timeout=5)
+        time.sleep(0.1)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'running')
+
+    def test_cached_result_returns_done_job(self):
+        self.queue._get_cached = lambda symbol, periods: {'current_price': 1.0, 'cached': True}
+        job = self.queue.submit('AAPL', 30)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(self.queue.get(job['id'])['result']['cached'], True)
+        self.assertEqual(self.queue.dispatch(), 0)
+        self.assertEqual(self.calls, [])
+
+@unittest.skipUnless(importlib.util.find_spec('gunicorn') and sys.platform != 'win32', 'gunicorn が必要です')
+class TestJobsUnderGunicorn(unittest.TestCase):
+    """gunicorn の複数ワーカーで、どのワーカーに振り分けられてもジョブの状態を返す"""
+
+    def poll(self, session, url, timeout=60):
+        deadline = time.monotonic() + timeout
+        statuses = []
+        while True:
+            response = session.get(url, timeout=10)
+            statuses.append(response.status_code)
+            job = response.json()
+            if len(statuses) >= 20 and (job.get('status') in ('done', 'error') or time.monotonic() > deadline):
+                return statuses, job
+            time.sleep(0.05)
+
+    def test_job_status_from_any_worker(self):
+        import requests
+
+        with FakeYahooServer() as upstream, AppServer(upstream.base_url, workers=2) as app:
+            # 接続を使い回さず、リクエストごとに別のワーカーに振り分けられるようにする
+            session = requests.Session()
+            session.headers['Connection'] = 'close'
+
+            response = session.post(f'{app.base_url}/api/stocks/import?enrich=false', json=['AAPL', 'MSFT'])
+            self.assertEqual(response.status_code, 201)
+            statuses, job = self.poll(session, f"{app.base_url}/api/stocks/import/{response.json()['id']}")
+            self.assertEqual(set(statuses), {200})
+            self.assertEqual((job['status'], job['added']), ('done', 2))
+
+            response = session.post(f'{app.base_url}/api/stocks/AAPL/prediction/jobs', json={'periods': 30})
+            self.assertEqual(response.status_code, 202)
+            statuses, job = self.poll(session, f"{app.base_url}/api/prediction/jobs/{response.json()['id']}")
+            self.assertEqual(set(statuses), {200})
+            # 実行はバックグラウンド処理を担当する1つのワーカーが行う（Prophet がない環境では失敗として記録される）
+            self.assertIn(job['status'], ('done', 'error'))
+
+if __name__ == '__main__':
+    unittest.main()
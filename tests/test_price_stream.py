@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import tempfile
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base, engine as default_engine
+from database import db
+from price_stream import PriceStream
+
+class TestPriceStream(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = PriceStream(buffer_size=3, heartbeat_seconds=0.01, refresh_seconds=60)
+        self.stream._ensure_refresher = lambda: None
+
+    def publish(self, symbol, price, volume=1000):
+        self.stream.on_data_saved('price', symbol, {
+            'current_price': price, 'previous_close': 100.0, 'change': price - 100.0,
+            'change_percent': price - 100.0, 'volume': volume, 'market_cap': 1
+        })
+
+    def events(self, chunk):
+        parsed = []
+        for block in chunk.strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+            if 'event' in fields:
+                parsed.append(fields)
+        return parsed
+
+    def test_only_changed_fields_are_published(self):
+        self.publish('AAPL', 101.0)
+        self.publish('AAPL', 101.0)
+        self.publish('AAPL', 101.0, volume=2000)
+        self.stream.on_data_saved('history', 'AAPL', None)
+
+        self.assertEqual(self.stream._seq, 2)
+        last = json.loads(self.stream._events[-1].split('data: ', 1)[1])
+        self.assertEqual(last['symbol'], 'AAPL')
+        self.assertEqual(last['volume'], 2000)
+        self.assertNotIn('current_price', last)
+
+    def test_subscriber_receives_new_events(self):
+        subscription = self.stream.subscribe()
+        self.assertIn('retry:', next(subscription))
+        self.assertEqual(next(subscription), ': keepalive\n\n')
+
+        self.publish('AAPL', 101.0)
+        self.publish('MSFT', 102.0)
+        events = self.events(next(subscription))
+        self.assertEqual([json.loads(e['data'])['symbol'] for e in events], ['AAPL', 'MSFT'])
+        self.assertEqual(events[-1]['id'], f'{self.stream.stream_id}-2')
+        self.assertEqual(self.stream.subscribers, 1)
+
+        subscription.close()
+        self.assertEqual(self.stream.subscribers, 0)
+
+    def test_resume_replays_missed_events(self):
+        self.publish('AAPL', 101.0)
+        self.publish('AAPL', 102.0)
+        self.publish('AAPL', 103.0)
+
+        subscription = self.stream.subscribe(f'{self.stream.stream_id}-1')
+        next(subscription)
+        events = self.events(next(subscription))
+        prices = [json.loads(e['data'])['current_price'] for e in events]
+        self.assertEqual(prices, [102.0, 103.0])
+        subscription.close()
+
+    def test_unknown_or_expired_event_id_sends_reset(self):
+        for price in (101.0, 102.0, 103.0, 104.0, 105.0):
+            self.publish('AAPL', price)
+
+        for event_id in ('other-3', f'{self.stream.stream_id}-1', f'{self.stream.stream_id}-99'):
+            subscription = self.stream.subscribe(event_id)
+            events = self.events(next(subscription))
+            self.assertEqual(events[0]['event'], 'reset')
+            self.assertEqual(events[0]['id'], f'{self.stream.stream_id}-5')
+            self.assertEqual(next(subscription), ': keepalive\n\n')
+            subscription.close()
+
+class TestPriceCachePolling(unittest.TestCase):
+    """ファイル上のSQLite（価格キャッシュの変更を監視して配信）"""
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._dir.name, 'stream.db')}")
+        db_session.remove()
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        self.stream = PriceStream(buffer_size=10, heartbeat_seconds=0.01, refresh_seconds=60)
+        self.stream._ensure_refresher = lambda: None
+
+    def tearDown(self):
+        db_session.remove()
+        db_session.configure(bind=default_engine)
+        self.engine.dispose()
+        self._dir.cleanup()
+
+    def test_saved_prices_are_published_by_polling(self):
+        db.save_price_cache('AAPL', {'current_price': 100.0, 'volume': 1000})
+        # 最初の確認は基準の記録だけ
+        self.assertEqual(self.stream.watcher.poll(), 0)
+        self.assertEqual(self.stream._seq, 0)
+
+        db.save_price_cache('AAPL', {'current_price': 101.0, 'volume': 1000})
+        db.save_price_cache('MSFT', {'current_price': 200.0, 'volume': 500})
+        self.assertEqual(self.stream.watcher.poll(), 2)
+        self.assertEqual(self.stream.watcher.poll(), 0)
+
+        events = [json.loads(event.split('data: ', 1)[1]) for event in self.stream._events]
+        self.assertEqual([(e['symbol'], e['current_price']) for e in events], [('AAPL', 101.0), ('MSFT', 200.0)])
+
+    @patch('services.stock_service.StockService.get_dashboard_data')
+    def test_only_lease_holder_refreshes(self, get_dashboard_data):
+        other = PriceStream(refresh_seconds=60)
+        self.assertTrue(self.stream.refresh('host-a:1'))
+        self.assertFalse(other.refresh('host-b:1'))
+        self.assertTrue(self.stream.refresh('host-a:1'))
+        self.assertEqual(get_dashboard_data.call_count, 2)
+
+        db.release_lease(PriceStream.REFRESH_LEASE, 'host-a:1')
+        self.assertTrue(other.refresh('host-b:1'))
+
+if __name__ == '__main__':
+    unittest.main()
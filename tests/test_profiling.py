@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import Profiler, StackSampler, AllocationTracker
+from exceptions import StockTrackingError
+
+def busy_work(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(1000))
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.profiler = Profiler(secret='s3cret', output_dir=self.output_dir, max_files=2, max_window_seconds=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_authorize(self):
+        self.profiler.authorize('s3cret')
+        self.assertFalse(self.profiler.is_authorized('wrong'))
+        with self.assertRaises(StockTrackingError) as ctx:
+            self.profiler.authorize(None)
+        self.assertEqual(ctx.exception.status_code, 403)
+        with self.assertRaises(StockTrackingError) as ctx:
+            Profiler(secret='').authorize('s3cret')
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_cprofile_request_and_pruning(self):
+        ids = []
+        for _ in range(3):
+            handle = self.profiler.begin('cprofile')
+            busy_work(0.01)
+            ids.append(self.profiler.end(handle, 'GET /'))
+
+        self.assertEqual([p['id'] for p in self.profiler.list_profiles()], ids[:0:-1])
+        body, mimetype = self.profiler.load(ids[-1])
+        self.assertEqual(mimetype, 'text/plain')
+        self.assertIn(b'busy_work', body)
+        self.assertEqual(self.profiler.load(ids[-1], 'raw')[1], 'application/octet-stream')
+        with self.assertRaises(StockTrackingError):
+            self.profiler.load(ids[0])
+        with self.assertRaises(StockTrackingError):
+            self.profiler.load('../etc')
+
+    def test_sampling_includes_worker_threads(self):
+        handle = self.profiler.begin('sample')
+        worker = threading.Thread(target=busy_work, args=(0.1,), name='fetch-worker')
+        worker.start()
+        worker.join()
+        profile_id = self.profiler.end(handle, 'GET /api/dashboard')
+
+        body = self.profiler.load(profile_id)[0].decode('utf-8')
+        self.assertIn('fetch-worker;', body)
+        self.assertIn('test_profiling.py:busy_work', body)
+
+        with self.assertRaises(StockTrackingError):
+            self.profiler.sample_window(5)
+        profile_id, sampler = self.profiler.sample_window(0.05, interval_ms=5)
+        self.assertGreater(sampler.samples, 0)
+
+
+class TestAllocationTracker(unittest.TestCase):
+
+    def test_report_by_site(self):
+        tracker = AllocationTracker()
+        with self.assertRaises(StockTrackingError):
+            tracker.report()
+        tracker.start(frames=5)
+        try:
+            data = [bytearray(10000) for _ in range(100)]
+            report = tracker.report(limit=5)
+            self.assertTrue(report['tracing'])
+            self.assertTrue(any('test_profiling.py' in site['site'][0] for site in report['sites']))
+            self.assertGreater(report['sites'][0]['size_diff_kb'], 900)
+            with self.assertRaises(StockTrackingError):
+                tracker.report(group_by='module')
+            del data
+        finally:
+            self.assertFalse(tracker.stop()['tracing'])
+
+if __name__ == '__main__':
+    unittest.main()
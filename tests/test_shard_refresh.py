@@ -0,0 +1,172 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base, engine as default_engine
+from database import db
+from metrics import REFRESH_SHARD_LAG, REFRESH_SHARD_PENDING
+from shard_refresh import ShardedRefresher, shard_of, shard_status
+from alert_engine import AlertEngine
+from fake_yahoo import FakeYahooServer
+from price_stream import PriceStream
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'refresh_worker.py')
+
+class ShardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._dir.name, 'shards.db')}")
+        db_session.remove()
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        db_session.remove()
+        db_session.configure(bind=default_engine)
+        self.engine.dispose()
+        self._dir.cleanup()
+
+class TestShardAssignment(ShardTestCase):
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of('aapl', 16), shard_of('AAPL', 16))
+        self.assertEqual(shard_of('7203.T', 16), 9)
+        shards = {shard_of(f'{code}.T', 4) for code in range(1300, 1400)}
+        self.assertEqual(shards, {0, 1, 2, 3})
+
+    def test_rebalance_on_join_and_death(self):
+        now = datetime(2024, 1, 1, 9, 0)
+        a = ShardedRefresher(shards=4, lease_seconds=30, owner='host-a:1')
+        b = ShardedRefresher(shards=4, lease_seconds=30, owner='host-b:1')
+
+        self.assertEqual(len(a.balance(now)), 4)
+        for shard in range(4):
+            REFRESH_SHARD_LAG.set(1.0, shard=str(shard))
+            REFRESH_SHARD_PENDING.set(1, shard=str(shard))
+        # 新しいワーカーが加わると、既存のワーカーが担当数を超えた分を解放する
+        self.assertEqual(b.balance(now), [])
+        self.assertEqual(a.balance(now + timedelta(seconds=5)), [0, 1])
+        # 解放したシャードの遅れ・未取得数は出力しない
+        for metric in (REFRESH_SHARD_LAG, REFRESH_SHARD_PENDING):
+            text = '\n'.join(metric.render())
+            self.assertIn('shard="1"', text)
+            self.assertNotIn('shard="2"', text)
+            self.assertNotIn('shard="3"', text)
+        b_shards = b.balance(now + timedelta(seconds=6))
+        self.assertEqual(len(b_shards), 2)
+        self.assertFalse(set(a.owned) & set(b_shards))
+
+        # a が延長しなくなると、リースの失効後に b が引き継ぐ
+        self.assertEqual(b.balance(now + timedelta(seconds=20)), b_shards)
+        self.assertEqual(b.balance(now + timedelta(seconds=40)), [0, 1, 2, 3])
+        self.assertEqual(b.workers(now + timedelta(seconds=40)), ['host-b:1'])
+
+        owners = {row['shard']: row['owner'] for row in shard_status(shards=4, now=now + timedelta(seconds=40))}
+        self.assertEqual(set(owners.values()), {'host-b:1'})
+
+        b.release()
+        self.assertEqual(db.get_leases(now=now + timedelta(seconds=40)), [])
+        self.assertNotIn('shard="0"', '\n'.join(REFRESH_SHARD_LAG.render()))
+
+class TestRefreshShard(ShardTestCase):
+
+    def history(self):
+        dates = pd.bdate_range(end=datetime.now(), periods=5)
+        closes = np.linspace(100, 104, 5)
+        return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1000}, index=dates)
+
+    def test_refreshes_only_due_symbols(self):
+        db.add_stocks([{'symbol': 'AAPL', 'name': 'Apple'}, {'symbol': 'MSFT', 'name': 'Microsoft'},
+                       {'symbol': '7203', 'name': 'Toyota'}])
+        db.save_price_cache('AAPL', {'current_price': 1.0, 'market_cap': 3e12})
+        db.save_price_cache('MSFT', {'current_price': 2.0})
+        stale = datetime.now() - timedelta(minutes=10)
+        db_session.execute(Base.metadata.tables['price_cache'].update()
+                           .where(Base.metadata.tables['price_cache'].c.symbol == 'AAPL').values(cached_at=stale))
+        db_session.commit()
+
+        hist = self.history()
+        refresher = ShardedRefresher(shards=1, interval_seconds=60, cache_minutes=5, owner='host-a:1')
+        refresher.balance()
+        with patch('shard_refresh.StockAPI.get_multiple_stocks_history',
+                   side_effect=lambda symbols, period: {s: hist for s in symbols}) as download, \
+                patch('shard_refresh.StockAPI.get_ticker_info', return_value={'market_cap': 4e13}) as info:
+            result = refresher.refresh_shard(0)
+
+        # MSFT は期限内なので取得しない。7203 は正規化した銘柄コードで問い合わせ、元の銘柄コードで保存する
+        download.assert_called_once_with(['AAPL', '7203.T'], period='1mo')
+        info.assert_called_once_with('7203')
+        self.assertEqual(result['refreshed'], 2)
+        self.assertEqual(result['failed'], 0)
+        self.assertGreaterEqual(result['lag_seconds'], 600)
+        self.assertEqual(REFRESH_SHARD_LAG.value(shard='0'), result['lag_seconds'])
+        self.assertEqual(REFRESH_SHARD_PENDING.value(shard='0'), 2)
+
+        entries = db.get_price_cache_entries(['AAPL', '7203'])
+        self.assertEqual(entries['AAPL']['current_price'], 104)
+        self.assertEqual(entries['AAPL']['market_cap'], 3e12)
+        self.assertEqual(entries['7203']['market_cap'], 4e13)
+        status = shard_status(shards=1, cache_minutes=5)
+        self.assertEqual(status[0]['pending'], 0)
+        self.assertEqual(status[0]['owner'], 'host-a:1')
+
+class TestCrossProcessChanges(ShardTestCase):
+    """別のプロセスのシャード更新ワーカーが保存した価格を、価格キャッシュの監視で受け取る"""
+
+    def run_worker(self, upstream_url):
+        with open(os.path.join(self._dir.name, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'database': {'name': os.path.join(self._dir.name, 'shards.db')},
+                'upstream': {'base_url': upstream_url},
+            }, f)
+        env = {key: value for key, value in os.environ.items() if key != 'DB_NAME'}
+        result = subprocess.run(
+            [sys.executable, WORKER_PATH, '--once', '--shards', '1'],
+            cwd=self._dir.name, env=env, capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        return json.loads(result.stdout)
+
+    def test_stream_and_alerts_see_other_process_writes(self):
+        db.add_stocks([{'symbol': 'AAPL', 'name': 'Apple'}])
+        db.save_price_cache('AAPL', {'current_price': 0.01, 'change_percent': 0.0})
+        stale = datetime.now() - timedelta(minutes=10)
+        db_session.execute(Base.metadata.tables['price_cache'].update().values(cached_at=stale))
+        db_session.commit()
+
+        stream = PriceStream(refresh_seconds=60)
+        alerts = AlertEngine(webhook_url='')
+        alerts.add_rule('AAPL', 'price_above', 1.0)
+        self.assertEqual(stream.watcher.poll(), 0)
+        self.assertEqual(alerts.watcher.poll(), 0)
+
+        with FakeYahooServer() as upstream:
+            results = self.run_worker(upstream.base_url)
+        self.assertEqual(results[0]['refreshed'], 1)
+
+        db_session.remove()
+        # 履歴と価格キャッシュの変更がそれぞれ届く
+        self.assertEqual(stream.watcher.poll(), 2)
+        event = json.loads(stream._events[-1].split('data: ', 1)[1])
+        self.assertEqual(event['symbol'], 'AAPL')
+        self.assertGreater(event['current_price'], 1.0)
+
+        self.assertEqual(alerts.watcher.poll(), 2)
+        events = db.get_alert_events('AAPL')
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['rule_type'], 'price_above')
+
+if __name__ == '__main__':
+    unittest.main()
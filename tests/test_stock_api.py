@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch, MagicMock, PropertyMock
+import numpy as np
 import pandas as pd
+import base64
 import sys
 import os
 
@@ -69,7 +71,7 @@ class TestStockAPI(unittest.TestCase):
         mock_db.get_cached_price.return_value = None
         
         # Mock API response
-        mock_get_price.side_effect = lambda symbol, use_cache: {
+        mock_get_price.side_effect = lambda symbol, use_cache, history_format: {
             'symbol': symbol, 'current_price': 150.0
         }
         
@@ -81,5 +83,39 @@ class TestStockAPI(unittest.TestCase):
         self.assertIn('AAPL', symbols_in_results)
         self.assertIn('GOOGL', symbols_in_results)
 
+    def _history_frame(self):
+        index = pd.DatetimeIndex(['2026-01-05 00:00', '2026-01-06 00:00'], name='Date').tz_localize('Asia/Tokyo')
+        return pd.DataFrame({
+            'Open': [100.0, 101.0], 'High': [102.0, 103.0], 'Low': [99.0, 100.5],
+            'Close': [101.5, 102.5], 'Volume': [1000, 2000]
+        }, index=index)
+
+    def test_format_history_data(self):
+        rows = StockAPI.format_history_data(self._history_frame())
+        self.assertEqual(rows[0], {'date': '2026-01-05', 'open': 100.0, 'high': 102.0, 'low': 99.0, 'close': 101.5, 'volume': 1000})
+        self.assertIsInstance(rows[1]['volume'], int)
+
+    def test_history_columns_match_rows(self):
+        hist = self._history_frame()
+        columns = StockAPI.format_history_columns(hist)
+        # 日付は取引所のローカル日付の UTC 0時
+        self.assertEqual(columns['date'], [1767571200, 1767657600])
+        self.assertEqual(columns['close'], [101.5, 102.5])
+        self.assertEqual(StockAPI.history_rows_to_columns(StockAPI.format_history_data(hist)), columns)
+
+    def test_packed_history(self):
+        packed = StockAPI.encode_history(self._history_frame(), 'packed')
+        self.assertEqual(packed['length'], 2)
+        closes = np.frombuffer(base64.b64decode(packed['columns']['close']), dtype=packed['dtypes']['close'])
+        volumes = np.frombuffer(base64.b64decode(packed['columns']['volume']), dtype=packed['dtypes']['volume'])
+        np.testing.assert_allclose(closes, [101.5, 102.5])
+        self.assertEqual(volumes.tolist(), [1000, 2000])
+
+    def test_cached_response_history_format(self):
+        rows = StockAPI.format_history_data(self._history_frame())[::-1]
+        response = StockAPI.build_history_response(self.symbol, rows, 'message', history_format='columns')
+        self.assertEqual(response['history']['close'], [102.5, 101.5])
+        self.assertEqual(response['current_price'], 102.5)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db_session, Base
+from database import db
+from stock_import import StockImporter, StockImportQueue
+from enrichment_queue import EnrichmentWorker
+from exceptions import StockTrackingError
+
+class TestStockImporter(unittest.TestCase):
+
+    def test_parse_csv_with_header(self):
+        entries = StockImporter.parse('Ticker,Name,Quantity\naapl,Apple,10\n7203,,\n\n', 'csv')
+        self.assertEqual(entries[0], {'symbol': 'aapl', 'name': 'Apple', 'quantity': '10'})
+        self.assertEqual(entries[1]['symbol'], '7203')
+
+    def test_parse_csv_without_header_and_json(self):
+        self.assertEqual(StockImporter.parse('AAPL\nMSFT,extra\n', 'csv'), [{'symbol': 'AAPL'}, {'symbol': 'MSFT'}])
+        self.assertEqual(
+            StockImporter.parse('{"symbols": ["AAPL", {"symbol": "7203", "name": "Toyota"}]}', 'json'),
+            [{'symbol': 'AAPL'}, {'symbol': '7203', 'name': 'Toyota'}]
+        )
+        with self.assertRaises(StockTrackingError):
+            StockImporter.parse('{"symbol": "AAPL"}', 'json')
+
+    def test_normalize(self):
+        stocks, invalid = StockImporter.normalize([
+            {'symbol': 'aapl'}, {'symbol': 'AAPL '}, {'symbol': '7203'}, {'symbol': 'bad symbol!'},
+            {'symbol': ''}, {'symbol': 'MSFT', 'quantity': 'x'}
+        ])
+        self.assertEqual([s['symbol'] for s in stocks], ['AAPL', '7203.T'])
+        self.assertEqual(invalid, ['bad symbol!', '', 'MSFT'])
+
+
+class TestStockImportQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        db_session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        self.queue = StockImportQueue(max_symbols=10)
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(self.engine)
+
+    def history(self):
+        dates = pd.bdate_range('2024-01-02', periods=5)
+        closes = np.linspace(100, 104, 5)
+        return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1000}, index=dates)
+
+    def test_import_registers_in_one_batch_without_enrichment(self):
+        db.add_stock('AAPL', 'Apple Inc.')
+
+        job = self.queue.start([{'symbol': 'aapl'}, {'symbol': 'msft'}, {'symbol': '7203', 'quantity': 100}], enrich=False)
+
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['added'], 2)
+        self.assertEqual(job['duplicates'], ['AAPL'])
+        stocks = {s['symbol']: s for s in db.get_tracked_stocks()}
+        self.assertEqual(stocks['MSFT']['name'], 'MSFT')
+        self.assertEqual(stocks['7203.T']['quantity'], 100)
+        # ジョブはデータベースに保存され、別のプロセスのキューからも参照できる
+        self.assertEqual(StockImportQueue().get(job['id'])['added'], 2)
+        self.assertIsNone(StockImportQueue().get('missing'))
+
+        with self.assertRaises(StockTrackingError):
+            self.queue.start([{'symbol': f'S{i}'} for i in range(11)])
+
+    @patch('stock_import.enrichment_worker', EnrichmentWorker(batch_size=2, requests_per_second=0, max_workers=2, max_attempts=1))
+    @patch('enrichment_queue.StockAPI.get_multiple_stocks_history')
+    @patch('enrichment_queue.StockAPI.fetch_info')
+    def test_enrichment_updates_names_and_prices_in_batches(self, mock_fetch_info, mock_history):
+        def fetch_info(symbol):
+            if symbol == 'FAIL':
+                raise Exception('404 Not Found')
+            return {'longName': f'{symbol} Corp', 'marketCap': 1}
+        mock_fetch_info.side_effect = fetch_info
+        mock_history.side_effect = lambda batch, period: {s: self.history() for s in batch if s != 'FAIL'}
+        updates = []
+
+        job = self.queue.start(
+            [{'symbol': 'AAPL'}, {'symbol': 'MSFT', 'name': 'Microsoft'}, {'symbol': 'FAIL'}],
+            background=False, progress=updates.append
+        )
+
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['enriched'], job['failed']), (2, 1))
+        self.assertIn('FAIL', job['failures'])
+        self.assertEqual(mock_history.call_count, 2)
+        self.assertEqual([u['enriched'] + u['failed'] for u in updates], [2, 3])
+        stocks = {s['symbol']: s['name'] for s in db.get_tracked_stocks()}
+        self.assertEqual(stocks, {'AAPL': 'AAPL Corp', 'MSFT': 'Microsoft', 'FAIL': 'FAIL'})
+        self.assertEqual(db.get_cached_price('AAPL')['current_price'], 104.0)
+
+if __name__ == '__main__':
+    unittest.main()
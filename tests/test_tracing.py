@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracing import RequestTracer, span, bind, traced, traced_methods
+
+@traced_methods('svc')
+class Service:
+
+    @staticmethod
+    def load(value):
+        with span('inner'):
+            return value
+
+    def save(self, value):
+        return value
+
+    def iterate(self):
+        yield 1
+
+class TestRequestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = RequestTracer(enabled=True, slow_request_ms=0, max_entries=3)
+
+    def tearDown(self):
+        self.tracer.finish()
+
+    def test_spans_from_worker_threads_belong_to_request(self):
+        trace = self.tracer.start('GET /api/dashboard')
+        with span('fetch'):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(bind(Service.load), range(4)))
+        Service().save(1)
+        self.tracer.finish()
+
+        fetch = trace.root.children[0]
+        self.assertEqual(fetch.name, 'fetch')
+        self.assertEqual([child.name for child in fetch.children], ['svc.load'] * 4)
+        self.assertTrue(all(child.children[0].name == 'inner' for child in fetch.children))
+        self.assertEqual(trace.root.children[1].name, 'svc.save')
+        self.assertEqual(list(Service().iterate()), [1])
+
+        totals = {name: count for name, _, count in trace.totals()}
+        self.assertEqual(totals, {'fetch': 1, 'svc.load': 4, 'inner': 4, 'svc.save': 1})
+
+    def test_server_timing_header(self):
+        trace = self.tracer.start('GET /')
+        for _ in range(2):
+            with span('db.get_cached_price'):
+                pass
+        with span('json.encode'):
+            pass
+        self.tracer.finish()
+
+        header = self.tracer.server_timing(trace)
+        self.assertTrue(header.startswith('total;dur='))
+        self.assertIn('db.get_cached_price;dur=', header)
+        self.assertIn(';desc="x2"', header)
+        self.assertIn('json.encode;dur=', header)
+
+    def test_slow_request_log_and_no_trace(self):
+        self.assertEqual(traced('noop')(lambda: 1)(), 1)
+        self.assertIs(bind(len), len)
+        self.assertIsNone(self.tracer.finish())
+
+        self.tracer.slow_request_ms = 0.001
+        self.tracer.start('GET /slow')
+        with span('yahoo.history'):
+            pass
+        with self.assertLogs('tracing', level='WARNING') as logs:
+            self.tracer.finish()
+        self.assertIn('GET /slow', logs.output[0])
+        self.assertIn('  yahoo.history', logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+import pandas as pd
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upstream_capture import UpstreamCapture, CapturedTicker, encode_payload, decode_payload, read_records, summarize
+from stock_api import StockAPI
+
+class FakeTicker:
+
+    def __init__(self):
+        self.calls = 0
+        self.ticker = 'AAPL'
+
+    def history(self, period='1mo', interval='1d'):
+        self.calls += 1
+        index = pd.date_range('2024-01-01', periods=3, freq='D', tz='America/New_York', name='Date')
+        return pd.DataFrame({
+            'Close': [100.0 + self.calls, 101.0, float('nan')],
+            'Volume': [1000, 2000, 3000],
+        }, index=index)
+
+    @property
+    def info(self):
+        return {'longName': 'Apple Inc.', 'marketCap': 3e12, 'exDividendDate': pd.Timestamp('2024-02-09')}
+
+    @property
+    def dividends(self):
+        raise Exception('Too Many Requests. Rate limited.')
+
+class TestPayloadEncoding(unittest.TestCase):
+
+    def test_round_trip_keeps_index_and_dtypes(self):
+        frame = FakeTicker().history()
+        decoded = decode_payload(encode_payload(frame))
+        pd.testing.assert_frame_equal(decoded, frame, check_freq=False)
+
+        columns = pd.MultiIndex.from_tuples([('AAPL', 'Close'), ('MSFT', 'Close')])
+        multi = pd.DataFrame([[1.0, 2.0], [3.0, 4.0]], columns=columns, index=pd.date_range('2024-01-01', periods=2))
+        pd.testing.assert_frame_equal(decode_payload(encode_payload(multi)), multi, check_freq=False)
+
+        series = pd.Series([0.24, 0.25], index=pd.to_datetime(['2024-02-09', '2024-05-10'], utc=True), name='Dividends')
+        pd.testing.assert_series_equal(decode_payload(encode_payload(series)), series)
+
+        frames = decode_payload(encode_payload({'AAPL': frame}))
+        pd.testing.assert_frame_equal(frames['AAPL'], frame, check_freq=False)
+        self.assertIsNone(decode_payload(encode_payload(None)))
+        self.assertEqual(decode_payload(encode_payload({'a': 1}))['a'], 1)
+
+class TestUpstreamCapture(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'capture', 'upstream.jsonl.gz')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def record(self):
+        recorder = UpstreamCapture('record', self.path)
+        source = FakeTicker()
+        ticker = recorder.wrap('AAPL', source)
+        first = ticker.history(period='1mo')
+        second = ticker.history(period='1mo')
+        info = ticker.info
+        with self.assertRaisesRegex(Exception, 'Too Many Requests'):
+            ticker.dividends
+        recorder.close()
+        return first, second, info
+
+    def test_record_then_replay(self):
+        first, second, info = self.record()
+
+        records = list(read_records(self.path))
+        self.assertEqual([r['kind'] for r in records], ['history', 'history', 'info', 'dividends'])
+        self.assertEqual(records[0]['params'], {'period': '1mo'})
+        self.assertIn('error', records[3])
+        summary = {row['kind']: row for row in summarize(self.path)}
+        self.assertEqual(summary['history']['count'], 2)
+        self.assertEqual(summary['dividends']['errors'], 1)
+
+        player = UpstreamCapture('replay', self.path)
+        ticker = player.replay_ticker('AAPL')
+        self.assertIsInstance(ticker, CapturedTicker)
+        # 記録順に返し、最後まで返したら先頭に戻る
+        pd.testing.assert_frame_equal(ticker.history(period='1mo'), first, check_freq=False)
+        pd.testing.assert_frame_equal(ticker.history(period='1mo'), second, check_freq=False)
+        pd.testing.assert_frame_equal(ticker.history(period='1mo'), first, check_freq=False)
+        self.assertEqual(ticker.info['longName'], info['longName'])
+        self.assertEqual(ticker.info['exDividendDate'], '2024-02-09 00:00:00')
+        with self.assertRaisesRegex(Exception, 'Too Many Requests'):
+            ticker.dividends
+        with self.assertRaisesRegex(Exception, 'No captured response'):
+            ticker.history(period='1y')
+
+    def test_truncated_capture_is_readable(self):
+        self.record()
+        with open(self.path, 'ab') as f:
+            f.write(b'\x1f\x8b\x08\x00garbage')
+        self.assertEqual(len(list(read_records(self.path))), 4)
+
+    def test_disabled_capture_passes_through(self):
+        capture = UpstreamCapture('', self.path)
+        source = FakeTicker()
+        self.assertIs(capture.wrap('AAPL', source), source)
+        self.assertEqual(capture.call('AAPL', 'info', {}, lambda: 1), 1)
+        self.assertFalse(os.path.exists(self.path))
+        with self.assertRaises(ValueError):
+            UpstreamCapture('unknown', self.path)
+
+    def test_stock_api_replays_without_upstream(self):
+        self.record()
+        with patch('stock_api.upstream_capture', UpstreamCapture('replay', self.path)), \
+                patch('stock_api.yf.Ticker', side_effect=AssertionError('upstream called')):
+            self.assertEqual(StockAPI.get_ticker_info('AAPL')['name'], 'Apple Inc.')
+            self.assertEqual(StockAPI.get_multiple_stocks_history(['AAPL']), {})
+
+if __name__ == '__main__':
+    unittest.main()
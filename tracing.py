@@ -0,0 +1,212 @@
+"""リクエストトレースモジュール - リクエスト内の処理時間の内訳（Server-Timing と遅いリクエストのログ）"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from flask.json.provider import DefaultJSONProvider
+from config import TRACING_ENABLED, TRACING_SLOW_REQUEST_MS, TRACING_SERVER_TIMING_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """計測区間（開始からの経過時間はミリ秒で保持）"""
+
+    __slots__ = ('name', 'thread', 'start', 'duration_ms', 'children')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.children: List['Span'] = []
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+
+
+class Trace:
+    """1リクエスト分のスパンの木（ワーカースレッドからも子スパンを追加する）"""
+
+    def __init__(self, name: str):
+        self.root = Span(name)
+        self._lock = threading.Lock()
+
+    def add(self, parent: Span, span: Span):
+        with self._lock:
+            parent.children.append(span)
+
+    def totals(self) -> List[Tuple[str, float, int]]:
+        """スパン名ごとの合計時間と回数（合計時間の降順、ルートは除く）"""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            stack = list(self.root.children)
+            while stack:
+                span = stack.pop()
+                stack.extend(span.children)
+                if span.duration_ms is None:
+                    continue
+                entry = totals.setdefault(span.name, [0.0, 0])
+                entry[0] += span.duration_ms
+                entry[1] += 1
+        return sorted(((name, ms, int(count)) for name, (ms, count) in totals.items()), key=lambda t: -t[1])
+
+    def render(self) -> str:
+        """スパンの木をインデント付きのテキストにする"""
+        lines = []
+
+        def walk(span: Span, depth: int):
+            duration = f'{span.duration_ms:.1f}ms' if span.duration_ms is not None else 'running'
+            offset = (span.start - self.root.start) * 1000
+            lines.append(f"{'  ' * depth}{span.name} {duration} (+{offset:.1f}ms, {span.thread})")
+            for child in sorted(span.children, key=lambda s: s.start):
+                walk(child, depth + 1)
+
+        with self._lock:
+            walk(self.root, 0)
+        return '\n'.join(lines)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+class _SpanContext:
+    """with 文でスパンを計測（トレース中でなければ何もしない）"""
+
+    __slots__ = ('name', '_trace', '_span', '_token')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._trace = _current_trace.get()
+        if self._trace is None:
+            return None
+        parent = _current_span.get() or self._trace.root
+        self._span = Span(self.name)
+        self._trace.add(parent, self._span)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, *exc):
+        if self._trace is not None:
+            self._span.finish()
+            _current_span.reset(self._token)
+        return False
+
+
+class RequestTracer:
+    """
+    リクエスト単位のトレーサー
+
+    トレースとスパンの親子関係は ContextVar で持つため、リクエストを処理するスレッドの外
+    （ThreadPoolExecutor のワーカーなど）で計測する場合は bind() で包んだ関数を渡す。
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, slow_request_ms: float = TRACING_SLOW_REQUEST_MS,
+                 max_entries: int = TRACING_SERVER_TIMING_MAX_ENTRIES):
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self.max_entries = max_entries
+
+    def start(self, name: str) -> Optional[Trace]:
+        """現在のコンテキストでトレースを開始"""
+        if not self.enabled:
+            return None
+        trace = Trace(name)
+        _current_trace.set(trace)
+        _current_span.set(None)
+        return trace
+
+    def finish(self) -> Optional[Trace]:
+        """トレースを終了し、しきい値を超えていればスパンの木をログに出す"""
+        trace = _current_trace.get()
+        if trace is None:
+            return None
+        _current_trace.set(None)
+        _current_span.set(None)
+        trace.root.finish()
+        if self.slow_request_ms and trace.root.duration_ms >= self.slow_request_ms:
+            logger.warning(f"Slow request ({trace.root.duration_ms:.0f}ms):\n{trace.render()}")
+        return trace
+
+    def server_timing(self, trace: Trace) -> str:
+        """Server-Timing ヘッダーの値（スパン名ごとの合計、並列実行分は重複して数える）"""
+        entries = [f'total;dur={trace.root.duration_ms:.1f}']
+        for name, ms, count in trace.totals()[:self.max_entries]:
+            entry = f'{name};dur={ms:.1f}'
+            if count > 1:
+                entry += f';desc="x{count}"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+    @staticmethod
+    def span(name: str) -> _SpanContext:
+        """スパンを計測するコンテキストマネージャー"""
+        return _SpanContext(name)
+
+    @staticmethod
+    def bind(func: Callable) -> Callable:
+        """現在のトレースとスパンを引き継いで func を呼び出す関数を返す（別スレッドで実行する場合）"""
+        trace = _current_trace.get()
+        if trace is None:
+            return func
+        parent = _current_span.get()
+
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            trace_token = _current_trace.set(trace)
+            span_token = _current_span.set(parent)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_span.reset(span_token)
+                _current_trace.reset(trace_token)
+        return run
+
+
+def traced(name: str) -> Callable:
+    """関数の呼び出しをスパンとして計測するデコレーター"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with _SpanContext(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_methods(prefix: str) -> Callable:
+    """クラスの公開メソッドをすべて計測するクラスデコレーター（ジェネレーターは対象外）"""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_'):
+                continue
+            if isinstance(value, staticmethod):
+                func = value.__func__
+                if not inspect.isgeneratorfunction(func):
+                    setattr(cls, attr, staticmethod(traced(f'{prefix}.{attr}')(func)))
+            elif inspect.isfunction(value) and not inspect.isgeneratorfunction(value):
+                setattr(cls, attr, traced(f'{prefix}.{attr}')(value))
+        return cls
+    return decorator
+
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """JSONのシリアライズを json.encode スパンとして計測"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with _SpanContext('json.encode'):
+            return super().dumps(obj, **kwargs)
+
+
+# グローバルインスタンス
+tracer = RequestTracer()
+span = RequestTracer.span
+bind = RequestTracer.bind
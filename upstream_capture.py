@@ -0,0 +1,252 @@
+"""上流データの記録・再生モジュール - Yahoo Finance との通信内容を保存し、同じ応答を再現する
+
+record では銘柄・種類（history / info / dividends / download）・引数・応答・所要時間を
+gzip 圧縮した JSON Lines に追記する。replay では Yahoo Finance に接続せず、記録した応答を
+同じ引数の呼び出しごとに記録順で返す（最後まで返したら先頭に戻る）。例外も記録し、再生時に同じ内容で送出する。
+障害の再現や、同じデータでの性能比較に使う。
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from config import CAPTURE_MODE, CAPTURE_PATH, CAPTURE_REPLAY_SPEED
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MODES = ('', 'record', 'replay')
+
+
+def _encode_index(index: pd.Index) -> Dict:
+    if isinstance(index, pd.DatetimeIndex):
+        return {
+            'kind': 'datetime', 'name': index.name, 'unit': index.unit,
+            'tz': str(index.tz) if index.tz is not None else None, 'values': index.asi8.tolist(),
+        }
+    return {'kind': 'plain', 'name': index.name, 'values': index.tolist()}
+
+
+def _decode_index(data: Dict) -> pd.Index:
+    if data['kind'] == 'datetime':
+        if data['tz']:
+            index = pd.to_datetime(data['values'], unit=data['unit'], utc=True).tz_convert(data['tz'])
+        else:
+            index = pd.to_datetime(data['values'], unit=data['unit'])
+        return index.rename(data['name'])
+    return pd.Index(data['values'], name=data['name'])
+
+
+def encode_payload(value) -> Dict:
+    """応答をJSONにできる形に変換（DataFrame は列ごとに型とともに保存する）"""
+    if value is None:
+        return {'type': 'none'}
+    if isinstance(value, pd.DataFrame):
+        return {
+            'type': 'frame',
+            'index': _encode_index(value.index),
+            'columns': [list(column) if isinstance(column, tuple) else column for column in value.columns],
+            'dtypes': [str(dtype) for dtype in value.dtypes],
+            'data': [value.iloc[:, i].tolist() for i in range(value.shape[1])],
+        }
+    if isinstance(value, pd.Series):
+        return {
+            'type': 'series', 'name': value.name, 'dtype': str(value.dtype),
+            'index': _encode_index(value.index), 'data': value.tolist(),
+        }
+    if isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+        return {'type': 'frames', 'value': {key: encode_payload(frame) for key, frame in value.items()}}
+    return {'type': 'json', 'value': json.loads(json.dumps(value, default=str))}
+
+
+def decode_payload(data: Dict):
+    """encode_payload の逆変換"""
+    kind = data['type']
+    if kind == 'none':
+        return None
+    if kind == 'frame':
+        index = _decode_index(data['index'])
+        columns = [tuple(column) if isinstance(column, list) else column for column in data['columns']]
+        frame = pd.DataFrame(
+            {i: pd.Series(values, index=index, dtype=dtype)
+             for i, (values, dtype) in enumerate(zip(data['data'], data['dtypes']))},
+            index=index
+        )
+        frame.columns = pd.MultiIndex.from_tuples(columns) if columns and isinstance(columns[0], tuple) else columns
+        return frame
+    if kind == 'series':
+        return pd.Series(data['data'], index=_decode_index(data['index']), dtype=data['dtype'], name=data['name'])
+    if kind == 'frames':
+        return {key: decode_payload(frame) for key, frame in data['value'].items()}
+    return data['value']
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """記録を順に読む（書き込み途中で終了したファイルは読めたところまで）"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError) as e:
+            # 記録中のプロセスが強制終了された場合は最後の gzip メンバーが閉じられていない
+            logger.info(f"Capture {path} ends without a complete gzip member, read up to that point: {e}")
+
+
+def summarize(path: str) -> List[Dict]:
+    """銘柄・種類ごとの件数・エラー数・平均所要時間"""
+    groups: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+    for record in read_records(path):
+        groups[(record['symbol'], record['kind'])].append(record)
+    return [
+        {
+            'symbol': symbol,
+            'kind': kind,
+            'count': len(records),
+            'errors': sum(1 for record in records if 'error' in record),
+            'mean_latency_ms': round(sum(record['latency_ms'] for record in records) / len(records), 2),
+        }
+        for (symbol, kind), records in sorted(groups.items())
+    ]
+
+
+class CapturedTicker:
+    """Ticker の history / info / dividends を UpstreamCapture を通して呼び出す（再生時は ticker なし）"""
+
+    def __init__(self, capture: 'UpstreamCapture', symbol: str, ticker=None):
+        self._capture = capture
+        self._ticker = ticker
+        self.ticker = symbol
+
+    def history(self, *args, **kwargs) -> pd.DataFrame:
+        params = {'args': list(args), **kwargs} if args else kwargs
+        return self._capture.call(self.ticker, 'history', params, lambda: self._ticker.history(*args, **kwargs))
+
+    @property
+    def info(self) -> Dict:
+        return self._capture.call(self.ticker, 'info', {}, lambda: self._ticker.info)
+
+    @property
+    def dividends(self) -> pd.Series:
+        return self._capture.call(self.ticker, 'dividends', {}, lambda: self._ticker.dividends)
+
+
+class UpstreamCapture:
+    """
+    上流データの記録・再生
+
+    mode が空の場合は何もしない。replay_speed は再生時の速さ（0 は待たない、1 は記録時と同じ、2 は2倍速）。
+    """
+
+    def __init__(self, mode: str = CAPTURE_MODE, path: str = CAPTURE_PATH, replay_speed: float = CAPTURE_REPLAY_SPEED):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.replay_speed = replay_speed
+        self._lock = threading.Lock()
+        self._file = None
+        self._started = time.monotonic()
+        self._replay: Optional[Dict[Tuple[str, str, str], List[Dict]]] = None
+        self._cursors: Dict[Tuple[str, str, str], int] = {}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def wrap(self, symbol: str, ticker):
+        """記録中は ticker を記録用に包み、それ以外はそのまま返す"""
+        return CapturedTicker(self, symbol, ticker) if self.recording else ticker
+
+    def replay_ticker(self, symbol: str) -> CapturedTicker:
+        return CapturedTicker(self, symbol)
+
+    def call(self, symbol: str, kind: str, params: Dict, func: Callable):
+        """モードに応じて func を呼ぶ・記録する・記録から返す"""
+        if self.replaying:
+            return self._play(symbol, kind, params)
+        if not self.recording:
+            return func()
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            self._write(symbol, kind, params, start, error=str(e))
+            raise
+        self._write(symbol, kind, params, start, payload=encode_payload(result))
+        return result
+
+    @staticmethod
+    def _key(symbol: str, kind: str, params: Dict) -> Tuple[str, str, str]:
+        return symbol, kind, json.dumps(params, sort_keys=True, default=str)
+
+    def _write(self, symbol: str, kind: str, params: Dict, start: float, **result):
+        latency_ms = (time.perf_counter() - start) * 1000
+        record = {
+            'at': round(time.monotonic() - self._started, 3),
+            'symbol': symbol,
+            'kind': kind,
+            'params': json.loads(self._key(symbol, kind, params)[2]),
+            'latency_ms': round(latency_ms, 2),
+            **result,
+        }
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        try:
+            with self._lock:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    # 追記ごとに gzip のメンバーが増えるが、gzip.open でまとめて読める
+                    self._file = gzip.open(self.path, 'at', encoding='utf-8')
+                    atexit.register(self.close)
+                self._file.write(line)
+                # 途中で終了しても書き込み済みの記録は読めるようにする
+                self._file.flush()
+        except OSError as e:
+            logger.error(f"Failed to write capture {self.path}: {e}")
+
+    def _load(self) -> Dict[Tuple[str, str, str], List[Dict]]:
+        with self._lock:
+            if self._replay is None:
+                replay = defaultdict(list)
+                if os.path.exists(self.path):
+                    for record in read_records(self.path):
+                        replay[self._key(record['symbol'], record['kind'], record['params'])].append(record)
+                else:
+                    logger.error(f"Capture {self.path} not found")
+                self._replay = dict(replay)
+                logger.info(f"Loaded {sum(map(len, replay.values()))} captured responses from {self.path}")
+            return self._replay
+
+    def _play(self, symbol: str, kind: str, params: Dict):
+        key = self._key(symbol, kind, params)
+        records = self._load().get(key)
+        if not records:
+            raise Exception(f"No captured response for {symbol} {kind} {key[2]}")
+        with self._lock:
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+        record = records[position % len(records)]
+        if self.replay_speed > 0:
+            time.sleep(record['latency_ms'] / 1000 / self.replay_speed)
+        if 'error' in record:
+            raise Exception(record['error'])
+        return decode_payload(record['payload'])
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# グローバルインスタンス
+upstream_capture = UpstreamCapture()
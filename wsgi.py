@@ -0,0 +1,12 @@
+"""WSGI エントリーポイント（gunicorn などの WSGI サーバー用）
+
+使用例:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+バックグラウンド処理（予測バッチ・銘柄情報の取得）はここでは開始しない。
+gunicorn では gunicorn.conf.py の post_fork で各ワーカーが担当プロセスの選出に参加する。
+他の WSGI サーバーで使う場合は、ワーカープロセスで app.start_background_services() を呼ぶ。
+"""
+from app import create_app
+
+app = create_app(start_background=False)
@@ -0,0 +1,128 @@
+"""Yahoo Finance 互換HTTPクライアント - upstream.base_url を指定した場合に yfinance の代わりに使用
+
+Yahoo Finance の chart（/v8/finance/chart）と quoteSummary（/v10/finance/quoteSummary）のJSONを
+yfinance の Ticker と同じ形（history / info / dividends）に変換する。
+負荷試験用のローカルサーバー（fake_yahoo.py）や社内のプロキシに接続するために使う。
+"""
+import logging
+import threading
+from typing import Dict, List
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+QUOTE_SUMMARY_MODULES = ('price', 'summaryDetail', 'defaultKeyStatistics', 'financialData', 'assetProfile')
+REQUEST_TIMEOUT = 30
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    """スレッドごとのHTTPセッション（接続を再利用する）"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _get_json(url: str, params: Dict) -> Dict:
+    """
+    JSONを取得
+
+    Raises:
+        Exception: 429 は 'Too Many Requests'、404 は '404 Not Found' を含むメッセージ（既存のエラー判定に合わせる）
+    """
+    response = _session().get(url, params=params, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 429:
+        raise Exception(f'Too Many Requests: {url}')
+    if response.status_code == 404:
+        raise Exception(f'404 Not Found: {url}')
+    response.raise_for_status()
+    return response.json()
+
+
+def _raw(value):
+    """{'raw': ..., 'fmt': ...} 形式の値を生の値にする"""
+    if isinstance(value, dict):
+        return value.get('raw') if 'raw' in value else (value or None)
+    return value
+
+
+class YahooHttpTicker:
+    """yfinance.Ticker の history / info / dividends と同じ形で値を返す"""
+
+    def __init__(self, symbol: str, base_url: str):
+        self.ticker = symbol
+        self.base_url = base_url.rstrip('/')
+
+    def _chart(self, period: str, interval: str = '1d') -> Dict:
+        data = _get_json(
+            f'{self.base_url}/v8/finance/chart/{self.ticker}',
+            {'range': period, 'interval': interval, 'events': 'div'}
+        )
+        results = (data.get('chart') or {}).get('result') or []
+        if not results:
+            error = (data.get('chart') or {}).get('error') or {}
+            raise Exception(error.get('description') or f'No data found for {self.ticker}')
+        return results[0]
+
+    def history(self, period: str = '1mo', interval: str = '1d') -> pd.DataFrame:
+        """OHLCV の DataFrame（取得できない場合は空の DataFrame）"""
+        result = self._chart(period, interval)
+        timestamps = result.get('timestamp') or []
+        if not timestamps:
+            return pd.DataFrame()
+        quote = result['indicators']['quote'][0]
+        index = pd.to_datetime(timestamps, unit='s', utc=True)
+        timezone = (result.get('meta') or {}).get('exchangeTimezoneName')
+        if timezone:
+            index = index.tz_convert(timezone)
+        hist = pd.DataFrame({
+            'Open': quote.get('open'),
+            'High': quote.get('high'),
+            'Low': quote.get('low'),
+            'Close': quote.get('close'),
+            'Volume': quote.get('volume'),
+        }, index=index.rename('Date'))
+        hist = hist.dropna(subset=['Close'])
+        hist['Volume'] = hist['Volume'].fillna(0).astype('int64')
+        return hist
+
+    @property
+    def info(self) -> Dict:
+        """quoteSummary の各モジュールの値を1つの辞書にまとめる"""
+        data = _get_json(
+            f'{self.base_url}/v10/finance/quoteSummary/{self.ticker}',
+            {'modules': ','.join(QUOTE_SUMMARY_MODULES)}
+        )
+        results = (data.get('quoteSummary') or {}).get('result') or []
+        info = {'symbol': self.ticker}
+        for module in (results[0] if results else {}).values():
+            if isinstance(module, dict):
+                info.update({key: _raw(value) for key, value in module.items()})
+        return info
+
+    @property
+    def dividends(self) -> pd.Series:
+        """配当の Series（日付 → 金額）"""
+        events = (self._chart('max').get('events') or {}).get('dividends') or {}
+        if not events:
+            return pd.Series(dtype='float64', name='Dividends')
+        items = sorted((int(event['date']), float(event['amount'])) for event in events.values())
+        index = pd.to_datetime([date for date, _ in items], unit='s', utc=True)
+        return pd.Series([amount for _, amount in items], index=index, name='Dividends')
+
+
+def download(symbols: List[str], base_url: str, period: str = '1mo') -> Dict[str, pd.DataFrame]:
+    """複数銘柄の履歴を取得（取得できなかった銘柄は含めない）"""
+    result = {}
+    for symbol in symbols:
+        try:
+            hist = YahooHttpTicker(symbol, base_url).history(period=period)
+        except Exception as e:
+            logger.warning(f"Error downloading {symbol}: {e}")
+            continue
+        if not hist.empty:
+            result[symbol] = hist
+    return result